@@ -0,0 +1,105 @@
+# Speed/accuracy comparison of the face and landmark backends in driver_monitor/backends.py.
+# Replays the same recorded clip through each backend with run_replay and reports fps,
+# CPU time and how often the resulting driver status agrees with the reference backend
+# (the first one listed, dlib HOG + 68-point by default). Other backends whose model files
+# or OpenCV modules are missing are reported and skipped; the reference must load.
+#
+# Examples:
+#   python3 compare_backends.py --video drive.mp4 --dlib68-model shape_predictor_68_face_landmarks.dat
+#   python3 compare_backends.py --frames ./frames --fps 30 --backends dlib_hog/dlib68 haar/dlib68 lbp/dlib68
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from driver_monitor.backends import DLIB5_MODEL_PATH, DLIB68_MODEL_PATH, LBF_MODEL_PATH, make_face_detector, \
+    make_landmarker
+from driver_monitor.drowsiness import DriverState
+from driver_monitor.face_tracking import DETECTION_SCALE, MODE_DETECT, MODE_LANDMARKS, MODE_CORRELATION, \
+    REDETECT_INTERVAL, ROI_PADDING
+from replay_benchmark import directory_frames, run_replay, video_frames
+
+DEFAULT_BACKENDS = ["dlib_hog/dlib68", "haar/dlib68", "lbp/dlib68", "dlib_hog/dlib5_eyes", "dlib_hog/lbf"]
+ALERT_STATUSES = ("ALERT: High Drowsiness!", "ALERT: Driver Sleeping!")
+
+
+def status_agreement(reference, candidate):
+    """
+    Return (overall, alert) agreement: the fraction of frames with the same driver
+    status, and the fraction of the reference's alert frames the candidate also
+    flagged as an alert.
+    """
+    frames = min(len(reference), len(candidate))
+    if frames == 0:
+        return 0.0, 0.0
+    same = sum(1 for a, b in zip(reference, candidate) if a == b)
+    alert_frames = [i for i in range(frames) if reference[i] in ALERT_STATUSES]
+    if not alert_frames:
+        return same / frames, 1.0
+    caught = sum(1 for i in alert_frames if candidate[i] in ALERT_STATUSES)
+    return same / frames, caught / len(alert_frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare face/landmark backends on the same recorded clip.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="recorded video file")
+    source.add_argument("--frames", help="directory of frame images, replayed in filename order")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate for --frames")
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS,
+                        help="face/landmark pairs to run; the first one is the reference")
+    parser.add_argument("--dlib68-model", default=DLIB68_MODEL_PATH)
+    parser.add_argument("--dlib5-model", default=DLIB5_MODEL_PATH)
+    parser.add_argument("--lbf-model", default=LBF_MODEL_PATH)
+    parser.add_argument("--haar-cascade", help="Haar cascade file (default: the one bundled with OpenCV)")
+    parser.add_argument("--lbp-cascade", help="LBP cascade file")
+    parser.add_argument("--tracking-mode", default=MODE_LANDMARKS, choices=[MODE_DETECT, MODE_LANDMARKS, MODE_CORRELATION])
+    parser.add_argument("--redetect-interval", type=int, default=REDETECT_INTERVAL)
+    parser.add_argument("--detection-scale", type=float, default=DETECTION_SCALE)
+    parser.add_argument("--roi-padding", type=float, default=ROI_PADDING)
+    parser.add_argument("--output-dir", help="keep each backend's combined CSV here (default: a temporary directory)")
+    args = parser.parse_args()
+
+    models = {"dlib68": args.dlib68_model, "dlib5_eyes": args.dlib5_model, "lbf": args.lbf_model}
+    cascades = {"haar": args.haar_cascade, "lbp": args.lbp_cascade}
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix="compare_backends_")
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    for spec in args.backends:
+        face_name, _, landmark_name = spec.partition("/")
+        try:
+            face_detector = make_face_detector(face_name, cascades.get(face_name))
+            landmarker = make_landmarker(landmark_name, models.get(landmark_name), roi_padding=args.roi_padding)
+        except Exception as e:
+            if spec == args.backends[0]:
+                raise SystemExit(f"Cannot load the reference backend {spec}: {e}")
+            print(f"Skipping {spec}: {e}")
+            continue
+
+        frames = video_frames(args.video) if args.video else directory_frames(args.frames, args.fps)
+        sink_path = os.path.join(output_dir, spec.replace("/", "_") + ".csv")
+        print(f"Running {spec} ...")
+        stats = run_replay(frames, face_detector, landmarker, sink_path, tracking_mode=args.tracking_mode,
+                           redetect_interval=args.redetect_interval, detection_scale=args.detection_scale,
+                           driver_state=DriverState())
+        results.append((spec, stats))
+
+    reference_spec, reference = results[0]
+    print(f"\nReference: {reference_spec}; combined rows in {output_dir}")
+    print(f"{'backend':<22} {'fps':>7} {'CPU ms/frame':>13} {'CPU %':>6} {'agree %':>8} {'alerts %':>9} {'yawns':>6}")
+    for spec, stats in results:
+        frames = stats["frames"]
+        if frames == 0:
+            print(f"{spec:<22} no frames")
+            continue
+        agreement, alert_agreement = status_agreement(reference["status_sequence"], stats["status_sequence"])
+        print(f"{spec:<22} {frames / stats['elapsed']:7.1f} {1000.0 * stats['cpu_seconds'] / frames:13.2f} "
+              f"{100.0 * stats['cpu_seconds'] / stats['elapsed']:6.0f} {100.0 * agreement:8.1f} "
+              f"{100.0 * alert_agreement:9.1f} {stats['yawns']:6d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+# Driver-facing camera drowsiness monitor.
+# Importing the package (or any of its modules) is cheap: cv2, dlib and paramiko are
+# only imported when first used. Run it with "Activation on Pi.py" or
+# "python3 -m driver_monitor"; the settings live in driver_monitor/config.py.
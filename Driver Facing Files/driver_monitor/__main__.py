@@ -0,0 +1,13 @@
+# python3 -m driver_monitor (run from the "Driver Facing Files" folder)
+
+import time
+
+STARTED = time.perf_counter()
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from driver_monitor.supervisor import main
+
+main(started=STARTED)
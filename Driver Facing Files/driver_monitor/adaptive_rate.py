@@ -0,0 +1,80 @@
+# Adaptive landmark inference rate for the driver-facing camera.
+# While the driver is clearly awake (EAR and LAR well clear of their thresholds and no
+# closure or yawn timer running) there is little point running the landmark model on
+# every frame. InferenceScheduler stretches the gap between inferences up to a small
+# ceiling, and snaps back to every frame as soon as anything gets close to a threshold.
+# The ceiling bounds how late a closure can be noticed, and so the error added to the
+# DROWSY_TIME_THRESHOLD / SLEEP_TIME_THRESHOLD timers.
+
+# ===============================
+# Default Settings
+# ===============================
+MAX_INTERVAL = 0.25        # longest gap between inferences in seconds
+EAR_MARGIN = 0.06          # EAR must be this far above EYE_AR_THRESH to count as calm
+LAR_MARGIN = 0.20          # LAR must be this far below YAWN_THRESHOLD to count as calm
+STABLE_FRAMES = 10         # consecutive calm inferences before the gap is stretched
+INTERVAL_STEP = 0.05       # first stretched gap in seconds; doubled on each further calm inference
+
+
+class InferenceScheduler:
+    """
+    Decide per frame whether to run landmark inference.
+
+    Call should_infer(now) for every captured frame; after an inference call
+    record(...) with its result. Times are in seconds (capture timestamps).
+    """
+
+    def __init__(self, eye_ar_thresh, yawn_threshold, max_interval=MAX_INTERVAL, ear_margin=EAR_MARGIN,
+                 lar_margin=LAR_MARGIN, stable_frames=STABLE_FRAMES, interval_step=INTERVAL_STEP):
+        self.eye_ar_thresh = eye_ar_thresh
+        self.yawn_threshold = yawn_threshold
+        self.max_interval = max_interval
+        self.ear_margin = ear_margin
+        self.lar_margin = lar_margin
+        self.stable_frames = stable_frames
+        self.interval_step = interval_step
+
+        self.interval = 0.0        # current gap between inferences; 0 means every frame
+        self._calm_streak = 0
+        self._last_inference = None
+
+        self.frames = 0
+        self.inferences = 0
+
+    def should_infer(self, now):
+        self.frames += 1
+        if self._last_inference is None or now - self._last_inference >= self.interval:
+            self._last_inference = now
+            self.inferences += 1
+            return True
+        return False
+
+    def record(self, left_ear, right_ear, lar, timer_running):
+        """
+        Update the rate from an inference result. Pass timer_running=True while a
+        closure or yawn timer is running.
+        """
+        calm = (
+            not timer_running
+            and min(left_ear, right_ear) > self.eye_ar_thresh + self.ear_margin
+            and lar < self.yawn_threshold - self.lar_margin
+        )
+        if not calm:
+            self.full_rate()
+            return
+        self._calm_streak += 1
+        if self._calm_streak >= self.stable_frames:
+            self.interval = min(max(self.interval * 2, self.interval_step), self.max_interval)
+
+    def full_rate(self):
+        """
+        Go back to inference on every frame (e.g. when no face is found).
+        """
+        self._calm_streak = 0
+        self.interval = 0.0
+
+    def duty_cycle(self):
+        """
+        Fraction of frames that ran inference.
+        """
+        return self.inferences / self.frames if self.frames else 1.0
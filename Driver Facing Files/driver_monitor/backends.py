@@ -0,0 +1,182 @@
+# Pluggable face detection and landmark backends for the driver-facing camera.
+# A face detector is any callable gray_frame -> list of dlib.rectangle.
+# A landmarker is any callable (gray_frame, face) -> (points, features), where points is
+# an (N, 2) array used for face tracking and features is the dict produced by
+# landmark_features.compute_features (at least left_ear, right_ear and lar).
+# make_face_detector / make_landmarker build them by name, so each device can pick the
+# speed/accuracy trade-off that suits it.
+
+import numpy as np
+
+from drishti.lazy import LazyModule
+from .face_tracking import ROI_PADDING, predict_landmarks_in_roi
+from .landmark_features import compute_features, shape_to_array
+
+cv2 = LazyModule("cv2")
+dlib = LazyModule("dlib")
+
+# ===============================
+# Backend Names and Default Model Paths
+# ===============================
+FACE_BACKENDS = ("dlib_hog", "haar", "lbp")
+LANDMARK_BACKENDS = ("dlib68", "dlib5_eyes", "lbf")
+
+HAAR_CASCADE_NAME = "haarcascade_frontalface_default.xml"   # bundled with OpenCV under cv2.data.haarcascades
+LBP_CASCADE_PATH = "/usr/share/opencv4/lbpcascades/lbpcascade_frontalface_improved.xml"
+DLIB68_MODEL_PATH = "/home/pi/Desktop/main/section2_shape_predictor_68_face_landmarks.dat"
+DLIB5_MODEL_PATH = "/home/pi/Desktop/main/shape_predictor_5_face_landmarks.dat"
+LBF_MODEL_PATH = "/home/pi/Desktop/main/lbfmodel.yaml"
+
+# dlib 5-point model: image-right eye corners, image-left eye corners, base of the nose
+FIVE_POINT_RIGHT_EYE = (0, 1)
+FIVE_POINT_LEFT_EYE = (2, 3)
+EYE_PATCH_HEIGHT = 0.8     # eye patch height as a fraction of the corner-to-corner width
+
+
+# ===============================
+# Face Detectors
+# ===============================
+class CascadeFaceDetector:
+    """
+    OpenCV Haar or LBP cascade face detector returning dlib rectangles,
+    largest face first.
+    """
+
+    def __init__(self, cascade_path, scale_factor=1.1, min_neighbors=5, min_size=(60, 60)):
+        if not hasattr(cv2, "CascadeClassifier"):
+            raise ImportError("This OpenCV build has no CascadeClassifier (OpenCV 5 moved it to opencv-contrib)")
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise IOError(f"Could not load cascade {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def __call__(self, gray_frame):
+        boxes = self.cascade.detectMultiScale(
+            gray_frame, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=self.min_size)
+        boxes = sorted(boxes, key=lambda box: box[2] * box[3], reverse=True)
+        return [dlib.rectangle(int(x), int(y), int(x + w), int(y + h)) for x, y, w, h in boxes]
+
+
+def make_face_detector(name, cascade_path=None):
+    """
+    Build a face detector by name: "dlib_hog", "haar" or "lbp".
+    """
+    if name == "dlib_hog":
+        return dlib.get_frontal_face_detector()
+    if name == "haar":
+        return CascadeFaceDetector(cascade_path or cv2.data.haarcascades + HAAR_CASCADE_NAME)
+    if name == "lbp":
+        return CascadeFaceDetector(cascade_path or LBP_CASCADE_PATH)
+    raise ValueError(f"Unknown face backend: {name} (choose from {', '.join(FACE_BACKENDS)})")
+
+
+# ===============================
+# Landmarkers
+# ===============================
+class Dlib68Landmarks:
+    """
+    dlib 68-point shape predictor; the reference backend. Accepts a model path or an
+    already loaded predictor. With roi_padding set, predicts on a padded crop.
+    """
+
+    def __init__(self, predictor, roi_padding=ROI_PADDING):
+        self.predictor = dlib.shape_predictor(predictor) if isinstance(predictor, str) else predictor
+        self.roi_padding = roi_padding
+
+    def __call__(self, gray_frame, face):
+        if self.roi_padding is None:
+            landmarks = self.predictor(gray_frame, face)
+        else:
+            landmarks = predict_landmarks_in_roi(self.predictor, gray_frame, face, self.roi_padding)
+        points = shape_to_array(landmarks)
+        return points, compute_features(points)
+
+
+def eye_openness(gray_frame, corner_a, corner_b):
+    """
+    Estimate an EAR-like openness for one eye from its two corners: the height of
+    the dark (iris and pupil) region in the middle of the eye patch divided by the
+    eye width. An open eye shows the iris (~0.3); a closed eye only the lash line.
+    """
+    width = float(np.linalg.norm(corner_b - corner_a))
+    if width < 4:
+        return 0.0
+    centre = (corner_a + corner_b) / 2.0
+    half_w = width / 2.0
+    half_h = width * EYE_PATCH_HEIGHT / 2.0
+    frame_h, frame_w = gray_frame.shape[:2]
+    x0, x1 = int(max(centre[0] - half_w, 0)), int(min(centre[0] + half_w, frame_w))
+    y0, y1 = int(max(centre[1] - half_h, 0)), int(min(centre[1] + half_h, frame_h))
+    patch = gray_frame[y0:y1, x0:x1]
+    if patch.size == 0:
+        return 0.0
+    _, dark = cv2.threshold(patch, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    third = dark.shape[1] // 3
+    middle = dark[:, third:dark.shape[1] - third] if third else dark
+    dark_rows = np.count_nonzero(middle.mean(axis=1) > 0.5)
+    return dark_rows / width
+
+
+class Dlib5EyeLandmarks:
+    """
+    Eye-only fast path: dlib's 5-point predictor locates the eye corners and the
+    openness of each eye is measured on the image patch between them. There are no
+    mouth points, so lar is reported as 0 and yawns are not detected; head pose
+    features are NaN. The openness scale differs from the 68-point EAR, so
+    EYE_AR_THRESH may need recalibrating on recorded clips.
+    """
+
+    def __init__(self, predictor):
+        self.predictor = dlib.shape_predictor(predictor) if isinstance(predictor, str) else predictor
+
+    def __call__(self, gray_frame, face):
+        points = shape_to_array(self.predictor(gray_frame, face))
+        left_ear = eye_openness(gray_frame, points[FIVE_POINT_LEFT_EYE[0]], points[FIVE_POINT_LEFT_EYE[1]])
+        right_ear = eye_openness(gray_frame, points[FIVE_POINT_RIGHT_EYE[0]], points[FIVE_POINT_RIGHT_EYE[1]])
+        features = {
+            "left_ear": left_ear,
+            "right_ear": right_ear,
+            "lar": 0.0,
+            "mouth_open": 0.0,
+            "yaw": float("nan"),
+            "pitch": float("nan"),
+            "roll": float("nan"),
+        }
+        return points, features
+
+
+class LbfLandmarks:
+    """
+    OpenCV LBF facemark (68 points, dlib ordering). Needs opencv-contrib
+    (cv2.face) and the lbfmodel.yaml model file. Returns None for a face the
+    model could not fit.
+    """
+
+    def __init__(self, model_path=LBF_MODEL_PATH):
+        if not hasattr(cv2, "face"):
+            raise ImportError("OpenCV LBF facemark needs opencv-contrib-python (cv2.face)")
+        self.facemark = cv2.face.createFacemarkLBF()
+        self.facemark.loadModel(model_path)
+
+    def __call__(self, gray_frame, face):
+        box = np.array([[face.left(), face.top(), face.width(), face.height()]], dtype=np.int32)
+        ok, landmarks = self.facemark.fit(gray_frame, box)
+        if not ok:
+            return None
+        points = landmarks[0].reshape(-1, 2).astype(np.float64)
+        return points, compute_features(points)
+
+
+def make_landmarker(name, model_path=None, roi_padding=ROI_PADDING):
+    """
+    Build a landmarker by name: "dlib68", "dlib5_eyes" or "lbf".
+    """
+    if name == "dlib68":
+        return Dlib68Landmarks(model_path or DLIB68_MODEL_PATH, roi_padding=roi_padding)
+    if name == "dlib5_eyes":
+        return Dlib5EyeLandmarks(model_path or DLIB5_MODEL_PATH)
+    if name == "lbf":
+        return LbfLandmarks(model_path or LBF_MODEL_PATH)
+    raise ValueError(f"Unknown landmark backend: {name} (choose from {', '.join(LANDMARK_BACKENDS)})")
@@ -0,0 +1,80 @@
+# Configuration for the driver-facing drowsiness monitor.
+# Edit the values here; every module of the driver monitor reads them at run time
+# (config.NAME), so they can also be overridden from Python before calling
+# supervisor.main().
+
+
+# ===============================
+# Configuration and Constants
+# ===============================
+# Drowsiness Detection Constants (time-based)
+DROWSY_TIME_THRESHOLD = 3.0   # seconds required to trigger drowsiness alert
+SLEEP_TIME_THRESHOLD = 8.0    # seconds required to trigger sleep alert
+EYE_AR_THRESH = 0.22         # EAR threshold for eye closure
+USB_CAM_INDEX = 0            # USB Camera index
+LANDMARKS_MODEL = "/home/pi/Desktop/main/section2_shape_predictor_68_face_landmarks.dat"  # model file for LANDMARK_BACKEND
+
+# Face and Landmark Backends (see backends.py; compare them with compare_backends.py)
+FACE_BACKEND = "dlib_hog"           # "dlib_hog", "haar" or "lbp"
+LANDMARK_BACKEND = "dlib68"         # "dlib68", "dlib5_eyes" (eye-only, no yawns) or "lbf" (needs opencv-contrib)
+CASCADE_PATH = None                 # Haar/LBP cascade file; None uses the default for FACE_BACKEND
+
+# Adaptive Inference Rate (skip landmark inference while the driver is clearly awake)
+ADAPTIVE_INFERENCE = True           # False runs landmark inference on every frame
+ADAPTIVE_MAX_INTERVAL = 0.25        # longest gap between inferences (s); bounds the extra closure-timer error
+ADAPTIVE_EAR_MARGIN = 0.06          # EAR must stay this far above EYE_AR_THRESH to slow down
+ADAPTIVE_LAR_MARGIN = 0.20          # LAR must stay this far below YAWN_THRESHOLD to slow down
+ADAPTIVE_STABLE_FRAMES = 10         # calm inferences in a row before slowing down
+
+# Face Tracking Constants
+TRACKING_MODE = "landmarks"         # "detect" (every frame), "landmarks" or "correlation"
+REDETECT_INTERVAL = 15              # frames between forced full face detections while tracking
+COMPARE_WITH_FULL_DETECTION = False # also run full-resolution detect-every-frame and print the EAR/LAR difference
+DETECTION_SCALE = 0.5               # face detection runs on the frame resized by this factor (1.0 = full size)
+ROI_PADDING = 0.25                  # landmarks use a full-resolution crop padded by this fraction of the face box
+
+# Yawning Detection Constants (time-based)
+YAWN_THRESHOLD = 0.7               # Lip Aspect Ratio (LAR) threshold for yawning
+EAR_THRESHOLD_FOR_YAWNING = 0.10   # Additional EAR check for yawning (ensuring eyes are almost closed)
+YAWN_TIME_THRESHOLD = 3.0          # seconds required to count as a yawn
+
+# PERCLOS (percentage of eye closure) Constants
+PERCLOS_WINDOW = 900               # frames in the rolling window (~30 s at 30 fps)
+
+# Remote Server Configuration
+HOSTNAME = '34.47.148.16'
+USERNAME = 'fast-and-furious'
+PRIVATE_KEY_PATH = '/home/pi/.ssh/fast-and-furious_public_key_openSSH.ppm'
+
+# CSV Paths on remote server
+REMOTE_DROWSINESS_LOG_PATH = "/home/fast-and-furious/main/section_2_test_drive/drowsiness_log.csv"
+REMOTE_YAWNING_LOG_PATH = "/home/fast-and-furious/main/section_2_test_drive/yawning_log.csv"
+REMOTE_COMBINED_LOG_PATH = "/home/fast-and-furious/main/section_2_test_drive/combined_log.csv"
+
+# Local combined log on the Raspberry Pi: compact binary segments, converted back to
+# the combined CSV columns with local_log_to_csv.py
+LOCAL_LOG_DIR = "/home/pi/Desktop/main/combined_log"
+LOCAL_LOG_FLUSH_INTERVAL = 10.0             # seconds of records buffered in memory before a write
+LOCAL_LOG_SEGMENT_BYTES = 8 * 1024 * 1024   # rotate (and gzip) segments at this size ...
+LOCAL_LOG_SEGMENT_SECONDS = 3600            # ... or after this many seconds
+LOCAL_LOG_MAX_BYTES = 512 * 1024 * 1024     # oldest compressed segments are deleted beyond this total
+
+# Remote upload batching (rows are queued and sent over one persistent SFTP session)
+UPLOAD_SPOOL_DIR = "/home/pi/Desktop/main/upload_spool"  # rows wait here while the link is down
+UPLOAD_BATCH_SIZE = 200        # flush after this many queued rows
+UPLOAD_FLUSH_INTERVAL = 1.0    # ... or after this many seconds
+
+# Pipeline Settings
+LOG_QUEUE_SIZE = 1000          # pending log writes before new ones are dropped
+FRAME_WAIT_TIMEOUT = 5.0       # seconds to wait for a new frame before giving up on the camera
+
+# Metrics (Prometheus format; set either to None to disable)
+METRICS_PORT = 9101            # served at http://127.0.0.1:9101/metrics
+METRICS_HOST = "127.0.0.1"     # "0.0.0.0" to serve every interface (there is no authentication)
+METRICS_TEXTFILE = None        # e.g. "/var/lib/node_exporter/textfile_collector/driver.prom"
+
+# Supervisor (restarts the capture loop without reloading the models)
+WARM_MODELS_IN_BACKGROUND = True   # load the landmark model while the camera and uploader start
+RESTART_DELAY = 1.0                # first wait before reopening the camera after a failure (s)
+MAX_RESTART_DELAY = 30.0           # the wait doubles on repeated failures up to this limit
+MAX_RESTARTS = None                # give up after this many restarts (None = never)
@@ -0,0 +1,131 @@
+# Per-frame drowsiness and yawning logic for the driver-facing camera.
+# Shared by the live loop in "Activation on Pi.py" and the offline replay benchmark, so
+# both run exactly the same landmark, EAR/LAR and time-threshold code. Time is always
+# passed in by the caller (camera capture time live, frame timestamps on replay).
+
+from .landmark_features import PERCLOS_WINDOW, PerclosWindow
+
+# ===============================
+# Default Thresholds
+# ===============================
+DROWSY_TIME_THRESHOLD = 3.0        # seconds required to trigger drowsiness alert
+SLEEP_TIME_THRESHOLD = 8.0         # seconds required to trigger sleep alert
+EYE_AR_THRESH = 0.22               # EAR threshold for eye closure
+YAWN_THRESHOLD = 0.7               # Lip Aspect Ratio (LAR) threshold for yawning
+EAR_THRESHOLD_FOR_YAWNING = 0.10   # Additional EAR check for yawning (ensuring eyes are almost closed)
+YAWN_TIME_THRESHOLD = 3.0          # seconds required to count as a yawn
+
+
+def process_faces(gray_frame, faces, landmarker):
+    """
+    Run the landmark backend on each detected face. landmarker is any callable
+    (gray_frame, face) -> (points, features) from backends.py, e.g. Dlib68Landmarks,
+    which computes EAR for both eyes, LAR, mouth opening and head pose in one pass.
+    Returns a list of tuples: (points, features). A face the backend could not fit
+    (it returned None) is left out, as if it had not been detected.
+    """
+    results = (landmarker(gray_frame, face) for face in faces)
+    return [result for result in results if result is not None]
+
+
+class DriverState:
+    """
+    Time-based drowsiness and yawning state for one driver.
+
+    update() takes the EAR/LAR of the current frame and its time in seconds and
+    returns a dict with driver_status, drowsiness_percent, yawn_or_not,
+    yawn_percent (only meaningful when a yawn was counted) and perclos.
+    """
+
+    def __init__(self, drowsy_time_threshold=DROWSY_TIME_THRESHOLD, sleep_time_threshold=SLEEP_TIME_THRESHOLD,
+                 eye_ar_thresh=EYE_AR_THRESH, yawn_threshold=YAWN_THRESHOLD,
+                 ear_threshold_for_yawning=EAR_THRESHOLD_FOR_YAWNING, yawn_time_threshold=YAWN_TIME_THRESHOLD,
+                 perclos_window=PERCLOS_WINDOW):
+        self.drowsy_time_threshold = drowsy_time_threshold
+        self.sleep_time_threshold = sleep_time_threshold
+        self.eye_ar_thresh = eye_ar_thresh
+        self.yawn_threshold = yawn_threshold
+        self.ear_threshold_for_yawning = ear_threshold_for_yawning
+        self.yawn_time_threshold = yawn_time_threshold
+
+        self.closed_start_time = None  # time when eyes first detected closed
+        self.yawn_start_time = None    # time when yawning condition started
+        self.yawn_count = 0            # total yawn events detected
+        self.perclos = PerclosWindow(perclos_window)  # rolling % of recent frames with eyes closed
+
+    def no_face(self):
+        """
+        No face in this frame: reset the timers and return the "N/A" decision.
+        """
+        self.closed_start_time = None
+        self.yawn_start_time = None
+        return {
+            "driver_status": "N/A",
+            "drowsiness_percent": 0.0,
+            "yawn_or_not": "No",
+            "yawn_percent": 0.0,
+            "perclos": self.perclos.value(),
+        }
+
+    def timer_running(self):
+        """
+        True while an eye-closure or yawn timer is running.
+        """
+        return self.closed_start_time is not None or self.yawn_start_time is not None
+
+    def update(self, left_ear, right_ear, lar, current_time):
+        avg_ear = (left_ear + right_ear) / 2.0
+
+        # ---------------------------
+        # Time-based Drowsiness Detection
+        # ---------------------------
+        both_eyes_closed = (left_ear < self.eye_ar_thresh and right_ear < self.eye_ar_thresh)
+        perclos = self.perclos.update(both_eyes_closed)
+        if both_eyes_closed:
+            if self.closed_start_time is None:
+                self.closed_start_time = current_time  # start timer when eyes first close
+            closed_duration = current_time - self.closed_start_time
+        else:
+            closed_duration = 0
+            self.closed_start_time = None
+
+        # Determine driver status based on closed eye duration
+        if closed_duration >= self.sleep_time_threshold:
+            driver_status = "ALERT: Driver Sleeping!"
+            drowsiness_percent = 100.0
+        elif closed_duration >= self.drowsy_time_threshold:
+            driver_status = "ALERT: High Drowsiness!"
+            # Percentage relative to the window between thresholds
+            drowsiness_percent = ((closed_duration - self.drowsy_time_threshold)
+                                  / (self.sleep_time_threshold - self.drowsy_time_threshold)) * 100.0
+        else:
+            driver_status = "Driver Awake"
+            drowsiness_percent = 0.0
+
+        # ---------------------------
+        # Time-based Yawning Detection
+        # ---------------------------
+        if (lar > self.yawn_threshold and avg_ear < self.ear_threshold_for_yawning):
+            if self.yawn_start_time is None:
+                self.yawn_start_time = current_time  # start yawning timer
+            yawn_duration = current_time - self.yawn_start_time
+        elif self.yawn_start_time is not None:
+            yawn_duration = current_time - self.yawn_start_time
+            self.yawn_start_time = None
+        else:
+            yawn_duration = 0
+
+        yawn_or_not = "Yes" if yawn_duration >= self.yawn_time_threshold else "No"
+        yawn_percent = 0.0
+        if yawn_or_not == "Yes":
+            self.yawn_count += 1
+            yawn_percent = min(100.0, (yawn_duration / self.yawn_time_threshold) * 100.0)
+            self.yawn_start_time = None
+
+        return {
+            "driver_status": driver_status,
+            "drowsiness_percent": drowsiness_percent,
+            "yawn_or_not": yawn_or_not,
+            "yawn_percent": yawn_percent,
+            "perclos": perclos,
+        }
@@ -0,0 +1,251 @@
+# Detect-once-then-track helper for the driver-facing camera.
+# The HOG face detector is the most expensive step per frame, while the driver's head
+# barely moves between frames. FaceTracker runs full detection only every few frames
+# (or when tracking looks unreliable) and otherwise reuses the previous face box.
+# ScaledFaceDetector and predict_landmarks_in_roi further cut the per-frame cost by
+# detecting on a downscaled frame and predicting landmarks on a full-resolution crop.
+# New face boxes are made with the class of the detector's boxes, so a detector that does
+# not return dlib.rectangle (the synthetic one) works without dlib, except in correlation
+# mode.
+
+import time
+
+import numpy as np
+
+from drishti.lazy import LazyModule
+
+cv2 = LazyModule("cv2")
+dlib = LazyModule("dlib")
+
+# ===============================
+# Tracking Modes
+# ===============================
+MODE_DETECT = "detect"            # run the face detector on every frame (original behaviour)
+MODE_LANDMARKS = "landmarks"      # derive the next face box from the previous frame's 68 landmarks
+MODE_CORRELATION = "correlation"  # follow the face with dlib's correlation tracker
+
+REDETECT_INTERVAL = 15     # frames between forced full detections while tracking
+MIN_TRACK_PSR = 7.0        # correlation tracker peak-to-sidelobe ratio below which we re-detect
+MAX_BOX_SCALE_CHANGE = 0.3 # relative change in landmark box size between frames treated as lost track
+
+# ===============================
+# Multi-resolution Detection Defaults
+# ===============================
+DETECTION_SCALE = 0.5      # detect on a frame resized by this factor (1.0 = full resolution)
+ROI_PADDING = 0.25         # crop margin around the face box, as a fraction of its size
+
+
+def landmarks_bounding_box(points):
+    """
+    Return (left, top, right, bottom) of a (num_parts, 2) landmark array.
+    """
+    left, top = points.min(axis=0)
+    right, bottom = points.max(axis=0)
+    return left, top, right, bottom
+
+
+class ScaledFaceDetector:
+    """
+    Wrap a dlib face detector so it runs on a downscaled copy of the frame and
+    returns rectangles mapped back to full-resolution coordinates. Keeps timing
+    totals so the latency saving can be reported.
+    """
+
+    def __init__(self, detector, scale=DETECTION_SCALE, histogram=None):
+        if not 0 < scale <= 1:
+            raise ValueError(f"Detection scale must be in (0, 1], got {scale}")
+        self.detector = detector
+        self.scale = scale
+        self.histogram = histogram  # optional drishti.metrics.Histogram fed with each call's duration
+        self.calls = 0
+        self.total_seconds = 0.0
+
+    def __call__(self, gray_frame):
+        start = time.perf_counter()
+        if self.scale == 1:
+            faces = list(self.detector(gray_frame))
+        else:
+            small = cv2.resize(gray_frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            faces = [
+                type(face)(
+                    int(face.left() / self.scale), int(face.top() / self.scale),
+                    int(face.right() / self.scale), int(face.bottom() / self.scale),
+                )
+                for face in self.detector(small)
+            ]
+        elapsed = time.perf_counter() - start
+        self.total_seconds += elapsed
+        self.calls += 1
+        if self.histogram is not None:
+            self.histogram.observe(elapsed)
+        return faces
+
+    def mean_latency_ms(self):
+        return 1000.0 * self.total_seconds / self.calls if self.calls else 0.0
+
+
+def predict_landmarks_in_roi(shape_predictor, gray_frame, face, padding=ROI_PADDING):
+    """
+    Run the shape predictor on a padded full-resolution crop around the face and
+    return the landmarks in full-frame coordinates.
+    """
+    height, width = gray_frame.shape[:2]
+    pad_x = int(face.width() * padding)
+    pad_y = int(face.height() * padding)
+    x0 = max(face.left() - pad_x, 0)
+    y0 = max(face.top() - pad_y, 0)
+    x1 = min(face.right() + pad_x, width)
+    y1 = min(face.bottom() + pad_y, height)
+    if x1 <= x0 or y1 <= y0:
+        return shape_predictor(gray_frame, face)
+
+    roi = gray_frame[y0:y1, x0:x1]
+    local_face = type(face)(face.left() - x0, face.top() - y0, face.right() - x0, face.bottom() - y0)
+    local = shape_predictor(roi, local_face)
+    if isinstance(local, np.ndarray):
+        return local + (x0, y0)
+    points = [dlib.point(local.part(i).x + x0, local.part(i).y + y0) for i in range(local.num_parts)]
+    return dlib.full_object_detection(face, points)
+
+
+class FaceTracker:
+    """
+    Locate the driver's face in each grayscale frame, re-running the full detector
+    only when needed. Call locate() before the shape predictor and observe() with
+    the resulting landmarks afterwards.
+    """
+
+    def __init__(self, detector, mode=MODE_LANDMARKS, redetect_interval=REDETECT_INTERVAL,
+                 min_psr=MIN_TRACK_PSR, max_box_scale_change=MAX_BOX_SCALE_CHANGE):
+        if mode not in (MODE_DETECT, MODE_LANDMARKS, MODE_CORRELATION):
+            raise ValueError(f"Unknown tracking mode: {mode}")
+        self.detector = detector
+        self.mode = mode
+        self.redetect_interval = redetect_interval
+        self.min_psr = min_psr
+        self.max_box_scale_change = max_box_scale_change
+
+        self._face = None                 # face box handed to the shape predictor last frame
+        self._frames_since_detect = 0
+        self._just_detected = False
+        self._box_offset = None           # detector box expressed relative to the landmark box
+        self._last_landmark_box = None
+        self._lost = True
+        self._correlation = None
+
+        # Counters so the caller can report how often full detection ran.
+        self.frames = 0
+        self.detections = 0
+
+    def reset(self):
+        """
+        Drop the current track; the next frame runs full detection.
+        """
+        self._face = None
+        self._box_offset = None
+        self._last_landmark_box = None
+        self._lost = True
+        self._correlation = None
+
+    def locate(self, gray_frame):
+        """
+        Return the list of face rectangles for this frame (empty if no face).
+        """
+        self.frames += 1
+        self._just_detected = False
+
+        if self._needs_detection():
+            return self._detect(gray_frame)
+
+        if self.mode == MODE_CORRELATION:
+            psr = self._correlation.update(gray_frame)
+            if psr < self.min_psr:
+                return self._detect(gray_frame)
+            position = self._correlation.get_position()
+            self._face = dlib.rectangle(int(position.left()), int(position.top()),
+                                        int(position.right()), int(position.bottom()))
+        else:
+            self._face = self._box_from_landmarks(self._last_landmark_box)
+
+        if not self._inside_frame(self._face, gray_frame):
+            return self._detect(gray_frame)
+
+        self._frames_since_detect += 1
+        return [self._face]
+
+    def observe(self, points):
+        """
+        Feed back the landmarks predicted for the face returned by locate(),
+        as a (num_parts, 2) array.
+        """
+        box = landmarks_bounding_box(points)
+        if self._just_detected:
+            self._box_offset = self._offset_between(box, self._face)
+        elif self._last_landmark_box is not None:
+            previous_size = self._last_landmark_box[2] - self._last_landmark_box[0]
+            current_size = box[2] - box[0]
+            if previous_size <= 0 or abs(current_size - previous_size) / previous_size > self.max_box_scale_change:
+                self._lost = True
+        self._last_landmark_box = box
+
+    # ---------------------------
+    # Internal Helpers
+    # ---------------------------
+    def _needs_detection(self):
+        return (
+            self.mode == MODE_DETECT
+            or self._lost
+            or self._face is None
+            or self._last_landmark_box is None
+            or self._frames_since_detect >= self.redetect_interval
+        )
+
+    def _detect(self, gray_frame):
+        self.detections += 1
+        faces = self.detector(gray_frame)
+        if len(faces) == 0:
+            self.reset()
+            return faces
+        self._face = faces[0]
+        self._frames_since_detect = 0
+        self._just_detected = True
+        self._lost = False
+        if self.mode == MODE_CORRELATION:
+            self._correlation = dlib.correlation_tracker()
+            self._correlation.start_track(gray_frame, self._face)
+        return faces
+
+    @staticmethod
+    def _offset_between(landmark_box, face):
+        """
+        Express the detector's box relative to the landmark box, so later landmark
+        boxes can be turned back into the kind of box the shape predictor expects.
+        """
+        left, top, right, bottom = landmark_box
+        width = max(right - left, 1)
+        height = max(bottom - top, 1)
+        return (
+            (face.left() - left) / width,
+            (face.top() - top) / height,
+            (face.right() - right) / width,
+            (face.bottom() - bottom) / height,
+        )
+
+    def _box_from_landmarks(self, landmark_box):
+        left, top, right, bottom = landmark_box
+        width = right - left
+        height = bottom - top
+        dl, dt, dr, db = self._box_offset
+        return type(self._face)(
+            int(round(left + dl * width)), int(round(top + dt * height)),
+            int(round(right + dr * width)), int(round(bottom + db * height)),
+        )
+
+    @staticmethod
+    def _inside_frame(face, gray_frame):
+        height, width = gray_frame.shape[:2]
+        return (
+            face.right() > face.left() and face.bottom() > face.top()
+            and face.right() > 0 and face.bottom() > 0
+            and face.left() < width and face.top() < height
+        )
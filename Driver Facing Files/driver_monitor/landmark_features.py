@@ -0,0 +1,119 @@
+# Vectorized facial features for the driver-facing camera.
+# The dlib shape is converted to one (68, 2) array per frame, and every feature is
+# computed from that array with NumPy indexing, so the same code also runs on a
+# (frames, 68, 2) batch when replaying recorded landmarks offline.
+
+import numpy as np
+
+# ===============================
+# Landmark Indices (dlib 68-point model)
+# ===============================
+EYES = np.array([range(36, 42), range(42, 48)])   # left eye, right eye; 6 points each
+EYE_VERTICAL = np.array([[1, 5], [2, 4]])          # point pairs inside each eye
+EYE_HORIZONTAL = np.array([0, 3])
+LIP_VERTICAL = np.array([[50, 58], [52, 56]])      # outer lip pairs used by the LAR
+LIP_HORIZONTAL = np.array([48, 54])
+INNER_MOUTH_VERTICAL = np.array([62, 66])
+INNER_MOUTH_HORIZONTAL = np.array([60, 64])
+NOSE_TIP = 30
+CHIN = 8
+JAW_LEFT = 0
+JAW_RIGHT = 16
+
+PERCLOS_WINDOW = 900       # frames in the rolling PERCLOS window (~30 s at 30 fps)
+
+
+def shape_to_array(landmarks):
+    """
+    Convert a dlib full_object_detection into a (num_parts, 2) float array. A
+    predictor that already returns an array (the synthetic one) is passed through.
+    """
+    if isinstance(landmarks, np.ndarray):
+        return landmarks.astype(np.float64)
+    return np.array([(point.x, point.y) for point in landmarks.parts()], dtype=np.float64)
+
+
+def _distance(points, a, b):
+    return np.linalg.norm(points[..., a, :] - points[..., b, :], axis=-1)
+
+
+def compute_features(points):
+    """
+    Compute all per-frame features from landmark coordinates.
+
+    points has shape (68, 2) for one frame or (frames, 68, 2) for a batch. Returns a
+    dict of floats (or arrays with one value per frame):
+      left_ear, right_ear  Eye Aspect Ratio of each eye
+      lar                  Lip Aspect Ratio (outer lips, same formula as the yawn threshold)
+      mouth_open           inner mouth height / width
+      yaw                  nose offset between the jaw edges, -1 (turned left) .. 1 (turned right)
+      pitch                nose height between eye line and chin, ~0.5 when facing the camera
+      roll                 angle of the line between the eye centres, in degrees
+    """
+    points = np.asarray(points, dtype=np.float64)
+
+    # Both eyes in one go: eyes has shape (..., 2, 6, 2)
+    eyes = points[..., EYES, :]
+    vertical = np.linalg.norm(eyes[..., EYE_VERTICAL[:, 0], :] - eyes[..., EYE_VERTICAL[:, 1], :], axis=-1)
+    horizontal = np.linalg.norm(eyes[..., EYE_HORIZONTAL[0], :] - eyes[..., EYE_HORIZONTAL[1], :], axis=-1)
+    ear = vertical.sum(axis=-1) / (2.0 * horizontal)
+
+    lip_vertical = np.linalg.norm(points[..., LIP_VERTICAL[:, 0], :] - points[..., LIP_VERTICAL[:, 1], :], axis=-1)
+    lar = lip_vertical.sum(axis=-1) / (2.0 * _distance(points, *LIP_HORIZONTAL))
+    mouth_open = _distance(points, *INNER_MOUTH_VERTICAL) / _distance(points, *INNER_MOUTH_HORIZONTAL)
+
+    eye_centres = eyes.mean(axis=-2)
+    eye_delta = eye_centres[..., 1, :] - eye_centres[..., 0, :]
+    roll = np.degrees(np.arctan2(eye_delta[..., 1], eye_delta[..., 0]))
+
+    to_left_jaw = _distance(points, NOSE_TIP, JAW_LEFT)
+    to_right_jaw = _distance(points, NOSE_TIP, JAW_RIGHT)
+    yaw = (to_left_jaw - to_right_jaw) / (to_left_jaw + to_right_jaw)
+
+    eye_line_y = eye_centres[..., 1].mean(axis=-1)
+    pitch = (points[..., NOSE_TIP, 1] - eye_line_y) / (points[..., CHIN, 1] - eye_line_y)
+
+    return {
+        "left_ear": ear[..., 0],
+        "right_ear": ear[..., 1],
+        "lar": lar,
+        "mouth_open": mouth_open,
+        "yaw": yaw,
+        "pitch": pitch,
+        "roll": roll,
+    }
+
+
+class PerclosWindow:
+    """
+    Rolling PERCLOS: the fraction of the last `size` frames in which the eyes were
+    closed. Uses a fixed ring buffer and a running count, so each update is O(1).
+    """
+
+    def __init__(self, size=PERCLOS_WINDOW):
+        self._closed = np.zeros(size, dtype=bool)
+        self._index = 0
+        self._count = 0
+        self._closed_count = 0
+
+    def update(self, eyes_closed):
+        """
+        Record one frame and return the current PERCLOS as a percentage.
+        """
+        if self._count == len(self._closed):
+            self._closed_count -= int(self._closed[self._index])
+        else:
+            self._count += 1
+        self._closed[self._index] = eyes_closed
+        self._closed_count += int(eyes_closed)
+        self._index = (self._index + 1) % len(self._closed)
+        return self.value()
+
+    def value(self):
+        return 100.0 * self._closed_count / self._count if self._count else 0.0
+
+    def reset(self):
+        self._closed[:] = False
+        self._index = 0
+        self._count = 0
+        self._closed_count = 0
@@ -0,0 +1,248 @@
+# Compact local store for the combined driver log on the Pi's SD card.
+# Each frame is one fixed-size binary record (timestamp, EARs, LAR, drowsiness %,
+# status and yawn) instead of a formatted CSV line. Records are buffered in memory and
+# written in blocks, segment files rotate by size and age, closed segments are gzipped
+# on a background thread and the oldest segments are deleted once the store exceeds
+# its size limit. read_records() / write_csv() turn segments back into the CSV columns.
+
+import csv
+import gzip
+import os
+import shutil
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+# ===============================
+# Record Format
+# ===============================
+# microseconds since the epoch, UTC offset in minutes, left EAR, right EAR, LAR,
+# drowsiness %, status code, yawn flag -> 28 bytes per frame
+RECORD = struct.Struct("<qhffffBB")
+SEGMENT_MAGIC = b"DRCOMB01"
+SEGMENT_SUFFIX = ".bin"
+COMPRESSED_SUFFIX = ".bin.gz"
+CSV_COLUMNS = ["timestamp", "left_ear", "right_ear", "lar", "drowsiness_percent", "driver_status", "yawn_or_not"]
+STATUSES = ["N/A", "Driver Awake", "ALERT: High Drowsiness!", "ALERT: Driver Sleeping!"]
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+UNKNOWN_STATUS = 255
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# ===============================
+# Default Settings
+# ===============================
+BUFFER_RECORDS = 300           # write once this many records are waiting (~10 s at 30 fps)
+FLUSH_INTERVAL = 10.0          # ... or once the oldest waiting record is this many seconds old
+SEGMENT_BYTES = 8 * 1024 * 1024   # start a new segment at this size
+SEGMENT_SECONDS = 3600.0       # ... or after this many seconds
+MAX_STORE_BYTES = 512 * 1024 * 1024   # delete the oldest segments beyond this total
+
+
+class LocalLogStore:
+    """
+    Buffered, rotating, compressed writer for combined driver log records.
+    Not thread-safe: call append() from one thread (the log worker).
+    """
+
+    def __init__(self, directory, prefix="combined", buffer_records=BUFFER_RECORDS, flush_interval=FLUSH_INTERVAL,
+                 segment_bytes=SEGMENT_BYTES, segment_seconds=SEGMENT_SECONDS, max_store_bytes=MAX_STORE_BYTES):
+        self.directory = directory
+        self.prefix = prefix
+        self.buffer_records = buffer_records
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.max_store_bytes = max_store_bytes
+
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._oldest_buffered = None
+        self._file = None
+        self._segment_path = None
+        self._segment_started = None
+        self._compressors = []
+
+        # Counters
+        self.records_written = 0
+        self.bytes_written = 0
+        self.segments_closed = 0
+        self.segments_deleted = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        # Segments left open by a previous run (e.g. after a power cut) are closed now.
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith(self.prefix + "-") and name.endswith(SEGMENT_SUFFIX):
+                self._compress_in_background(os.path.join(self.directory, name))
+
+    def append(self, current_dt, left_ear, right_ear, lar, drowsiness_percent, driver_status, yawn_or_not):
+        """
+        Buffer one record. current_dt must be a timezone-aware datetime.
+        """
+        offset = current_dt.utcoffset()
+        offset_minutes = int(offset.total_seconds() // 60) if offset is not None else 0
+        micros = (current_dt - EPOCH) // ONE_MICROSECOND
+        self._buffer += RECORD.pack(micros, offset_minutes, left_ear, right_ear, lar, drowsiness_percent,
+                                    STATUS_CODES.get(driver_status, UNKNOWN_STATUS), yawn_or_not == "Yes")
+        self._buffered += 1
+        now = time.monotonic()
+        if self._oldest_buffered is None:
+            self._oldest_buffered = now
+        if self._buffered >= self.buffer_records or now - self._oldest_buffered >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered records to the current segment, rotating it if needed.
+        """
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._open_segment()
+        try:
+            self._file.write(self._buffer)
+            self._file.flush()
+        except Exception as e:
+            print(f"Error writing local log segment ({self._segment_path}): {e}")
+            return  # keep the records buffered and try again on the next flush
+        self.records_written += self._buffered
+        self.bytes_written += len(self._buffer)
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._oldest_buffered = None
+        if (self._file.tell() >= self.segment_bytes
+                or time.monotonic() - self._segment_started >= self.segment_seconds):
+            self._close_segment()
+
+    def close(self, timeout=30.0):
+        """
+        Flush, close the current segment and wait for pending compression.
+        """
+        self.flush()
+        self._close_segment()
+        for thread in self._compressors:
+            thread.join(timeout)
+        self._compressors = []
+
+    # ---------------------------
+    # Segments
+    # ---------------------------
+    def _open_segment(self):
+        # Names sort in time order: prefix-YYYYmmdd-HHMMSS-NNN.bin
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        count = 0
+        while True:
+            path = os.path.join(self.directory, f"{self.prefix}-{stamp}-{count:03d}{SEGMENT_SUFFIX}")
+            if not os.path.exists(path) and not os.path.exists(path + ".gz"):
+                break
+            count += 1
+        self._file = open(path, "wb")
+        self._file.write(SEGMENT_MAGIC)
+        self._segment_path = path
+        self._segment_started = time.monotonic()
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self.segments_closed += 1
+        self._compress_in_background(self._segment_path)
+
+    def _compress_in_background(self, path):
+        self._compressors = [thread for thread in self._compressors if thread.is_alive()]
+        thread = threading.Thread(target=self._compress, args=(path,), name="log-compress", daemon=True)
+        thread.start()
+        self._compressors.append(thread)
+
+    def _compress(self, path):
+        """
+        gzip a closed segment (write to a temporary file, then rename) and enforce
+        the store size limit.
+        """
+        try:
+            tmp_path = path + ".gz.tmp"
+            with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, path + ".gz")
+            os.remove(path)
+        except Exception as e:
+            print(f"Error compressing local log segment ({path}): {e}")
+        self._enforce_limit()
+
+    def _enforce_limit(self):
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(self.prefix + "-") and name.endswith(COMPRESSED_SUFFIX))
+        sizes = {}
+        for name in names:
+            try:
+                sizes[name] = os.path.getsize(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass  # removed by another compressor thread
+        total = sum(sizes.values())
+        for name in sizes:
+            if total <= self.max_store_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= sizes[name]
+                self.segments_deleted += 1
+            except FileNotFoundError:
+                pass
+
+
+# ===============================
+# Reading Back
+# ===============================
+def segment_paths(directory, prefix="combined"):
+    """
+    Segment files in the directory, oldest first (compressed and still open ones).
+    """
+    names = [name for name in os.listdir(directory) if name.startswith(prefix + "-")
+             and (name.endswith(SEGMENT_SUFFIX) or name.endswith(COMPRESSED_SUFFIX))]
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+
+def read_records(path):
+    """
+    Yield (timestamp, left_ear, right_ear, lar, drowsiness_percent, driver_status,
+    yawn_or_not) tuples from one segment, with timestamp as an aware datetime.
+    A partially written last record is ignored.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(SEGMENT_MAGIC):
+        raise ValueError(f"{path} is not a combined log segment")
+    end = len(SEGMENT_MAGIC) + (len(data) - len(SEGMENT_MAGIC)) // RECORD.size * RECORD.size
+    for micros, offset_minutes, left_ear, right_ear, lar, drowsiness_percent, status_code, yawn in \
+            RECORD.iter_unpack(memoryview(data)[len(SEGMENT_MAGIC):end]):
+        tz = timezone(timedelta(minutes=offset_minutes))
+        timestamp = (EPOCH + micros * ONE_MICROSECOND).astimezone(tz)
+        driver_status = STATUSES[status_code] if status_code < len(STATUSES) else "Unknown"
+        yield timestamp, left_ear, right_ear, lar, drowsiness_percent, driver_status, "Yes" if yawn else "No"
+
+
+def write_csv(paths, output, header=False):
+    """
+    Convert segments to rows in the combined CSV format (the same columns and number
+    formatting the local CSV log used). output is a path or an open text file.
+    Returns the number of rows written.
+    """
+    close = isinstance(output, str)
+    f = open(output, "w", newline="") if close else output
+    rows = 0
+    try:
+        writer = csv.writer(f, lineterminator="\n")
+        if header:
+            writer.writerow(CSV_COLUMNS)
+        for path in paths:
+            for timestamp, left_ear, right_ear, lar, drowsiness_percent, driver_status, yawn_or_not in read_records(path):
+                writer.writerow([timestamp.isoformat(), f"{left_ear:.3f}", f"{right_ear:.3f}", f"{lar:.3f}",
+                                 f"{drowsiness_percent:.1f}", driver_status, yawn_or_not])
+                rows += 1
+    finally:
+        if close:
+            f.close()
+    return rows
@@ -0,0 +1,73 @@
+# Face detector and landmark model loading for the driver monitor.
+# The 68-point landmark model is ~100 MB and takes seconds to load on a Pi, so it is
+# loaded once per process and shared by every (re)start of the capture loop. warm()
+# imports cv2/dlib and loads the models on a background thread, so that work overlaps
+# with opening the camera and starting the uploader.
+
+import threading
+import time
+
+from .backends import make_face_detector, make_landmarker
+from .face_tracking import ROI_PADDING
+
+
+class ModelLoadError(Exception):
+    """
+    The face or landmark model could not be loaded (wrong path, missing module).
+    """
+
+
+class ModelLoader:
+    """
+    Load the (face_detector, landmarker) pair once, on demand or in the background.
+    """
+
+    def __init__(self, face_backend, landmark_backend, landmarks_model, cascade_path=None, roi_padding=ROI_PADDING):
+        self.face_backend = face_backend
+        self.landmark_backend = landmark_backend
+        self.landmarks_model = landmarks_model
+        self.cascade_path = cascade_path
+        self.roi_padding = roi_padding
+
+        self._models = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.load_seconds = None   # time spent importing and loading, once loaded
+
+    def warm(self):
+        """
+        Start loading on a background thread and return immediately.
+        """
+        if self._thread is None and self._models is None:
+            self._thread = threading.Thread(target=self._warm, name="model-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _warm(self):
+        try:
+            self.get()
+        except ModelLoadError:
+            pass  # get() raises it again for the caller that needs the models
+
+    def loaded(self):
+        return self._models is not None
+
+    def get(self):
+        """
+        Return (face_detector, landmarker), loading them on first use. Waits for a
+        background warmup that is already in progress instead of loading twice.
+        """
+        with self._lock:
+            if self._models is None:
+                start = time.perf_counter()
+                try:
+                    face_detector = make_face_detector(self.face_backend, self.cascade_path)
+                    landmarker = make_landmarker(self.landmark_backend, self.landmarks_model,
+                                                 roi_padding=self.roi_padding)
+                except Exception as e:
+                    raise ModelLoadError(
+                        f"Unable to load the {self.face_backend}/{self.landmark_backend} models "
+                        f"({self.landmarks_model}): {e}") from e
+                self._models = (face_detector, landmarker)
+                self.load_seconds = time.perf_counter() - start
+            return self._models
@@ -0,0 +1,445 @@
+# Driver-facing drowsiness monitor: captures frames from the driver camera, runs the
+# face/landmark models, applies the time-based drowsiness and yawning logic and logs
+# the results locally and to the virtual machine engine.
+# DriverMonitor holds everything that should survive a camera restart (models, uploader,
+# log worker, metrics, driver state); run_once() opens the camera and processes frames
+# until the camera stops delivering them. supervisor.py restarts it as needed.
+
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from drishti import metrics
+from drishti.lazy import LazyModule
+from drishti.uploader import BatchedUploader
+from . import config
+from .adaptive_rate import InferenceScheduler
+from .backends import Dlib68Landmarks
+from .drowsiness import DriverState, process_faces
+from .face_tracking import FaceTracker, ScaledFaceDetector
+from .local_log import LocalLogStore
+from .pipeline import AsyncWorker, LatestFrameCapture
+
+cv2 = LazyModule("cv2")
+
+
+def stage_histogram(stage):
+    return metrics.REGISTRY.histogram("driver_stage_seconds", "Time spent in each driver loop stage", {"stage": stage})
+
+
+class DriverMonitor:
+    """
+    The driver monitor of one process. Create it once, call run_once() for each
+    camera session and close() on shutdown. Pass uploader to send the remote rows
+    through something else than its own BatchedUploader (e.g. the edge agent).
+    """
+
+    def __init__(self, models, started=None, uploader=None):
+        self.models = models
+        self.started = time.perf_counter() if started is None else started   # for time to first frame
+        self.face_detector = None
+        self.landmarker = None
+        self.full_frame_landmarker = None
+        self.scaled_face_detector = None
+        self.face_tracker = None
+
+        # Running totals for COMPARE_WITH_FULL_DETECTION
+        self.comparison_stats = {"frames": 0, "missed": 0, "ear_diff": 0.0, "lar_diff": 0.0, "max_ear_diff": 0.0,
+                                 "reference_seconds": 0.0}
+        self.runs = 0
+        self.frame_capture = None
+        self._captured_before = 0   # frame counters of earlier camera sessions
+        self._dropped_before = 0
+        self.stopping = threading.Event()   # set by stop() to end run_once() and the supervisor
+
+        # ---------------------------
+        # Logging
+        # ---------------------------
+        self.owns_uploader = uploader is None
+        if self.owns_uploader:
+            uploader = BatchedUploader(
+                config.HOSTNAME, config.USERNAME, config.PRIVATE_KEY_PATH, config.UPLOAD_SPOOL_DIR,
+                batch_size=config.UPLOAD_BATCH_SIZE, flush_interval=config.UPLOAD_FLUSH_INTERVAL,
+            ).start()
+        self.uploader = uploader
+        self.log_worker = AsyncWorker("log-worker", max_queue_size=config.LOG_QUEUE_SIZE).start()
+        self.local_log = LocalLogStore(
+            config.LOCAL_LOG_DIR, flush_interval=config.LOCAL_LOG_FLUSH_INTERVAL,
+            segment_bytes=config.LOCAL_LOG_SEGMENT_BYTES, segment_seconds=config.LOCAL_LOG_SEGMENT_SECONDS,
+            max_store_bytes=config.LOCAL_LOG_MAX_BYTES,
+        )
+
+        # ---------------------------
+        # Time-Based Tracking State
+        # ---------------------------
+        self.driver_state = DriverState(
+            drowsy_time_threshold=config.DROWSY_TIME_THRESHOLD, sleep_time_threshold=config.SLEEP_TIME_THRESHOLD,
+            eye_ar_thresh=config.EYE_AR_THRESH, yawn_threshold=config.YAWN_THRESHOLD,
+            ear_threshold_for_yawning=config.EAR_THRESHOLD_FOR_YAWNING,
+            yawn_time_threshold=config.YAWN_TIME_THRESHOLD, perclos_window=config.PERCLOS_WINDOW,
+        )
+        self.inference_scheduler = InferenceScheduler(
+            config.EYE_AR_THRESH, config.YAWN_THRESHOLD, max_interval=config.ADAPTIVE_MAX_INTERVAL,
+            ear_margin=config.ADAPTIVE_EAR_MARGIN, lar_margin=config.ADAPTIVE_LAR_MARGIN,
+            stable_frames=config.ADAPTIVE_STABLE_FRAMES,
+        )
+        self.left_ear = self.right_ear = self.lar = 0.0
+        self.features = None
+
+        self._register_metrics()
+
+    # ---------------------------
+    # Metrics
+    # ---------------------------
+    def _register_metrics(self):
+        registry = metrics.REGISTRY
+        self.frame_latency = registry.histogram(
+            "driver_frame_latency_seconds", "Time from camera capture to the drowsiness decision for a frame")
+        self.frames_processed = registry.counter("driver_frames_processed_total", "Frames that went through inference")
+        self.frames_skipped = registry.counter("driver_frames_skipped_total",
+                                               "Frames that reused the previous result (adaptive inference rate)")
+        self.faces_missing = registry.counter("driver_frames_without_face_total", "Frames where no face was found")
+        self.cvt_color_seconds = stage_histogram("cvt_color")
+        self.face_locate_seconds = stage_histogram("face_locate")      # tracker step, including any full detection
+        self.shape_predictor_seconds = stage_histogram("shape_predictor")
+        self.first_frame_seconds = registry.gauge(
+            "driver_time_to_first_frame_seconds", "Time from launch (or camera restart) to the first processed frame")
+        registry.counter("driver_capture_restarts_total", "Times the capture loop was restarted",
+                         func=lambda: max(self.runs - 1, 0))
+
+        if self.owns_uploader:
+            uploader = self.uploader
+            registry.counter("driver_upload_rows_total", "Rows appended to remote CSVs",
+                             func=lambda: uploader.rows_sent)
+            registry.counter("driver_upload_bytes_total", "Bytes appended to remote CSVs",
+                             func=lambda: uploader.bytes_sent)
+            registry.counter("driver_upload_spooled_rows_total", "Rows spooled to disk while offline",
+                             func=lambda: uploader.rows_spooled)
+            registry.counter("driver_upload_connects_total", "SSH (re)connections made by the uploader",
+                             func=lambda: uploader.reconnects)
+            registry.gauge("driver_queue_depth", "Items waiting in a queue", {"queue": "upload"},
+                           func=uploader.pending)
+        local_log = self.local_log
+        registry.counter("driver_local_log_records_total", "Records written to the local log store",
+                         func=lambda: local_log.records_written)
+        registry.counter("driver_local_log_bytes_total", "Bytes written to the local log store (before gzip)",
+                         func=lambda: local_log.bytes_written)
+        registry.counter("driver_local_log_segments_deleted_total", "Old local log segments deleted to cap disk use",
+                         func=lambda: local_log.segments_deleted)
+
+        registry.counter("driver_frames_captured_total", "Frames read from the camera",
+                         func=lambda: self.frames_captured())
+        registry.counter("driver_frames_dropped_total", "Frames overwritten before inference picked them up",
+                         func=lambda: self.frames_dropped())
+        registry.counter("driver_log_writes_dropped_total", "Log writes dropped on a full queue",
+                         func=lambda: self.log_worker.dropped)
+        registry.gauge("driver_queue_depth", "Items waiting in a queue", {"queue": "log"}, func=self.log_worker.depth)
+        registry.gauge("driver_inference_duty_cycle", "Fraction of frames that ran landmark inference",
+                       func=self.inference_scheduler.duty_cycle)
+
+    def frames_captured(self):
+        current = self.frame_capture.frames_captured if self.frame_capture is not None else 0
+        return self._captured_before + current
+
+    def frames_dropped(self):
+        current = self.frame_capture.frames_dropped if self.frame_capture is not None else 0
+        return self._dropped_before + current
+
+    # ---------------------------
+    # Models
+    # ---------------------------
+    def _prepare_models(self):
+        """
+        Fetch the (possibly still warming) models and build the tracker around them.
+        Only the first call loads anything; restarts reuse the same objects.
+        """
+        if self.face_tracker is not None:
+            return
+        self.face_detector, self.landmarker = self.models.get()
+        # The full-detection comparison predicts landmarks on the whole frame, without the ROI crop.
+        if isinstance(self.landmarker, Dlib68Landmarks):
+            self.full_frame_landmarker = Dlib68Landmarks(self.landmarker.predictor, roi_padding=None)
+        else:
+            self.full_frame_landmarker = self.landmarker
+        self.scaled_face_detector = ScaledFaceDetector(self.face_detector, scale=config.DETECTION_SCALE,
+                                                       histogram=stage_histogram("face_detector"))
+        self.face_tracker = FaceTracker(self.scaled_face_detector, mode=config.TRACKING_MODE,
+                                        redetect_interval=config.REDETECT_INTERVAL)
+
+    # ---------------------------
+    # Helper Functions for Detection
+    # ---------------------------
+    def compare_with_full_detection(self, gray_frame, left_ear, right_ear, lar):
+        """
+        Run the detect-every-frame path on the same frame and record how far the
+        tracked EAR/LAR values are from it.
+        """
+        stats = self.comparison_stats
+        start = time.perf_counter()
+        faces = self.face_detector(gray_frame)
+        stats["reference_seconds"] += time.perf_counter() - start
+        stats["frames"] += 1
+        results = process_faces(gray_frame, faces, self.full_frame_landmarker)
+        if not results:
+            stats["missed"] += 1
+            print("Compare: full detection found no face on this frame")
+            return
+        _, reference = results[0]
+        ear_diff = max(abs(left_ear - reference["left_ear"]), abs(right_ear - reference["right_ear"]))
+        lar_diff = abs(lar - reference["lar"])
+        stats["ear_diff"] += ear_diff
+        stats["lar_diff"] += lar_diff
+        stats["max_ear_diff"] = max(stats["max_ear_diff"], ear_diff)
+        print(f"Compare: EAR diff {ear_diff:.4f}, LAR diff {lar_diff:.4f}")
+
+    def print_tracking_summary(self):
+        """
+        Print how often full detection ran and, if enabled, the comparison totals.
+        """
+        tracker = self.face_tracker
+        if tracker is not None and tracker.frames:
+            print(f"Face tracking ({config.TRACKING_MODE}): full detection on {tracker.detections} "
+                  f"of {tracker.frames} frames ({100.0 * tracker.detections / tracker.frames:.1f}%)")
+        if self.scaled_face_detector is not None and self.scaled_face_detector.calls:
+            print(f"Face detection at scale {config.DETECTION_SCALE}: "
+                  f"mean {self.scaled_face_detector.mean_latency_ms():.1f} ms per call")
+        stats = self.comparison_stats
+        if stats["frames"]:
+            print(f"Compare: full-resolution detection mean "
+                  f"{1000.0 * stats['reference_seconds'] / stats['frames']:.1f} ms per call")
+        compared = stats["frames"] - stats["missed"]
+        if compared:
+            print(f"Compare: mean EAR diff {stats['ear_diff'] / compared:.4f}, "
+                  f"max EAR diff {stats['max_ear_diff']:.4f}, "
+                  f"mean LAR diff {stats['lar_diff'] / compared:.4f}, "
+                  f"frames without a reference face {stats['missed']}")
+
+    # ---------------------------
+    # Helper Functions for Logging
+    # ---------------------------
+    def update_remote_csv(self, remote_file_path, entry):
+        """
+        Queue a new entry for the specified remote CSV file. The background uploader
+        appends it in the next batch, so this never waits on the network.
+        """
+        self.uploader.append(remote_file_path, entry)
+
+    def log_drowsiness(self, status, drowsiness_percent):
+        """
+        Log a new drowsiness event with timestamp, status, and drowsiness percentage
+        to the dedicated drowsiness log.
+        """
+        timestamp = datetime.now(ZoneInfo("Asia/Kolkata")).isoformat()
+        entry = f"{timestamp},{status},{drowsiness_percent}"
+        self.update_remote_csv(config.REMOTE_DROWSINESS_LOG_PATH, entry)
+
+    def log_yawning(self, total_yawns, yawn_percent):
+        """
+        Log a new yawning event with timestamp, total yawns, and the yawning percentage
+        to the dedicated yawning log.
+        """
+        timestamp = datetime.now(ZoneInfo("UTC")).isoformat()
+        entry = f"{timestamp},{total_yawns},{yawn_percent}"
+        self.update_remote_csv(config.REMOTE_YAWNING_LOG_PATH, entry)
+
+    def log_combined_data(self, current_dt, left_ear, right_ear, lar, drowsiness_percent, driver_status, yawn_or_not):
+        """
+        Log a combined row to the remote CSV and the local log store with all relevant fields.
+        CSV Columns:
+        timestamp, left_ear, right_ear, lar, drowsiness_percent, driver_status, yawn_or_not
+        """
+        entry = (
+            f"{current_dt.isoformat()},"
+            f"{left_ear:.3f},"
+            f"{right_ear:.3f},"
+            f"{lar:.3f},"
+            f"{drowsiness_percent:.1f},"
+            f"{driver_status},"
+            f"{yawn_or_not}"
+        )
+        # Log to remote combined CSV
+        self.update_remote_csv(config.REMOTE_COMBINED_LOG_PATH, entry)
+        # Log to the local binary log store on the Raspberry Pi
+        try:
+            self.local_log.append(current_dt, left_ear, right_ear, lar, drowsiness_percent, driver_status, yawn_or_not)
+        except Exception as e:
+            print(f"Error updating local log ({config.LOCAL_LOG_DIR}): {e}")
+
+    # ---------------------------
+    # Capture Loop
+    # ---------------------------
+    def open_camera(self):
+        """
+        Open the USB camera, raising IOError if it is not available.
+        """
+        cap = cv2.VideoCapture(config.USB_CAM_INDEX)
+        if not cap.isOpened():
+            cap.release()
+            raise IOError("Could not open USB camera. Please verify that it is connected.")
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # don't let stale frames pile up in the driver
+        return cap
+
+    def run_once(self):
+        """
+        Open the camera and process frames until it stops delivering them.
+        Returns the number of frames processed. Raises ModelLoadError if the models
+        cannot be loaded and IOError if the camera cannot be opened.
+        """
+        self.runs += 1
+        run_started = time.perf_counter()
+        launch = self.started if self.runs == 1 else run_started
+        # Open the camera first: the models keep loading in the background meanwhile.
+        cap = self.open_camera()
+        camera_seconds = time.perf_counter() - run_started
+        # Capture thread -> (newest frame only) -> inference here -> (bounded queue) -> log worker
+        self.frame_capture = LatestFrameCapture(cap, tz=ZoneInfo("Asia/Kolkata"),
+                                                read_histogram=stage_histogram("cap_read")).start()
+        processed = 0
+        try:
+            wait_started = time.perf_counter()
+            self._prepare_models()
+            model_wait_seconds = time.perf_counter() - wait_started
+
+            # A new camera session starts from a clean slate, like a face that just appeared.
+            self.driver_state.no_face()
+            self.inference_scheduler.full_rate()
+            self.face_tracker.reset()
+
+            while not self.stopping.is_set():
+                captured = self.frame_capture.read(timeout=config.FRAME_WAIT_TIMEOUT)
+                if captured is None:
+                    print("Error: camera stopped delivering frames")
+                    break
+                self.process_frame(*captured)
+                processed += 1
+                if processed == 1:
+                    first_frame = time.perf_counter() - launch
+                    self.first_frame_seconds.set(first_frame)
+                    what = "launch" if self.runs == 1 else "camera restart"
+                    load = f"{self.models.load_seconds:.2f}s" if self.models.load_seconds is not None else "n/a"
+                    print(f"Startup: first frame processed {first_frame:.2f}s after {what} "
+                          f"(camera open {camera_seconds:.2f}s, model load {load}, "
+                          f"waited {model_wait_seconds:.2f}s for the models)")
+        finally:
+            self.frame_capture.stop()
+            self._captured_before += self.frame_capture.frames_captured
+            self._dropped_before += self.frame_capture.frames_dropped
+            self.frame_capture = None
+            cap.release()
+        return processed
+
+    def process_frame(self, frame, current_dt):
+        """
+        Run detection and the drowsiness logic on one captured frame and queue its logs.
+        """
+        # Use the capture time (as float seconds), not the time processing got to this frame
+        timestamp = current_dt.isoformat()
+        current_time = current_dt.timestamp()
+
+        # While the driver is clearly awake the scheduler skips some frames; those reuse
+        # the last landmark result so timers, PERCLOS and the logs still advance per frame.
+        inferred = not config.ADAPTIVE_INFERENCE or self.inference_scheduler.should_infer(current_time)
+        if not inferred:
+            self.frames_skipped.inc()
+        else:
+            # Convert frame to grayscale; the tracker only runs full face detection when needed
+            with self.cvt_color_seconds.time():
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            with self.face_locate_seconds.time():
+                faces = self.face_tracker.locate(gray)
+            self.frames_processed.inc()
+            results = []
+            if len(faces):
+                with self.shape_predictor_seconds.time():
+                    results = process_faces(gray, faces, self.landmarker)
+
+            # If no face is detected (or none could be fitted), reset timers and log "N/A" values.
+            if not results:
+                decision = self.driver_state.no_face()
+                self.inference_scheduler.full_rate()
+                self.faces_missing.inc()
+                self.frame_latency.observe(time.time() - current_time)
+                self.left_ear = self.right_ear = self.lar = 0.0
+                print(f"{timestamp}, Left EAR: N/A, Right EAR: N/A, LAR: N/A, "
+                      f"Drowsiness%: {decision['drowsiness_percent']:.1f}, "
+                      f"Status: {decision['driver_status']}, Yawn: {decision['yawn_or_not']}")
+                self.log_worker.submit(self.log_combined_data, current_dt, 0.0, 0.0, 0.0,
+                                       decision["drowsiness_percent"], decision["driver_status"],
+                                       decision["yawn_or_not"])
+                return
+
+            # Process the first detected face (adjust if you want to handle multiple faces)
+            points, self.features = results[0]
+            self.face_tracker.observe(points)
+            self.left_ear = self.features["left_ear"]
+            self.right_ear = self.features["right_ear"]
+            self.lar = self.features["lar"]
+            if config.COMPARE_WITH_FULL_DETECTION:
+                self.compare_with_full_detection(gray, self.left_ear, self.right_ear, self.lar)
+
+        left_ear, right_ear, lar, features = self.left_ear, self.right_ear, self.lar, self.features
+
+        # Time-based drowsiness and yawning detection
+        decision = self.driver_state.update(left_ear, right_ear, lar, current_time)
+        self.frame_latency.observe(time.time() - current_time)
+        if inferred:
+            self.inference_scheduler.record(left_ear, right_ear, lar, self.driver_state.timer_running())
+        driver_status = decision["driver_status"]
+        drowsiness_percent = decision["drowsiness_percent"]
+        yawn_or_not = decision["yawn_or_not"]
+        if yawn_or_not == "Yes":
+            self.log_worker.submit(self.log_yawning, self.driver_state.yawn_count, decision["yawn_percent"])
+
+        # ---------------------------
+        # Print and Log Combined Data
+        # ---------------------------
+        print(
+            f"{timestamp}, "
+            f"Left EAR: {left_ear:.3f}, Right EAR: {right_ear:.3f}, LAR: {lar:.3f}, "
+            f"Drowsiness%: {drowsiness_percent:.1f}, PERCLOS: {decision['perclos']:.1f}%, Status: {driver_status}, "
+            f"Yawn: {yawn_or_not}, "
+            f"Head yaw/pitch/roll: {features['yaw']:.2f}/{features['pitch']:.2f}/{features['roll']:.1f}"
+        )
+        self.log_worker.submit(self.log_combined_data, current_dt, left_ear, right_ear, lar, drowsiness_percent,
+                               driver_status, yawn_or_not)
+
+    # ---------------------------
+    # Shutdown
+    # ---------------------------
+    def stop(self):
+        """
+        Make run_once() return after the current frame (safe from any thread).
+        """
+        self.stopping.set()
+
+    def print_pipeline_summary(self):
+        """
+        Print how many frames and log writes each stage had to drop.
+        """
+        print(f"Pipeline: captured {self.frames_captured()} frames, "
+              f"{self.frames_dropped()} dropped as stale, "
+              f"{self.log_worker.dropped} of {self.log_worker.submitted + self.log_worker.dropped} log writes dropped, "
+              f"{max(self.runs - 1, 0)} capture restarts")
+
+    def print_adaptive_summary(self):
+        """
+        Print the inference duty cycle achieved by the adaptive scheduler.
+        """
+        scheduler = self.inference_scheduler
+        if config.ADAPTIVE_INFERENCE and scheduler.frames:
+            print(f"Adaptive inference: ran on {scheduler.inferences} of {scheduler.frames} frames "
+                  f"(duty cycle {100.0 * scheduler.duty_cycle():.1f}%)")
+
+    def close(self):
+        """
+        Print the summaries, drain the log worker, close the local log, then flush
+        or spool the uploads (if the uploader is our own).
+        """
+        self.print_adaptive_summary()
+        self.print_pipeline_summary()
+        self.print_tracking_summary()
+        self.log_worker.stop()
+        self.local_log.close()
+        if self.owns_uploader:
+            self.uploader.close()
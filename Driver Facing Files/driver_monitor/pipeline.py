@@ -0,0 +1,132 @@
+# Staged pipeline helpers for the driver-facing camera loop.
+# A capture thread keeps only the newest camera frame (stamped with the time it was
+# read), the main loop runs inference on whatever is newest, and log writes are handed
+# to a background worker. Every hand-off is bounded and counts what it had to drop, so
+# a slow stage sheds load instead of building up latency.
+
+import queue
+import threading
+import time
+from datetime import datetime
+
+LOG_QUEUE_SIZE = 1000      # pending log calls before new ones are dropped
+
+
+class LatestFrameCapture:
+    """
+    Read frames from a cv2.VideoCapture on a background thread, keeping only the
+    most recent one. read() returns (frame, capture_datetime) for a frame that has
+    not been returned before, or None once the camera stops delivering frames.
+    """
+
+    def __init__(self, cap, tz=None, read_histogram=None):
+        self.cap = cap
+        self.tz = tz
+        self.read_histogram = read_histogram  # optional drishti.metrics.Histogram for cap.read()
+        self._condition = threading.Condition()
+        self._frame = None
+        self._frame_time = None
+        self._fresh = False
+        self._running = False
+        self._thread = None
+
+        self.frames_captured = 0
+        self.frames_dropped = 0    # frames overwritten before inference picked them up
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="frame-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def read(self, timeout=None):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._fresh or not self._running, timeout):
+                return None
+            if not self._fresh:
+                return None
+            self._fresh = False
+            return self._frame, self._frame_time
+
+    def _run(self):
+        while self._running:
+            start = time.perf_counter()
+            ret, frame = self.cap.read()
+            if self.read_histogram is not None:
+                self.read_histogram.observe_since(start)
+            # Stamp the frame as soon as it leaves the camera, so the drowsiness
+            # timers measure when the eyes closed, not when we got round to it.
+            frame_time = datetime.now(self.tz)
+            with self._condition:
+                if not ret:
+                    self._running = False
+                    self._condition.notify_all()
+                    return
+                if self._fresh:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._frame_time = frame_time
+                self._fresh = True
+                self.frames_captured += 1
+                self._condition.notify()
+
+
+class AsyncWorker:
+    """
+    Run submitted calls (e.g. CSV writes) in order on a background thread.
+    submit() never blocks; when the bounded queue is full the call is dropped.
+    """
+
+    def __init__(self, name="async-worker", max_queue_size=LOG_QUEUE_SIZE):
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+
+        self.submitted = 0
+        self.dropped = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, func, *args, **kwargs):
+        try:
+            self._queue.put_nowait((func, args, kwargs))
+            self.submitted += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def stop(self, timeout=5.0):
+        """
+        Finish the calls already queued, then stop the thread.
+        """
+        if self._thread is None:
+            return
+        try:
+            self._queue.put((None, (), {}), timeout=timeout)
+        except queue.Full:
+            print(f"{self.name}: queue still full on shutdown, {self.depth()} calls abandoned")
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            func, args, kwargs = self._queue.get()
+            if func is None:
+                return
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Error in {self.name}: {e}")
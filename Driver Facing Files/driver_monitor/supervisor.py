@@ -0,0 +1,64 @@
+# Supervisor entry point for the driver monitor.
+# Starts the model warmup, the uploader and the metrics exporter once, then keeps the
+# capture loop running: if the camera disappears or the loop crashes it is restarted
+# after a growing delay, reusing the already loaded models.
+
+from drishti import metrics
+from . import config
+from .models import ModelLoader, ModelLoadError
+from .monitor import DriverMonitor
+
+
+def supervise(monitor, restart_delay=None, max_restart_delay=None, max_restarts=None):
+    """
+    Run monitor.run_once() until interrupted or monitor.stop() is called, restarting
+    it on camera loss or errors. Model load errors are not retried: a wrong model
+    path will not fix itself.
+    """
+    restart_delay = config.RESTART_DELAY if restart_delay is None else restart_delay
+    max_restart_delay = config.MAX_RESTART_DELAY if max_restart_delay is None else max_restart_delay
+    delay = restart_delay
+    restarts = 0
+    while not monitor.stopping.is_set():
+        try:
+            processed = monitor.run_once()
+        except ModelLoadError:
+            raise
+        except Exception as e:
+            print(f"Error in the capture loop: {e}")
+            processed = 0
+
+        if monitor.stopping.is_set():
+            return
+        if max_restarts is not None and restarts >= max_restarts:
+            print(f"Giving up after {restarts} restarts")
+            return
+        if processed:
+            delay = restart_delay   # the last session worked for a while: start the backoff over
+        print(f"Restarting the capture loop in {delay:.1f}s (models stay loaded)")
+        if monitor.stopping.wait(delay):
+            return
+        delay = min(delay * 2, max_restart_delay)
+        restarts += 1
+
+
+def main(started=None):
+    """
+    Start the driver monitor. started is a time.perf_counter() value taken as early as
+    possible in the launching script, so the reported time to first frame includes
+    the imports.
+    """
+    models = ModelLoader(config.FACE_BACKEND, config.LANDMARK_BACKEND, config.LANDMARKS_MODEL,
+                         cascade_path=config.CASCADE_PATH, roi_padding=config.ROI_PADDING)
+    if config.WARM_MODELS_IN_BACKGROUND:
+        models.warm()
+    monitor = DriverMonitor(models, started=started)
+    metrics.start_exporter(port=config.METRICS_PORT, textfile=config.METRICS_TEXTFILE, host=config.METRICS_HOST)
+    try:
+        supervise(monitor, max_restarts=config.MAX_RESTARTS)
+    except ModelLoadError as e:
+        print(f"Error: {e}. Please verify the file path.")
+    except KeyboardInterrupt:
+        print("Stopping the driver monitor")
+    finally:
+        monitor.close()
@@ -0,0 +1,210 @@
+# Synthetic driver video for benchmarking the drowsiness detector without a camera,
+# the 68-point landmark model or a network connection.
+# SyntheticDriverVideo draws a simple face whose eye and mouth opening follow a scripted
+# scenario (blinks, a drowsy spell, falling asleep, a yawn). SyntheticFaceDetector finds
+# the face with a threshold on the image, and SyntheticShapePredictor returns the
+# scenario's landmarks placed inside whatever face box it is given, standing in for
+# dlib's detector and shape_predictor. Neither needs dlib: faces are FaceBox objects and
+# the landmarks a (68, 2) array.
+
+import numpy as np
+
+from drishti.lazy import LazyModule
+
+cv2 = LazyModule("cv2")
+
+# ===============================
+# Default Scenario
+# ===============================
+AWAKE_EAR = 0.30
+AWAKE_LAR = 0.35
+BLINK_INTERVAL = 4.0       # seconds between blinks while awake
+BLINK_DURATION = 0.15
+BLINK_EAR = 0.08
+
+# (start seconds, end seconds, eye aspect ratio, lip aspect ratio)
+DEFAULT_SCENARIO = [
+    (10.0, 14.5, 0.12, AWAKE_LAR),   # eyes closed for 4.5 s -> high drowsiness
+    (20.0, 29.5, 0.10, AWAKE_LAR),   # eyes closed for 9.5 s -> sleeping
+    (35.0, 39.0, 0.05, 0.85),        # long yawn with eyes squeezed shut
+]
+DEFAULT_DURATION = 45.0
+
+FACE_BRIGHTNESS = 170
+BACKGROUND_BRIGHTNESS = 60
+FEATURE_BRIGHTNESS = 30
+
+
+def face_landmarks(cx, cy, width, height, ear, lar):
+    """
+    Build a (68, 2) array in dlib's 68-point order for a face centred at (cx, cy)
+    whose eyes have the given EAR and whose outer lips have the given LAR.
+    """
+    a = width / 2.0
+    b = height / 2.0
+    points = np.zeros((68, 2), dtype=np.float64)
+
+    # Jaw 0-16: lower half of the face outline, ending at the chin (8)
+    angles = np.linspace(np.pi, 0, 17)
+    points[0:17, 0] = cx + 0.95 * a * np.cos(angles)
+    points[0:17, 1] = cy + 0.1 * b + 0.85 * b * np.sin(angles)
+
+    # Brows 17-26
+    points[17:22, 0] = np.linspace(cx - 0.7 * a, cx - 0.15 * a, 5)
+    points[22:27, 0] = np.linspace(cx + 0.15 * a, cx + 0.7 * a, 5)
+    points[17:27, 1] = cy - 0.45 * b
+
+    # Nose bridge 27-30 and nostrils 31-35
+    points[27:31, 0] = cx
+    points[27:31, 1] = np.linspace(cy - 0.3 * b, cy + 0.15 * b, 4)
+    points[31:36, 0] = np.linspace(cx - 0.2 * a, cx + 0.2 * a, 5)
+    points[31:36, 1] = cy + 0.25 * b
+
+    # Eyes 36-41 and 42-47: corners, two upper points, two lower points
+    eye_width = 0.35 * a
+    eye_height = ear * eye_width
+    eye_x = np.array([-1 / 2, -1 / 6, 1 / 6, 1 / 2, 1 / 6, -1 / 6]) * eye_width
+    eye_y = np.array([0, -1 / 2, -1 / 2, 0, 1 / 2, 1 / 2]) * eye_height
+    for start, ex in ((36, cx - 0.4 * a), (42, cx + 0.4 * a)):
+        points[start:start + 6, 0] = ex + eye_x
+        points[start:start + 6, 1] = cy - 0.2 * b + eye_y
+
+    # Outer lips 48-59 and inner lips 60-67
+    mouth_width = 0.6 * a
+    mouth_height = lar * mouth_width
+    mx, my = cx, cy + 0.5 * b
+    outer_x = np.array([-1 / 2, -1 / 3, -1 / 6, 0, 1 / 6, 1 / 3, 1 / 2, 1 / 3, 1 / 6, 0, -1 / 6, -1 / 3])
+    outer_y = np.array([0, -0.4, -0.5, -0.5, -0.5, -0.4, 0, 0.4, 0.5, 0.5, 0.5, 0.4])
+    inner_x = np.array([-0.4, -1 / 6, 0, 1 / 6, 0.4, 1 / 6, 0, -1 / 6])
+    inner_y = np.array([0, -0.35, -0.35, -0.35, 0, 0.35, 0.35, 0.35])
+    points[48:60, 0] = mx + outer_x * mouth_width
+    points[48:60, 1] = my + outer_y * mouth_height
+    points[60:68, 0] = mx + inner_x * mouth_width
+    points[60:68, 1] = my + inner_y * mouth_height
+    return points
+
+
+class SyntheticDriverVideo:
+    """
+    Iterate over (bgr_frame, seconds) pairs of a scripted driver video. After each
+    frame, current_points holds the true landmarks and face_box the drawn face box.
+    """
+
+    def __init__(self, duration=DEFAULT_DURATION, fps=30.0, width=640, height=480,
+                 scenario=DEFAULT_SCENARIO, seed=0):
+        self.duration = duration
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.scenario = scenario
+        self.face_width = int(width * 0.3)
+        self.face_height = int(self.face_width * 1.3)
+        self._rng = np.random.default_rng(seed)
+        self.current_points = None
+        self.face_box = None
+
+    def __len__(self):
+        return int(self.duration * self.fps)
+
+    def eye_and_mouth_at(self, t):
+        """
+        Return the (ear, lar) the scenario prescribes at time t.
+        """
+        for start, end, ear, lar in self.scenario:
+            if start <= t < end:
+                return ear, lar
+        if t % BLINK_INTERVAL < BLINK_DURATION:
+            return BLINK_EAR, AWAKE_LAR
+        return AWAKE_EAR, AWAKE_LAR
+
+    def __iter__(self):
+        noise = self._rng.integers(0, 12, size=(self.height, self.width), dtype=np.uint8)
+        for index in range(len(self)):
+            t = index / self.fps
+            ear, lar = self.eye_and_mouth_at(t)
+            # Small head sway so tracking has something to follow.
+            cx = self.width / 2 + 20 * np.sin(2 * np.pi * t / 10.0)
+            cy = self.height / 2 + 8 * np.sin(2 * np.pi * t / 7.0)
+            yield self._draw(cx, cy, ear, lar, noise), t
+
+    def _draw(self, cx, cy, ear, lar, noise):
+        gray = np.full((self.height, self.width), BACKGROUND_BRIGHTNESS, dtype=np.uint8)
+        gray += noise
+        centre = (int(round(cx)), int(round(cy)))
+        axes = (self.face_width // 2, self.face_height // 2)
+        cv2.ellipse(gray, centre, axes, 0, 0, 360, FACE_BRIGHTNESS, -1)
+
+        points = face_landmarks(cx, cy, self.face_width, self.face_height, ear, lar)
+        for start, end in ((36, 42), (42, 48), (48, 60)):
+            cv2.fillPoly(gray, [np.round(points[start:end]).astype(np.int32)], FEATURE_BRIGHTNESS)
+
+        self.current_points = points
+        self.face_box = (centre[0] - axes[0], centre[1] - axes[1], centre[0] + axes[0], centre[1] + axes[1])
+        return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+class FaceBox:
+    """
+    The parts of dlib.rectangle the driver monitor uses. As in dlib, right and
+    bottom are inside the box.
+    """
+
+    __slots__ = ("_left", "_top", "_right", "_bottom")
+
+    def __init__(self, left, top, right, bottom):
+        self._left, self._top, self._right, self._bottom = int(left), int(top), int(right), int(bottom)
+
+    def left(self):
+        return self._left
+
+    def top(self):
+        return self._top
+
+    def right(self):
+        return self._right
+
+    def bottom(self):
+        return self._bottom
+
+    def width(self):
+        return self._right - self._left + 1
+
+    def height(self):
+        return self._bottom - self._top + 1
+
+
+class SyntheticFaceDetector:
+    """
+    Stand-in for dlib's face detector: the bounding box of the bright face region.
+    """
+
+    def __init__(self, threshold=(FACE_BRIGHTNESS + BACKGROUND_BRIGHTNESS) // 2, min_area=400):
+        self.threshold = threshold
+        self.min_area = min_area
+
+    def __call__(self, gray_frame):
+        _, mask = cv2.threshold(gray_frame, self.threshold, 255, cv2.THRESH_BINARY)
+        pixels = cv2.findNonZero(mask)
+        if pixels is None:
+            return []
+        x, y, w, h = cv2.boundingRect(pixels)
+        if w * h < self.min_area:
+            return []
+        return [FaceBox(x, y, x + w, y + h)]
+
+
+class SyntheticShapePredictor:
+    """
+    Stand-in for dlib's shape_predictor: places the video's true landmarks (taken
+    relative to the drawn face box) inside the face box it is called with, as a
+    (68, 2) array.
+    """
+
+    def __init__(self, video):
+        self.video = video
+
+    def __call__(self, gray_frame, face):
+        left, top, right, _ = self.video.face_box
+        scale = face.width() / float(right - left)
+        points = (self.video.current_points - (left, top)) * scale + (face.left(), face.top())
+        return np.round(points)
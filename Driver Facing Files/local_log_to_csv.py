@@ -0,0 +1,33 @@
+# Convert the driver monitor's binary local log (driver_monitor/local_log.py) back to
+# the combined CSV columns:
+# timestamp, left_ear, right_ear, lar, drowsiness_percent, driver_status, yawn_or_not
+#
+# Examples:
+#   python3 local_log_to_csv.py --dir /home/pi/Desktop/main/combined_log --output combined_log.csv
+#   python3 local_log_to_csv.py combined-20250217-101500-000.bin.gz --header
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from driver_monitor import config
+from driver_monitor.local_log import segment_paths, write_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert binary combined log segments to CSV.")
+    parser.add_argument("segments", nargs="*", help="segment files (default: every segment in --dir, oldest first)")
+    parser.add_argument("--dir", default=config.LOCAL_LOG_DIR, help="local log directory")
+    parser.add_argument("--output", help="CSV file to write (default: standard output)")
+    parser.add_argument("--header", action="store_true", help="write a header row (the old CSV had none)")
+    args = parser.parse_args()
+
+    paths = args.segments or segment_paths(args.dir)
+    rows = write_csv(paths, args.output or sys.stdout, header=args.header)
+    if args.output:
+        print(f"Wrote {rows} rows from {len(paths)} segments to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
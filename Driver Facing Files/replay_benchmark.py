@@ -0,0 +1,249 @@
+# Offline replay and benchmark for the driver drowsiness detector.
+# Runs the same face tracking, landmark, EAR/LAR and time-threshold code as the
+# driver monitor (driver_monitor/monitor.py), but reads frames from a recorded video,
+# a directory of frames or a synthetic driver video, uses frame timestamps instead of
+# the wall clock, and writes the combined rows to a local CSV instead of the server.
+#
+# Examples:
+#   python3 replay_benchmark.py --synthetic
+#   python3 replay_benchmark.py --synthetic --adaptive
+#   python3 replay_benchmark.py --video drive.mp4 --model shape_predictor_68_face_landmarks.dat
+#   python3 replay_benchmark.py --frames ./frames --fps 30 --model shape_predictor_68_face_landmarks.dat
+#   python3 replay_benchmark.py --video drive.mp4 --face-backend haar --landmark-backend lbf --model lbfmodel.yaml
+
+import argparse
+import csv
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from driver_monitor.adaptive_rate import MAX_INTERVAL, InferenceScheduler
+from driver_monitor.backends import FACE_BACKENDS, LANDMARK_BACKENDS, Dlib68Landmarks, make_face_detector, \
+    make_landmarker
+from driver_monitor.drowsiness import DriverState, process_faces
+from driver_monitor.face_tracking import DETECTION_SCALE, MODE_DETECT, MODE_LANDMARKS, MODE_CORRELATION, \
+    REDETECT_INTERVAL, ROI_PADDING, FaceTracker, ScaledFaceDetector
+from driver_monitor.synthetic_driver import SyntheticDriverVideo, SyntheticFaceDetector, SyntheticShapePredictor
+
+STAGES = ["read", "gray", "detect", "landmarks", "decide", "sink"]
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+CSV_COLUMNS = ["timestamp", "left_ear", "right_ear", "lar", "drowsiness_percent", "driver_status", "yawn_or_not"]
+
+
+# ===============================
+# Frame Sources
+# ===============================
+def video_frames(path):
+    """
+    Yield (frame, seconds) from a video file, using the container's timestamps.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {path}")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield frame, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+    finally:
+        cap.release()
+
+
+def directory_frames(path, fps):
+    """
+    Yield (frame, seconds) for the images in a directory, in filename order,
+    assuming they were captured at a constant fps.
+    """
+    names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+    for index, name in enumerate(names):
+        frame = cv2.imread(os.path.join(path, name), cv2.IMREAD_COLOR)
+        if frame is None:
+            print(f"Error: Could not read {name}, skipping")
+            continue
+        yield frame, index / fps
+
+
+# ===============================
+# Replay
+# ===============================
+def run_replay(frames, face_detector, landmarker, sink_path, tracking_mode=MODE_LANDMARKS,
+               redetect_interval=REDETECT_INTERVAL, detection_scale=DETECTION_SCALE,
+               driver_state=None, scheduler=None):
+    """
+    Run the detector over (frame, seconds) pairs and write one combined row per frame
+    to sink_path. landmarker is a backend from backends.py. If an InferenceScheduler
+    is given, skipped frames reuse the previous landmark result exactly like the live
+    loop. Returns a dict with per-stage latencies (seconds), counts, the per-frame
+    driver status, alert onsets, wall and CPU time.
+    """
+    scaled_detector = ScaledFaceDetector(face_detector, scale=detection_scale)
+    tracker = FaceTracker(scaled_detector, mode=tracking_mode, redetect_interval=redetect_interval)
+    driver_state = driver_state or DriverState()
+    latencies = {stage: [] for stage in STAGES}
+    statuses = Counter()
+    status_sequence = []   # driver status of every frame, for comparing backends
+    onsets = []            # (seconds, status) whenever the driver status changes
+    previous_status = None
+    left_ear = right_ear = lar = 0.0
+    frame_iter = iter(frames)
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    with open(sink_path, "w", newline="") as sink:
+        writer = csv.writer(sink)
+        writer.writerow(CSV_COLUMNS)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                frame, seconds = next(frame_iter)
+            except StopIteration:
+                break
+            t1 = time.perf_counter()
+            inferred = scheduler is None or scheduler.should_infer(seconds)
+            if not inferred:
+                # Reuse the previous landmark result, as the live loop does.
+                t2 = t3 = t4 = t1
+                decision = driver_state.update(left_ear, right_ear, lar, seconds)
+            else:
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                t2 = time.perf_counter()
+                faces = tracker.locate(gray)
+                t3 = time.perf_counter()
+                results = process_faces(gray, faces, landmarker)
+
+                if not results:
+                    decision = driver_state.no_face()
+                    left_ear = right_ear = lar = 0.0
+                    if scheduler is not None:
+                        scheduler.full_rate()
+                    t4 = time.perf_counter()
+                else:
+                    points, features = results[0]
+                    tracker.observe(points)
+                    left_ear, right_ear, lar = features["left_ear"], features["right_ear"], features["lar"]
+                    t4 = time.perf_counter()
+                    decision = driver_state.update(left_ear, right_ear, lar, seconds)
+                    if scheduler is not None:
+                        scheduler.record(left_ear, right_ear, lar, driver_state.timer_running())
+            t5 = time.perf_counter()
+
+            writer.writerow([f"{seconds:.3f}", f"{left_ear:.3f}", f"{right_ear:.3f}", f"{lar:.3f}",
+                             f"{decision['drowsiness_percent']:.1f}", decision["driver_status"], decision["yawn_or_not"]])
+            t6 = time.perf_counter()
+
+            statuses[decision["driver_status"]] += 1
+            status_sequence.append(decision["driver_status"])
+            if decision["driver_status"] != previous_status:
+                onsets.append((seconds, decision["driver_status"]))
+                previous_status = decision["driver_status"]
+            for stage, begin, end in zip(STAGES, (t0, t1, t2, t3, t4, t5), (t1, t2, t3, t4, t5, t6)):
+                latencies[stage].append(end - begin)
+
+    return {
+        "frames": len(latencies["read"]),
+        "elapsed": time.perf_counter() - started,
+        "cpu_seconds": time.process_time() - cpu_started,
+        "latencies": latencies,
+        "statuses": statuses,
+        "status_sequence": status_sequence,
+        "onsets": onsets,
+        "yawns": driver_state.yawn_count,
+        "detections": tracker.detections,
+        "duty_cycle": scheduler.duty_cycle() if scheduler is not None else 1.0,
+    }
+
+
+def print_report(stats, peak_traced_bytes=None):
+    """
+    Print fps, p50/p95/p99 latency per stage, peak memory and the status counts.
+    """
+    frames = stats["frames"]
+    if frames == 0:
+        print("No frames were processed.")
+        return
+    print(f"Frames: {frames}, elapsed {stats['elapsed']:.2f} s, {frames / stats['elapsed']:.1f} fps, "
+          f"CPU {stats['cpu_seconds']:.2f} s ({100.0 * stats['cpu_seconds'] / stats['elapsed']:.0f}% of one core)")
+    print(f"Full face detection ran on {stats['detections']} frames ({100.0 * stats['detections'] / frames:.1f}%)")
+    print(f"Landmark inference duty cycle: {100.0 * stats['duty_cycle']:.1f}%")
+    print(f"{'stage':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    total = np.zeros(frames)
+    for stage in STAGES:
+        values = np.array(stats["latencies"][stage]) * 1000.0
+        total += values
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        print(f"{stage:<10} {p50:8.3f} {p95:8.3f} {p99:8.3f} {values.mean():8.3f}")
+    p50, p95, p99 = np.percentile(total, [50, 95, 99])
+    print(f"{'total':<10} {p50:8.3f} {p95:8.3f} {p99:8.3f} {total.mean():8.3f}")
+
+    # ru_maxrss is reported in kilobytes on Linux.
+    print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0:.1f} MB")
+    if peak_traced_bytes is not None:
+        print(f"Peak traced Python/NumPy allocations: {peak_traced_bytes / (1024.0 * 1024.0):.1f} MB")
+    print("Driver status counts: " + ", ".join(f"{status}: {count}" for status, count in stats["statuses"].most_common()))
+    print(f"Yawns counted: {stats['yawns']}")
+    print("Status changes: " + ", ".join(f"{seconds:.2f}s {status}" for seconds, status in stats["onsets"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic frames through the drowsiness detector.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="recorded video file")
+    source.add_argument("--frames", help="directory of frame images, replayed in filename order")
+    source.add_argument("--synthetic", action="store_true", help="generated driver video (no camera or model needed)")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate for --frames and --synthetic")
+    parser.add_argument("--duration", type=float, default=45.0, help="seconds of synthetic video")
+    parser.add_argument("--model", help="model file for the landmark backend (required unless --synthetic)")
+    parser.add_argument("--face-backend", default="dlib_hog", choices=FACE_BACKENDS)
+    parser.add_argument("--landmark-backend", default="dlib68", choices=LANDMARK_BACKENDS)
+    parser.add_argument("--cascade", help="Haar/LBP cascade file (default depends on --face-backend)")
+    parser.add_argument("--output", default="replay_combined_log.csv", help="local CSV sink for the combined rows")
+    parser.add_argument("--tracking-mode", default=MODE_LANDMARKS, choices=[MODE_DETECT, MODE_LANDMARKS, MODE_CORRELATION])
+    parser.add_argument("--redetect-interval", type=int, default=REDETECT_INTERVAL)
+    parser.add_argument("--detection-scale", type=float, default=DETECTION_SCALE)
+    parser.add_argument("--roi-padding", type=float, default=ROI_PADDING)
+    parser.add_argument("--adaptive", action="store_true", help="use the adaptive inference rate scheduler")
+    parser.add_argument("--adaptive-max-interval", type=float, default=MAX_INTERVAL)
+    parser.add_argument("--trace-memory", action="store_true", help="also report peak allocations via tracemalloc (slower)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        frames = SyntheticDriverVideo(duration=args.duration, fps=args.fps)
+        face_detector = SyntheticFaceDetector()
+        landmarker = Dlib68Landmarks(SyntheticShapePredictor(frames), roi_padding=args.roi_padding)
+    else:
+        if not args.model:
+            parser.error("--model is required when replaying recorded frames")
+        frames = video_frames(args.video) if args.video else directory_frames(args.frames, args.fps)
+        face_detector = make_face_detector(args.face_backend, args.cascade)
+        landmarker = make_landmarker(args.landmark_backend, args.model, roi_padding=args.roi_padding)
+
+    driver_state = DriverState()
+    scheduler = None
+    if args.adaptive:
+        scheduler = InferenceScheduler(driver_state.eye_ar_thresh, driver_state.yawn_threshold,
+                                       max_interval=args.adaptive_max_interval)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    stats = run_replay(frames, face_detector, landmarker, args.output, tracking_mode=args.tracking_mode,
+                       redetect_interval=args.redetect_interval, detection_scale=args.detection_scale,
+                       driver_state=driver_state, scheduler=scheduler)
+    peak = None
+    if args.trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print_report(stats, peak)
+    print(f"Combined rows written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# Runs every Raspberry Pi sensor (driver camera, front camera, MQ3 and OBD) in one edge
+# agent process sharing a single connection to the virtual machine engine.
+# Settings are in edge_agent.ini next to this file; the agent itself is drishti/edge.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from drishti.edge.__main__ import main
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "edge_agent.ini")
+
+if __name__ == "__main__":
+    main(["--config", CONFIG_PATH] + sys.argv[1:])
@@ -2,23 +2,79 @@
 
 import time
 import os
-from picamera2 import Picamera2
+import sys
+import csv
+import io
 import paramiko
 from datetime import datetime
 from zoneinfo import ZoneInfo  # For timezone-aware timestamps
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from drishti import metrics
+from drishti.camera import CapturePipeline, encode_jpeg, open_camera, upload_jpeg
+from drishti.visibility import SnapshotTrigger, score_jpeg
+
 # --- Configuration ---
 HOSTNAME = '34.47.148.16'
 USERNAME = 'fast-and-furious'
 PRIVATE_KEY_PATH = '/home/pi/.ssh/fast_and_furious_public_key_openSSH.ppm'
 REMOTE_DIR = '/home/fast-and-furious/main/section_1_test_drive/'
 
-# --- Initialize Picamera2 ---
-picam2 = Picamera2()
-config = picam2.create_still_configuration()
-picam2.configure(config)
-picam2.start()
-time.sleep(2)  # Allow the camera to warm up
+# Capture mode:
+#   "file"       capture to the SD card, sftp.put the file, then delete it (the original flow)
+#   "memory"     capture a JPEG into memory and stream it to the remote file
+#   "pipelined"  like "memory", but the next capture runs while the current image uploads
+#   "edge"       score visibility on the Pi and send only the metric row (see below)
+# "memory" and "pipelined" skip the SD card; with IMAGE_SIZE = (1920, 1080) they also
+# send far smaller images, which the server's visibility analysis handles as well.
+CAPTURE_MODE = "file"
+CAPTURE_INTERVAL = 3           # seconds between captures ("file"/"memory" wait this long after each upload)
+CAMERA = "picamera"            # "fake" for synthetic frames when testing without the camera module
+FAKE_IMAGE_DIR = None          # e.g. this folder, to replay the sample images through the fake camera
+IMAGE_SIZE = None              # width, height, e.g. (1920, 1080); None for the full sensor resolution
+JPEG_QUALITY = 90              # Picamera2's default
+TIMEZONE = "Asia/Kolkata"
+
+# Edge mode: each capture is scored with the server's dark-channel method at reduced
+# resolution and a row is appended to the server's visibility log. An image is sent
+# only when visibility is low or changes sharply, into a folder the watcher ignores.
+VISIBILITY_LOG = os.path.join(REMOTE_DIR, 'visibility_log.csv')   # same columns as the server writes
+SNAPSHOT_DIR = os.path.join(REMOTE_DIR, 'edge_snapshots/')
+SNAPSHOT = "thumbnail"         # "thumbnail" (the reduced image that was scored), "full", or None
+SCORE_REDUCTION = 2            # decode at 1/2, 1/4 or 1/8 scale for scoring (the server's setting)
+VISIBILITY_THRESHOLD = 45      # send an image below this visibility (%) ...
+SNAPSHOT_MIN_INTERVAL = 30     # ... at most once every this many seconds while it stays low
+VISIBILITY_CHANGE = 10         # or when visibility moves this many points between captures
+THUMBNAIL_QUALITY = 70
+
+# Metrics (Prometheus format; set either to None to disable)
+METRICS_PORT = 9102            # served at http://127.0.0.1:9102/metrics
+METRICS_HOST = "127.0.0.1"     # "0.0.0.0" to serve every interface (there is no authentication)
+METRICS_TEXTFILE = None        # e.g. "/var/lib/node_exporter/textfile_collector/front_camera.prom"
+
+# --- Metrics ---
+capture_seconds = metrics.REGISTRY.histogram(
+    "front_camera_stage_seconds", "Time spent in each front camera stage",
+    {"stage": "capture_file" if CAPTURE_MODE == "file" else "capture_jpeg"})
+upload_seconds = metrics.REGISTRY.histogram(
+    "front_camera_stage_seconds", "Time spent in each front camera stage",
+    {"stage": "sftp_put" if CAPTURE_MODE == "file" else "sftp_stream"})
+score_seconds = metrics.REGISTRY.histogram(
+    "front_camera_stage_seconds", "Time spent in each front camera stage", {"stage": "score"})
+images_sent = metrics.REGISTRY.counter("front_camera_images_sent_total", "Images uploaded to the server")
+bytes_sent = metrics.REGISTRY.counter("front_camera_bytes_sent_total", "Image bytes uploaded to the server")
+metrics.start_exporter(port=METRICS_PORT, textfile=METRICS_TEXTFILE, host=METRICS_HOST)
+
+tz = ZoneInfo(TIMEZONE)
+
+
+def image_timestamp():
+    # Human-readable, timezone-aware timestamp for the file name
+    return datetime.now(tz).strftime("%Y%m%d_%H%M%S")
+
+
+# --- Initialize the camera ---
+camera = open_camera(CAMERA, IMAGE_SIZE, JPEG_QUALITY, image_dir=FAKE_IMAGE_DIR)
 
 # --- Setup SFTP connection using Paramiko with RSA key ---
 try:
@@ -36,29 +92,133 @@ except Exception as e:
     
 sftp = paramiko.SFTPClient.from_transport(transport)
 
-print("Starting image capture and transfer. Press Ctrl+C to stop.")
 
-try:
+def send_image(timestamp, data):
+    """
+    Stream one in-memory JPEG to the remote directory.
+    """
+    filename = f'image_{timestamp}.jpg'
+    remote_filepath = os.path.join(REMOTE_DIR, filename)
+    with upload_seconds.time():
+        size = upload_jpeg(sftp, data, remote_filepath)
+    images_sent.inc()
+    bytes_sent.inc(size)
+    print(f"Transferred {filename} ({size} bytes) to {remote_filepath}")
+
+
+def run_file_mode():
     while True:
-        # Generate a human-readable, timezone-aware timestamp (e.g., UTC)
-        tz = ZoneInfo("Asia/Kolkata")  # Update the timezone as needed
-        timestamp = datetime.now(tz).strftime("%Y%m%d_%H%M%S")
-        filename = f'image_{timestamp}.jpg'
-        
-        # Capture the image using Picamera2.
-        picam2.capture_file(filename)
+        filename = f'image_{image_timestamp()}.jpg'
+
+        # Capture the image to the SD card.
+        with capture_seconds.time():
+            camera.capture_file(filename)
         print(f"Captured {filename}")
-        
+
         # Upload the image to the remote directory.
         remote_filepath = os.path.join(REMOTE_DIR, filename)
-        sftp.put(filename, remote_filepath)
+        with upload_seconds.time():
+            attributes = sftp.put(filename, remote_filepath)
+        images_sent.inc()
+        bytes_sent.inc(attributes.st_size)
         print(f"Transferred {filename} to {remote_filepath}")
-        
-        # Optionally remove the local file after transfer.
+
+        # Remove the local file after transfer.
         os.remove(filename)
-        
-        # Wait for one second before capturing the next image.
-        time.sleep(3)
+        time.sleep(CAPTURE_INTERVAL)
+
+
+def run_memory_mode():
+    while True:
+        timestamp = image_timestamp()
+        with capture_seconds.time():
+            data = camera.capture()
+        send_image(timestamp, data)
+        time.sleep(CAPTURE_INTERVAL)
+
+
+def run_pipelined_mode():
+    pipeline = CapturePipeline(camera, CAPTURE_INTERVAL, image_timestamp, capture_timer=capture_seconds)
+    metrics.REGISTRY.counter("front_camera_images_dropped_total",
+                             "Captured images dropped because the upload fell behind",
+                             func=lambda: pipeline.dropped)
+    pipeline.start()
+    try:
+        while True:
+            item = pipeline.get()
+            if item is None:
+                raise RuntimeError(f"capture stopped: {pipeline.error}")
+            send_image(*item)
+    finally:
+        pipeline.close()
+
+
+def remote_exists(path):
+    try:
+        sftp.stat(path)
+        return True
+    except IOError:
+        return False
+
+
+def append_visibility_row(row, write_header):
+    buffer = io.StringIO()
+    csvwriter = csv.writer(buffer)
+    if write_header:
+        csvwriter.writerow(["Date", "Time", "Filename", "Visibility (%)", "Avg Dark Value"])
+    csvwriter.writerow(row)
+    with sftp.open(VISIBILITY_LOG, "a") as remote_file:
+        remote_file.write(buffer.getvalue().encode("utf-8"))
+
+
+def run_edge_mode():
+    rows_sent = metrics.REGISTRY.counter("front_camera_visibility_rows_total", "Visibility rows sent from the Pi")
+    snapshots = {reason: metrics.REGISTRY.counter(
+        "front_camera_snapshots_total", "Images sent because of the edge visibility score", {"reason": reason})
+        for reason in ("low", "change")}
+    trigger = SnapshotTrigger(VISIBILITY_THRESHOLD, VISIBILITY_CHANGE, SNAPSHOT_MIN_INTERVAL)
+    write_header = not remote_exists(VISIBILITY_LOG)
+    if SNAPSHOT and not remote_exists(SNAPSHOT_DIR):
+        sftp.mkdir(SNAPSHOT_DIR)
+
+    next_capture = time.monotonic()
+    while True:
+        now = datetime.now(tz)
+        filename = f'image_{now.strftime("%Y%m%d_%H%M%S")}.jpg'
+        with capture_seconds.time():
+            data = camera.capture()
+        with score_seconds.time():
+            scored = score_jpeg(data, SCORE_REDUCTION)
+        if scored is None:
+            print(f"Could not decode {filename}")
+        else:
+            visibility_percent, avg_dark, img = scored
+            append_visibility_row([now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"), filename,
+                                   f"{visibility_percent:.2f}", f"{avg_dark:.2f}"], write_header)
+            write_header = False
+            rows_sent.inc()
+            reason = trigger.check(visibility_percent, time.monotonic())
+            if SNAPSHOT and reason:
+                if SNAPSHOT == "thumbnail":
+                    data = encode_jpeg(img, THUMBNAIL_QUALITY)
+                with upload_seconds.time():
+                    size = upload_jpeg(sftp, data, os.path.join(SNAPSHOT_DIR, filename))
+                snapshots[reason].inc()
+                images_sent.inc()
+                bytes_sent.inc(size)
+                print(f"Sent {SNAPSHOT} {filename} ({size} bytes): visibility {reason}")
+            print(f"{filename}: Visibility: {visibility_percent:.2f}%, Avg Dark: {avg_dark:.2f}")
+        current = time.monotonic()
+        next_capture = max(next_capture + CAPTURE_INTERVAL, current)
+        time.sleep(max(0.0, next_capture - current))
+
+
+MODES = {"file": run_file_mode, "memory": run_memory_mode, "pipelined": run_pipelined_mode, "edge": run_edge_mode}
+
+print(f"Starting image capture and transfer ({CAPTURE_MODE} mode). Press Ctrl+C to stop.")
+
+try:
+    MODES[CAPTURE_MODE]()
 
 except KeyboardInterrupt:
     print("Terminated by user.")
@@ -66,4 +226,4 @@ except KeyboardInterrupt:
 finally:
     sftp.close()
     transport.close()
-    picam2.stop()
+    camera.close()
@@ -1,132 +1,318 @@
 # Images for front facing camera is uploaded simultaneously in a folder on virtual machine and this code is on virtual machine to check that is any new image is uploaded on the folder then that image is processed, this task is being done by the watchdog library
+#
+# The watchdog handler only notes file events; it never waits, so events are not held
+# up while the workers are behind. An image counts as complete when the uploader
+# closes it (close-write), when it is renamed into place (the edge agent's ".part"
+# uploads), or, where no close event comes, once its size has stopped changing. The
+# completion thread queues complete images, waiting while the queue is full. They are
+# decoded at reduced size and scored (drishti/visibility.py) by a pool of worker
+# processes, and one writer thread appends the results to each folder's CSV log, so
+# images from several vehicles are processed in parallel.
 
 import time
 import os
+import sys
 import csv
-import re
-from datetime import datetime
-import cv2
-import numpy as np
+import multiprocessing
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from drishti.visibility import CSV_HEADER, visibility_row
+
 # Define the folder to monitor and the CSV log file path.
 WATCH_FOLDER = "/home/fast-and-furious/main/section_1_test_drive/"
 CSV_LOG = "/home/fast-and-furious/main/section_1_test_drive/visibility_log.csv"
+# Every watched folder and the CSV log its results go to (add one entry per vehicle).
+WATCH_FOLDERS = {WATCH_FOLDER: CSV_LOG}
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Visibility scoring (see visibility_accuracy.py for how each setting compares with full resolution)
+SCORE_REDUCTION = 2            # decode at 1/1, 1/2, 1/4 or 1/8 size; the patch size is scaled to match
+                               # (1/2 is within 0.5 points of full resolution; 1/4 reads about 1 point lower)
+WORKING_WIDTH = None           # e.g. 480 to also shrink every image to this width before scoring
+
+# Processing
+WORKERS = os.cpu_count() or 2
+USE_PROCESSES = True           # decode + dark channel in worker processes; False for threads
+MAX_IN_FLIGHT = 2 * WORKERS    # images being processed before the dispatcher waits
+MAX_READY = 200                # complete images waiting for a worker before the completion thread waits
+
+# Completion detection for images that get no close-write or rename event
+STABLE_POLL = 0.25             # seconds between size checks
+STABLE_POLLS = 8               # unchanged, non-empty size checks (2 s) before an image counts as complete
+PENDING_TIMEOUT = 120          # give up on a file that is still empty after this many seconds
+RECENT_LIMIT = 1000            # completed files remembered so one upload is not processed twice
 
 
-def add_alpha_channel(img):
+def analyze_image(file_path):
     """
-    Add an alpha channel to an image if it doesn't have one.
-    The new alpha channel is set to fully opaque (255) for all pixels.
+    Process an image: read it, compute the dark channel and visibility.
+    Returns the CSV row (date, time, filename, visibility, avg dark) with the
+    timestamp from the filename, or None if the image cannot be read.
     """
-    if img.shape[2] == 3:  # Check if image is in BGR format
-        alpha = np.ones((img.shape[0], img.shape[1], 1), dtype=img.dtype) * 255
-        img = np.concatenate((img, alpha), axis=2)
-    return img
+    row = visibility_row(file_path, SCORE_REDUCTION, WORKING_WIDTH)
+    if row is None:
+        print(f"Error: Could not read {file_path}")
+    return row
 
 
-def compute_dark_channel(img, patch_size=15):
+# ===============================
+# CSV Writer
+# ===============================
+class CsvWriter:
     """
-    Compute the dark channel of an image.
-    For each pixel, the dark channel is the minimum intensity value
-    within a patch (of size patch_size) across all color channels.
+    The one thread that appends result rows to the CSV logs. Files stay open and
+    are flushed whenever the queue runs empty.
     """
-    min_channel = np.min(img, axis=2)
-    kernel = cv2.getStructuringElement(
-        cv2.MORPH_RECT, (patch_size, patch_size))
-    dark_channel = cv2.erode(min_channel, kernel)
-    return dark_channel
 
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._files = {}
+        self._thread = threading.Thread(target=self._run, name="csv-writer", daemon=True)
 
-def compute_visibility_percentage(dark_channel_img):
-    """
-    Calculate a visibility percentage from the dark channel image.
-    We assume that lower average dark channel values indicate better visibility.
+    def start(self):
+        self._thread.start()
 
-    Formula:
-      visibility (%) = 100 * (1 - (avg_dark / 255))
-    """
-    avg_dark = np.mean(dark_channel_img)
-    visibility_percent = 100 * (1 - (avg_dark / 255))
-    visibility_percent = np.clip(visibility_percent, 0, 100)
-    return visibility_percent, avg_dark
+    def write(self, csv_path, row):
+        self._queue.put((csv_path, row))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _writer(self, csv_path):
+        if csv_path not in self._files:
+            file_exists = os.path.exists(csv_path) and os.path.getsize(csv_path) > 0
+            csvfile = open(csv_path, mode='a', newline='')
+            csvwriter = csv.writer(csvfile)
+            if not file_exists:
+                csvwriter.writerow(CSV_HEADER)
+            self._files[csv_path] = (csvfile, csvwriter)
+        return self._files[csv_path][1]
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            csv_path, row = item
+            try:
+                self._writer(csv_path).writerow(row)
+            except OSError as e:
+                print(f"Error: Could not write to {csv_path}: {e}")
+            if self._queue.empty():
+                for csvfile, _ in self._files.values():
+                    csvfile.flush()
+        for csvfile, _ in self._files.values():
+            csvfile.close()
 
 
-def extract_timestamp_from_filename(filename):
+# ===============================
+# Worker Pool
+# ===============================
+class VisibilityProcessor:
     """
-    Extract date and time from filename.
-    Expected filename format: image_YYYYMMDD_HHMMSS.ext
-    Returns a tuple (date, time) in string format (YYYY-MM-DD, HH:MM:SS).
-    If the pattern is not found, returns None.
+    Feeds complete images to the worker pool. At most max_in_flight images are
+    being processed at once; beyond that the dispatcher waits, the ready queue
+    fills up and the completion checker waits in turn.
     """
-    match = re.search(r'(\d{8})_(\d{6})', filename)
-    if match:
-        date_str = match.group(1)
-        time_str = match.group(2)
-        date_formatted = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
-        time_formatted = f"{time_str[:2]}:{time_str[2:4]}:{time_str[4:]}"
-        return date_formatted, time_formatted
-    else:
-        return None
-
-
-def process_image(file_path):
+
+    def __init__(self, ready, writer, workers=WORKERS, use_processes=USE_PROCESSES, max_in_flight=MAX_IN_FLIGHT):
+        self.ready = ready
+        self.writer = writer
+        if use_processes:
+            # spawn: forking this process (observer and helper threads running) is not safe
+            self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._thread = threading.Thread(target=self._run, name="dispatcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        self.ready.put(None)
+        self._thread.join()
+        self.pool.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            item = self.ready.get()
+            if item is None:
+                break
+            file_path, csv_path = item
+            self._slots.acquire()
+            future = self.pool.submit(analyze_image, file_path)
+            future.add_done_callback(lambda f, file_path=file_path, csv_path=csv_path: self._done(f, file_path, csv_path))
+
+    def _done(self, future, file_path, csv_path):
+        self._slots.release()
+        try:
+            row = future.result()
+        except Exception as e:
+            print(f"Error: Could not process {file_path}: {e}")
+            return
+        if row is not None:
+            self.writer.write(csv_path, row)
+            date_formatted, time_formatted, filename, visibility, avg_dark = row
+            print(f"Processed {filename}: Date: {date_formatted}, Time: {time_formatted}, Visibility: {visibility}%, Avg Dark: {avg_dark}")
+
+
+# ===============================
+# Completion Detection
+# ===============================
+class CompletionTracker:
     """
-    Process an image: read it, compute the dark channel and visibility,
-    and log the results (with timestamp) into a CSV file.
+    Decides when an uploaded image is complete and puts (path, csv log) on the
+    ready queue once per upload. Only its own thread puts on the queue, so the
+    observer thread never blocks when the queue is full.
     """
-    # Read the image
-    img = cv2.imread(file_path, cv2.IMREAD_COLOR)
-    if img is None:
-        print(f"Error: Could not read {file_path}")
-        return
-
-    # Compute dark channel and visibility metrics.
-    dark = compute_dark_channel(img, patch_size=15)
-    visibility_percent, avg_dark = compute_visibility_percentage(dark)
-
-    # Extract timestamp from the filename; if not present, use file modification time.
-    filename = os.path.basename(file_path)
-    timestamp = extract_timestamp_from_filename(filename)
-    if timestamp:
-        date_formatted, time_formatted = timestamp
-    else:
-        mod_time = os.path.getmtime(file_path)
-        dt = datetime.fromtimestamp(mod_time)
-        date_formatted = dt.strftime("%Y-%m-%d")
-        time_formatted = dt.strftime("%H:%M:%S")
-
-    # Log the result into CSV.
-    file_exists = os.path.exists(CSV_LOG)
-    with open(CSV_LOG, mode='a', newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        if not file_exists:
-            csvwriter.writerow(["Date", "Time", "Filename",
-                               "Visibility (%)", "Avg Dark Value"])
-        csvwriter.writerow([date_formatted, time_formatted, filename,
-                            f"{visibility_percent:.2f}", f"{avg_dark:.2f}"])
-
-    print(f"Processed {filename}: Date: {date_formatted}, Time: {time_formatted}, Visibility: {visibility_percent:.2f}%, Avg Dark: {avg_dark:.2f}")
+
+    def __init__(self, ready, folders):
+        self.ready = ready
+        self.folders = {os.path.abspath(folder): csv_path for folder, csv_path in folders.items()}
+        self._pending = {}                 # path -> [size, unchanged polls, first seen]
+        self._closed = {}                  # paths closed or renamed into place, in event order
+        self._recent = OrderedDict()       # path -> (size, mtime_ns) when it was queued
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="completion", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+
+    def changed(self, path):
+        """
+        The file was created or written to; it is complete once it stops changing.
+        """
+        with self._lock:
+            self._pending[path] = [-1, 0, time.monotonic()]
+
+    def closed(self, path):
+        """
+        The writer closed the file or renamed it into place: it is complete now.
+        """
+        with self._lock:
+            self._pending.pop(path, None)
+            self._closed[path] = None
+        self._wakeup.set()
+
+    def _queue(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return                          # deleted or moved away before it was processed
+        if st.st_size == 0:
+            return
+        version = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if self._recent.get(path) == version:
+                return                      # already queued (close event and size check both fired)
+            self._recent[path] = version
+            self._recent.move_to_end(path)
+            while len(self._recent) > RECENT_LIMIT:
+                self._recent.popitem(last=False)
+        csv_path = self.folders[os.path.dirname(os.path.abspath(path))]
+        self.ready.put((path, csv_path))   # blocks while the workers are behind
+
+    def _run(self):
+        next_poll = time.monotonic() + STABLE_POLL
+        while True:
+            self._wakeup.wait(max(0.0, next_poll - time.monotonic()))
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            now = time.monotonic()
+            with self._lock:
+                complete = list(self._closed)
+                self._closed.clear()
+                if now < next_poll:
+                    pending = []
+                else:
+                    pending = list(self._pending.items())
+                    next_poll = now + STABLE_POLL
+                for path, state in pending:
+                    try:
+                        size = os.path.getsize(path)
+                    except OSError:
+                        del self._pending[path]
+                        continue
+                    if size > 0 and size == state[0]:
+                        state[1] += 1
+                        if state[1] >= STABLE_POLLS:
+                            del self._pending[path]
+                            complete.append(path)
+                    else:
+                        state[0], state[1] = size, 0
+                        if now - state[2] > PENDING_TIMEOUT and size == 0:
+                            print(f"Giving up on empty file {path}")
+                            del self._pending[path]
+            for path in complete:
+                self._queue(path)
+
+
+def is_image(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
 
 
 class NewFileHandler(FileSystemEventHandler):
+    """
+    Only records events; it never reads images on the observer thread.
+    """
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+
     def on_created(self, event):
         # Ignore directories and non-image files.
-        if not event.is_directory and event.src_path.lower().endswith(('.png', '.jpg', '.jpeg')):
+        if not event.is_directory and is_image(event.src_path):
             print(f"New file detected: {event.src_path}")
-            # Wait briefly to ensure the file is fully written.
-            time.sleep(1)
-            process_image(event.src_path)
+            self.tracker.changed(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory and is_image(event.src_path):
+            self.tracker.changed(event.src_path)
+
+    def on_closed(self, event):
+        if not event.is_directory and is_image(event.src_path):
+            self.tracker.closed(event.src_path)
+
+    def on_moved(self, event):
+        # e.g. image.jpg.part -> image.jpg once the upload has finished
+        if not event.is_directory and is_image(event.dest_path):
+            print(f"New file detected: {event.dest_path}")
+            self.tracker.closed(event.dest_path)
 
 
 if __name__ == '__main__':
+    ready = queue.Queue(maxsize=MAX_READY)
+    writer = CsvWriter()
+    processor = VisibilityProcessor(ready, writer)
+    tracker = CompletionTracker(ready, WATCH_FOLDERS)
+    writer.start()
+    processor.start()
+    tracker.start()
+
     # Set up the watchdog observer.
-    event_handler = NewFileHandler()
+    event_handler = NewFileHandler(tracker)
     observer = Observer()
-    observer.schedule(event_handler, WATCH_FOLDER, recursive=False)
+    for folder in WATCH_FOLDERS:
+        observer.schedule(event_handler, folder, recursive=False)
     observer.start()
-    print(f"Monitoring folder: {WATCH_FOLDER} for new image files...")
+    print(f"Monitoring {', '.join(WATCH_FOLDERS)} for new image files with {WORKERS} workers...")
 
     try:
         while True:
@@ -135,3 +321,6 @@ if __name__ == '__main__':
         print("Stopping folder monitoring.")
         observer.stop()
     observer.join()
+    tracker.close()
+    processor.close()
+    writer.close()
@@ -1,6 +1,28 @@
+# Visibility / speed risk analysis on the server. visibility_log.csv and the OBD track
+# log are tailed as they grow, and each visibility row is joined to the OBD speed at
+# the time the image was taken (drishti/asof_join.py, the same result as merge_asof
+# with TOLERANCE_SECONDS and DIRECTION) as soon as the OBD log has passed that time.
+# Only the OBD rows within the tolerance are kept in memory, so each new image costs
+# the same however long the drive is. Joined rows are appended to merged_log_path and
+# sent to Gemini PROMPT_ROWS at a time. Progress is kept in state_path, so a restart
+# carries on where it stopped (a row may then be joined twice, never skipped).
+
 import os
+import sys
+import csv
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
 import pandas as pd
-import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from drishti.asof_join import AsofJoin, epoch_seconds
+from drishti.compaction import compact_visibility, compression_ratio
+from drishti.llm_client import LlmClient
+from drishti.rash_driving import parse_gps_times
+from drishti.tail import CsvTail, SlidingWindow
+from drishti.visibility import log_times
 
 # --- Configuration ---
 
@@ -8,54 +30,36 @@ import requests
 visibility_log_path = '/home/fast-and-furious/main/section_1_test_drive/visibility_log.csv'
 obd_data_path = '/home/fast-and-furious/main/section_3_test_drive/OBD Data TrackLog.csv'
 gemini_response_path = '/home/fast-and-furious/main/section_3_test_drive/gemini_response.csv'
+merged_log_path = '/home/fast-and-furious/main/section_1_test_drive/visibility_speed.csv'
+state_path = '/home/fast-and-furious/main/section_1_test_drive/.visibility_speed.state'
 
 # Gemini API configuration (update with your actual endpoint and API key)
 # Replace with your actual Gemini API endpoint
 GEMINI_API_URL = 'https://api.gemini.example.com/analyze'
 API_KEY = 'your_gemini_api_key'  # Replace with your actual API key
+COMPACT_PROMPT = True  # send per-minute features and the risky rows instead of the whole merged table
 
-# --- Load and Prepare Data ---
-
-# Read OBD CSV; assume it has "GPS Time" and "Speed (OBD)(km/h)"
-df_obd = pd.read_csv(obd_data_path)
-df_obd['GPS Time'] = pd.to_datetime(df_obd['GPS Time'])
-df_obd.sort_values('GPS Time', inplace=True)
-
-# Read visibility CSV; assume it has "Time Stamp" (only time in HH:MM:SS format) and "Visibility (%)"
-df_visibility = pd.read_csv(visibility_log_path)
-# Extract the date from the first OBD entry (assuming both logs are from the same day)
-default_date = df_obd['GPS Time'].iloc[0].date()
-# Combine the default date with the time from visibility CSV
-df_visibility['Time Stamp'] = pd.to_datetime(
-    df_visibility['Time Stamp'].apply(lambda t: f"{default_date} {t}"))
-df_visibility.sort_values('Time Stamp', inplace=True)
+# Join settings
+TIMEZONE = "Asia/Kolkata"   # clock of the camera Pi: visibility_log.csv has local times without a zone
+TOLERANCE_SECONDS = 2       # largest gap between an image and the OBD row it is joined to
+DIRECTION = 'nearest'       # OBD row to use: 'backward' (last before), 'forward' (first after) or 'nearest'
+MAX_WAIT_SECONDS = 30       # join an image without speed if the OBD log has not reached it by then
+POLL_SECONDS = 0.2
+PROMPT_ROWS = 100           # joined rows per Gemini prompt (about 5 minutes of images)
+FLUSH_SECONDS = 60          # send a smaller batch once no rows have been joined for this long
 
-# --- Merge Data Based on Timestamps ---
+MERGED_HEADER = ['Time Stamp', 'Filename', 'Visibility (%)', 'Speed (OBD)(km/h)']
+tz = ZoneInfo(TIMEZONE)
 
-# Use merge_asof to align the two DataFrames on their timestamps.
-# We set a tolerance of 2 seconds (adjust as needed) to account for small differences.
-merged = pd.merge_asof(
-    df_visibility, df_obd,
-    left_on='Time Stamp', right_on='GPS Time',
-    direction='nearest', tolerance=pd.Timedelta(seconds=2)
-)
+client = LlmClient(GEMINI_API_URL, API_KEY)
 
-# Drop rows where a match wasn't found (if any)
-merged = merged.dropna(subset=['Speed (OBD)(km/h)'])
+# --- Gemini API Prompt ---
 
-# For the purpose of the Gemini prompt, we'll use a subset of columns.
-merged_subset = merged[['Time Stamp', 'Visibility (%)', 'Speed (OBD)(km/h)']]
-
-# Convert the merged data into a CSV-formatted string.
-csv_data = merged_subset.to_csv(index=False)
-
-# --- Build Gemini API Prompt ---
-
-prompt = f"""
+PROMPT = """
 Please analyze the following data and determine if there is a driving risk based on the vehicle's visibility percentage and current speed.
 Note:
 - Visibility (%) is relative and may vary based on camera calibration and the method of calculation.
-- The timestamps come from two different logs: one provides only time (which we combined with a default date) and the other provides full datetime details.
+- Each image's timestamp was matched to the OBD row closest in time (within {tolerance} seconds).
 Evaluate each record to detect any risk conditions (e.g., low visibility combined with high speed or any other patterns indicating potential danger).
 
 For each detected risk event, return the following:
@@ -63,41 +67,176 @@ For each detected risk event, return the following:
 - Risk description (e.g., "Low visibility risk", "High speed in low visibility conditions", etc.)
 - Relevant parameters that led to the decision.
 
-Below is the merged CSV data:
+Below is the merged data:
 {csv_data}
 """
 
-# --- Send Prompt to Gemini API ---
-
-payload = {"prompt": prompt}
-headers = {
-    "Content-Type": "application/json",
-    "Authorization": f"Bearer {API_KEY}"
-}
-
-try:
-    response = requests.post(GEMINI_API_URL, json=payload, headers=headers)
-    if response.status_code == 200:
-        result = response.json()
-        # Extract details from Gemini response.
-        # It's expected that the response includes a timestamp, a fault (risk description), and parameters.
-        risk_event = {
-            'Time': result.get('timestamp', 'N/A'),
-            'Event': result.get('fault', 'Visibility Risk'),
-            'Details': result.get('parameters', '')
-        }
-
-        # Append the risk event to the Gemini response CSV (create it if it doesn't exist)
-        if os.path.exists(gemini_response_path):
-            df_gemini = pd.read_csv(gemini_response_path)
-        else:
-            df_gemini = pd.DataFrame(columns=['Time', 'Event', 'Details'])
-
-        df_gemini = df_gemini.append(risk_event, ignore_index=True)
-        df_gemini.to_csv(gemini_response_path, index=False)
-
+# --- State ---
+
+
+def load_state():
+    """
+    Tails of the three logs, the join and the Gemini batches, positioned where
+    the previous run stopped. state_path holds the inode and resume offset of
+    visibility_log.csv, of the OBD log and of the merged log, and the first and
+    analysed row of the merged log.
+    """
+    try:
+        with open(state_path) as f:
+            values = [int(value) for value in f.read().split()]
+        vis_inode, vis_offset, obd_inode, obd_offset, merged_inode, merged_offset, first_row, analysed_row = values
+    except (OSError, ValueError):
+        vis_inode, vis_offset, obd_inode, obd_offset, merged_inode, merged_offset, first_row, analysed_row = \
+            None, 0, None, 0, None, 0, 0, 0
+    vis_tail = CsvTail(visibility_log_path, ['Date', 'Time', 'Filename', 'Visibility (%)'],
+                       offset=vis_offset, inode=vis_inode)
+    obd_tail = CsvTail(obd_data_path, ['GPS Time', 'Speed (OBD)(km/h)'], offset=obd_offset, inode=obd_inode)
+    merged_tail = CsvTail(merged_log_path, MERGED_HEADER, offset=merged_offset, inode=merged_inode)
+    join = AsofJoin(TOLERANCE_SECONDS, DIRECTION, max_wait=MAX_WAIT_SECONDS)
+    batches = SlidingWindow(PROMPT_ROWS, PROMPT_ROWS, first_row=first_row, analysed_row=analysed_row)
+    return vis_tail, obd_tail, merged_tail, join, batches
+
+
+def save_state(vis_tail, obd_tail, merged_tail, join, batches):
+    # Resume from the oldest row still held in memory, so nothing is lost on a restart.
+    oldest_left = join.oldest_left_item()
+    oldest_right = join.oldest_right_item()
+    vis_offset = vis_tail.offset if oldest_left is None else oldest_left[0]
+    obd_offset = obd_tail.offset if oldest_right is None else oldest_right
+    temp_path = state_path + ".tmp"
+    with open(temp_path, "w") as f:
+        f.write(f"{vis_tail.inode} {vis_offset} {obd_tail.inode} {obd_offset} {merged_tail.inode} "
+                f"{batches.resume_offset(merged_tail)} {batches.first_row} {batches.analysed_row}\n")
+    os.replace(temp_path, state_path)
+
+# --- Join ---
+
+
+def read_visibility(vis_tail, join):
+    """
+    Adds the visibility rows appended since the last call to the join. Returns
+    the number of rows read.
+    """
+    rows, starts = vis_tail.read()
+    if vis_tail.restarted:
+        join.reset_left()
+    if len(rows):
+        times = epoch_seconds(log_times(rows['Date'], rows['Time'], tz))
+        for left_time, start, filename, visibility in zip(times, starts, rows['Filename'], rows['Visibility (%)']):
+            join.add_left(left_time, (int(start), filename, visibility))
+    return len(rows)
+
+
+def read_obd(obd_tail, join):
+    """
+    Reads the OBD log only as far as the waiting visibility rows need it.
+    """
+    while join.wants_right():
+        rows, starts = obd_tail.read()
+        if obd_tail.restarted:
+            join.reset_right()
+        if not len(rows):
+            return
+        times = epoch_seconds(parse_gps_times(rows['GPS Time'].astype(str)))
+        speeds = pd.to_numeric(rows['Speed (OBD)(km/h)'], errors="coerce")
+        join.add_right_many(times.tolist(), speeds.tolist(), starts.tolist())
+
+
+def write_merged(matches):
+    """
+    Appends the joined rows to the merged log; images without an OBD row within
+    the tolerance are left out. Returns the number of rows written.
+    """
+    rows = []
+    for left_time, (_, filename, visibility), _, speed, _ in matches:
+        if speed is None or pd.isna(speed):
+            continue
+        stamp = datetime.fromtimestamp(left_time, tz).strftime("%Y-%m-%d %H:%M:%S")
+        rows.append([stamp, filename, visibility, speed])
+    if rows:
+        file_exists = os.path.isfile(merged_log_path)
+        with open(merged_log_path, 'a', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            if not file_exists:
+                writer.writerow(MERGED_HEADER)
+            writer.writerows(rows)
+    return len(rows)
+
+# --- Gemini ---
+
+
+def log_risk_event(result):
+    """
+    Appends the risk event in a Gemini answer to the Gemini response CSV (created
+    if it does not exist).
+    """
+    # It's expected that the response includes a timestamp, a fault (risk description), and parameters.
+    risk_event = {
+        'Time': result.get('timestamp', 'N/A'),
+        'Event': result.get('fault', 'Visibility Risk'),
+        'Details': result.get('parameters', '')
+    }
+    file_exists = os.path.isfile(gemini_response_path)
+    try:
+        with open(gemini_response_path, 'a', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=['Time', 'Event', 'Details'])
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow(risk_event)
         print("Gemini response log updated with visibility risk event.")
-    else:
-        print("Gemini API Error:", response.status_code, response.text)
-except Exception as e:
-    print("Error connecting to Gemini API:", e)
+    except Exception as e:
+        print("Error logging response:", e)
+
+
+def analyze_batch(merged):
+    """
+    Sends one batch of joined rows to Gemini. Returns True once it was answered.
+    """
+    merged_subset = merged[['Time Stamp', 'Visibility (%)', 'Speed (OBD)(km/h)']]
+    csv_data = merged_subset.to_csv(index=False)
+    if COMPACT_PROMPT:
+        # Summarise it per minute and keep only the rows with low visibility at speed.
+        compact_data, kept = compact_visibility(merged_subset)
+        print(f"Merged data: {len(csv_data)} bytes of CSV sent as {len(compact_data)} "
+              f"({compression_ratio(csv_data, compact_data):.1f}x smaller), {len(kept)} of {len(merged_subset)} rows kept")
+        csv_data = compact_data
+
+    result = client.analyze(PROMPT.format(tolerance=TOLERANCE_SECONDS, csv_data=csv_data))
+    if result is None:
+        return False
+    log_risk_event(result)
+    return True
+
+
+def run_cycle(vis_tail, obd_tail, merged_tail, join, batches, last_growth):
+    """
+    One cycle: join the new visibility rows, then send every full batch of joined
+    rows (or a smaller one once FLUSH_SECONDS pass without new rows). Returns the
+    time the merged log last grew.
+    """
+    read_visibility(vis_tail, join)
+    read_obd(obd_tail, join)
+    write_merged(join.pop_ready())
+
+    if batches.next_window() is None:
+        rows, starts = merged_tail.read()
+        if merged_tail.restarted:
+            batches.reset()
+        if len(rows):
+            batches.extend(rows, starts)
+            last_growth = time.monotonic()
+    flush = time.monotonic() - last_growth >= FLUSH_SECONDS
+    batch = batches.next_window(flush)
+    if batch is not None and analyze_batch(batch.rows):
+        batches.mark_analysed(batch)
+    save_state(vis_tail, obd_tail, merged_tail, join, batches)
+    return last_growth
+
+
+# --- Main Loop ---
+if __name__ == '__main__':
+    vis_tail, obd_tail, merged_tail, join, batches = load_state()
+    last_growth = time.monotonic()
+    while True:
+        last_growth = run_cycle(vis_tail, obd_tail, merged_tail, join, batches, last_growth)
+        time.sleep(POLL_SECONDS)
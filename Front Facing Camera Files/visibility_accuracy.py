@@ -0,0 +1,150 @@
+# Reports how close the fast visibility score (drishti/visibility.py: reduced-size
+# decode, scaled patch, optional working width) is to the original full-resolution
+# computation, and what each setting costs in time and memory per image. It is the
+# same scorer the server uses (Activation on server.py) and the Pi uses in edge mode.
+#
+# The reference is the original algorithm (full-size imread, np.min over the channels,
+# 15x15 erode) recomputed on each image, or, with --log, the values already recorded
+# in an archived visibility_log.csv for the images that are still in the folder.
+# Exits with status 1 if the chosen setting is off by more than the tolerance.
+#
+#   python3 visibility_accuracy.py [image_dir] [--log visibility_log.csv]
+#                                  [--reduction 2] [--working-width W] [--tolerance 2]
+#
+# On this folder's sample images, --reduction 2 --tolerance 1 passes (at most 0.44
+# points off, the server's setting) and so does --reduction 2 --working-width 1280
+# --tolerance 1; --reduction 4 (1.53) and any --working-width 480 (2.1 to 2.4) do not.
+
+import argparse
+import csv
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..")))
+from drishti.visibility import PATCH_SIZE, score_file
+
+REDUCTIONS = (1, 2, 4, 8)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def reference_score(path):
+    """
+    The original server computation, kept here unchanged as the baseline.
+    """
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    min_channel = np.min(img, axis=2)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (PATCH_SIZE, PATCH_SIZE))
+    dark_channel = cv2.erode(min_channel, kernel)
+    avg_dark = np.mean(dark_channel)
+    return float(np.clip(100 * (1 - (avg_dark / 255)), 0, 100))
+
+
+def logged_scores(log_path):
+    """
+    {filename: visibility %} from a visibility_log.csv.
+    """
+    scores = {}
+    with open(log_path, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            try:
+                scores[row["Filename"]] = float(row["Visibility (%)"])
+            except (KeyError, ValueError):
+                continue
+    return scores
+
+
+def measure(func, *args):
+    """
+    Run func once; returns (result, seconds, peak bytes allocated).
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func(*args)
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fast and full-resolution visibility scores")
+    parser.add_argument("image_dir", nargs="?", default=None, help="default: the log's folder, or this folder")
+    parser.add_argument("--log", help="archived visibility_log.csv to use as the reference")
+    parser.add_argument("--reduction", type=int, default=2, choices=REDUCTIONS, help="setting to check")
+    parser.add_argument("--working-width", type=int, default=None, help="also shrink to this width")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="allowed difference in visibility points")
+    args = parser.parse_args()
+
+    image_dir = args.image_dir or (os.path.dirname(os.path.abspath(args.log)) if args.log else HERE)
+    logged = logged_scores(args.log) if args.log else None
+    images = sorted(f for f in os.listdir(image_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+    if logged is not None:
+        images = [f for f in images if f in logged]
+
+    settings = [(reduction, None) for reduction in REDUCTIONS]
+    if args.working_width:
+        settings += [(reduction, args.working_width) for reduction in REDUCTIONS]
+    checked = (args.reduction, args.working_width)
+    names = {setting: f"1/{setting[0]}" + (f"@{setting[1]}" if setting[1] else "") for setting in settings}
+    differences = {setting: [] for setting in settings}
+    seconds = {setting: 0.0 for setting in settings}
+    peaks = {setting: 0 for setting in settings}
+    reference_seconds = 0.0
+    reference_peak = 0
+
+    print(f"{'Filename':32} {'ref':>7} " + " ".join(f"{names[s]:>9}" for s in settings))
+    for filename in images:
+        path = os.path.join(image_dir, filename)
+        recomputed, elapsed, peak = measure(reference_score, path)
+        reference_seconds += elapsed
+        reference_peak = max(reference_peak, peak)
+        reference = logged[filename] if logged is not None else recomputed
+        if recomputed is None:
+            print(f"Error: Could not read {path}")
+            continue
+        columns = []
+        for setting in settings:
+            scored, elapsed, peak = measure(score_file, path, setting[0], setting[1])
+            seconds[setting] += elapsed
+            peaks[setting] = max(peaks[setting], peak)
+            differences[setting].append(scored[0] - reference)
+            columns.append(f"{scored[0] - reference:+9.2f}")
+        print(f"{filename:32} {reference:7.2f} " + " ".join(columns))
+
+    count = len(differences[settings[0]])
+    if not count:
+        print(f"No images to compare in {image_dir}")
+        return 1
+    source = f"values logged in {args.log}" if logged is not None else "full-resolution recomputation"
+    print(f"\n{count} images, reference: {source}")
+    print(f"Original full resolution: {1000 * reference_seconds / count:.1f} ms, "
+          f"peak {reference_peak / 1e6:.1f} MB per image")
+    for setting in settings:
+        diffs = differences[setting]
+        print(f"{names[setting]:>9}: mean |diff| {sum(abs(d) for d in diffs) / count:.2f}, "
+              f"max |diff| {max(abs(d) for d in diffs):.2f}, mean diff {sum(diffs) / count:+.2f} points, "
+              f"{1000 * seconds[setting] / count:.1f} ms ({reference_seconds / max(seconds[setting], 1e-9):.1f}x faster), "
+              f"peak {peaks[setting] / 1e6:.1f} MB")
+
+    if checked not in differences:
+        checked = (args.reduction, None)
+    worst = max(abs(d) for d in differences[checked])
+    if worst > args.tolerance:
+        print(f"FAIL: {names[checked]} differs by up to {worst:.2f} points (tolerance {args.tolerance})")
+        return 1
+    print(f"OK: {names[checked]} is within {args.tolerance} points of the reference")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+# Batch visibility processing of archived front camera images, e.g. to reprocess a
+# day's folder after the formula changed, instead of copying images back into the
+# watched folder one by one.
+#
+# Walks a directory tree, scores every image with a pool of worker processes (the same
+# scorer as Activation on server.py) and writes the rows to a CSV in the server's
+# visibility_log.csv format. A compact index next to the CSV lists every image already
+# processed (relative path, size, modification time and, with --hash, a content hash),
+# so a rerun only processes new or changed images. Rows and index entries are written
+# in bulk and checkpointed together: after a crash the next run rolls both back to the
+# last checkpoint and carries on from there.
+#
+#   python3 visibility_backfill.py <image_root> [--csv out.csv] [--workers N] [--hash]
+#                                  [--reduction 2] [--working-width W] [--restart]
+
+import argparse
+import csv
+import hashlib
+import io
+import multiprocessing
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..")))
+from drishti.visibility import CSV_HEADER, PATCH_SIZE, visibility_row
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+CHECKPOINT_ROWS = 500          # write rows and index entries in bulk every this many images ...
+CHECKPOINT_SECONDS = 10        # ... or this often
+PROGRESS_SECONDS = 5
+CHUNKSIZE = 8                  # images handed to a worker at a time
+INDEX_VERSION = 1
+
+
+# ===============================
+# Index and Checkpoint
+# ===============================
+# <csv>.index    one line per processed image: relative path, size, mtime_ns, hash, status
+#                ("ok"; "duplicate" if the same content was already processed; "error"
+#                if it could not be read, which is not retried)
+# <csv>.ckpt     "csv size, index size, settings" of the last checkpoint, replaced atomically
+class BackfillState:
+    """
+    The output CSV, its index and the checkpoint that keeps the two consistent.
+    """
+
+    def __init__(self, csv_path, settings, restart=False):
+        self.csv_path = csv_path
+        self.index_path = csv_path + ".index"
+        self.checkpoint_path = csv_path + ".ckpt"
+        self.settings = settings
+        self.done = set()            # (relative path, size, mtime_ns)
+        self.hashes = set()
+        self.skipped = 0             # images found already in the index this run
+        self.rows = []
+        self.entries = []
+        csv_size, index_size = self._read_checkpoint(restart)
+        self._truncate(self.csv_path, csv_size)
+        self._truncate(self.index_path, index_size)
+        self._load_index()
+        self._csv = open(self.csv_path, "a", newline="")
+        self._index = open(self.index_path, "a")
+        if csv_size == 0:
+            self.rows.append(CSV_HEADER)
+            self.checkpoint()          # replaces any checkpoint of a discarded run
+
+    def _read_checkpoint(self, restart):
+        if restart or not os.path.exists(self.checkpoint_path):
+            if not restart and os.path.exists(self.csv_path) and os.path.getsize(self.csv_path) > 0:
+                raise SystemExit(f"{self.csv_path} exists but has no checkpoint; use --restart to overwrite it")
+            return 0, 0
+        with open(self.checkpoint_path) as f:
+            csv_size, index_size, settings = f.read().rstrip("\n").split(" ", 2)
+        if settings != self.settings:
+            raise SystemExit(f"{self.csv_path} was made with different settings ({settings}); "
+                             f"use --restart to reprocess everything or a new --csv")
+        return int(csv_size), int(index_size)
+
+    @staticmethod
+    def _truncate(path, size):
+        # Drops whatever was written after the last checkpoint.
+        if size == 0 or os.path.exists(path):
+            with open(path, "a") as f:
+                f.truncate(size)
+
+    def _load_index(self):
+        with open(self.index_path) as f:
+            for line in f:
+                relative_path, size, mtime_ns, digest, _ = line.rstrip("\n").rsplit("\t", 4)
+                self.done.add((relative_path, int(size), int(mtime_ns)))
+                if digest:
+                    self.hashes.add(digest)
+
+    def add(self, relative_path, size, mtime_ns, digest, status, row=None):
+        if row is not None:
+            self.rows.append(row)
+        self.entries.append(f"{relative_path}\t{size}\t{mtime_ns}\t{digest}\t{status}\n")
+        self.done.add((relative_path, size, mtime_ns))
+        if digest:
+            self.hashes.add(digest)
+
+    def checkpoint(self):
+        """
+        Append the buffered rows and index entries, make them durable, then record
+        the new sizes in the checkpoint file.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(self.rows)
+        self._csv.write(buffer.getvalue())
+        self._index.write("".join(self.entries))
+        for f in (self._csv, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(f"{self._csv.tell()} {self._index.tell()} {self.settings}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.checkpoint_path)
+        self.rows = []
+        self.entries = []
+
+    def close(self):
+        self.checkpoint()
+        self._csv.close()
+        self._index.close()
+
+
+# ===============================
+# Workers
+# ===============================
+_options = {}
+
+
+def _init_worker(reduction, working_width, use_hash, known_hashes):
+    _options.update(reduction=reduction, working_width=working_width, use_hash=use_hash, known_hashes=known_hashes)
+
+
+def process_image(task):
+    """
+    Score one image. Returns (relative path, size, mtime_ns, hash, status, row);
+    the status is "ok", "error" if the image cannot be read, or "duplicate" if an
+    image with the same content was processed by an earlier run.
+    """
+    path, relative_path, size, mtime_ns = task
+    digest = ""
+    data = None
+    if _options["use_hash"]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return relative_path, size, mtime_ns, digest, "error", None
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if digest in _options["known_hashes"]:
+            return relative_path, size, mtime_ns, digest, "duplicate", None
+    try:
+        row = visibility_row(path, _options["reduction"], _options["working_width"], data)
+    except Exception as e:
+        print(f"Error: Could not process {path}: {e}")
+        row = None
+    if row is None:
+        return relative_path, size, mtime_ns, digest, "error", None
+    return relative_path, size, mtime_ns, digest, "ok", row
+
+
+def find_images(root, state, skip_paths):
+    """
+    Yield (path, relative path, size, mtime_ns) of every image under root that is
+    not in the index yet.
+    """
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(directory, filename)
+            if path in skip_paths:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            relative_path = os.path.relpath(path, root)
+            if (relative_path, st.st_size, st.st_mtime_ns) in state.done:
+                state.skipped += 1
+                continue
+            yield path, relative_path, st.st_size, st.st_mtime_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill visibility for a tree of archived images")
+    parser.add_argument("root", help="folder of images (searched recursively)")
+    parser.add_argument("--csv", help="output CSV (default: <root>/visibility_backfill.csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--reduction", type=int, default=2, choices=(1, 2, 4, 8))
+    parser.add_argument("--working-width", type=int, default=0)
+    parser.add_argument("--hash", action="store_true", help="also skip images whose content was already processed")
+    parser.add_argument("--restart", action="store_true", help="discard the CSV and index and start over")
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    csv_path = os.path.abspath(args.csv or os.path.join(root, "visibility_backfill.csv"))
+    settings = f"v{INDEX_VERSION},reduction={args.reduction},working_width={args.working_width},patch={PATCH_SIZE}"
+    state = BackfillState(csv_path, settings, restart=args.restart)
+    skip_paths = {csv_path, state.index_path, state.checkpoint_path}
+
+    counts = {"ok": 0, "error": 0, "duplicate": 0}
+    processed = 0
+    started = last_checkpoint = last_progress = time.monotonic()
+    print(f"Backfilling {root} -> {csv_path} with {args.workers} workers ({settings})")
+    pool = multiprocessing.get_context("spawn").Pool(
+        args.workers, initializer=_init_worker,
+        initargs=(args.reduction, args.working_width or None, args.hash, state.hashes if args.hash else set()))
+    try:
+        for relative_path, size, mtime_ns, digest, status, row in pool.imap_unordered(
+                process_image, find_images(root, state, skip_paths), chunksize=CHUNKSIZE):
+            if status == "ok" and digest and digest in state.hashes:
+                status, row = "duplicate", None   # same content earlier in this run
+            state.add(relative_path, size, mtime_ns, digest, status, row)
+            counts[status] += 1
+            processed += 1
+            now = time.monotonic()
+            if len(state.entries) >= CHECKPOINT_ROWS or now - last_checkpoint >= CHECKPOINT_SECONDS:
+                state.checkpoint()
+                last_checkpoint = now
+            if now - last_progress >= PROGRESS_SECONDS:
+                print(f"{processed} images, {processed / (now - started):.1f} images/s")
+                last_progress = now
+        pool.close()
+    except KeyboardInterrupt:
+        print("Interrupted; saving progress.")
+        pool.terminate()
+    except BaseException:
+        pool.terminate()                # join() would wait forever on a pool that was not closed
+        raise
+    finally:
+        pool.join()
+        state.close()
+
+    elapsed = time.monotonic() - started
+    print(f"Done: {processed} images in {elapsed:.1f} s ({processed / max(elapsed, 1e-9):.1f} images/s), "
+          f"{state.skipped} already processed, {counts['duplicate']} duplicates, {counts['error']} unreadable")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
 # This file is estabilising a serial communication between raspberry pi and arduino. It is taking mq3 data from arduino at a baud rate of 115200 and updating csv file on virtual machine engine
+# The serial port is read event-driven (no polling), each reading is stamped when it
+# arrives, and readings are sent in batches over one `cat >>` SSH channel that is
+# reopened and replayed automatically if it dies. Test without hardware:
+#   python3 fake_mq3_serial.py   (prints a /dev/pts/N port)
+#   python3 "MQ3 Activation on Pi.py" --port /dev/pts/N --local-output /tmp/mq3_data.csv
 
-import serial
-import time
-import paramiko
-from datetime import datetime
+import argparse
+import os
+import sys
+import threading
 from zoneinfo import ZoneInfo
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from drishti import metrics
+from drishti.channel import BatchedChannelWriter, LocalFileChannel, SshAppendChannel
+from drishti.serial_reader import SerialLineReader
+
 # -------------------------
 # Configuration
 # -------------------------
@@ -22,55 +32,79 @@ PRIVATE_KEY_PATH  = "/home/pi/.ssh/fast_and_furious_public_key_openSSH.ppm"
 # Remote CSV path (watch out for spaces, just quote the path if needed)
 REMOTE_CSV_PATH   = "/home/fast-and-furious/main/section_4_test_drive/mq3_data.csv"
 
+# Batching (readings arrive every 2 s, so a batch of 5 is ~10 s of data)
+RING_SIZE         = 10000      # readings kept while the server is unreachable
+BATCH_SIZE        = 5          # send once this many readings are waiting
+FLUSH_INTERVAL    = 10.0       # ... or once the oldest waiting reading is this many seconds old
+
+# Metrics (Prometheus format; set either to None to disable)
+METRICS_PORT      = 9103       # served at http://127.0.0.1:9103/metrics
+METRICS_HOST      = "127.0.0.1"  # "0.0.0.0" to serve every interface (there is no authentication)
+METRICS_TEXTFILE  = None       # e.g. "/var/lib/node_exporter/textfile_collector/mq3.prom"
+
+# -------------------------
+# Metrics
+# -------------------------
+channel_send_seconds = metrics.REGISTRY.histogram(
+    "mq3_stage_seconds", "Time spent in each MQ3 bridge stage", {"stage": "channel_send"})
+reading_age_seconds = metrics.REGISTRY.histogram(
+    "mq3_reading_age_seconds", "Time from a reading's arrival on the serial port to its batch being sent")
+
+
 def main():
-    # 1) Connect to Arduino
-    ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1.0)
-    time.sleep(3)
-    ser.reset_input_buffer()
-    print("Serial connection established.")
+    parser = argparse.ArgumentParser(description="Stream MQ3 readings from the Arduino to the server.")
+    parser.add_argument("--port", default=SERIAL_PORT, help="serial port (e.g. a fake_mq3_serial.py pty)")
+    parser.add_argument("--local-output", help="append to this local file instead of the remote CSV")
+    args = parser.parse_args()
 
-    # 2) Set up Paramiko SSH
-    ssh_client = paramiko.SSHClient()
-    ssh_client.load_system_host_keys()
-    ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    metrics.start_exporter(port=METRICS_PORT, textfile=METRICS_TEXTFILE, host=METRICS_HOST)
+
+    if args.local_output:
+        channel_factory = LocalFileChannel(args.local_output)
+    else:
+        channel_factory = SshAppendChannel(HOSTNAME, USERNAME, PRIVATE_KEY_PATH, REMOTE_CSV_PATH)
+    writer = BatchedChannelWriter(channel_factory, ring_size=RING_SIZE, batch_size=BATCH_SIZE,
+                                  flush_interval=FLUSH_INTERVAL, send_histogram=channel_send_seconds,
+                                  age_histogram=reading_age_seconds)
+
+    def on_reading(reading):
+        # Build a timestamped CSV line (wall clock at arrival); the monotonic stamp
+        # measures how long the reading waited before it was sent.
+        csv_line = f"{reading.wall.isoformat()},{reading.line}\n"
+        writer.put(csv_line, queued_at=reading.monotonic)
+        print(csv_line, end="")  # Local debug
+
+    reader = SerialLineReader(args.port, BAUD_RATE, on_reading, tz=LOCAL_TIMEZONE)
+
+    metrics.REGISTRY.counter("mq3_readings_read_total", "Sensor readings read from the serial port",
+                             func=lambda: reader.lines_read)
+    metrics.REGISTRY.counter("mq3_serial_reopens_total", "Times the serial port was (re)opened",
+                             func=lambda: reader.reopens)
+    metrics.REGISTRY.counter("mq3_serial_read_seconds_total", "Time spent reading and splitting serial data",
+                             func=lambda: reader.read_seconds)
+    metrics.REGISTRY.counter("mq3_readings_sent_total", "Sensor readings sent to the server",
+                             func=lambda: writer.rows_sent)
+    metrics.REGISTRY.counter("mq3_bytes_sent_total", "Bytes sent over the SSH channel", func=lambda: writer.bytes_sent)
+    metrics.REGISTRY.counter("mq3_readings_dropped_total", "Readings dropped because the ring buffer was full",
+                             func=lambda: writer.rows_dropped)
+    metrics.REGISTRY.counter("mq3_channel_connects_total", "Times the remote append channel was (re)opened",
+                             func=lambda: writer.reconnects)
+    metrics.REGISTRY.gauge("mq3_readings_buffered", "Readings waiting to be sent", func=writer.pending)
+
+    writer.start()
+    reader.start()
+    print(f"Streaming MQ3 readings from {args.port} to {args.local_output or REMOTE_CSV_PATH}...")
 
     try:
-        ssh_client.connect(
-            hostname=HOSTNAME,
-            username=USERNAME,
-            key_filename=PRIVATE_KEY_PATH
-        )
-        # 3) Open a session and run `cat >> remote_file` to append incoming data
-        transport = ssh_client.get_transport()
-        channel = transport.open_session()
-        # The command below appends all incoming data on this channel to 'mq3_data.csv'
-        channel.exec_command(f'cat >> "{REMOTE_CSV_PATH}"')
-
-        print("SSH channel established. Streaming data to remote CSV...")
-
-        try:
-            while True:
-                time.sleep(0.01)
-                if ser.in_waiting > 0:
-                    line = ser.readline().decode("utf-8").rstrip()
-                    # Build a timestamped CSV line
-                    now = datetime.now(tz=LOCAL_TIMEZONE).isoformat()
-                    csv_line = f"{now},{line}\n"
-                    # 4) Send the CSV line over the channel
-                    channel.send(csv_line)
-                    print(csv_line, end="")  # Local debug
-        except KeyboardInterrupt:
-            print("Stopping data collection...")
-
-        # Close the channel (this will end the 'cat >>' on the remote side)
-        channel.close()
-
-    except Exception as e:
-        print(f"SSH Error: {e}")
+        threading.Event().wait()   # the reader and writer threads do the work
+    except KeyboardInterrupt:
+        print("Stopping data collection...")
     finally:
-        ssh_client.close()
-        ser.close()
-        print("Closed serial and SSH connections.")
+        reader.stop()
+        writer.close()
+        print(f"Closed serial and SSH connections ({writer.rows_sent} readings sent, "
+              f"{writer.pending()} unsent, {writer.rows_dropped} dropped).")
+
 
 if __name__ == "__main__":
     main()
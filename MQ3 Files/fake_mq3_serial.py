@@ -0,0 +1,85 @@
+# Fake MQ3 Arduino on a pseudo-terminal, so the serial bridge can be tested on any
+# Linux machine without the sensor. The slave side of the pty behaves like
+# /dev/ttyACM0 and receives "Sensor Value: N" lines like mq3-activation.ino prints.
+#
+# Examples:
+#   python3 fake_mq3_serial.py                 # prints the port, then emits a reading every 2 s
+#   python3 fake_mq3_serial.py --interval 0.05 --count 500
+#   python3 "MQ3 Activation on Pi.py" --port /dev/pts/5 --local-output /tmp/mq3_data.csv
+
+import argparse
+import os
+import random
+import threading
+import time
+import tty
+
+
+class FakeSerialDevice:
+    """
+    A pty pair: open .port with pyserial, write lines with write_line().
+    """
+
+    def __init__(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)   # no echo or newline translation, like a real serial port
+        self.port = os.ttyname(self._slave)
+        self.lines_written = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write_line(self, text):
+        # Serial.println ends lines with CR LF
+        os.write(self._master, (text + "\r\n").encode("utf-8"))
+        self.lines_written += 1
+
+    def start_sensor(self, interval=2.0, count=None, base=140, spread=10):
+        """
+        Emit "Sensor Value: N" every interval seconds on a background thread.
+        """
+        def run():
+            sent = 0
+            while not self._stop.is_set() and (count is None or sent < count):
+                self.write_line(f"Sensor Value: {base + random.randint(-spread, spread)}")
+                sent += 1
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, name="fake-mq3", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate the MQ3 Arduino on a pseudo-terminal.")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between readings")
+    parser.add_argument("--count", type=int, help="stop after this many readings")
+    args = parser.parse_args()
+
+    device = FakeSerialDevice()
+    print(f"Fake MQ3 serial port: {device.port}", flush=True)
+    device.start_sensor(interval=args.interval, count=args.count)
+    try:
+        device.wait()
+        time.sleep(1.0)   # let the reader drain the last lines before the pty closes
+    except KeyboardInterrupt:
+        pass
+    finally:
+        device.close()
+
+
+if __name__ == "__main__":
+    main()
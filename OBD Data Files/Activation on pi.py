@@ -1,9 +1,13 @@
 import time
 import os
+import sys
 import paramiko
 from datetime import datetime
 from zoneinfo import ZoneInfo  # If you need timezones
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from drishti.filesync import AppendOnlySync
+
 # --- Configuration ---
 HOSTNAME = '34.47.148.16'
 USERNAME = 'fast-and-furious'
@@ -12,6 +16,12 @@ REMOTE_DIR = '/home/fast-and-furious/main/section_3_test_drive/'
 LOCAL_FILE = '/home/pi/OBD-Data_trackLog.csv'  # Adjust to the actual local path
 REMOTE_FILE = os.path.join(REMOTE_DIR, 'OBD-Data_trackLog.csv')
 
+# Sync mode: "incremental" keeps one connection and appends only new complete rows;
+# "full" re-uploads the whole file every cycle (the original behaviour).
+SYNC_MODE = "incremental"
+SYNC_INTERVAL = 1.0      # seconds between sync cycles
+STATUS_INTERVAL = 60.0   # seconds between progress lines in incremental mode
+
 
 def upload_file(local_path, remote_path):
     """
@@ -33,7 +43,33 @@ def upload_file(local_path, remote_path):
     transport.close()
 
 
+def sync_incremental():
+    """
+    Mirror LOCAL_FILE to REMOTE_FILE by appending only the rows added since the
+    last acknowledged offset, over one persistent SFTP session.
+    """
+    sync = AppendOnlySync(HOSTNAME, USERNAME, PRIVATE_KEY_PATH, LOCAL_FILE, REMOTE_FILE)
+    print(f"[{datetime.now(ZoneInfo('UTC')).isoformat()}] Syncing new rows of {LOCAL_FILE} to {REMOTE_FILE} ...")
+    last_status = time.monotonic()
+    try:
+        while True:
+            started = time.monotonic()
+            sync.sync_once()
+            if started - last_status >= STATUS_INTERVAL:
+                print(f"[{datetime.now(ZoneInfo('UTC')).isoformat()}] Synced {sync.rows_sent} rows "
+                      f"({sync.bytes_sent} bytes) in {sync.appends} appends, offset {sync.offset}, "
+                      f"{sync.reconnects} connections, {sync.rotations} restarts")
+                last_status = started
+            time.sleep(max(SYNC_INTERVAL - (time.monotonic() - started), 0))
+    finally:
+        sync.close()
+
+
 def main():
+    if SYNC_MODE == "incremental":
+        sync_incremental()
+        return
+
     while True:
         try:
             # Optionally, you can log the time of upload or handle partial writes
@@ -1,15 +1,45 @@
+# Rash-driving analysis of the OBD track log on the server. The log is tailed: each
+# cycle parses only the rows appended since the last one, and the rows are analysed in
+# overlapping windows (WINDOW_ROWS long, one every WINDOW_STEP rows) that are sent to
+# Gemini once each, so the cost per cycle stays the same for the whole trip. Progress
+# is kept in STATE_PATH, so a restart carries on where it stopped.
+#
+# Each window is first checked by the local detector (drishti/rash_driving.py), which
+# finds the four event types with the same thresholds as the model's past answers.
+# Clear events are logged straight away; Gemini is only asked about the windows
+# LLM_FOR selects, and if it cannot be reached the local result stands, so detection
+# keeps working offline. Calls go through drishti/llm_client.py (one pooled session,
+# rate limited, retried and cached), with windows that are ready together sent at once.
+# With COMPACT_PROMPTS a window is sent as a summary per few seconds plus the raw rows
+# around the detected peaks (drishti/compaction.py), a fraction of the full CSV.
+
 import os
+import sys
 import csv
 import time
-import requests
-import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from drishti.llm_client import LlmClient
+from drishti.compaction import check_obd_compaction, compact_obd, compression_ratio
+from drishti.rash_driving import detect_events, elapsed_seconds
+from drishti.tail import CsvTail, SlidingWindow
 
 # === Configuration ===
 # Replace with your actual Gemini API endpoint
 GEMINI_API_URL = "https://api.gemini.example.com/analyze"
 API_KEY = "your_gemini_api_key"  # Replace with your Gemini API key
+GEMINI_BATCH_URL = None  # endpoint taking several prompts per request, if the API has one
 CSV_FILE_PATH = '/home/fast-and-furious/main/section_3_test_drive/OBD-Data_trackLog.csv'
 CSV_RESPONSE_LOG = '/home/fast-and-furious/main/section_3_test_drive/gemini_response.csv'
+STATE_PATH = '/home/fast-and-furious/main/section_3_test_drive/.gemini_analysis.state'
+WINDOW_ROWS = 300       # rows per analysed window (30 s at 10 rows/s)
+WINDOW_STEP = 200       # a new window every this many rows; windows overlap by WINDOW_ROWS - WINDOW_STEP
+FLUSH_SECONDS = 10      # analyse a partial window once the log has not grown for this long
+# Windows that still go to Gemini: "ambiguous" (some reading is near but below a
+# threshold), "candidates" (any event or near reading), "all" (every window) or "none".
+LLM_FOR = "ambiguous"
+BATCH_WINDOWS = 4       # most windows sent to Gemini together
+COMPACT_PROMPTS = True  # send per-segment features and the rows around detected peaks instead of every row
 COLUMNS = [
     'GPS Time',
     'Bearing',
@@ -45,20 +75,55 @@ BASE_PROMPT = (
     "- Sensor parameters and values that led to the decision.\n\n"
     "Below is the CSV data:"
 )
+OVERLAP_NOTE = (
+    "The first {overlap} rows repeat the end of the previous part for context; only report events "
+    "at or after GPS Time {first_new}."
+)
+CANDIDATE_NOTE = (
+    "A threshold check already flagged these rows; confirm or reject each and report anything it missed:\n"
+    "{candidates}"
+)
+
+client = LlmClient(GEMINI_API_URL, API_KEY, batch_url=GEMINI_BATCH_URL)
 
 # === Helper Functions ===
 
 
-def get_csv_data():
+def window_csv(window, csv_data=None):
+    """
+    The window's rows as a CSV-formatted string (or csv_data, their compacted
+    form), with a note on the rows that were already analysed as part of the
+    previous window.
+    """
+    overlap = window.new_from_row - window.start_row
+    if csv_data is None:
+        csv_data = window.rows.to_csv(index=False)
+    if overlap:
+        first_new = window.rows['GPS Time'].iloc[overlap]
+        csv_data = OVERLAP_NOTE.format(overlap=overlap, first_new=first_new) + "\n\n" + csv_data
+    return csv_data
+
+
+def load_state():
     """
-    Reads the CSV and returns the data for the required columns as a CSV-formatted string.
+    A tail and window positioned where the previous run stopped.
+    STATE_PATH holds "inode offset first_row analysed_row".
     """
     try:
-        df = pd.read_csv(CSV_FILE_PATH, usecols=COLUMNS)
-        return df.to_csv(index=False)
-    except Exception as e:
-        print("Error reading CSV file:", e)
-        return None
+        with open(STATE_PATH) as f:
+            inode, offset, first_row, analysed_row = (int(value) for value in f.read().split())
+    except (OSError, ValueError):
+        inode, offset, first_row, analysed_row = None, 0, 0, 0
+    tail = CsvTail(CSV_FILE_PATH, COLUMNS, offset=offset, inode=inode)
+    windows = SlidingWindow(WINDOW_ROWS, WINDOW_STEP, first_row=first_row, analysed_row=analysed_row)
+    return tail, windows
+
+
+def save_state(tail, windows):
+    temp_path = STATE_PATH + ".tmp"
+    with open(temp_path, "w") as f:
+        f.write(f"{tail.inode} {windows.resume_offset(tail)} {windows.first_row} {windows.analysed_row}\n")
+    os.replace(temp_path, STATE_PATH)
 
 
 def log_response(response_data):
@@ -79,50 +144,133 @@ def log_response(response_data):
         print("Error logging response:", e)
 
 
-def analyze_data():
+def compact_window(window, seconds, all_events, events):
     """
-    Reads the CSV data, builds the Gemini prompt, sends it to the Gemini API,
-    prints the result, and logs the response.
+    The window as features plus the raw rows around the detected peaks, or None
+    if the detector does not find the same events in the compacted rows.
     """
-    csv_data = get_csv_data()
-    if csv_data is None:
-        return
+    from_row = window.new_from_row - window.start_row
+    compact, kept = compact_obd(window.rows, events, seconds)
+    missing, extra = check_obd_compaction(window.rows, kept, all_events, from_row, seconds)
+    if len(missing) or len(extra):
+        print(f"Compacted rows {window.start_row}-{window.end_row} show different events "
+              f"({len(missing)} missing, {len(extra)} extra); sending the raw rows")
+        return None
+    raw = window.rows.to_csv(index=False)
+    print(f"Rows {window.start_row}-{window.end_row}: {len(raw)} bytes of CSV sent as {len(compact)} "
+          f"({compression_ratio(raw, compact):.1f}x smaller), {len(kept)} raw rows kept")
+    return compact
+
+
+def build_prompt(window, seconds, all_events, events):
+    """
+    The Gemini prompt for one window. all_events are the local detector's findings
+    in the whole window, events those in its new rows, which are listed for the
+    model to check.
+    """
+    compact = compact_window(window, seconds, all_events, events) if COMPACT_PROMPTS else None
+    csv_data = window_csv(window, compact)
 
     # Build the full prompt by appending the CSV data
     full_prompt = f"{BASE_PROMPT}\n\n{csv_data}"
+    if len(events):
+        candidates = "\n".join(f"- {e.time}: {e.event}, {e.details}" for e in events.itertuples())
+        full_prompt += "\n\n" + CANDIDATE_NOTE.format(candidates=candidates)
+    return full_prompt
 
-    payload = {
-        "prompt": full_prompt,
-        # Add any additional Gemini API parameters if needed
-    }
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {API_KEY}"
+def log_result(result):
+    """
+    Prints and logs one Gemini answer.
+    """
+    print("Gemini Analysis Result:", result)
+
+    # Map the result to our logging format. Adjust keys if needed.
+    data_to_log = {
+        'GPS Time': result.get('timestamp', 'N/A'),
+        'Fault': result.get('fault', 'N/A'),
+        'Parameters': result.get('parameters', 'N/A')
     }
+    log_response(data_to_log)
 
-    try:
-        response = requests.post(GEMINI_API_URL, json=payload, headers=headers)
-        if response.status_code == 200:
-            result = response.json()
-            print("Gemini Analysis Result:", result)
-
-            # Map the result to our logging format. Adjust keys if needed.
-            data_to_log = {
-                'GPS Time': result.get('timestamp', 'N/A'),
-                'Fault': result.get('fault', 'N/A'),
-                'Parameters': result.get('parameters', 'N/A')
-            }
-            log_response(data_to_log)
-        else:
-            print("Gemini API Error:", response.status_code, response.text)
-    except Exception as e:
-        print("Error connecting to Gemini API:", e)
+
+def needs_llm(events, ambiguous):
+    if LLM_FOR == "all":
+        return True
+    if LLM_FOR == "candidates":
+        return len(events) > 0
+    if LLM_FOR == "ambiguous":
+        return ambiguous.any()
+    return False
+
+
+def analyze_windows(batch):
+    """
+    Runs the local detector on the new rows of each window, asks Gemini about the
+    windows LLM_FOR selects (all in one go), then logs each window's clear events
+    and Gemini's answer in order. Near-threshold readings are logged as
+    "Possible ..." when Gemini is not asked or cannot be reached.
+    """
+    checked = []
+    for window in batch:
+        seconds = elapsed_seconds(window.rows['GPS Time'].astype(str))
+        all_events = detect_events(window.rows, seconds=seconds)
+        # The overlap is longer than the detector's look-back, so events in the new rows
+        # were computed with their full history; earlier ones belong to the previous window.
+        events = all_events[all_events["row"] >= window.new_from_row - window.start_row]
+        ambiguous = events["magnitude"] < 1.0
+        prompt = build_prompt(window, seconds, all_events, events) if needs_llm(events, ambiguous) else None
+        checked.append((events, ambiguous, prompt))
+
+    results = iter(client.analyze_many([prompt for _, _, prompt in checked if prompt is not None]))
+    for events, ambiguous, prompt in checked:
+        for e in events[~ambiguous].itertuples():
+            log_response({'GPS Time': e.time, 'Fault': e.event, 'Parameters': e.details})
+        result = next(results) if prompt is not None else None
+        if result is not None:
+            log_result(result)
+            continue
+        for e in events[ambiguous].itertuples():
+            log_response({'GPS Time': e.time, 'Fault': f"Possible {e.event}", 'Parameters': e.details})
+
+
+def analyze_new_rows(tail, windows, last_growth):
+    """
+    One cycle: read the rows appended since the last cycle (only while no full
+    window is waiting) and analyse every window that is ready. Returns the time
+    the log last grew.
+    """
+    if windows.next_window() is None:
+        try:
+            rows, starts = tail.read()
+        except Exception as e:
+            print("Error reading CSV file:", e)
+            return last_growth
+        if tail.restarted:
+            windows.reset()
+        if len(rows):
+            windows.extend(rows, starts)
+            last_growth = time.monotonic()
+    flush = time.monotonic() - last_growth >= FLUSH_SECONDS
+    window = windows.next_window(flush)
+    while window is not None:
+        # Windows that are ready together (e.g. catching up after a restart) are
+        # sent to Gemini together.
+        batch = []
+        while window is not None and len(batch) < BATCH_WINDOWS:
+            batch.append(window)
+            windows.mark_analysed(window)
+            window = windows.next_window(flush)
+        analyze_windows(batch)
+        save_state(tail, windows)
+    return last_growth
 
 
 # === Main Loop ===
 if __name__ == '__main__':
+    tail, windows = load_state()
+    last_growth = time.monotonic()
     while True:
-        analyze_data()
+        last_growth = analyze_new_rows(tail, windows, last_growth)
         # Sleep for one second (adjust as necessary based on CSV update frequency)
         time.sleep(1)
@@ -0,0 +1 @@
+# Shared helpers used by the Drishti edge (Raspberry Pi) and server scripts.
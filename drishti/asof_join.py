@@ -0,0 +1,207 @@
+# Incremental as-of join of two timestamped streams, e.g. each visibility row (left)
+# with the OBD speed (right) at the time the image was taken. It gives the same
+# matches as pandas.merge_asof(left, right, direction=..., tolerance=...), but rows
+# are added as the two logs grow and each left row is emitted as soon as the right
+# stream has passed its time, so the whole log is never reloaded or re-sorted.
+#
+# Only the right rows a coming left row can still match are kept: those no more than
+# the tolerance older than the oldest left row still waiting (or than the newest left
+# row seen, less LEFT_DISORDER_SECONDS for rows that arrive slightly out of order).
+# wants_right() tells the caller when reading more of the right stream would let a
+# waiting row out, so the right log is read only as far as it is needed and memory
+# stays constant however long the drive is.
+
+import bisect
+import heapq
+import itertools
+import math
+import time
+
+from .lazy import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+DIRECTIONS = ("backward", "forward", "nearest")
+
+# ===============================
+# Default Settings
+# ===============================
+TOLERANCE_SECONDS = 2.0
+LEFT_DISORDER_SECONDS = 10.0     # left rows may arrive up to this much older than the newest one
+MAX_RIGHT_ROWS = 100000          # hard limit on right rows kept (oldest are dropped)
+
+
+def epoch_seconds(times):
+    """
+    Seconds since the epoch (float numpy array, NaN for NaT) of a timezone-aware
+    datetime Series.
+    """
+    return ((times - pd.Timestamp(0, tz="UTC")).dt.total_seconds()).to_numpy(dtype=float)
+
+
+class AsofJoin:
+    """
+    Joins left rows to the right row matching their time within tolerance seconds:
+    the last one at or before it ("backward"), the first one at or after it
+    ("forward") or the closer of the two ("nearest", ties go backward). Right rows
+    must be added in time order (older ones are counted in out_of_order and
+    skipped); left rows may be added in any order.
+
+    pop_ready() returns (left time, left item, right time, right value, right
+    item) for each left row that can be decided, with None for the right side if
+    nothing matched. A left row that has waited max_wait seconds (wall clock) is
+    emitted with what is known, so a stalled right stream does not hold it forever.
+    """
+
+    def __init__(self, tolerance=TOLERANCE_SECONDS, direction="nearest", max_wait=None,
+                 left_disorder=LEFT_DISORDER_SECONDS, max_right_rows=MAX_RIGHT_ROWS, clock=time.monotonic):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}, not {direction!r}")
+        self.tolerance = tolerance
+        self.direction = direction
+        self.max_wait = max_wait
+        self.left_disorder = left_disorder
+        self.max_right_rows = max_right_rows
+        self.clock = clock
+        self._order = itertools.count()
+        self.reset_left()
+        self.reset_right()
+
+        # Counters, readable at any time for debugging or metrics.
+        self.emitted = 0
+        self.matched = 0
+        self.out_of_order = 0
+        self.right_dropped = 0
+
+    def reset_left(self):
+        self._waiting = []             # heap of (left time, arrival order, arrival clock, item)
+        self.left_time = -math.inf     # newest left time seen
+
+    def reset_right(self):
+        # Parallel lists; entries before _head are dropped, and cut off in bulk.
+        self._times = []
+        self._values = []
+        self._items = []
+        self._head = 0
+        self.right_time = -math.inf    # newest right time seen
+
+    # ---------------------------
+    # Input
+    # ---------------------------
+    def add_left(self, left_time, item):
+        if math.isnan(left_time):
+            return
+        heapq.heappush(self._waiting, (left_time, next(self._order), self.clock(), item))
+        self.left_time = max(self.left_time, left_time)
+
+    def add_right(self, right_time, value, item=None):
+        self.add_right_many([right_time], [value], [item])
+
+    def add_right_many(self, right_times, values, items=None):
+        """
+        Add right rows in time order; rows older than the newest one already added
+        (or without a time) are skipped.
+        """
+        if items is None:
+            items = [None] * len(right_times)
+        for right_time, value, item in zip(right_times, values, items):
+            if not right_time >= self.right_time:       # also catches NaN
+                self.out_of_order += 1
+                continue
+            self._times.append(right_time)
+            self._values.append(value)
+            self._items.append(item)
+            self.right_time = right_time
+        self._prune()
+
+    # ---------------------------
+    # Output
+    # ---------------------------
+    def wants_right(self):
+        """
+        True if a waiting left row needs right rows newer than those added so far.
+        """
+        return bool(self._waiting) and not self._decided(self._waiting[0][0])
+
+    def waiting(self):
+        return len(self._waiting)
+
+    def right_rows(self):
+        return len(self._times) - self._head
+
+    def oldest_left_item(self):
+        """
+        The item of the earliest waiting left row in arrival order, or None.
+        """
+        if not self._waiting:
+            return None
+        return min(self._waiting, key=lambda entry: entry[1])[3]
+
+    def oldest_right_item(self):
+        return self._items[self._head] if self._head < len(self._items) else None
+
+    def pop_ready(self):
+        """
+        Matches of the left rows that can be decided now, oldest first.
+        """
+        ready = []
+        now = self.clock()
+        while self._waiting and self._decided(self._waiting[0][0]):
+            ready.append(self._emit(heapq.heappop(self._waiting)))
+        if self.max_wait is not None and self._waiting:
+            expired = [entry for entry in self._waiting if now - entry[2] >= self.max_wait]
+            if expired:
+                self._waiting = [entry for entry in self._waiting if now - entry[2] < self.max_wait]
+                heapq.heapify(self._waiting)
+                ready.extend(self._emit(entry) for entry in sorted(expired))
+        self._prune()
+        return ready
+
+    # ---------------------------
+    # Matching
+    # ---------------------------
+    def _decided(self, left_time):
+        # Right rows arrive in time order, so once one newer than left_time has been
+        # seen (or one at left_time, for "forward") no later row can match better.
+        if self.direction == "forward":
+            return self.right_time >= left_time
+        return self.right_time > left_time
+
+    def _emit(self, entry):
+        left_time, _, _, item = entry
+        position = self._match(left_time)
+        self.emitted += 1
+        if position is None:
+            return left_time, item, None, None, None
+        self.matched += 1
+        return left_time, item, self._times[position], self._values[position], self._items[position]
+
+    def _match(self, left_time):
+        times = self._times
+        backward = forward = None
+        if self.direction in ("backward", "nearest"):
+            position = bisect.bisect_right(times, left_time, self._head) - 1
+            if position >= self._head and left_time - times[position] <= self.tolerance:
+                backward = position
+        if self.direction in ("forward", "nearest"):
+            position = bisect.bisect_left(times, left_time, self._head)
+            if position < len(times) and times[position] - left_time <= self.tolerance:
+                forward = position
+        if backward is None or forward is None:
+            return forward if backward is None else backward
+        return forward if times[forward] - left_time < left_time - times[backward] else backward
+
+    def _prune(self):
+        # Drop right rows no waiting or future left row can match.
+        keep_from = self.left_time - self.left_disorder
+        if self._waiting:
+            keep_from = min(keep_from, self._waiting[0][0])
+        head = bisect.bisect_left(self._times, keep_from - self.tolerance, self._head)
+        if len(self._times) - head > self.max_right_rows:
+            self.right_dropped += len(self._times) - head - self.max_right_rows
+            head = len(self._times) - self.max_right_rows
+        self._head = head
+        if self._head > 1024 and self._head * 2 > len(self._times):
+            del self._times[:self._head], self._values[:self._head], self._items[:self._head]
+            self._head = 0
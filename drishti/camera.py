@@ -0,0 +1,220 @@
+# Front camera capture straight into memory.
+# A camera source returns one encoded JPEG (bytes) per capture() call, so nothing is
+# written to the SD card (capture_file(path) still writes one to disk for the
+# original capture-then-sftp.put flow):
+#   PiCamera      the Pi camera module through Picamera2; the ISP scales to the
+#                 configured size and the JPEG is encoded at the configured quality
+#   FakeCamera    synthetic road-like frames (or the sample images of a directory)
+#                 encoded with OpenCV, for running without the camera module
+# upload_jpeg streams the bytes to a file on an open SFTP session, and CapturePipeline
+# captures the next image on its own thread while the current one is being uploaded.
+
+import io
+import os
+import queue
+import threading
+import time
+
+from .lazy import LazyModule
+
+cv2 = LazyModule("cv2")       # only the fake camera encodes with OpenCV
+np = LazyModule("numpy")
+
+# ===============================
+# Default Settings
+# ===============================
+DEFAULT_SIZE = None           # full sensor resolution, as the original still capture
+DEFAULT_QUALITY = 90          # JPEG quality (Picamera2's default)
+FAKE_SIZE = (1920, 1080)      # frame size of the fake camera when no size is given
+WARMUP_SECONDS = 2            # let exposure and white balance settle
+PIPELINE_DEPTH = 2            # captured images waiting for upload before the oldest is dropped
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def encode_jpeg(img, quality=DEFAULT_QUALITY):
+    """
+    JPEG bytes of a BGR image.
+    """
+    ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return encoded.tobytes()
+
+
+# ===============================
+# Camera Sources
+# ===============================
+class PiCamera:
+    """
+    The Pi camera module, capturing JPEGs of the given size into memory.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, quality=DEFAULT_QUALITY, warmup=WARMUP_SECONDS):
+        from picamera2 import Picamera2   # only available on the Pi
+        self.camera = Picamera2()
+        if size:
+            config = self.camera.create_still_configuration(main={"size": tuple(size)})
+        else:
+            config = self.camera.create_still_configuration()   # full sensor resolution
+        self.camera.configure(config)
+        self.camera.options["quality"] = quality
+        self.camera.start()
+        time.sleep(warmup)
+
+    def capture(self):
+        buffer = io.BytesIO()
+        self.camera.capture_file(buffer, format="jpeg")
+        return buffer.getvalue()
+
+    def capture_file(self, path):
+        self.camera.capture_file(path)
+
+    def close(self):
+        self.camera.stop()
+        self.camera.close()
+
+
+class FakeCamera:
+    """
+    Stand-in for PiCamera. Cycles through the images of image_dir (resized to size)
+    or, without one, draws a road scene whose haze changes from frame to frame.
+    capture_delay adds the time a real exposure and encode would take.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, quality=DEFAULT_QUALITY, image_dir=None, capture_delay=0.0):
+        self.size = tuple(size) if size else FAKE_SIZE
+        self.quality = quality
+        self.capture_delay = capture_delay
+        self.frames = []
+        if image_dir:
+            for filename in sorted(os.listdir(image_dir)):
+                if filename.lower().endswith(IMAGE_SUFFIXES):
+                    img = cv2.imread(os.path.join(image_dir, filename), cv2.IMREAD_COLOR)
+                    if img is not None:
+                        self.frames.append(cv2.resize(img, self.size, interpolation=cv2.INTER_AREA))
+            if not self.frames:
+                print(f"No images in {image_dir}; using synthetic frames")
+        self.count = 0
+
+    def _synthetic_frame(self):
+        width, height = self.size
+        haze = 0.5 + 0.5 * np.sin(self.count / 5.0)        # 0 = clear, 1 = thick fog
+        rows = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+        sky = np.array([235, 200, 150], dtype=np.float32)  # BGR
+        road = np.array([70, 70, 75], dtype=np.float32)
+        horizon = 0.45
+        scene = np.where(rows[..., None] < horizon, sky, road) * np.ones((1, width, 1), dtype=np.float32)
+        noise = np.random.default_rng(self.count).normal(0, 12, (height, width, 1)).astype(np.float32)
+        frame = (1 - haze) * (scene + noise) + haze * 220.0
+        return np.clip(frame, 0, 255).astype(np.uint8)
+
+    def capture(self):
+        if self.capture_delay:
+            time.sleep(self.capture_delay)
+        frame = self.frames[self.count % len(self.frames)] if self.frames else self._synthetic_frame()
+        self.count += 1
+        return encode_jpeg(frame, self.quality)
+
+    def capture_file(self, path):
+        with open(path, "wb") as f:
+            f.write(self.capture())
+
+    def close(self):
+        pass
+
+
+def open_camera(kind="picamera", size=DEFAULT_SIZE, quality=DEFAULT_QUALITY, image_dir=None, capture_delay=0.0):
+    """
+    Open the camera source named by kind ("picamera" or "fake").
+    """
+    if kind == "picamera":
+        return PiCamera(size, quality)
+    if kind == "fake":
+        return FakeCamera(size, quality, image_dir, capture_delay)
+    raise ValueError(f"unknown camera {kind!r}")
+
+
+# ===============================
+# Upload
+# ===============================
+def upload_jpeg(sftp, data, remote_path):
+    """
+    Write the image bytes to remote_path over an open paramiko SFTP client, without
+    waiting for the server to acknowledge each write request. Like sftp.put, the
+    file is created under its final name, which the server's watcher expects.
+    """
+    with sftp.open(remote_path, "wb") as remote_file:
+        remote_file.set_pipelined(True)
+        remote_file.write(data)
+    return len(data)
+
+
+class CapturePipeline:
+    """
+    Captures an image every interval seconds on a background thread, so the next
+    capture overlaps the upload of the current one. Up to depth captured images
+    wait for get(); when the uploader falls behind, the oldest is dropped so the
+    server always gets recent images.
+    """
+
+    def __init__(self, camera, interval, clock, depth=PIPELINE_DEPTH, capture_timer=None):
+        self.camera = camera
+        self.interval = interval
+        self.clock = clock                   # returns the capture timestamp
+        self.capture_timer = capture_timer   # optional metrics histogram
+        self.captured = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def get(self, timeout=None):
+        """
+        The next (timestamp, jpeg bytes), or None on timeout or once the capture
+        thread has stopped (check error for the reason).
+        """
+        while True:
+            try:
+                return self._queue.get(timeout=0.5 if timeout is None else timeout)
+            except queue.Empty:
+                if timeout is not None or not self._thread.is_alive():
+                    return None
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        next_capture = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                timestamp = self.clock()
+                if self.capture_timer is not None:
+                    with self.capture_timer.time():
+                        data = self.camera.capture()
+                else:
+                    data = self.camera.capture()
+                self.captured += 1
+                self._put((timestamp, data))
+                next_capture = max(next_capture + self.interval, time.monotonic())
+                self._stop.wait(next_capture - time.monotonic())
+        except Exception as e:
+            print(f"Camera capture failed: {e}")
+            self.error = e
+
+    def _put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
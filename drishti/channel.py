@@ -0,0 +1,267 @@
+# Batched streaming of rows to a remote file over a persistent SSH channel running
+# `cat >> file`. Rows wait in a bounded in-memory ring buffer and are only removed once
+# a batch has been handed to the channel, so when the channel or the SSH session dies
+# the writer reconnects (with a growing delay) and replays whatever is still buffered.
+# If the link stays down long enough for the ring buffer to fill, the oldest rows are
+# dropped and counted.
+
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+from .lazy import LazyModule
+
+paramiko = LazyModule("paramiko")   # imported on the first connection attempt
+
+# ===============================
+# Default Settings
+# ===============================
+RING_SIZE = 10000          # rows kept while the link is down (~5.5 hours of MQ3 readings)
+BATCH_SIZE = 50            # send once this many rows are waiting
+FLUSH_INTERVAL = 5.0       # ... or once the oldest waiting row is this many seconds old
+MIN_BACKOFF = 1.0          # first reconnect delay in seconds
+MAX_BACKOFF = 60.0         # reconnect delay is doubled up to this limit
+KEEPALIVE_INTERVAL = 30    # SSH keepalive so idle NAT entries are not dropped
+
+
+class SshAppendChannel:
+    """
+    Opens `cat >> remote_path` on an SSH session, reusing the session across
+    channel reopens while its transport is alive.
+    """
+
+    def __init__(self, hostname, username, key_filename, remote_path):
+        self.hostname = hostname
+        self.username = username
+        self.key_filename = key_filename
+        self.remote_path = remote_path
+        self._client = None
+
+    def open(self):
+        transport = self._client.get_transport() if self._client is not None else None
+        if transport is None or not transport.is_active():
+            self.close()
+            client = paramiko.SSHClient()
+            client.load_system_host_keys()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(hostname=self.hostname, username=self.username, key_filename=self.key_filename,
+                           timeout=10)
+            client.get_transport().set_keepalive(KEEPALIVE_INTERVAL)
+            self._client = client
+            transport = client.get_transport()
+        channel = transport.open_session()
+        channel.exec_command(f'cat >> "{self.remote_path}"')
+        return channel
+
+    def close(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+
+class LocalFileChannel:
+    """
+    Stand-in for SshAppendChannel that appends to a local file, for testing the
+    bridge without a server.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def open(self):
+        return _LocalChannel(open(self.path, "a", buffering=1))
+
+    def close(self):
+        pass
+
+
+class _LocalChannel:
+    def __init__(self, f):
+        self.f = f
+        self.closed = False
+
+    def exit_status_ready(self):
+        return self.closed
+
+    def sendall(self, data):
+        self.f.write(data)
+
+    def close(self):
+        self.closed = True
+        self.f.close()
+
+
+class BatchedChannelWriter:
+    """
+    Queue rows with put() from any thread; a worker thread sends them in batches
+    over a channel opened by channel_factory.open().
+    """
+
+    def __init__(self, channel_factory, ring_size=RING_SIZE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 min_backoff=MIN_BACKOFF, max_backoff=MAX_BACKOFF, send_histogram=None, age_histogram=None):
+        self.channel_factory = channel_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.send_histogram = send_histogram    # seconds per channel send
+        self.age_histogram = age_histogram      # seconds from put() (or queued_at) to send, per row
+
+        self._ring = deque(maxlen=ring_size)   # (sequence number, monotonic time queued, row)
+        self._cond = threading.Condition()
+        self._next_seq = 0
+        self._channel = None
+        self._backoff = min_backoff
+        self._next_connect_time = 0.0
+        self._stop = False
+        self._thread = None
+
+        # Counters, readable at any time for debugging or metrics.
+        self.rows_sent = 0
+        self.bytes_sent = 0
+        self.batches_sent = 0
+        self.rows_dropped = 0
+        self.reconnects = 0
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="channel-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def put(self, row, queued_at=None):
+        """
+        Buffer one row (a string ending in a newline). Never blocks; when the ring
+        buffer is full the oldest row is dropped.
+        """
+        with self._cond:
+            if len(self._ring) == self._ring.maxlen:
+                self.rows_dropped += 1
+            self._ring.append((self._next_seq, time.monotonic() if queued_at is None else queued_at, row))
+            self._next_seq += 1
+            if len(self._ring) == 1 or len(self._ring) >= self.batch_size:
+                self._cond.notify()   # start the flush timer, or send a full batch now
+
+    def pending(self):
+        return len(self._ring)
+
+    def close(self, timeout=10.0):
+        """
+        Send what is buffered (one attempt) and close the channel.
+        """
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._disconnect()
+        self.channel_factory.close()
+
+    # ---------------------------
+    # Worker
+    # ---------------------------
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop and not self._batch_due():
+                    self._cond.wait(self._wait_time())
+                stopping = self._stop
+                batch = list(islice(self._ring, self.batch_size))
+            if batch:
+                self._send(batch)
+            if stopping:
+                self._drain()
+                return
+
+    def _batch_due(self):
+        if not self._ring:
+            return False
+        if time.monotonic() < self._next_connect_time:
+            return False
+        return len(self._ring) >= self.batch_size or time.monotonic() - self._ring[0][1] >= self.flush_interval
+
+    def _wait_time(self):
+        if not self._ring:
+            return None
+        due = max(self._ring[0][1] + self.flush_interval, self._next_connect_time)
+        return max(due - time.monotonic(), 0.01)
+
+    def _drain(self):
+        while True:
+            with self._cond:
+                batch = list(islice(self._ring, self.batch_size))
+            if not batch or not self._send(batch):
+                return
+
+    def _send(self, batch):
+        """
+        Send one batch; on success drop those rows from the ring buffer.
+        """
+        if not self._ensure_connected():
+            return False
+        data = "".join(row for _, _, row in batch)
+        try:
+            started = time.perf_counter()
+            self._channel.sendall(data)
+            if self.send_histogram is not None:
+                self.send_histogram.observe_since(started)
+        except Exception as e:
+            print(f"Error sending over the channel (reconnecting): {e}")
+            self._disconnect()
+            self._schedule_reconnect()
+            return False
+        if self.age_histogram is not None:
+            now = time.monotonic()
+            for _, queued_at, _ in batch:
+                self.age_histogram.observe(now - queued_at)
+        last_seq = batch[-1][0]
+        with self._cond:
+            # Rows may have been dropped from the left meanwhile; remove by sequence number.
+            while self._ring and self._ring[0][0] <= last_seq:
+                self._ring.popleft()
+        self.rows_sent += len(batch)
+        self.bytes_sent += len(data)
+        self.batches_sent += 1
+        return True
+
+    # ---------------------------
+    # Connection Handling
+    # ---------------------------
+    def _ensure_connected(self):
+        if self._channel is not None:
+            if not self._channel.closed and not self._channel.exit_status_ready():
+                return True
+            print("Remote append channel closed (reconnecting)")
+            self._disconnect()
+        if time.monotonic() < self._next_connect_time:
+            return False
+        try:
+            self._channel = self.channel_factory.open()
+            self._backoff = self.min_backoff
+            self.reconnects += 1
+            return True
+        except Exception as e:
+            print(f"Error opening the remote append channel (retrying in {self._backoff:.0f}s): {e}")
+            self.channel_factory.close()
+            self._schedule_reconnect()
+            return False
+
+    def _schedule_reconnect(self):
+        self._next_connect_time = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    def _disconnect(self):
+        if self._channel is not None:
+            try:
+                self._channel.close()
+            except Exception:
+                pass
+            self._channel = None
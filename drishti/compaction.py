@@ -0,0 +1,234 @@
+# Prompt compaction for the Gemini analysis scripts. Instead of pasting every row of a
+# window (ten OBD rows a second, or the whole merged visibility/speed table), the
+# prompt gets a short table of features per segment of the window (speed min/max/
+# change, peak |acceleration| per axis, bearing change and rate, visibility
+# percentiles, with the times of the extremes), and raw rows only around the peaks
+# the local detector (rash_driving.py) flagged, with enough history before each peak
+# for the event to be measured the same way.
+#
+# check_obd_compaction runs the detector again on the rows kept and compares the
+# events with those found on all rows; the analysis script sends the raw rows instead
+# if they differ. compression_ratio gives raw / compacted prompt size.
+
+from .lazy import LazyModule
+from .rash_driving import ACCEL_TOTAL, BEARING, LOOKBACK_SECONDS, SPEED, TIME, detect_events, elapsed_seconds
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+ACCEL_AXES = {
+    "X": 'Acceleration Sensor(X axis)(g)',
+    "Y": 'Acceleration Sensor(Y axis)(g)',
+    "Z": 'Acceleration Sensor(Z axis)(g)',
+    "Total": ACCEL_TOTAL,
+}
+ENGINE_LOAD = 'Engine Load(%)'
+THROTTLE = 'Throttle Position(Manifold)(%)'
+VISIBILITY_TIME = 'Time Stamp'
+VISIBILITY = 'Visibility (%)'
+
+# ===============================
+# Default Settings
+# ===============================
+SEGMENT_SECONDS = 5.0           # OBD feature rows: one per this many seconds of the window
+PEAK_AFTER_SECONDS = 1.0        # raw rows kept after an event (before it: the event's look-back ...
+HISTORY_MARGIN_SECONDS = 0.5    # ... and this much more)
+RATE_SECONDS = 1.0              # bearing rate measured over this span
+MATCH_SECONDS = 1.0             # events on raw and compacted rows this close in time are the same
+VISIBILITY_SEGMENT_SECONDS = 60.0
+VISIBILITY_PERCENTILES = (10, 50)
+LOW_VISIBILITY = 45.0           # merged rows kept raw: visibility below this ...
+RISK_SPEED_KMH = 40.0           # ... at or above this speed
+
+
+def compression_ratio(raw_text, compact_text):
+    return len(raw_text) / max(len(compact_text), 1)
+
+
+def _numeric(rows, column):
+    if column not in rows:
+        return np.full(len(rows), np.nan)
+    return pd.to_numeric(rows[column], errors="coerce").to_numpy(dtype=float)
+
+
+def _extreme(values, how):
+    # nanmax/nanmin, but NaN (without a warning) if there is no value.
+    if np.isnan(values).all():
+        return np.nan
+    return np.nanmax(values) if how == "max" else np.nanmin(values)
+
+
+def _time_of(times, values, how):
+    # GPS Time of the row where values is largest/smallest, or "" if all NaN.
+    if np.isnan(values).all():
+        return ""
+    return times[int(np.nanargmax(values) if how == "max" else np.nanargmin(values))]
+
+
+# ===============================
+# OBD windows
+# ===============================
+def obd_features(rows, seconds=None, segment_seconds=SEGMENT_SECONDS):
+    """
+    One feature row per segment_seconds of OBD log rows: the segment's first and
+    last GPS Time, speed min/max/change, peak |acceleration| per axis, bearing
+    change and peak rate, peak throttle and engine load, and when the speed
+    extremes and the largest total acceleration happened.
+    """
+    if seconds is None:
+        seconds = elapsed_seconds(rows[TIME].astype(str))
+    times = rows[TIME].astype(str).to_numpy()
+    speed = _numeric(rows, SPEED)
+    bearing = _numeric(rows, BEARING)
+    heading = np.full_like(bearing, np.nan)
+    valid = ~np.isnan(bearing)
+    heading[valid] = np.unwrap(bearing[valid], period=360.0)
+    before = np.searchsorted(seconds, seconds - RATE_SECONDS, side="left")
+    rate = np.abs(heading - heading[before]) / np.maximum(seconds - seconds[before], 1e-9)
+    rate[before == np.arange(len(rows))] = 0.0
+
+    segment = ((seconds - seconds[0]) // segment_seconds).astype(int)
+    features = []
+    for number in np.unique(segment):
+        part = np.flatnonzero(segment == number)
+        s, h = speed[part], heading[part]
+        known = h[~np.isnan(h)]
+        feature = {
+            "From": times[part[0]],
+            "To": times[part[-1]],
+            "Speed min": _extreme(s, "min"),
+            "Speed max": _extreme(s, "max"),
+            "Speed change": s[-1] - s[0],
+        }
+        for axis, column in ACCEL_AXES.items():
+            feature[f"Peak |{axis}| (g)"] = _extreme(np.abs(_numeric(rows, column)[part]), "max")
+        feature["Bearing change"] = known[-1] - known[0] if len(known) else np.nan
+        feature["Bearing rate max (deg/s)"] = _extreme(rate[part], "max")
+        feature["Throttle max"] = _extreme(_numeric(rows, THROTTLE)[part], "max")
+        feature["Engine load max"] = _extreme(_numeric(rows, ENGINE_LOAD)[part], "max")
+        feature["Speed max at"] = _time_of(times[part], s, "max")
+        feature["Speed min at"] = _time_of(times[part], s, "min")
+        feature["Peak |Total| at"] = _time_of(times[part], np.abs(_numeric(rows, ACCEL_TOTAL)[part]), "max")
+        features.append(feature)
+    return pd.DataFrame(features).round(2)
+
+
+def peak_rows(seconds, events, after=PEAK_AFTER_SECONDS):
+    """
+    Positions of the rows to keep raw: each event's rows over the threshold, with
+    its look-back before them and `after` seconds after them.
+    """
+    keep = np.zeros(len(seconds), dtype=bool)
+    for e in events.itertuples():
+        before = LOOKBACK_SECONDS[e.event] + HISTORY_MARGIN_SECONDS
+        keep |= (seconds >= seconds[e.first] - before) & (seconds <= seconds[e.last] + after)
+    return np.flatnonzero(keep)
+
+
+def compact_obd(rows, events, seconds=None):
+    """
+    (prompt text, positions of the raw rows kept) for a window of OBD rows and
+    the detector's events in it.
+    """
+    if seconds is None:
+        seconds = elapsed_seconds(rows[TIME].astype(str))
+    features = obd_features(rows, seconds)
+    kept = peak_rows(seconds, events)
+    text = (f"Summary of {len(rows)} rows in {SEGMENT_SECONDS:g} s segments "
+            f"(speed in km/h, bearing in degrees):\n{features.to_csv(index=False)}")
+    if len(kept):
+        text += (f"\nRaw rows around the flagged peaks ({len(kept)} of {len(rows)}):\n"
+                 f"{rows.iloc[kept].to_csv(index=False)}")
+    return text, kept
+
+
+def _unmatched(events, others, seconds):
+    # The events that do not overlap an event of the same type in others (with
+    # MATCH_SECONDS of slack).
+    missing = []
+    for e in events.itertuples():
+        same = others[others["event"] == e.event]
+        first = seconds[same["first"].to_numpy(dtype=int)]
+        last = seconds[same["last"].to_numpy(dtype=int)]
+        if not ((first - MATCH_SECONDS <= seconds[e.last]) & (seconds[e.first] <= last + MATCH_SECONDS)).any():
+            missing.append(e.Index)
+    return events.loc[missing]
+
+
+def check_obd_compaction(rows, kept, events, from_row=0, seconds=None):
+    """
+    Detect events again on the kept rows only (with their original timing) and
+    compare them with events, the detector's result on all rows. Returns (events
+    at or after position from_row missing from the kept rows, events there only on
+    the kept rows); both are empty if the compacted prompt shows the same events.
+    Events on the kept rows that peak less than their look-back after the start of
+    a run of kept rows only count as matches: their rows are context, measured
+    without their full history.
+    """
+    if seconds is None:
+        seconds = elapsed_seconds(rows[TIME].astype(str))
+    compact = detect_events(rows.iloc[kept], seconds=seconds[kept])
+    run_start = kept.copy()
+    run_start[1:][np.diff(kept) == 1] = -1
+    run_start = np.maximum.accumulate(run_start)        # first kept row of each row's run
+    for column in ("row", "first", "last"):
+        compact[column] = kept[compact[column].to_numpy(dtype=int)]
+    peaks = compact["row"].to_numpy(dtype=int)
+    start = run_start[np.searchsorted(kept, peaks)]
+    lookback = compact["event"].map(LOOKBACK_SECONDS).to_numpy(dtype=float)
+    measured = (start == 0) | (seconds[peaks] - seconds[start] >= lookback)   # the window's own start is no loss
+    return (_unmatched(events[events["row"] >= from_row], compact, seconds),
+            _unmatched(compact[(peaks >= from_row) & measured], events, seconds))
+
+
+# ===============================
+# Merged visibility / speed table
+# ===============================
+def visibility_features(merged, segment_seconds=VISIBILITY_SEGMENT_SECONDS):
+    """
+    One feature row per segment_seconds of the merged table: first and last Time
+    Stamp, visibility min and percentiles, speed max, and when the visibility was
+    lowest and the speed highest.
+    """
+    stamps = pd.to_datetime(merged[VISIBILITY_TIME])
+    times = merged[VISIBILITY_TIME].astype(str).to_numpy()
+    seconds = (stamps - stamps.iloc[0]).dt.total_seconds().to_numpy()
+    visibility = _numeric(merged, VISIBILITY)
+    speed = _numeric(merged, SPEED)
+    segment = (seconds // segment_seconds).astype(int)
+    features = []
+    for number in np.unique(segment):
+        part = np.flatnonzero(segment == number)
+        v, s = visibility[part], speed[part]
+        feature = {"From": times[part[0]], "To": times[part[-1]], "Rows": len(part),
+                   "Visibility min": _extreme(v, "min")}
+        for q in VISIBILITY_PERCENTILES:
+            feature[f"Visibility p{q}"] = np.nan if np.isnan(v).all() else np.nanpercentile(v, q)
+        feature["Speed max"] = _extreme(s, "max")
+        feature["Visibility min at"] = _time_of(times[part], v, "min")
+        feature["Speed max at"] = _time_of(times[part], s, "max")
+        features.append(feature)
+    return pd.DataFrame(features).round(2)
+
+
+def risk_rows(merged):
+    """
+    Positions of the merged rows with low visibility at speed.
+    """
+    return np.flatnonzero((_numeric(merged, VISIBILITY) < LOW_VISIBILITY) & (_numeric(merged, SPEED) >= RISK_SPEED_KMH))
+
+
+def compact_visibility(merged):
+    """
+    (prompt text, positions of the raw rows kept) for the merged visibility/speed
+    table: the segment features and the rows with low visibility at speed.
+    """
+    if len(merged) == 0:
+        return merged.to_csv(index=False), np.empty(0, dtype=int)
+    kept = risk_rows(merged)
+    text = (f"Summary of {len(merged)} rows in {VISIBILITY_SEGMENT_SECONDS:g} s segments:\n"
+            f"{visibility_features(merged).to_csv(index=False)}")
+    if len(kept):
+        text += (f"\nRows with visibility below {LOW_VISIBILITY:g}% at {RISK_SPEED_KMH:g} km/h or more "
+                 f"({len(kept)} of {len(merged)}):\n{merged.iloc[kept].to_csv(index=False)}")
+    return text, kept
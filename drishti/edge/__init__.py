@@ -0,0 +1,2 @@
+# Edge agent: every Pi sensor as a plug-in producer in one asyncio process, sharing a
+# single priority-ordered transport. Run it with `python3 -m drishti.edge --config FILE`.
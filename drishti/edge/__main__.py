@@ -0,0 +1,27 @@
+# Entry point: python3 -m drishti.edge --config "Edge Agent Files/edge_agent.ini"
+
+import argparse
+import asyncio
+import signal
+
+from .agent import EdgeAgent
+from .config import load_config
+
+
+async def run_agent(agent):
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, agent.stop)
+    await agent.run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run every Pi sensor in one edge agent process.")
+    parser.add_argument("--config", help="agent config file (INI); defaults are used for missing settings")
+    args = parser.parse_args(argv)
+    agent = EdgeAgent(load_config(args.config))
+    asyncio.run(run_agent(agent))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# The edge agent: one asyncio process on the Pi hosting every sensor as a producer
+# task. The producers share one transport (a single SSH session, sent in per-stream
+# priority order), one memory budget (the transport queue), one CPU budget and
+# thread pool, one config file, and one metrics and health endpoint.
+# A producer that crashes is restarted with a growing delay; the others keep running.
+
+import asyncio
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
+
+from drishti import metrics
+from drishti.ingest_client import IngestClient, SshTunnelConnector, TcpConnector
+from . import config as agent_config
+from .transport import LocalDirConnection, SftpConnection, Transport
+
+BUSY_SLOWDOWN = 2.0   # throttleable producers stretch their interval by this factor while over the CPU budget
+
+# Producers that can be named by their short class name in the config file.
+BUILTIN_PRODUCERS = {
+    "mq3": "drishti.edge.producers:Mq3Producer",
+    "obd": "drishti.edge.producers:ObdProducer",
+    "front_camera": "drishti.edge.producers:FrontCameraProducer",
+    "driver_camera": "drishti.edge.producers:DriverCameraProducer",
+}
+
+
+def load_class(spec):
+    """
+    Import "package.module:ClassName".
+    """
+    module_name, _, class_name = BUILTIN_PRODUCERS.get(spec, spec).partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def rss_bytes():
+    """
+    Resident memory of this process (Linux), or 0 if unknown.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class CpuBudget:
+    """
+    Tracks the agent's CPU use (as a share of all cores) and flags when it is over
+    the budget, so producers doing optional work can back off.
+    """
+
+    def __init__(self, max_percent, interval):
+        self.max_percent = max_percent
+        self.interval = interval
+        self.percent = 0.0
+        self.busy = False
+        self._last_cpu = time.process_time()
+        self._last_wall = time.monotonic()
+
+    def sample(self):
+        cpu, wall = time.process_time(), time.monotonic()
+        if wall > self._last_wall:
+            self.percent = 100.0 * (cpu - self._last_cpu) / ((wall - self._last_wall) * (os.cpu_count() or 1))
+        self._last_cpu, self._last_wall = cpu, wall
+        self.busy = self.percent > self.max_percent
+
+    def scale(self, interval):
+        return interval * BUSY_SLOWDOWN if self.busy else interval
+
+
+class ProducerState:
+    """
+    Supervision state of one producer, for restarts and the health view.
+    """
+
+    def __init__(self, producer):
+        self.producer = producer
+        self.status = "starting"
+        self.restarts = 0
+        self.last_error = None
+        self.started_at = None
+
+
+class EdgeAgent:
+    """
+    Build it from a loaded config, then asyncio.run(agent.run()).
+    """
+
+    def __init__(self, config):
+        self.config = config
+        agent = config["agent"]
+        self.tz = ZoneInfo(agent.get("timezone"))
+        self.state_dir = agent.get("state_dir")
+        self.status_interval = agent.getfloat("status_interval")
+        self.min_restart_delay = agent.getfloat("min_restart_delay")
+        self.max_restart_delay = agent.getfloat("max_restart_delay")
+        self.stop_timeout = agent.getfloat("stop_timeout")
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        self.executor = ThreadPoolExecutor(max_workers=agent.getint("cpu_workers"), thread_name_prefix="edge-worker")
+        self.budget = CpuBudget(agent.getfloat("cpu_budget_percent"), agent.getfloat("budget_interval"))
+        self.transport = self._make_transport(config["transport"], agent_config.priorities(config))
+        self.ingest = self._make_ingest(config["ingest"], config["transport"])
+        self.loop = None
+        self.stopping = None
+
+        self.producers = []
+        for name, section in agent_config.producer_sections(config):
+            producer_class = load_class(section.get("class", fallback=name))
+            self.producers.append(ProducerState(producer_class(self, name, section)))
+
+    def _make_transport(self, section, priorities):
+        if section.get("kind") == "local":
+            connection = LocalDirConnection(section.get("local_root"))
+        else:
+            connection = SftpConnection(section.get("hostname"), section.get("username"), section.get("key_filename"))
+        return Transport(connection, priorities, max_queued_bytes=section.getint("max_queued_bytes"),
+                         chunk_bytes=section.getint("chunk_bytes"), batch_bytes=section.getint("batch_bytes"),
+                         min_backoff=section.getfloat("min_backoff"), max_backoff=section.getfloat("max_backoff"))
+
+    def _make_ingest(self, section, transport_section):
+        """
+        Binary record client (None unless [ingest] is enabled). Producers send their
+        records through it instead of as CSV text over the transport.
+        """
+        if not section.getboolean("enabled"):
+            return None
+        if section.get("connect") == "tcp":
+            connector = TcpConnector(section.get("host"), section.getint("port"))
+        else:
+            connector = SshTunnelConnector(transport_section.get("hostname"), transport_section.get("username"),
+                                           transport_section.get("key_filename"), section.getint("port"),
+                                           remote_host=section.get("host"))
+        return IngestClient(connector, section.get("vehicle_id"), os.path.join(self.state_dir, "outbox"),
+                            batch_records=section.getint("batch_records"),
+                            flush_interval=section.getfloat("flush_interval"))
+
+    # ---------------------------
+    # Helpers for Producers
+    # ---------------------------
+    def run_blocking(self, func, *args):
+        """
+        Run a blocking or CPU-heavy call on the shared worker pool.
+        """
+        return self.loop.run_in_executor(self.executor, func, *args)
+
+    async def sleep(self, seconds):
+        """
+        Sleep, returning early if the agent starts stopping.
+        """
+        if seconds <= 0:
+            return
+        try:
+            await asyncio.wait_for(self.stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def stop(self):
+        """
+        Ask the agent to shut down (safe to call from any thread).
+        """
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+
+    # ---------------------------
+    # Health and Metrics
+    # ---------------------------
+    def health(self):
+        producers = {}
+        for state in self.producers:
+            entry = {"status": state.status, "restarts": state.restarts, "last_error": state.last_error}
+            try:
+                entry.update(state.producer.health())
+            except Exception as e:
+                entry["health_error"] = str(e)
+            producers[state.producer.name] = entry
+        transport = self.transport
+        return {
+            "ok": all(state.status == "running" for state in self.producers) and transport.connected(),
+            "producers": producers,
+            "transport": {
+                "connected": transport.connected(),
+                "queued_bytes": transport.queued_bytes,
+                "max_queued_bytes": transport.max_queued_bytes,
+                "streams": {stream: {"pending": transport.pending(stream), "sent": stats["sent"],
+                                     "dropped": stats["dropped"]}
+                            for stream, stats in list(transport.streams.items())},
+            },
+            "ingest": None if self.ingest is None else {
+                "connected": self.ingest.connected(),
+                "records_submitted": self.ingest.records_submitted,
+                "records_sent": self.ingest.records_sent,
+                "unacked": self.ingest.unacked(),
+            },
+            "cpu_percent": round(self.budget.percent, 1),
+            "cpu_busy": self.budget.busy,
+            "rss_bytes": rss_bytes(),
+        }
+
+    def _register_metrics(self):
+        registry = metrics.REGISTRY
+        self.transport.register_metrics(registry)
+        registry.gauge("edge_cpu_percent", "Agent CPU use as a share of all cores", func=lambda: self.budget.percent)
+        registry.gauge("edge_rss_bytes", "Resident memory of the agent process", func=rss_bytes)
+        if self.ingest is not None:
+            ingest = self.ingest
+            registry.counter("edge_ingest_records_sent_total", "Records acknowledged by the ingest daemon",
+                             func=lambda: ingest.records_sent)
+            registry.counter("edge_ingest_bytes_sent_total", "Wire bytes sent to the ingest daemon",
+                             func=lambda: ingest.bytes_sent)
+            registry.gauge("edge_ingest_records_unacked", "Records in the outboxes not yet acknowledged",
+                           func=ingest.unacked)
+        for state in self.producers:
+            labels = {"producer": state.producer.name}
+            registry.gauge("edge_producer_up", "1 while the producer task is running", labels,
+                           func=lambda state=state: 1 if state.status == "running" else 0)
+            registry.counter("edge_producer_restarts_total", "Times the producer task was restarted", labels,
+                             func=lambda state=state: state.restarts)
+
+    def _start_exporter(self):
+        agent = self.config["agent"]
+        port = agent.getint("metrics_port")
+        host = agent.get("metrics_host")
+        if port:
+            try:
+                metrics.serve_http(port=port, host=host, health=lambda: json.dumps(self.health(), indent=2))
+                print(f"Metrics at http://{host}:{port}/metrics, health at http://{host}:{port}/health")
+            except OSError as e:
+                print(f"Error starting metrics endpoint on port {port}: {e}")
+        if agent.get("metrics_textfile"):
+            metrics.start_textfile_writer(agent.get("metrics_textfile"))
+
+    # ---------------------------
+    # Tasks
+    # ---------------------------
+    async def _supervise(self, state):
+        """
+        Run one producer, restarting it with a growing delay when it fails.
+        """
+        producer = state.producer
+        delay = self.min_restart_delay
+        while not self.stopping.is_set():
+            state.status = "running"
+            state.started_at = time.monotonic()
+            try:
+                await producer.run()
+                if self.stopping.is_set():
+                    break
+                state.last_error = "run() returned"
+            except Exception as e:
+                state.last_error = f"{type(e).__name__}: {e}"
+            print(f"Producer {producer.name} stopped ({state.last_error}); restarting in {delay:.0f}s")
+            state.status = "restarting"
+            if time.monotonic() - state.started_at > self.max_restart_delay:
+                delay = self.min_restart_delay   # it ran fine for a while: start the backoff over
+            await self.sleep(delay)
+            delay = min(delay * 2, self.max_restart_delay)
+            state.restarts += 1
+        state.status = "stopped"
+
+    async def _watch_budget(self):
+        while not self.stopping.is_set():
+            await self.sleep(self.budget.interval)
+            self.budget.sample()
+
+    async def _print_status(self):
+        while not self.stopping.is_set():
+            await self.sleep(self.status_interval)
+            transport = self.transport
+            streams = ", ".join(f"{stream} {stats['sent']} sent/{transport.pending(stream)} pending"
+                                for stream, stats in sorted(transport.streams.items()))
+            running = sum(state.status == "running" for state in self.producers)
+            print(f"[{time.strftime('%H:%M:%S')}] Edge agent: {running}/{len(self.producers)} producers running, "
+                  f"CPU {self.budget.percent:.0f}%, {transport.queued_bytes} bytes queued, {streams or 'no data yet'}")
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        self.transport.start()
+        if self.ingest is not None:
+            self.ingest.start()
+        self._register_metrics()
+        self._start_exporter()
+        names = ", ".join(state.producer.name for state in self.producers) or "none"
+        print(f"Edge agent started with producers: {names}")
+
+        tasks = [asyncio.create_task(self._supervise(state), name=f"producer-{state.producer.name}")
+                 for state in self.producers]
+        tasks.append(asyncio.create_task(self._watch_budget(), name="cpu-budget"))
+        tasks.append(asyncio.create_task(self._print_status(), name="status"))
+        try:
+            await self.stopping.wait()
+        finally:
+            self.stopping.set()
+            _, pending = await asyncio.wait(tasks, timeout=self.stop_timeout)
+            for task in pending:
+                print(f"Task {task.get_name()} did not stop in time; cancelling it")
+                task.cancel()
+            await self.transport.close(timeout=self.stop_timeout)
+            if self.ingest is not None:
+                await self.loop.run_in_executor(None, self.ingest.close, self.stop_timeout)
+            self.executor.shutdown(wait=False)
+            print("Edge agent stopped")
@@ -0,0 +1,77 @@
+# Configuration file of the edge agent (INI format, see "Edge Agent Files/edge_agent.ini").
+# [agent]              budgets, metrics and health endpoint, state directory
+# [transport]          the one connection every sensor shares
+# [priorities]         stream name = priority (lower is sent sooner)
+# [ingest]             optional: send MQ3, driver and OBD records in the binary wire
+#                      format to the ingest daemon instead of as CSV text
+# [producer:<name>]    one sensor each; "class" picks the producer (module:Class)
+
+import configparser
+
+PRODUCER_PREFIX = "producer:"
+
+DEFAULTS = {
+    "agent": {
+        "timezone": "Asia/Kolkata",
+        "state_dir": "/home/pi/.drishti",
+        "cpu_workers": "2",              # shared thread pool for blocking sensor work
+        "cpu_budget_percent": "80",      # of all cores; above it, throttleable producers slow down
+        "budget_interval": "5",          # seconds between CPU budget checks
+        "status_interval": "60",         # seconds between status lines
+        "metrics_port": "9100",          # metrics at /metrics, health at /health (0 disables)
+        "metrics_host": "127.0.0.1",     # 0.0.0.0 serves every interface (there is no authentication)
+        "metrics_textfile": "",
+        "min_restart_delay": "1",        # producer restart backoff in seconds
+        "max_restart_delay": "300",
+        "stop_timeout": "10",            # seconds to flush the transport on shutdown
+    },
+    "transport": {
+        "kind": "sftp",                  # "sftp", or "local" to write under local_root for testing
+        "hostname": "34.47.148.16",
+        "username": "fast-and-furious",
+        "key_filename": "/home/pi/.ssh/fast_and_furious_public_key_openSSH.ppm",
+        "local_root": "/tmp/drishti-edge",
+        "max_queued_bytes": str(64 * 1024 * 1024),
+        "chunk_bytes": str(256 * 1024),
+        "batch_bytes": str(256 * 1024),
+        "min_backoff": "1",
+        "max_backoff": "60",
+    },
+    "priorities": {},
+    "ingest": {
+        "enabled": "false",
+        "vehicle_id": "pi-1",
+        "connect": "ssh",                # "ssh" tunnels with the [transport] key; "tcp" connects directly
+        "host": "127.0.0.1",             # daemon address as seen from the server (ssh) or from the Pi (tcp)
+        "port": "7070",
+        "batch_records": "500",
+        "flush_interval": "1",
+    },
+}
+
+
+def load_config(path=None):
+    """
+    Read the agent configuration; missing settings take the DEFAULTS.
+    """
+    parser = configparser.ConfigParser(inline_comment_prefixes=("#", ";"), interpolation=None)
+    parser.read_dict(DEFAULTS)
+    if path is not None:
+        with open(path) as f:
+            parser.read_file(f)
+    return parser
+
+
+def producer_sections(parser):
+    """
+    Yield (name, section) for every enabled [producer:<name>] section.
+    """
+    for section_name in parser.sections():
+        if section_name.startswith(PRODUCER_PREFIX):
+            section = parser[section_name]
+            if section.getboolean("enabled", fallback=True):
+                yield section_name[len(PRODUCER_PREFIX):], section
+
+
+def priorities(parser):
+    return {stream: int(value) for stream, value in parser["priorities"].items()}
@@ -0,0 +1,355 @@
+# Sensor producers hosted by the edge agent. Each one is the per-sensor logic of a
+# standalone Pi script, turned into an asyncio task that hands its data to the shared
+# transport instead of holding its own SSH connection:
+#   Mq3Producer            MQ3 Activation on Pi.py (serial readings -> mq3_data.csv)
+#   ObdProducer            OBD Activation on pi.py (new OBD track log rows -> remote copy)
+#   FrontCameraProducer    Front camera Activation on pi.py (a JPEG every few seconds)
+#   DriverCameraProducer   Driver Activation on Pi.py (the driver_monitor package)
+# Other producers can be plugged in from the config file ("class = module:Class"); they
+# subclass Producer and implement run().
+# When the agent has an ingest client ([ingest] enabled), MQ3, OBD and combined driver
+# rows go to it as typed binary records instead of CSV text.
+
+import asyncio
+import os
+import posixpath
+import sys
+import threading
+import time
+from datetime import datetime
+
+from drishti import camera, wire
+from .transport import APPEND, FILE
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class Producer:
+    """
+    Base class of a sensor task. run() should return (or raise) only when the
+    agent is stopping or the sensor failed; the agent restarts it with a backoff.
+    """
+
+    def __init__(self, agent, name, section):
+        self.agent = agent
+        self.name = name
+        self.section = section
+        self.stream = section.get("stream", fallback=name)
+
+    async def run(self):
+        raise NotImplementedError
+
+    def health(self):
+        """
+        Extra producer-specific fields for the agent's /health view.
+        """
+        return {}
+
+
+# ===============================
+# MQ3 Alcohol Sensor
+# ===============================
+class Mq3Producer(Producer):
+    """
+    Stream timestamped MQ3 readings from the Arduino's serial port.
+    """
+
+    def __init__(self, agent, name, section):
+        super().__init__(agent, name, section)
+        self.port = section.get("port", fallback="/dev/ttyACM0")
+        self.baud_rate = section.getint("baud_rate", fallback=115200)
+        self.open_delay = section.getfloat("open_delay", fallback=3.0)   # the Arduino resets when the port opens
+        self.remote_path = section.get(
+            "remote_path", fallback="/home/fast-and-furious/main/section_4_test_drive/mq3_data.csv")
+        self.reader = None
+
+    async def run(self):
+        from drishti.serial_reader import SerialLineReader
+
+        ingest = self.agent.ingest
+
+        def on_reading(reading):
+            if ingest is not None:
+                ingest.submit(wire.MQ3, wire.mq3_record(reading.wall, reading.line))
+                return
+            row = f"{reading.wall.isoformat()},{reading.line}\n"
+            self.agent.transport.send_threadsafe(self.stream, APPEND, self.remote_path, row.encode("utf-8"))
+
+        # The reader reopens the port by itself, so this task only ends on shutdown.
+        self.reader = SerialLineReader(self.port, self.baud_rate, on_reading, tz=self.agent.tz,
+                                       open_delay=self.open_delay).start()
+        try:
+            await self.agent.stopping.wait()
+        finally:
+            await self.agent.run_blocking(self.reader.stop)
+
+    def health(self):
+        if self.reader is None:
+            return {}
+        return {"port": self.port, "readings": self.reader.lines_read, "port_opens": self.reader.reopens}
+
+
+# ===============================
+# OBD Track Log
+# ===============================
+class ObdProducer(Producer):
+    """
+    Send the rows appended to the local OBD track log. The offset of the last
+    delivered row (or, with the ingest client, of the last row put in its outbox)
+    is kept in the state directory, so a restart resumes after it.
+    """
+
+    def __init__(self, agent, name, section):
+        super().__init__(agent, name, section)
+        self.local_path = section.get("local_path", fallback="/home/pi/OBD-Data_trackLog.csv")
+        self.remote_path = section.get(
+            "remote_path", fallback="/home/fast-and-furious/main/section_3_test_drive/OBD-Data_trackLog.csv")
+        self.interval = section.getfloat("interval", fallback=1.0)
+        self.max_chunk_bytes = section.getint("max_chunk_bytes", fallback=1024 * 1024)
+        self.state_path = os.path.join(agent.state_dir, f"{name}.offset")
+        self.offset = 0          # bytes of the local file queued for sending
+        self.acked_offset = 0    # bytes of the local file delivered
+        self.inode = None
+        self.row_parser = None   # wire.ObdRowParser for the current file's header
+        self.rows_queued = 0
+        self.state_loaded = False
+
+    async def run(self):
+        if not self.state_loaded:
+            # Only on the first start: after a restart, chunks queued before the
+            # failure may still be on their way, so carry on from self.offset.
+            self.inode, self.acked_offset = self._load_state()
+            self.offset = self.acked_offset
+            self.state_loaded = True
+        while not self.agent.stopping.is_set():
+            chunk = await self.agent.run_blocking(self._read_new_rows)
+            if chunk:
+                end = self.offset + len(chunk)
+                inode = self.inode
+                if self.agent.ingest is not None:
+                    self._submit_records(chunk, header_included=self.offset == 0)
+                    await self.agent.run_blocking(self._acked, inode, end)   # the outbox has them now
+                else:
+                    self.agent.transport.send(self.stream, APPEND, self.remote_path, chunk,
+                                              on_sent=lambda: self._acked(inode, end))
+                self.offset = end
+                self.rows_queued += chunk.count(b"\n")
+            await self.agent.sleep(self.interval)
+
+    def _read_new_rows(self):
+        """
+        Complete rows appended since self.offset (at most max_chunk_bytes).
+        """
+        try:
+            st = os.stat(self.local_path)
+        except FileNotFoundError:
+            return b""
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            if self.inode is not None:
+                print(f"{self.local_path} was truncated or replaced; sending it from the start")
+            self.inode = st.st_ino
+            self.offset = 0
+            self.row_parser = None
+        if self.row_parser is None and self.agent.ingest is not None:
+            with open(self.local_path, "rb") as f:
+                header = f.readline()
+            if not header.endswith(b"\n"):
+                return b""   # wait for the complete header
+            self.row_parser = wire.ObdRowParser(header.decode("utf-8", errors="replace").strip())
+        length = min(st.st_size - self.offset, self.max_chunk_bytes)
+        if length <= 0:
+            return b""
+        with open(self.local_path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(length)
+        return data[:data.rfind(b"\n") + 1]
+
+    def _submit_records(self, chunk, header_included):
+        now = datetime.now(self.agent.tz)
+        lines = chunk.decode("utf-8", errors="replace").splitlines()
+        for line in lines[1:] if header_included else lines:
+            if line.strip():
+                self.agent.ingest.submit(wire.OBD, self.row_parser.record(now, line))
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                inode, offset = f.read().split()
+            return int(inode), int(offset)
+        except (FileNotFoundError, ValueError):
+            return None, 0
+
+    def _acked(self, inode, offset):
+        self.acked_offset = offset
+        tmp_path = self.state_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(f"{inode} {offset}\n")
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"Error saving the OBD offset ({self.state_path}): {e}")
+
+    def health(self):
+        return {"offset": self.offset, "acked_offset": self.acked_offset, "rows_queued": self.rows_queued}
+
+
+# ===============================
+# Front Camera
+# ===============================
+class FrontCameraProducer(Producer):
+    """
+    Capture a JPEG into memory every few seconds and queue it as a remote file.
+    Capture slows down while the agent is over its CPU budget and is skipped while
+    earlier images are still waiting to be sent. The transport uploads on its own
+    thread, so the next capture overlaps the current upload.
+    """
+
+    def __init__(self, agent, name, section):
+        super().__init__(agent, name, section)
+        self.remote_dir = section.get("remote_dir", fallback="/home/fast-and-furious/main/section_1_test_drive/")
+        self.interval = section.getfloat("interval", fallback=3.0)
+        self.max_pending = section.getint("max_pending", fallback=5)
+        self.camera_kind = section.get("camera", fallback="picamera")
+        width, height = camera.DEFAULT_SIZE or (0, 0)
+        width = section.getint("width", fallback=width)
+        height = section.getint("height", fallback=height)
+        self.size = (width, height) if width and height else None   # 0 for the full sensor resolution
+        self.quality = section.getint("quality", fallback=camera.DEFAULT_QUALITY)
+        self.image_dir = section.get("image_dir", fallback="") or None
+        self.images_captured = 0
+        self.images_skipped = 0
+
+    async def run(self):
+        source = await self.agent.run_blocking(
+            camera.open_camera, self.camera_kind, self.size, self.quality, self.image_dir)
+        try:
+            while not self.agent.stopping.is_set():
+                started = time.monotonic()
+                if self.agent.transport.pending(self.stream) >= self.max_pending:
+                    self.images_skipped += 1
+                else:
+                    timestamp = datetime.now(self.agent.tz).strftime("%Y%m%d_%H%M%S")
+                    data = await self.agent.run_blocking(source.capture)
+                    self.images_captured += 1
+                    self.agent.transport.send(self.stream, FILE,
+                                              posixpath.join(self.remote_dir, f"image_{timestamp}.jpg"), data)
+                interval = self.agent.budget.scale(self.interval)
+                await self.agent.sleep(interval - (time.monotonic() - started))
+        finally:
+            await self.agent.run_blocking(source.close)
+
+    def health(self):
+        return {"images_captured": self.images_captured, "images_skipped": self.images_skipped}
+
+
+# ===============================
+# Driver Camera
+# ===============================
+class TransportUploader:
+    """
+    Takes the place of BatchedUploader inside DriverMonitor: rows go to the agent's
+    transport on a stream chosen by remote file. Combined-log rows with an ALERT
+    status are also copied to the drowsiness log on the alert stream, so alerts
+    overtake everything else without reordering the combined log. With an ingest
+    client the combined rows go to it as binary records instead.
+    """
+
+    def __init__(self, transport, streams, default_stream, combined_path=None, alert_path=None,
+                 alert_stream=None, ingest=None):
+        self.transport = transport
+        self.ingest = ingest
+        self.streams = streams            # remote path -> stream
+        self.default_stream = default_stream
+        self.combined_path = combined_path
+        self.alert_path = alert_path
+        self.alert_stream = alert_stream
+        self.alerts = 0
+
+    def append(self, remote_path, line):
+        if self.ingest is not None and remote_path == self.combined_path:
+            self.ingest.submit(wire.DRIVER, wire.driver_record(line))
+        else:
+            stream = self.streams.get(remote_path, self.default_stream)
+            self.transport.send_threadsafe(stream, APPEND, remote_path, (line + "\n").encode("utf-8"))
+        if self.alert_path and remote_path == self.combined_path:
+            # timestamp, left_ear, right_ear, lar, drowsiness_percent, driver_status, yawn_or_not
+            fields = line.split(",")
+            if len(fields) == 7 and fields[5].startswith("ALERT"):
+                alert = f"{fields[0]},{fields[5]},{fields[4]}\n"   # the drowsiness log's columns
+                self.transport.send_threadsafe(self.alert_stream, APPEND, self.alert_path, alert.encode("utf-8"))
+                self.alerts += 1
+
+    def pending(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+class DriverCameraProducer(Producer):
+    """
+    Run the driver_monitor package (settings in its config.py) on its own thread,
+    with its remote rows sent through the agent's transport.
+    """
+
+    def __init__(self, agent, name, section):
+        super().__init__(agent, name, section)
+        self.package_dir = section.get("package_dir", fallback=os.path.join(REPO_DIR, "Driver Facing Files"))
+        self.alert_stream = section.get("alert_stream", fallback="driver_alert")
+        self.monitor = None
+        self.uploader = None
+
+    async def run(self):
+        if self.package_dir not in sys.path:
+            sys.path.insert(0, self.package_dir)
+        from driver_monitor import config
+        from driver_monitor.models import ModelLoader
+        from driver_monitor.monitor import DriverMonitor
+        from driver_monitor.supervisor import supervise
+
+        if self.monitor is None:
+            # Created once: a producer restart keeps the loaded models, logs and metrics.
+            models = ModelLoader(config.FACE_BACKEND, config.LANDMARK_BACKEND, config.LANDMARKS_MODEL,
+                                 cascade_path=config.CASCADE_PATH, roi_padding=config.ROI_PADDING)
+            models.warm()
+            self.uploader = TransportUploader(
+                self.agent.transport,
+                {config.REMOTE_DROWSINESS_LOG_PATH: self.alert_stream,
+                 config.REMOTE_YAWNING_LOG_PATH: self.alert_stream},
+                self.stream, combined_path=config.REMOTE_COMBINED_LOG_PATH,
+                alert_path=config.REMOTE_DROWSINESS_LOG_PATH, alert_stream=self.alert_stream,
+                ingest=self.agent.ingest,
+            )
+            self.monitor = DriverMonitor(models, uploader=self.uploader)
+        self.monitor.stopping.clear()
+
+        # The frame loop is CPU-bound and never returns on its own, so it gets a
+        # dedicated thread rather than a slot in the shared pool.
+        done = self.agent.loop.create_future()
+
+        def run_monitor():
+            try:
+                supervise(self.monitor, max_restarts=config.MAX_RESTARTS)
+                result = None
+            except BaseException as e:
+                result = e
+            self.agent.loop.call_soon_threadsafe(done.set_result, result)
+
+        threading.Thread(target=run_monitor, name="driver-monitor", daemon=True).start()
+        stopping = asyncio.ensure_future(self.agent.stopping.wait())
+        try:
+            await asyncio.wait([done, stopping], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+            self.monitor.stop()
+            error = await done
+            if self.agent.stopping.is_set():
+                await self.agent.run_blocking(self.monitor.close)
+        if error is not None:
+            raise error
+
+    def health(self):
+        if self.monitor is None:
+            return {}
+        return {"frames_captured": self.monitor.frames_captured(), "restarts": max(self.monitor.runs - 1, 0),
+                "alerts": self.uploader.alerts}
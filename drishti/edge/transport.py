@@ -0,0 +1,480 @@
+# Priority-multiplexed transport for the edge agent.
+# Every producer hands its data to one Transport: rows to append to a remote CSV, or
+# whole files such as camera images. The transport sends them over a single SSH/SFTP
+# session in priority order. Files go out in chunks, so a drowsiness alert queued
+# behind a camera image waits for one chunk, not for the whole image. A remote CSV is
+# cut back to its previous size before a failed append is retried, so no row lands twice.
+# Everything waiting shares one memory budget; when it is exceeded the oldest data of
+# the least important stream is dropped first.
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from drishti import metrics
+from drishti.lazy import LazyModule
+
+paramiko = LazyModule("paramiko")   # imported on the first connection attempt
+
+APPEND = "append"    # data is appended to the remote file
+FILE = "file"        # data is the whole remote file (written to <path>.part, then renamed)
+
+# ===============================
+# Default Settings
+# ===============================
+MAX_QUEUED_BYTES = 64 * 1024 * 1024   # memory budget shared by every stream
+CHUNK_BYTES = 256 * 1024              # file upload granularity (how long an alert may wait)
+BATCH_BYTES = 256 * 1024              # queued appends to one remote file are merged up to this size
+DEFAULT_PRIORITY = 5                  # for streams missing from the priority table (lower is sooner)
+MIN_BACKOFF = 1.0                     # first reconnect delay in seconds
+MAX_BACKOFF = 60.0                    # reconnect delay is doubled up to this limit
+KEEPALIVE_INTERVAL = 30               # SSH keepalive so idle NAT entries are not dropped
+PART_SUFFIX = ".part"
+
+
+class Message:
+    """
+    One queued item. Messages order by (priority, sequence number), so equal
+    priorities keep their arrival order.
+    """
+
+    __slots__ = ("priority", "seq", "stream", "kind", "remote_path", "data", "queued_at", "offset", "on_sent")
+
+    def __init__(self, priority, seq, stream, kind, remote_path, data, on_sent=None):
+        self.priority = priority
+        self.seq = seq
+        self.stream = stream
+        self.kind = kind
+        self.remote_path = remote_path
+        self.data = data
+        self.queued_at = time.monotonic()
+        self.offset = 0          # bytes of a FILE already written to the .part file
+        self.on_sent = on_sent   # called on the event loop once the message is delivered
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+# ===============================
+# Connections (blocking; only ever used from the transport's I/O thread)
+# ===============================
+class SftpConnection:
+    """
+    One SSH session with an SFTP channel to the virtual machine engine.
+    """
+
+    def __init__(self, hostname, username, key_filename):
+        self.hostname = hostname
+        self.username = username
+        self.key_filename = key_filename
+        self._client = None
+        self._sftp = None
+
+    def describe(self):
+        return f"{self.username}@{self.hostname}"
+
+    def is_active(self):
+        if self._sftp is None:
+            return False
+        transport = self._client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def connect(self):
+        self.close()
+        client = paramiko.SSHClient()
+        client.load_system_host_keys()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(self.hostname, username=self.username, key_filename=self.key_filename, timeout=10)
+        client.get_transport().set_keepalive(KEEPALIVE_INTERVAL)
+        self._sftp = client.open_sftp()
+        self._client = client
+
+    def append(self, path, data):
+        with self._sftp.open(path, "ab") as remote_file:
+            remote_file.write(data)
+
+    def size(self, path):
+        try:
+            return self._sftp.stat(path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def truncate(self, path, size):
+        self._sftp.truncate(path, size)
+
+    def write_part(self, path, offset, data):
+        with self._sftp.open(path + PART_SUFFIX, "ab" if offset else "wb") as remote_file:
+            remote_file.write(data)
+
+    def finish_file(self, path):
+        self._sftp.posix_rename(path + PART_SUFFIX, path)
+
+    def close(self):
+        for handle in (self._sftp, self._client):
+            if handle is not None:
+                try:
+                    handle.close()
+                except Exception:
+                    pass
+        self._sftp = None
+        self._client = None
+
+
+class LocalDirConnection:
+    """
+    Stand-in for SftpConnection that writes remote paths under a local directory,
+    for running the agent without a server.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._active = False
+
+    def describe(self):
+        return self.root
+
+    def is_active(self):
+        return self._active
+
+    def connect(self):
+        os.makedirs(self.root, exist_ok=True)
+        self._active = True
+
+    def _local(self, path):
+        local_path = os.path.join(self.root, path.lstrip("/"))
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        return local_path
+
+    def append(self, path, data):
+        with open(self._local(path), "ab") as f:
+            f.write(data)
+
+    def size(self, path):
+        try:
+            return os.path.getsize(self._local(path))
+        except FileNotFoundError:
+            return 0
+
+    def truncate(self, path, size):
+        os.truncate(self._local(path), size)
+
+    def write_part(self, path, offset, data):
+        with open(self._local(path) + PART_SUFFIX, "ab" if offset else "wb") as f:
+            f.write(data)
+
+    def finish_file(self, path):
+        local_path = self._local(path)
+        os.replace(local_path + PART_SUFFIX, local_path)
+
+    def close(self):
+        self._active = False
+
+
+# ===============================
+# Transport
+# ===============================
+class Transport:
+    """
+    Queue data with send() on the event loop (or send_threadsafe() from any
+    thread); one task delivers it in priority order over the connection.
+    """
+
+    def __init__(self, connection, priorities=None, max_queued_bytes=MAX_QUEUED_BYTES, chunk_bytes=CHUNK_BYTES,
+                 batch_bytes=BATCH_BYTES, min_backoff=MIN_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.connection = connection
+        self.priorities = dict(priorities or {})   # stream name -> priority (lower is sooner)
+        self.max_queued_bytes = max_queued_bytes
+        self.chunk_bytes = chunk_bytes
+        self.batch_bytes = batch_bytes
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._backoff = min_backoff
+        self._next_connect_time = 0.0
+        self._closing = False
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+        self._registry = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="edge-transport")
+
+        # Counters, readable at any time for debugging or metrics.
+        self.queued_bytes = 0
+        self.reconnects = 0
+        self.streams = {}             # stream name -> {"sent", "sent_bytes", "dropped", "dropped_bytes"}
+        self._pending = {}            # stream name -> queued messages
+        self._rewind = {}             # remote path -> its size before an append that failed part way
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def start(self):
+        """
+        Start the delivery task on the running event loop.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="edge-transport")
+        return self
+
+    def send(self, stream, kind, remote_path, data, on_sent=None):
+        """
+        Queue data for the remote path. Never blocks. Returns False if the data was
+        dropped because the memory budget is full of more important data.
+        """
+        priority = self.priorities.get(stream, DEFAULT_PRIORITY)
+        self._stream_stats(stream)
+        if not self._make_room(len(data), priority):
+            self._count_drop(stream, len(data))
+            return False
+        heapq.heappush(self._heap, Message(priority, next(self._seq), stream, kind, remote_path, data, on_sent))
+        self.queued_bytes += len(data)
+        self._pending[stream] = self._pending.get(stream, 0) + 1
+        self._wakeup.set()
+        return True
+
+    def send_threadsafe(self, stream, kind, remote_path, data, on_sent=None):
+        self._loop.call_soon_threadsafe(self.send, stream, kind, remote_path, data, on_sent)
+
+    def pending(self, stream=None):
+        """
+        Messages waiting (for one stream, or in total).
+        """
+        if stream is None:
+            return sum(self._pending.values())
+        return self._pending.get(stream, 0)
+
+    def connected(self):
+        return self.connection.is_active()
+
+    async def close(self, timeout=10.0):
+        """
+        Deliver what is queued (for at most timeout seconds) and close the connection.
+        """
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                print(f"Transport closed with {self.pending()} messages ({self.queued_bytes} bytes) unsent")
+            self._task = None
+        await self._loop.run_in_executor(self._io, self.connection.close)
+        self._io.shutdown(wait=False)
+
+    def register_metrics(self, registry=metrics.REGISTRY):
+        registry.gauge("edge_transport_queued_bytes", "Bytes waiting in the shared transport queue",
+                       func=lambda: self.queued_bytes)
+        registry.gauge("edge_transport_connected", "1 while the transport session is up",
+                       func=lambda: 1 if self.connected() else 0)
+        registry.counter("edge_transport_connects_total", "Times the transport session was (re)opened",
+                         func=lambda: self.reconnects)
+        self._registry = registry
+        for stream in set(self.priorities) | set(self.streams):
+            self._register_stream(stream)
+
+    def _register_stream(self, stream):
+        registry = self._registry
+        if registry is None:
+            return
+        stats = self._stream_stats(stream)
+        labels = {"stream": stream}
+        registry.counter("edge_stream_messages_sent_total", "Messages delivered per stream", labels,
+                         func=lambda: stats["sent"])
+        registry.counter("edge_stream_bytes_sent_total", "Bytes delivered per stream", labels,
+                         func=lambda: stats["sent_bytes"])
+        registry.counter("edge_stream_messages_dropped_total", "Messages dropped to stay within the memory budget",
+                         labels, func=lambda: stats["dropped"])
+        registry.gauge("edge_stream_messages_pending", "Messages waiting per stream", labels,
+                       func=lambda: self.pending(stream))
+        stats["latency"] = registry.histogram("edge_stream_delivery_seconds",
+                                              "Time from queueing a message to its delivery", labels)
+
+    # ---------------------------
+    # Memory Budget
+    # ---------------------------
+    def _make_room(self, size, priority):
+        """
+        Evict queued messages until size more bytes fit. Only messages of the same or
+        a less important priority are evicted (least important, then oldest, first).
+        """
+        if size > self.max_queued_bytes:
+            return False
+        while self.queued_bytes + size > self.max_queued_bytes:
+            victims = [m for m in self._heap if m.offset == 0]
+            if not victims:
+                return False
+            victim = max(victims, key=lambda m: (m.priority, -m.seq))
+            if victim.priority < priority:
+                return False
+            self._heap.remove(victim)
+            heapq.heapify(self._heap)
+            self._forget(victim)
+            self._count_drop(victim.stream, len(victim.data))
+        return True
+
+    def _stream_stats(self, stream):
+        stats = self.streams.get(stream)
+        if stats is None:
+            stats = self.streams[stream] = {"sent": 0, "sent_bytes": 0, "dropped": 0, "dropped_bytes": 0,
+                                            "latency": None}
+            self._register_stream(stream)
+        return stats
+
+    def _count_drop(self, stream, size):
+        stats = self._stream_stats(stream)
+        stats["dropped"] += 1
+        stats["dropped_bytes"] += size
+
+    def _forget(self, message):
+        self.queued_bytes -= len(message.data)
+        self._pending[message.stream] -= 1
+
+    # ---------------------------
+    # Delivery
+    # ---------------------------
+    async def _run(self):
+        while True:
+            if not self._heap:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if not await self._ensure_connected():
+                continue
+            message = heapq.heappop(self._heap)
+            if message.kind == APPEND:
+                await self._send_appends(message)
+            else:
+                await self._send_chunk(message)
+
+    async def _send_appends(self, first):
+        """
+        Merge every queued append to the same remote file (in arrival order) into
+        one write.
+        """
+        batch = [first]
+        size = len(first.data)
+        same_file = [m for m in self._heap if m.kind == APPEND and m.remote_path == first.remote_path]
+        for message in sorted(same_file, key=lambda m: m.seq):
+            if size + len(message.data) > self.batch_bytes:
+                break
+            batch.append(message)
+            size += len(message.data)
+        if len(batch) > 1:
+            taken = set(map(id, batch))
+            self._heap = [m for m in self._heap if id(m) not in taken]
+            heapq.heapify(self._heap)
+        batch.sort(key=lambda m: m.seq)
+        data = b"".join(m.data for m in batch)
+        if await self._io_call(self._append, first.remote_path, data):
+            for message in batch:
+                self._delivered(message)
+        else:
+            for message in batch:
+                heapq.heappush(self._heap, message)
+
+    def _append(self, path, data):
+        """
+        Append on the I/O thread. If an earlier append to the path failed part way,
+        the file is first cut back to its size before that append (the rows are all
+        in data again); if this append fails, that size is recorded for next time.
+        """
+        rewind = self._rewind.get(path)
+        if rewind is None:
+            self._rewind[path] = self.connection.size(path)
+        elif self.connection.size(path) > rewind:
+            self.connection.truncate(path, rewind)
+        self.connection.append(path, data)
+        del self._rewind[path]
+
+    async def _send_chunk(self, message):
+        """
+        Write the next chunk of a file; a partly written file goes back in the queue
+        so anything more important is sent before its next chunk.
+        """
+        chunk = message.data[message.offset:message.offset + self.chunk_bytes]
+        ok = await self._io_call(self.connection.write_part, message.remote_path, message.offset, chunk)
+        if ok:
+            message.offset += len(chunk)
+            if message.offset >= len(message.data):
+                ok = await self._io_call(self.connection.finish_file, message.remote_path)
+                if ok:
+                    self._delivered(message)
+                    return
+                message.offset = 0   # rewrite the .part file from the start after reconnecting
+        elif message.offset:
+            message.offset = 0
+        heapq.heappush(self._heap, message)
+
+    def _delivered(self, message):
+        self._forget(message)
+        stats = self._stream_stats(message.stream)
+        stats["sent"] += 1
+        stats["sent_bytes"] += len(message.data)
+        if stats["latency"] is not None:
+            stats["latency"].observe(time.monotonic() - message.queued_at)
+        if message.on_sent is not None:
+            try:
+                message.on_sent()
+            except Exception as e:
+                print(f"Error in the delivery callback of stream {message.stream}: {e}")
+
+    async def _io_call(self, func, *args):
+        """
+        Run one blocking connection call on the I/O thread. Returns False (and drops
+        the connection) if it failed.
+        """
+        try:
+            await self._loop.run_in_executor(self._io, func, *args)
+            return True
+        except Exception as e:
+            print(f"Error sending to {self.connection.describe()} (reconnecting): {e}")
+            await self._loop.run_in_executor(self._io, self.connection.close)
+            self._schedule_reconnect()
+            return False
+
+    # ---------------------------
+    # Connection Handling
+    # ---------------------------
+    async def _ensure_connected(self):
+        if self.connection.is_active():
+            return True
+        wait = self._next_connect_time - time.monotonic()
+        if wait > 0:
+            if self._closing:
+                # Shutting down while offline: give up on what is left.
+                self._drop_all()
+                return False
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            return False
+        try:
+            await self._loop.run_in_executor(self._io, self.connection.connect)
+        except Exception as e:
+            print(f"Error connecting to {self.connection.describe()} (retrying in {self._backoff:.0f}s): {e}")
+            self._schedule_reconnect()
+            return False
+        self._backoff = self.min_backoff
+        self.reconnects += 1
+        print(f"Transport connected to {self.connection.describe()}")
+        return True
+
+    def _schedule_reconnect(self):
+        self._next_connect_time = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    def _drop_all(self):
+        for message in self._heap:
+            self._forget(message)
+            self._count_drop(message.stream, len(message.data))
+        self._heap = []
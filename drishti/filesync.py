@@ -0,0 +1,228 @@
+# Incremental, append-only mirroring of a growing local file (e.g. the OBD track log)
+# to the virtual machine engine. One SSH/SFTP session is reused; each cycle sends only
+# the complete rows appended since the last acknowledged byte offset.
+#
+# The remote file always holds a prefix of the local file, so after a reconnect the
+# remote size *is* the acknowledged offset: an append that was cut off half-way is
+# simply continued, and nothing is sent twice. If the local file is truncated or
+# replaced (a new trip log), the remote copy is archived under a timestamped name and
+# mirroring starts again from the beginning.
+
+import os
+import time
+
+from .lazy import LazyModule
+
+paramiko = LazyModule("paramiko")   # imported on the first connection attempt
+
+# ===============================
+# Default Settings
+# ===============================
+MAX_CHUNK_BYTES = 1024 * 1024   # largest single append (bounds memory after a long outage)
+HEAD_CHECK_BYTES = 4096         # start of the file compared each cycle to spot a replaced file
+TAIL_CHECK_BYTES = 256          # bytes compared before the remote end when resuming
+MIN_BACKOFF = 1.0               # first reconnect delay in seconds
+MAX_BACKOFF = 60.0              # reconnect delay is doubled up to this limit
+KEEPALIVE_INTERVAL = 30         # SSH keepalive so idle NAT entries are not dropped
+
+
+class AppendOnlySync:
+    """
+    Mirror one append-only local file to a remote path by sending only new rows.
+    Call sync_once() periodically (e.g. every second).
+    """
+
+    def __init__(self, hostname, username, key_filename, local_path, remote_path,
+                 max_chunk_bytes=MAX_CHUNK_BYTES, min_backoff=MIN_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.hostname = hostname
+        self.username = username
+        self.key_filename = key_filename
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.max_chunk_bytes = max_chunk_bytes
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.offset = 0            # bytes of the local file acknowledged by the server
+        self._inode = None
+        self._head = b""           # first bytes of the local file when offset was set
+        self._client = None
+        self._sftp = None
+        self._backoff = min_backoff
+        self._next_connect_time = 0.0
+
+        # Counters, readable at any time for debugging or metrics.
+        self.bytes_sent = 0
+        self.rows_sent = 0
+        self.appends = 0
+        self.rotations = 0
+        self.reconnects = 0
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def sync_once(self):
+        """
+        Send the complete rows appended since the last call. Returns the number of
+        bytes sent, or None if the server could not be reached.
+        """
+        try:
+            st = os.stat(self.local_path)
+        except FileNotFoundError:
+            return 0
+        if not self._ensure_connected():
+            return None
+        try:
+            if self._inode is None:
+                self._resume(st)
+            elif self._local_rotated(st):
+                print(f"{self.local_path} was truncated or replaced; starting a new remote copy")
+                self._start_over(st)
+
+            sent = 0
+            while True:
+                chunk = self._read_complete_rows(st.st_size)
+                if not chunk:
+                    break
+                self._append_remote(chunk)
+                # Acknowledged: the SFTP write and close returned without error.
+                self.offset += len(chunk)
+                self.bytes_sent += len(chunk)
+                self.rows_sent += chunk.count(b"\n")
+                self.appends += 1
+                sent += len(chunk)
+                if len(self._head) < HEAD_CHECK_BYTES:
+                    self._head = self._read_local(0, min(self.offset, HEAD_CHECK_BYTES))
+            return sent
+        except Exception as e:
+            print(f"Error syncing {self.local_path} to {self.remote_path}: {e}")
+            self._disconnect()
+            return None
+
+    def close(self):
+        self._disconnect()
+
+    # ---------------------------
+    # Offsets and Rotation
+    # ---------------------------
+    def _resume(self, st):
+        """
+        Take the acknowledged offset from the remote file after checking that it is
+        still a copy of the start of the local file.
+        """
+        remote_size = self._remote_size()
+        if remote_size == 0:
+            self._set_offset(st, 0)
+            return
+        check = min(TAIL_CHECK_BYTES, remote_size)
+        if remote_size <= st.st_size and \
+                self._read_remote(remote_size - check, check) == self._read_local(remote_size - check, check):
+            self._set_offset(st, remote_size)
+            return
+        print(f"{self.remote_path} does not match {self.local_path}; archiving it and starting a new remote copy")
+        self._start_over(st)
+
+    def _local_rotated(self, st):
+        if st.st_ino != self._inode or st.st_size < self.offset:
+            return True
+        return self._read_local(0, len(self._head)) != self._head
+
+    def _start_over(self, st):
+        """
+        Archive the remote copy under a timestamped name and restart from byte 0.
+        """
+        if self._remote_size() > 0:
+            archive = self.remote_path + time.strftime(".%Y%m%d-%H%M%S")
+            count = 1
+            while self._remote_exists(archive):
+                count += 1
+                archive = self.remote_path + time.strftime(".%Y%m%d-%H%M%S") + f"-{count}"
+            self._sftp.rename(self.remote_path, archive)
+        self.rotations += 1
+        self._set_offset(st, 0)
+
+    def _set_offset(self, st, offset):
+        self.offset = offset
+        self._inode = st.st_ino
+        self._head = self._read_local(0, min(offset, HEAD_CHECK_BYTES))
+
+    def _read_local(self, start, length):
+        with open(self.local_path, "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    def _read_complete_rows(self, size):
+        """
+        Bytes from the acknowledged offset up to the last complete row (at most
+        max_chunk_bytes), or b"" if no full row has been appended yet.
+        """
+        length = min(size - self.offset, self.max_chunk_bytes)
+        if length <= 0:
+            return b""
+        data = self._read_local(self.offset, length)
+        end = data.rfind(b"\n") + 1
+        if end == 0 and len(data) == self.max_chunk_bytes:
+            return data  # a single row longer than a chunk: send it in pieces
+        return data[:end]
+
+    # ---------------------------
+    # Connection Handling
+    # ---------------------------
+    def _ensure_connected(self):
+        if self._sftp is not None:
+            transport = self._client.get_transport()
+            if transport is not None and transport.is_active():
+                return True
+            self._disconnect()
+
+        now = time.monotonic()
+        if now < self._next_connect_time:
+            return False
+        try:
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(self.hostname, username=self.username, key_filename=self.key_filename, timeout=10)
+            client.get_transport().set_keepalive(KEEPALIVE_INTERVAL)
+            self._sftp = client.open_sftp()
+            self._client = client
+            self._backoff = self.min_backoff
+            self.reconnects += 1
+            self._inode = None   # re-derive the offset from the remote file on the next cycle
+            return True
+        except Exception as e:
+            print(f"Error connecting to {self.hostname} (retrying in {self._backoff:.0f}s): {e}")
+            self._next_connect_time = now + self._backoff
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+            return False
+
+    def _disconnect(self):
+        for handle in (self._sftp, self._client):
+            if handle is not None:
+                try:
+                    handle.close()
+                except Exception:
+                    pass
+        self._sftp = None
+        self._client = None
+
+    def _remote_size(self):
+        try:
+            return self._sftp.stat(self.remote_path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _remote_exists(self, path):
+        try:
+            self._sftp.stat(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _read_remote(self, start, length):
+        with self._sftp.open(self.remote_path, "rb") as remote_file:
+            remote_file.seek(start)
+            return remote_file.read(length)
+
+    def _append_remote(self, data):
+        with self._sftp.open(self.remote_path, "ab") as remote_file:
+            remote_file.write(data)
@@ -0,0 +1,444 @@
+# Pi side of the binary ingest protocol (see wire.py).
+# Records are packed as soon as they are submitted and appended, with their sequence
+# number, to a per-stream outbox file, so they survive a network outage and a restart
+# of the Pi. A worker thread sends what the server has not committed yet in batches
+# and moves each outbox's acknowledged position forward as ACKs come in. After a
+# reconnect the server's STATE says where every stream stands, so nothing is lost
+# and nothing is stored twice.
+
+import os
+import socket
+import struct
+import threading
+import time
+
+from . import wire
+from .lazy import LazyModule
+
+paramiko = LazyModule("paramiko")   # imported on the first SSH tunnel
+
+# ===============================
+# Default Settings
+# ===============================
+BATCH_RECORDS = 500         # records per BATCH frame
+FLUSH_INTERVAL = 1.0        # send at least this often while records are waiting
+ACK_TIMEOUT = 30.0          # seconds to wait for an ACK before reconnecting
+FSYNC_INTERVAL = 5.0        # seconds between fsyncs of the outbox files (SD card wear vs. loss on power cut)
+COMPACT_BYTES = 4 * 1024 * 1024   # a fully acknowledged outbox larger than this is emptied
+MIN_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+KEEPALIVE_INTERVAL = 30
+
+ENTRY = struct.Struct("<QH")   # outbox entry: sequence number, record length (then the record)
+
+
+# ===============================
+# Connectors
+# ===============================
+class TcpConnector:
+    """
+    Plain TCP to the ingest daemon (tests, or a trusted network).
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    def describe(self):
+        return f"{self.host}:{self.port}"
+
+    def open(self):
+        return socket.create_connection((self.host, self.port), timeout=10)
+
+    def close(self):
+        pass
+
+
+class SshTunnelConnector:
+    """
+    Reach a daemon listening on the server's localhost through an SSH direct-tcpip
+    channel, with the same key as the SFTP uploads. The SSH session is reused across
+    reconnects while it is alive.
+    """
+
+    def __init__(self, hostname, username, key_filename, port, remote_host="127.0.0.1"):
+        self.hostname = hostname
+        self.username = username
+        self.key_filename = key_filename
+        self.port = port
+        self.remote_host = remote_host
+        self._client = None
+
+    def describe(self):
+        return f"{self.username}@{self.hostname} -> {self.remote_host}:{self.port}"
+
+    def open(self):
+        transport = self._client.get_transport() if self._client is not None else None
+        if transport is None or not transport.is_active():
+            self.close()
+            client = paramiko.SSHClient()
+            client.load_system_host_keys()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(self.hostname, username=self.username, key_filename=self.key_filename, timeout=10)
+            client.get_transport().set_keepalive(KEEPALIVE_INTERVAL)
+            self._client = client
+            transport = client.get_transport()
+        return transport.open_channel("direct-tcpip", (self.remote_host, self.port), ("127.0.0.1", 0))
+
+    def close(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+
+# ===============================
+# Outbox
+# ===============================
+class Outbox:
+    """
+    Append-only file of (seq, record) entries for one stream, plus a small state file
+    with the last acknowledged seq and the file offset just after it.
+    """
+
+    def __init__(self, directory, schema):
+        self.schema = schema
+        self.path = os.path.join(directory, f"{schema.name}.outbox")
+        self.state_path = os.path.join(directory, f"{schema.name}.acked")
+        self.acked_seq, self.acked_offset = self._load_state()
+        self._file = open(self.path, "ab+")
+        self.next_seq = self._recover()
+        self.read_seq = self.acked_seq       # last seq handed to the sender
+        self.read_offset = self.acked_offset
+        self.dirty = False
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                seq, offset = f.read().split()
+            return int(seq), int(offset)
+        except (FileNotFoundError, ValueError):
+            return 0, 0
+
+    def _save_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f"{self.acked_seq} {self.acked_offset}\n")
+        os.replace(tmp_path, self.state_path)
+
+    def _recover(self):
+        """
+        Find the last complete entry (dropping a partly written one) and return the
+        next sequence number.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if self.acked_offset > size:
+            print(f"{self.path} is shorter than its acknowledged offset; starting after seq {self.acked_seq}")
+            self.acked_offset = size
+        last_seq = self.acked_seq
+        offset = self.acked_offset
+        self._file.seek(offset)
+        while True:
+            head = self._file.read(ENTRY.size)
+            if len(head) < ENTRY.size:
+                break
+            seq, length = ENTRY.unpack(head)
+            if len(self._file.read(length)) < length:
+                break
+            last_seq = seq
+            offset += ENTRY.size + length
+        if offset < size:
+            self._file.truncate(offset)
+        self._file.seek(0, os.SEEK_END)
+        return last_seq + 1
+
+    def append(self, record):
+        seq = self.next_seq
+        self._file.write(ENTRY.pack(seq, len(record)) + record)
+        self.next_seq += 1
+        self.dirty = True
+        return seq
+
+    def unsent(self):
+        return self.next_seq - 1 - self.read_seq
+
+    def unacked(self):
+        return self.next_seq - 1 - self.acked_seq
+
+    def read_batch(self, max_records):
+        """
+        Returns (first seq, [records], offset after the batch) of the next unsent
+        entries, or None.
+        """
+        if not self.unsent():
+            return None
+        self._file.flush()
+        with open(self.path, "rb") as f:
+            f.seek(self.read_offset)
+            first_seq = None
+            records = []
+            offset = self.read_offset
+            while len(records) < max_records:
+                head = f.read(ENTRY.size)
+                if len(head) < ENTRY.size:
+                    break
+                seq, length = ENTRY.unpack(head)
+                record = f.read(length)
+                if first_seq is None:
+                    first_seq = seq
+                records.append(record)
+                offset += ENTRY.size + length
+        if not records:
+            return None
+        self.read_seq = first_seq + len(records) - 1
+        self.read_offset = offset
+        return first_seq, records, offset
+
+    def ack(self, seq, offset):
+        if seq <= self.acked_seq:
+            return
+        self.acked_seq, self.acked_offset = seq, offset
+        if self.acked_seq == self.next_seq - 1 and self.acked_offset >= COMPACT_BYTES:
+            # Everything is acknowledged: start the file over.
+            self._file.truncate(0)
+            self.acked_offset = self.read_offset = 0
+        self._save_state()
+
+    def rewind(self, committed=None):
+        """
+        Resend from the acknowledged position. If the server reports a higher
+        committed seq (an ACK that was lost), skip and acknowledge up to it.
+        """
+        self.read_seq, self.read_offset = self.acked_seq, self.acked_offset
+        if committed is None or committed <= self.acked_seq:
+            if committed is not None and committed < self.acked_seq:
+                print(f"Server has {self.schema.name} up to seq {committed}, below the acknowledged "
+                      f"{self.acked_seq}; records in between cannot be resent")
+            return
+        self._file.flush()
+        with open(self.path, "rb") as f:
+            f.seek(self.read_offset)
+            while self.read_seq < committed:
+                head = f.read(ENTRY.size)
+                if len(head) < ENTRY.size:
+                    break
+                seq, length = ENTRY.unpack(head)
+                f.seek(length, os.SEEK_CUR)
+                self.read_seq = seq
+                self.read_offset += ENTRY.size + length
+        if committed >= self.next_seq:
+            # The outbox was lost or reset: number new records after the server's.
+            print(f"Server has {self.schema.name} up to seq {committed}, beyond this outbox "
+                  f"({self.next_seq - 1}); continuing from there")
+            self.next_seq = committed + 1
+            self.read_seq = committed
+        self.ack(self.read_seq, self.read_offset)
+
+    def sync(self):
+        if self.dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.dirty = False
+
+    def close(self):
+        self._file.flush()
+        self._file.close()
+
+
+# ===============================
+# Client
+# ===============================
+class IngestClient:
+    """
+    submit(schema, values) from any thread; a worker thread delivers the records to
+    the ingest daemon through connector.open().
+    """
+
+    def __init__(self, connector, vehicle_id, outbox_dir, schemas=(wire.MQ3, wire.DRIVER, wire.OBD),
+                 batch_records=BATCH_RECORDS, flush_interval=FLUSH_INTERVAL, ack_timeout=ACK_TIMEOUT,
+                 fsync_interval=FSYNC_INTERVAL, min_backoff=MIN_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.connector = connector
+        self.vehicle_id = vehicle_id
+        self.batch_records = batch_records
+        self.flush_interval = flush_interval
+        self.ack_timeout = ack_timeout
+        self.fsync_interval = fsync_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        os.makedirs(outbox_dir, exist_ok=True)
+        self.outboxes = {schema.sensor: Outbox(outbox_dir, schema) for schema in schemas}
+        self._cond = threading.Condition()
+        self._sock = None
+        self._stop = False
+        self._thread = None
+        self._backoff = min_backoff
+        self._last_sync = time.monotonic()
+
+        # Counters, readable at any time for debugging or metrics.
+        self.records_submitted = 0
+        self.records_sent = 0
+        self.bytes_sent = 0
+        self.batches_sent = 0
+        self.reconnects = 0
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ingest-client", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, schema, values):
+        """
+        Pack a record and append it to its stream's outbox. Never touches the network.
+        """
+        record = schema.encode(values)
+        with self._cond:
+            self.outboxes[schema.sensor].append(record)
+            self.records_submitted += 1
+            if self.outboxes[schema.sensor].unsent() >= self.batch_records:
+                self._cond.notify()
+
+    def unacked(self):
+        return sum(outbox.unacked() for outbox in self.outboxes.values())
+
+    def connected(self):
+        return self._sock is not None
+
+    def close(self, timeout=10.0):
+        """
+        Send what is waiting (one attempt), then close the connection and outboxes.
+        """
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._disconnect()
+        self.connector.close()
+        with self._cond:
+            for outbox in self.outboxes.values():
+                outbox.sync()
+                outbox.close()
+
+    # ---------------------------
+    # Worker
+    # ---------------------------
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stop:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stop
+                if time.monotonic() - self._last_sync >= self.fsync_interval:
+                    for outbox in self.outboxes.values():
+                        outbox.sync()
+                    self._last_sync = time.monotonic()
+            if any(outbox.unsent() for outbox in self.outboxes.values()):
+                if self._ensure_connected():
+                    try:
+                        self._send_pending()
+                    except (OSError, EOFError, wire.ProtocolError) as e:
+                        print(f"Error sending records to {self.connector.describe()} (reconnecting): {e}")
+                        self._disconnect()
+                        self._wait_backoff()
+            if stopping:
+                return
+
+    def _send_pending(self):
+        """
+        Send one batch per stream with unsent records, then read their ACKs.
+        Repeats until every outbox is drained.
+        """
+        while True:
+            in_flight = []
+            with self._cond:
+                for sensor, outbox in self.outboxes.items():
+                    batch = outbox.read_batch(self.batch_records)
+                    if batch is not None:
+                        in_flight.append((sensor, outbox, batch))
+            if not in_flight:
+                return
+            for sensor, outbox, (first_seq, records, _) in in_flight:
+                frame = wire.encode_batch(sensor, outbox.schema.version, first_seq, records)
+                self._sock.sendall(frame)
+                self.bytes_sent += len(frame)
+            for sensor, outbox, (first_seq, records, offset) in in_flight:
+                frame_type, payload = wire.read_frame(self._recv_exact)
+                if frame_type == wire.ERROR:
+                    raise wire.ProtocolError(f"server error: {payload.decode('utf-8', errors='replace')}")
+                if frame_type != wire.ACK:
+                    raise wire.ProtocolError(f"expected ACK, got frame type {frame_type}")
+                acked_sensor, committed = wire.decode_ack(payload)
+                if acked_sensor != sensor:
+                    raise wire.ProtocolError(f"ACK for stream {acked_sensor}, expected {sensor}")
+                last_seq = first_seq + len(records) - 1
+                with self._cond:
+                    if committed >= last_seq:
+                        outbox.ack(last_seq, offset)
+                        self.records_sent += len(records)
+                        self.batches_sent += 1
+                    else:
+                        print(f"Server committed {outbox.schema.name} only up to seq {committed}; resending")
+                        outbox.rewind(committed)
+
+    def _recv_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise EOFError("connection closed by the server")
+            data += chunk
+        return data
+
+    # ---------------------------
+    # Connection Handling
+    # ---------------------------
+    def _ensure_connected(self):
+        if self._sock is not None:
+            return True
+        try:
+            sock = self.connector.open()
+            sock.settimeout(self.ack_timeout)
+            self._sock = sock
+            sock.sendall(wire.encode_hello(self.vehicle_id))
+            frame_type, payload = wire.read_frame(self._recv_exact)
+            if frame_type == wire.ERROR:
+                raise wire.ProtocolError(f"server error: {payload.decode('utf-8', errors='replace')}")
+            if frame_type != wire.STATE:
+                raise wire.ProtocolError(f"expected STATE, got frame type {frame_type}")
+            committed = wire.decode_state(payload)
+        except Exception as e:
+            print(f"Error connecting to the ingest daemon at {self.connector.describe()} "
+                  f"(retrying in {self._backoff:.0f}s): {e}")
+            self._disconnect()
+            self.connector.close()
+            self._wait_backoff()
+            return False
+        with self._cond:
+            for sensor, outbox in self.outboxes.items():
+                outbox.rewind(committed.get(sensor, 0))
+        self._backoff = self.min_backoff
+        self.reconnects += 1
+        print(f"Connected to the ingest daemon at {self.connector.describe()}")
+        return True
+
+    def _wait_backoff(self):
+        with self._cond:
+            if not self._stop:
+                self._cond.wait(self._backoff)
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except Exception:
+                pass
+            self._sock = None
@@ -0,0 +1,343 @@
+# Ingest daemon for the virtual machine engine: receives the Pi's binary records
+# (wire.py), commits them to per-vehicle, per-stream store files and acknowledges
+# each batch with the stream's committed sequence number. Records already committed
+# are dropped, so a batch resent after a lost ACK is stored once.
+#
+# Store file (<store dir>/<vehicle>/<stream>.bin): one entry per record, in seq order.
+# The file itself is the commit log: on startup its last complete entry gives the
+# committed seq and a partly written tail is cut off.
+#
+# For the existing server-side scripts every stream can also be mirrored to its text
+# CSV (same columns as before). A sidecar file remembers the seq and size the CSV had
+# reached, so after a crash the CSV is trimmed back and refilled from the store.
+#
+# Run: python3 -m drishti.ingest_server   (it listens on localhost; the Pi connects
+# through an SSH tunnel, see ingest_client.SshTunnelConnector)
+
+import argparse
+import asyncio
+import os
+import struct
+import time
+
+from drishti import metrics
+from drishti import wire
+
+# ===============================
+# Configuration
+# ===============================
+LISTEN_HOST = "127.0.0.1"      # reached through SSH; use 0.0.0.0 only on a trusted network
+LISTEN_PORT = 7070
+STORE_DIR = "/home/fast-and-furious/main/ingest"
+FSYNC = True                   # fsync each batch before acknowledging it
+
+# Text CSV mirror of each stream ({vehicle} is replaced by the vehicle id; use it once
+# more than one vehicle reports, one CSV cannot be shared by several vehicles).
+CSV_MIRRORS = {
+    "mq3": "/home/fast-and-furious/main/section_4_test_drive/mq3_data.csv",
+    "driver": "/home/fast-and-furious/main/section_2_test_drive/combined_log.csv",
+    "obd": "/home/fast-and-furious/main/section_3_test_drive/OBD-Data_trackLog.csv",
+}
+
+# Metrics (Prometheus format; set either to None to disable)
+METRICS_PORT = 9110
+METRICS_TEXTFILE = None
+
+STORE_ENTRY = struct.Struct("<QqBH")   # seq, receive time (us since the epoch), schema version, record length
+SENSOR_IDS = {name: sensor for sensor, name in wire.SENSOR_NAMES.items()}
+
+# ===============================
+# Metrics
+# ===============================
+records_committed = metrics.REGISTRY.counter("ingest_records_committed_total", "Records stored")
+records_duplicate = metrics.REGISTRY.counter("ingest_records_duplicate_total",
+                                             "Resent records dropped because they were already stored")
+sequence_gaps = metrics.REGISTRY.counter("ingest_sequence_gaps_total", "Batches that skipped sequence numbers")
+bytes_received = metrics.REGISTRY.counter("ingest_bytes_received_total", "Frame bytes received")
+batch_seconds = metrics.REGISTRY.histogram("ingest_batch_seconds", "Time to store and acknowledge a batch")
+
+
+def stream_name(sensor):
+    return wire.SENSOR_NAMES.get(sensor, f"sensor{sensor}")
+
+
+def read_entries(path, after_seq=0):
+    """
+    Yield (seq, schema version, record, end offset) for the complete entries of a
+    store file with seq > after_seq.
+    """
+    with open(path, "rb") as f:
+        offset = 0
+        while True:
+            head = f.read(STORE_ENTRY.size)
+            if len(head) < STORE_ENTRY.size:
+                return
+            seq, _, version, length = STORE_ENTRY.unpack(head)
+            record = f.read(length)
+            if len(record) < length:
+                return
+            offset += STORE_ENTRY.size + length
+            if seq > after_seq:
+                yield seq, version, record, offset
+
+
+class CsvMirror:
+    """
+    Text CSV copy of a stream, kept exactly in step with the store.
+    """
+
+    def __init__(self, path, store):
+        self.path = path
+        self.store = store
+        self.sidecar_path = path + ".ingest"
+        self._unknown_versions = set()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a+", newline="")
+        seq, size = self._load_sidecar()
+        current = os.fstat(self._file.fileno()).st_size
+        if size is None:
+            size = current   # first run: keep what the old text pipeline wrote
+        elif current > size:
+            self._file.truncate(size)   # rows written after the last sidecar update
+        self._file.seek(0, os.SEEK_END)
+        if size == 0:
+            self._file.write(store.schema_header() + "\n")
+        self.seq = seq
+        # Refill whatever the store committed after the mirror's last update.
+        self.write([(s, version, record) for s, version, record, _ in read_entries(store.path, self.seq)])
+
+    def _load_sidecar(self):
+        try:
+            with open(self.sidecar_path) as f:
+                seq, size = f.read().split()
+            return int(seq), int(size)
+        except (FileNotFoundError, ValueError):
+            return 0, None
+
+    def write(self, entries):
+        """
+        entries: [(seq, schema version, record)]
+        """
+        if not entries:
+            return
+        rows = []
+        for _, version, record in entries:
+            schema = wire.SCHEMAS.get((self.store.sensor, version))
+            if schema is None:
+                if version not in self._unknown_versions:
+                    print(f"No schema for {self.store.name} version {version}; not mirrored to {self.path}")
+                    self._unknown_versions.add(version)
+                continue
+            rows.append(wire.csv_row(schema, schema.decode(record)) + "\n")
+        self._file.write("".join(rows))
+        self._file.flush()
+        if self.store.fsync:
+            os.fsync(self._file.fileno())
+        self.seq = entries[-1][0]
+        tmp_path = self.sidecar_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f"{self.seq} {self._file.tell()}\n")
+        os.replace(tmp_path, self.sidecar_path)
+
+    def close(self):
+        self._file.close()
+
+
+class StreamStore:
+    """
+    Append-only store of one vehicle's stream, with an optional CSV mirror.
+    """
+
+    def __init__(self, directory, vehicle_id, sensor, csv_path=None, fsync=FSYNC):
+        self.vehicle_id = vehicle_id
+        self.sensor = sensor
+        self.name = stream_name(sensor)
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{self.name}.bin")
+        self.lock = asyncio.Lock()
+        self._file = open(self.path, "ab")
+        self.committed = self._recover()
+        self.csv = CsvMirror(csv_path, self) if csv_path else None
+
+    def schema_header(self):
+        versions = [schema for (sensor, _), schema in wire.SCHEMAS.items() if sensor == self.sensor]
+        return max(versions, key=lambda schema: schema.version).csv_header if versions else "seq,record"
+
+    def _recover(self):
+        """
+        Return the last committed seq, cutting off a partly written entry.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        last_seq, offset = 0, 0
+        for seq, _, _, end in read_entries(self.path):
+            last_seq, offset = seq, end
+        if offset < size:
+            print(f"Dropping {size - offset} bytes of a partly written entry at the end of {self.path}")
+            self._file.truncate(offset)
+        return last_seq
+
+    def append(self, version, first_seq, records):
+        """
+        Store the records not committed yet. Returns (stored, duplicates, gap).
+        Blocking: run it on a worker thread with self.lock held.
+        """
+        skip = max(self.committed - first_seq + 1, 0)
+        new_records = records[skip:]
+        if not new_records:
+            return 0, len(records), False
+        gap = first_seq + skip > self.committed + 1
+        received = time.time_ns() // 1000
+        entries = []
+        parts = []
+        for seq, record in enumerate(new_records, first_seq + skip):
+            parts.append(STORE_ENTRY.pack(seq, received, version, len(record)))
+            parts.append(record)
+            entries.append((seq, version, record))
+        self._file.write(b"".join(parts))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.committed = entries[-1][0]
+        if self.csv is not None:
+            try:
+                self.csv.write(entries)
+            except OSError as e:
+                # The store is committed; the mirror catches up from it on the next start.
+                print(f"Error writing {self.csv.path}: {e}")
+        return len(new_records), skip, gap
+
+    def close(self):
+        self._file.close()
+        if self.csv is not None:
+            self.csv.close()
+
+
+class IngestServer:
+    """
+    Accepts client connections and routes their batches to the stream stores.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, csv_mirrors=None, fsync=FSYNC):
+        self.store_dir = store_dir
+        self.csv_mirrors = CSV_MIRRORS if csv_mirrors is None else csv_mirrors
+        self.fsync = fsync
+        self.stores = {}   # (vehicle id, sensor) -> StreamStore
+        self.open_connections = 0
+        metrics.REGISTRY.gauge("ingest_connections", "Open client connections", func=lambda: self.open_connections)
+
+    def store(self, vehicle_id, sensor):
+        key = (vehicle_id, sensor)
+        if key not in self.stores:
+            csv_path = self.csv_mirrors.get(stream_name(sensor))
+            if csv_path:
+                csv_path = csv_path.format(vehicle=vehicle_id)
+            self.stores[key] = StreamStore(os.path.join(self.store_dir, vehicle_id), vehicle_id, sensor,
+                                           csv_path=csv_path, fsync=self.fsync)
+        return self.stores[key]
+
+    def committed(self, vehicle_id):
+        """
+        {sensor: committed seq} of every stream stored for the vehicle.
+        """
+        directory = os.path.join(self.store_dir, vehicle_id)
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                name, ext = os.path.splitext(filename)
+                if ext == ".bin":
+                    sensor = SENSOR_IDS.get(name)
+                    if sensor is None and name.startswith("sensor") and name[6:].isdigit():
+                        sensor = int(name[6:])
+                    if sensor is not None:
+                        self.store(vehicle_id, sensor)
+        return {sensor: store.committed for (vehicle, sensor), store in self.stores.items() if vehicle == vehicle_id}
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        loop = asyncio.get_running_loop()
+        self.open_connections += 1
+        vehicle_id = None
+        try:
+            frame_type, payload = await self._read_frame(reader)
+            if frame_type != wire.HELLO:
+                raise wire.ProtocolError(f"expected HELLO, got frame type {frame_type}")
+            vehicle_id = wire.decode_hello(payload)
+            committed = self.committed(vehicle_id)
+            writer.write(wire.encode_state(committed))
+            await writer.drain()
+            streams = ", ".join(f"{stream_name(sensor)} {seq}" for sensor, seq in sorted(committed.items()))
+            print(f"{vehicle_id} connected from {peer} (committed: {streams or 'nothing yet'})")
+            while True:
+                frame_type, payload = await self._read_frame(reader)
+                if frame_type != wire.BATCH:
+                    raise wire.ProtocolError(f"expected BATCH, got frame type {frame_type}")
+                started = time.perf_counter()
+                sensor, version, first_seq, records = wire.decode_batch(payload)
+                store = self.store(vehicle_id, sensor)
+                async with store.lock:
+                    stored, duplicates, gap = await loop.run_in_executor(None, store.append, version, first_seq,
+                                                                         records)
+                    committed_seq = store.committed
+                writer.write(wire.encode_ack(sensor, committed_seq))
+                await writer.drain()
+                records_committed.inc(stored)
+                records_duplicate.inc(duplicates)
+                if gap:
+                    sequence_gaps.inc()
+                    print(f"{vehicle_id}/{store.name}: sequence gap before seq {first_seq + duplicates}")
+                batch_seconds.observe_since(started)
+        except asyncio.IncompleteReadError:
+            pass   # the client closed the connection
+        except wire.ProtocolError as e:
+            print(f"Protocol error from {vehicle_id or peer}: {e}")
+            try:
+                writer.write(wire.encode_error(str(e)))
+                await writer.drain()
+            except ConnectionError:
+                pass
+        except ConnectionError as e:
+            print(f"Connection from {vehicle_id or peer} lost: {e}")
+        finally:
+            self.open_connections -= 1
+            writer.close()
+
+    async def _read_frame(self, reader):
+        header = await reader.readexactly(wire.HEADER.size)
+        frame_type, length = wire.decode_header(header)
+        payload = await reader.readexactly(length) if length else b""
+        bytes_received.inc(wire.HEADER.size + length)
+        return frame_type, payload
+
+    async def serve(self, host=LISTEN_HOST, port=LISTEN_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Ingest daemon listening on {addresses}, storing in {self.store_dir}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        for store in self.stores.values():
+            store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Receive binary sensor records from the Pis.")
+    parser.add_argument("--host", default=LISTEN_HOST)
+    parser.add_argument("--port", type=int, default=LISTEN_PORT)
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--no-csv", action="store_true", help="do not mirror the streams to text CSVs")
+    parser.add_argument("--no-fsync", action="store_true", help="acknowledge before the data reaches the disk")
+    args = parser.parse_args(argv)
+
+    metrics.start_exporter(port=METRICS_PORT, textfile=METRICS_TEXTFILE)
+    server = IngestServer(args.store_dir, csv_mirrors={} if args.no_csv else None, fsync=not args.no_fsync)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Stopping the ingest daemon")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# Deferred imports for heavy modules (cv2, dlib, paramiko).
+# Importing them costs a noticeable part of a second each on a Raspberry Pi. A
+# LazyModule stands in for the module and imports it on first attribute access, so
+# scripts start quickly and the import can be done early on a background thread
+# (see LazyModule.load) while other startup work runs.
+
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Proxy that imports the named module the first time one of its attributes is used.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Import the module now (if not already imported) and return it.
+        """
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
@@ -0,0 +1,297 @@
+# HTTP client for the Gemini analysis endpoint, shared by the server-side analysis
+# scripts ("OBD Data Files/pi to gemini.py", "Front Facing Camera Files/server to
+# gemini response.py"). One requests.Session keeps connections open between calls,
+# a small thread pool bounds how many requests are in flight, a token bucket keeps
+# the request rate under the API quota, and failed calls are retried with jittered
+# exponential backoff. Answers are cached by a hash of the request, so a prompt that
+# is sent again within CACHE_TTL costs nothing, and identical prompts in flight at the
+# same time share one request. If the API takes several prompts per request
+# (batch_url), analyze_many sends them together.
+#
+# llm_stub.py is a local stand-in for the API with a benchmark of this client.
+
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .lazy import LazyModule
+
+requests = LazyModule("requests")
+
+# ===============================
+# Default Settings
+# ===============================
+MAX_CONCURRENCY = 4          # requests in flight at once
+RATE_PER_SECOND = 2.0        # sustained request rate (token bucket) ...
+BURST = 5                    # ... with bursts of up to this many requests
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+MAX_RETRIES = 4              # further attempts after the first one
+MIN_BACKOFF = 1.0            # retry delays are drawn from [0, MIN_BACKOFF * 2**attempt] ...
+MAX_BACKOFF = 30.0           # ... capped at this many seconds
+RETRY_STATUS = (429, 500, 502, 503, 504)
+CACHE_SIZE = 512             # cached answers (least recently used are dropped first)
+CACHE_TTL = 600.0            # seconds an answer stays valid
+MAX_BATCH = 8                # prompts per batch request
+
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average, and bursts of up to `burst`.
+    acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """
+    Answers by request hash, each valid for ttl seconds, at most max_entries of them
+    (least recently used are evicted first).
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()       # key -> (expiry time, answer)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url, payload):
+        data = json.dumps([url, payload], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, answer):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LlmClient:
+    """
+    Sends prompts to the analysis API. analyze() returns the decoded JSON answer, or
+    None if the request failed after all retries (the error is printed); submit()
+    does the same in the background and returns a Future.
+
+    batch_url, if the API has one, takes {"requests": [payload, ...]} and answers
+    {"responses": [answer, ...]} in the same order.
+    """
+
+    def __init__(self, url, api_key, batch_url=None, max_concurrency=MAX_CONCURRENCY,
+                 rate=RATE_PER_SECOND, burst=BURST, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 max_retries=MAX_RETRIES, min_backoff=MIN_BACKOFF, max_backoff=MAX_BACKOFF,
+                 cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL, max_batch=MAX_BATCH):
+        self.url = url
+        self.batch_url = batch_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.max_batch = max_batch
+        self.bucket = TokenBucket(rate, burst)
+        self.cache = ResponseCache(cache_size, cache_ttl)
+
+        self._headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+        self._max_concurrency = max_concurrency
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_concurrency, thread_name_prefix="llm-client")
+        self._in_flight = {}                # request hash -> Future of the request being sent
+        self._in_flight_lock = threading.Lock()
+
+        # Counters, readable at any time for debugging or benchmarks.
+        self.requests_sent = 0              # HTTP requests, including retries
+        self.cache_hits = 0                 # answered from the cache or by a request already in flight
+        self.cache_misses = 0
+        self.retries = 0
+        self.failures = 0
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def analyze(self, prompt, **params):
+        """
+        The API's answer to one prompt (extra params are added to the payload).
+        """
+        return self.submit(prompt, **params).result()
+
+    def submit(self, prompt, **params):
+        """
+        Like analyze, but returns a Future at once.
+        """
+        payload = dict(params, prompt=prompt)
+        key = ResponseCache.key(self.url, payload)
+        answer = self.cache.get(key)
+        if answer is not None:
+            self.cache_hits += 1
+            future = Future()
+            future.set_result(answer)
+            return future
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.cache_hits += 1
+                return future
+            self.cache_misses += 1
+            future = self._executor.submit(self._send_one, key, payload)
+            self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def analyze_many(self, prompts, **params):
+        """
+        Answers (or None) to several prompts, in order. Cached prompts are answered
+        at once; the rest go in batch requests if the API has a batch_url, otherwise
+        as concurrent single requests.
+        """
+        if self.batch_url is None:
+            futures = [self.submit(prompt, **params) for prompt in prompts]
+            return [future.result() for future in futures]
+
+        answers = [None] * len(prompts)
+        missing = {}                        # request hash -> (payload, positions in prompts)
+        for i, prompt in enumerate(prompts):
+            payload = dict(params, prompt=prompt)
+            key = ResponseCache.key(self.url, payload)
+            answer = self.cache.get(key)
+            if answer is not None or key in missing:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+            if answer is not None:
+                answers[i] = answer
+            else:
+                missing.setdefault(key, (payload, []))[1].append(i)
+        keys = list(missing)
+        chunks = [keys[i:i + self.max_batch] for i in range(0, len(keys), self.max_batch)]
+        futures = [self._executor.submit(self._send_batch, [(key, missing[key][0]) for key in chunk])
+                   for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            for key, answer in zip(chunk, future.result()):
+                for i in missing[key][1]:
+                    answers[i] = answer
+        return answers
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    # ---------------------------
+    # Requests
+    # ---------------------------
+    def _forget(self, key):
+        with self._in_flight_lock:
+            self._in_flight.pop(key, None)
+
+    def _get_session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self._max_concurrency)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.headers.update(self._headers)
+                    self._session = session
+        return self._session
+
+    def _send_one(self, key, payload):
+        answer = self._post(self.url, payload)
+        if answer is not None:
+            self.cache.put(key, answer)
+        return answer
+
+    def _send_batch(self, items):
+        answers = self._post(self.batch_url, {"requests": [payload for _, payload in items]})
+        if answers is not None:
+            answers = answers.get("responses") if isinstance(answers, dict) else None
+            if not isinstance(answers, list) or len(answers) != len(items):
+                print("LLM API Error: batch answer does not match the request")
+                self.failures += 1
+                answers = None
+        if answers is None:
+            return [None] * len(items)
+        for (key, _), answer in zip(items, answers):
+            self.cache.put(key, answer)
+        return answers
+
+    def _post(self, url, payload):
+        """
+        POST with rate limiting and retries; the decoded JSON answer, or None.
+        """
+        session = self._get_session()
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self.requests_sent += 1
+            retry_after = None
+            try:
+                response = session.post(url, json=payload, timeout=self.timeout)
+                if response.status_code == 200:
+                    return response.json()
+                error = f"{response.status_code} {response.text[:200]}"
+                if response.status_code not in RETRY_STATUS:
+                    print("LLM API Error:", error)
+                    break
+                retry_after = response.headers.get("Retry-After")
+            except requests.exceptions.JSONDecodeError as e:
+                # Also a RequestException, but sending the same request again will not help.
+                print("LLM API Error: answer is not JSON:", e)
+                break
+            except requests.RequestException as e:
+                error = e
+            if attempt == self.max_retries:
+                print(f"LLM API Error after {attempt + 1} attempts:", error)
+                break
+            self.retries += 1
+            delay = random.uniform(0, min(self.max_backoff, self.min_backoff * 2 ** attempt))
+            if retry_after is not None and retry_after.isdigit():
+                delay = max(delay, min(self.max_backoff, float(retry_after)))
+            time.sleep(delay)
+        self.failures += 1
+        return None
@@ -0,0 +1,162 @@
+# Local stand-in for the Gemini analysis endpoint, so the analysis scripts and
+# llm_client.LlmClient can be run and benchmarked without network or API quota.
+# POST /analyze takes {"prompt": ...} and answers {"timestamp", "fault", "parameters"}
+# after a simulated latency; POST /batch takes {"requests": [...]} and answers
+# {"responses": [...]}. A share of requests can be made to fail with 503 or 429.
+#
+#   python3 -m drishti.llm_stub [--port 8089] [--latency 0.3] [--error-rate 0.05]
+#       serve; point GEMINI_API_URL at http://127.0.0.1:8089/analyze
+#   python3 -m drishti.llm_stub --bench [--prompts 200] [--distinct 80] [--group 4] [--batch]
+#       benchmark LlmClient against the stub, and plain requests.post for comparison
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from drishti.llm_client import LlmClient
+
+# ===============================
+# Configuration
+# ===============================
+LISTEN_HOST = "127.0.0.1"
+LISTEN_PORT = 8089
+LATENCY = 0.3              # seconds per request (a batch request costs this once)
+ERROR_RATE = 0.0           # share of requests answered with 503 (or 429 with Retry-After)
+FAULTS = ["none", "Harsh Braking", "Sharp Turn", "High Acceleration", "Speed Breaker / Pothole"]
+
+
+def fake_answer(prompt):
+    """
+    A deterministic answer in the format the analysis scripts expect.
+    """
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return {
+        "timestamp": time.strftime("%H:%M:%S"),
+        "fault": FAULTS[digest[0] % len(FAULTS)],
+        "parameters": f"stub answer {digest.hex()[:8]}"
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # keep-alive, so connection reuse shows in benchmarks
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            if random.random() < server.error_rate:
+                if random.random() < 0.5:
+                    return self._reply(429, {"error": "rate limited"}, {"Retry-After": "1"})
+                return self._reply(503, {"error": "unavailable"})
+            if self.path.rstrip("/").endswith("/batch"):
+                answers = [fake_answer(payload.get("prompt", "")) for payload in body.get("requests", [])]
+                return self._reply(200, {"responses": answers})
+            return self._reply(200, fake_answer(body.get("prompt", "")))
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _reply(self, status, answer, headers=None):
+        data = json.dumps(answer).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(host=LISTEN_HOST, port=LISTEN_PORT, latency=LATENCY, error_rate=ERROR_RATE):
+    """
+    Serve the stub on a background thread; returns the server (server_address,
+    requests, max_in_flight, shutdown()).
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+
+def benchmark(args):
+    server = start_stub(port=0, latency=args.latency, error_rate=args.error_rate)
+    base = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    # A stream of windows where some prompts repeat (the same rows sent again).
+    prompts = [f"window {random.randrange(args.distinct)}" for _ in range(args.prompts)]
+    groups = [prompts[i:i + args.group] for i in range(0, len(prompts), args.group)]
+
+    if args.baseline:
+        import requests
+        started = time.perf_counter()
+        for prompt in prompts[:args.baseline]:
+            requests.post(base + "/analyze", json={"prompt": prompt}, headers={"Authorization": "Bearer x"})
+        elapsed = time.perf_counter() - started
+        print(f"requests.post, one at a time: {args.baseline} prompts in {elapsed:.2f} s "
+              f"({args.baseline / elapsed:.1f} prompts/s)")
+
+    server.requests = server.max_in_flight = 0
+    client = LlmClient(base + "/analyze", "x", batch_url=base + "/batch" if args.batch else None,
+                       max_concurrency=args.concurrency, rate=args.rate, burst=args.concurrency,
+                       min_backoff=0.1, max_backoff=2.0)
+    started = time.perf_counter()
+    answered = 0
+    for group in groups:
+        answered += sum(answer is not None for answer in client.analyze_many(group))
+    elapsed = time.perf_counter() - started
+    client.close()
+    lookups = client.cache_hits + client.cache_misses
+    print(f"LlmClient ({'batched' if args.batch else f'{args.concurrency} concurrent'}, groups of {args.group}): "
+          f"{len(prompts)} prompts in {elapsed:.2f} s ({len(prompts) / elapsed:.1f} prompts/s), "
+          f"{answered} answered")
+    print(f"  cache hit rate {client.cache_hits / max(lookups, 1):.0%}, {server.requests} HTTP requests "
+          f"({client.retries} retries, {client.failures} failed), at most {server.max_in_flight} in flight")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini analysis API")
+    parser.add_argument("--port", type=int, default=LISTEN_PORT)
+    parser.add_argument("--latency", type=float, default=LATENCY)
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE)
+    parser.add_argument("--bench", action="store_true", help="benchmark LlmClient against the stub and exit")
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=80, help="different prompts among them")
+    parser.add_argument("--group", type=int, default=4, help="prompts sent together, as windows ready at once")
+    parser.add_argument("--batch", action="store_true", help="use the batch endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=50.0, help="client rate limit, requests/s")
+    parser.add_argument("--baseline", type=int, default=20, help="prompts to send with plain requests.post first")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args)
+        return
+    server = start_stub(port=args.port, latency=args.latency, error_rate=args.error_rate)
+    print(f"LLM stub listening on http://{LISTEN_HOST}:{args.port} (/analyze, /batch)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
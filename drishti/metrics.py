@@ -0,0 +1,260 @@
+# Lightweight metrics for the Pi scripts: timing histograms, counters and gauges,
+# exported in the Prometheus text format either over a small local HTTP endpoint or
+# as a textfile for node_exporter's textfile collector.
+# Recording a value is a lock, a bisect and two additions, so it is cheap enough to
+# wrap every stage of the 30 fps driver loop.
+
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds, from 0.5 ms up to 10 s.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TEXTFILE_INTERVAL = 15.0   # seconds between textfile rewrites
+HTTP_HOST = "127.0.0.1"    # the endpoint has no authentication; use 0.0.0.0 only on a trusted network
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    """
+    Monotonically increasing count (frames, drops, reconnects, bytes sent...).
+    If func is given it is called at export time, which suits counts an object
+    already keeps as an attribute.
+    """
+
+    kind = "counter"
+
+    def __init__(self, labels=(), func=None):
+        self.labels = labels
+        self.func = func
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name):
+        value = self.func() if self.func is not None else self._value
+        return [(name, self.labels, value)]
+
+
+class Gauge:
+    """
+    Current value that can go up and down (e.g. queue depth). If func is given it is
+    called at export time instead, so the hot path pays nothing.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, labels=(), func=None):
+        self.labels = labels
+        self.func = func
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def samples(self, name):
+        value = self.func() if self.func is not None else self._value
+        return [(name, self.labels, value)]
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram of durations in seconds.
+    Use `with histogram.time(): ...` or observe(seconds).
+    """
+
+    kind = "histogram"
+
+    def __init__(self, labels=(), buckets=DEFAULT_BUCKETS):
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def observe_since(self, start):
+        """
+        Record the time elapsed since a time.perf_counter() reading.
+        """
+        self.observe(time.perf_counter() - start)
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self, name):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            samples.append((name + "_bucket", self.labels + (("le", repr(bound)),), cumulative))
+        samples.append((name + "_bucket", self.labels + (("le", "+Inf"),), count))
+        samples.append((name + "_sum", self.labels, total))
+        samples.append((name + "_count", self.labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Holds every metric of one process. Asking twice for the same name and labels
+    returns the same metric object.
+    """
+
+    def __init__(self, prefix="drishti_"):
+        self.prefix = prefix
+        self._metrics = {}   # name -> (kind, help, {labels: metric})
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        name = self.prefix + name
+        labels = tuple(sorted(labels.items())) if labels else ()
+        with self._lock:
+            kind, _, series = self._metrics.setdefault(name, (cls.kind, help_text, {}))
+            if kind != cls.kind:
+                raise ValueError(f"Metric {name} already registered as a {kind}")
+            if labels not in series:
+                series[labels] = cls(labels=labels, **kwargs)
+            return series[labels]
+
+    def counter(self, name, help_text="", labels=None, func=None):
+        return self._get(Counter, name, help_text, labels, func=func)
+
+    def gauge(self, name, help_text="", labels=None, func=None):
+        return self._get(Gauge, name, help_text, labels, func=func)
+
+    def histogram(self, name, help_text="", labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self):
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            items = [(name, kind, help_text, list(series.values()))
+                     for name, (kind, help_text, series) in sorted(self._metrics.items())]
+        for name, kind, help_text, series in items:
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in series:
+                for sample_name, labels, value in metric.samples(name):
+                    lines.append(f"{sample_name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Default registry shared by everything in one process.
+REGISTRY = MetricsRegistry()
+
+
+# ===============================
+# Exporters
+# ===============================
+def serve_http(registry=REGISTRY, port=9100, host=HTTP_HOST, health=None):
+    """
+    Serve the registry at http://host:port/metrics on a daemon thread, and the JSON
+    returned by health() at /health if given.
+    Returns the server so the caller can shut it down.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/health" and health is not None:
+                body = health().encode("utf-8")
+                content_type = "application/json"
+            elif path in ("/", "/metrics"):
+                body = registry.render().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep scrapes out of the script's console output
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_textfile(path, registry=REGISTRY):
+    """
+    Atomically (re)write the registry to a .prom file.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+def start_textfile_writer(path, registry=REGISTRY, interval=TEXTFILE_INTERVAL):
+    """
+    Rewrite the textfile every `interval` seconds on a daemon thread.
+    """
+
+    def run():
+        while True:
+            try:
+                write_textfile(path, registry)
+            except Exception as e:
+                print(f"Error writing metrics textfile ({path}): {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="metrics-textfile", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_exporter(port=None, textfile=None, registry=REGISTRY, host=HTTP_HOST):
+    """
+    Start whichever exporters are configured (HTTP port and/or textfile path).
+    """
+    if port:
+        try:
+            serve_http(registry, port, host)
+            print(f"Metrics available at http://{host}:{port}/metrics")
+        except OSError as e:
+            print(f"Error starting metrics endpoint on port {port}: {e}")
+    if textfile:
+        start_textfile_writer(textfile, registry)
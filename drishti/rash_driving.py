@@ -0,0 +1,160 @@
+# Local rash-driving detector for OBD track log rows (the columns of
+# "OBD Data Files/pi to gemini.py"). The four event types the Gemini prompt asks for
+# are threshold rules over rolling time windows, computed with pandas/NumPy over a
+# whole window of rows at once:
+#   Harsh Braking             speed drops by BRAKING_DROP_KMH within BRAKING_SECONDS
+#   Sharp Turn                bearing turns by TURN_DEGREES within TURN_SECONDS above TURN_MIN_SPEED_KMH
+#   High Acceleration         total acceleration rises by ACCEL_RISE_G within ACCEL_SECONDS
+#   Speed Breaker / Pothole   the vertical axis leaves its rolling baseline by BUMP_G above BUMP_MIN_SPEED_KMH
+# Each event has a magnitude relative to its threshold (1.0 = exactly at it). Rows
+# between NEAR_FACTOR and 1.0 are "near" candidates: too weak to report on their own
+# but worth a second opinion from the model.
+
+from .lazy import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+TIME = 'GPS Time'
+BEARING = 'Bearing'
+ACCEL_TOTAL = 'Acceleration Sensor(Total)(g)'
+ACCEL_VERTICAL = 'Acceleration Sensor(Y axis)(g)'   # the axis the prompt uses for speed breakers
+SPEED = 'Speed (OBD)(km/h)'
+TORQUE_TIME_FORMAT = "%a %b %d %H:%M:%S GMT%z %Y"   # e.g. Sat Mar 15 15:42:55 GMT+05:30 2025
+
+# ===============================
+# Thresholds
+# ===============================
+BRAKING_DROP_KMH = 15.0
+BRAKING_SECONDS = 5.0
+TURN_DEGREES = 30.0
+TURN_SECONDS = 3.0
+TURN_MIN_SPEED_KMH = 30.0
+ACCEL_RISE_G = 0.5
+ACCEL_SECONDS = 1.0
+BUMP_G = 0.3
+BUMP_BASELINE_SECONDS = 5.0
+BUMP_MIN_SPEED_KMH = 20.0
+LOOKBACK_SECONDS = {        # history each event type is measured over
+    "Harsh Braking": BRAKING_SECONDS,
+    "Sharp Turn": TURN_SECONDS,
+    "High Acceleration": ACCEL_SECONDS,
+    "Speed Breaker / Pothole": BUMP_BASELINE_SECONDS,
+}
+NEAR_FACTOR = 0.8          # candidates from this fraction of a threshold up
+EVENT_GAP_SECONDS = 3.0    # rows of one type closer than this are one event
+SAMPLE_HZ = 10.0           # assumed row rate when GPS Time cannot be parsed
+
+EVENT_COLUMNS = ["row", "first", "last", "time", "event", "magnitude", "details"]
+
+
+def parse_gps_times(times):
+    """
+    UTC datetimes of a Series of GPS Time strings (NaT where they cannot be parsed).
+    """
+    try:
+        return pd.to_datetime(times, format=TORQUE_TIME_FORMAT, utc=True)
+    except (ValueError, TypeError):
+        return pd.to_datetime(times, format="mixed", utc=True, errors="coerce")
+
+
+def elapsed_seconds(times):
+    """
+    Seconds since the first row, from the GPS Time strings. Torque logs whole
+    seconds, so rows sharing a timestamp are spread evenly over that second. Falls
+    back to the row number / SAMPLE_HZ if most of them cannot be parsed.
+    """
+    parsed = parse_gps_times(times)
+    if parsed.isna().mean() > 0.5:
+        return np.arange(len(times)) / SAMPLE_HZ
+    seconds = (parsed - parsed.dropna().iloc[0]).dt.total_seconds()
+    seconds = seconds.interpolate(limit_direction="both")
+    seconds = pd.Series(np.maximum.accumulate(seconds.to_numpy()))   # GPS time never runs backwards here
+    if (seconds % 1 == 0).all():
+        same = seconds.groupby(seconds)
+        seconds = seconds + same.cumcount() / same.transform("size")
+    return seconds.to_numpy()
+
+
+def _rolling(values, index, seconds, how):
+    series = pd.Series(values, index=index)
+    return getattr(series.rolling(f"{int(seconds * 1000)}ms", min_periods=1), how)().to_numpy()
+
+
+def _window_start(seconds, row, span):
+    # First row within span seconds before row.
+    return int(np.searchsorted(seconds, seconds[row] - span, side="left"))
+
+
+def detect_events(rows, near_factor=NEAR_FACTOR, seconds=None):
+    """
+    Events and near candidates in a DataFrame of consecutive log rows. Returns a
+    DataFrame with EVENT_COLUMNS: the position in rows of the strongest row of each
+    event and of its first and last row over the threshold, its GPS Time, the event
+    type, magnitude (1.0 = at the threshold) and a description in the style of
+    gemini_response.csv. seconds, if given, are the
+    rows' times (else they come from elapsed_seconds).
+    """
+    if len(rows) == 0:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    if seconds is None:
+        seconds = elapsed_seconds(rows[TIME].astype(str))
+    index = pd.to_datetime(seconds, unit="s")
+    speed = pd.to_numeric(rows[SPEED], errors="coerce").to_numpy(dtype=float)
+    bearing = pd.to_numeric(rows[BEARING], errors="coerce").to_numpy(dtype=float)
+    accel = pd.to_numeric(rows[ACCEL_TOTAL], errors="coerce").to_numpy(dtype=float)
+    vertical = pd.to_numeric(rows[ACCEL_VERTICAL], errors="coerce").to_numpy(dtype=float)
+
+    # Magnitudes relative to each threshold, one array per event type.
+    braking_drop = _rolling(speed, index, BRAKING_SECONDS, "max") - speed
+    heading = np.full_like(bearing, np.nan)
+    valid = ~np.isnan(bearing)
+    heading[valid] = np.unwrap(bearing[valid], period=360.0)
+    turn = np.maximum(_rolling(heading, index, TURN_SECONDS, "max") - heading,
+                      heading - _rolling(heading, index, TURN_SECONDS, "min"))
+    turn[~(speed >= TURN_MIN_SPEED_KMH)] = 0.0
+    accel_rise = accel - _rolling(accel, index, ACCEL_SECONDS, "min")
+    bump = np.abs(vertical - _rolling(vertical, index, BUMP_BASELINE_SECONDS, "median"))
+    bump[~(speed >= BUMP_MIN_SPEED_KMH)] = 0.0
+
+    checks = [
+        ("Harsh Braking", braking_drop / BRAKING_DROP_KMH),
+        ("Sharp Turn", turn / TURN_DEGREES),
+        ("High Acceleration", accel_rise / ACCEL_RISE_G),
+        ("Speed Breaker / Pothole", bump / BUMP_G),
+    ]
+    events = []
+    for event, magnitude in checks:
+        magnitude = np.nan_to_num(magnitude)
+        candidate = magnitude >= near_factor
+        if not candidate.any():
+            continue
+        # Group candidate rows into runs, merging runs less than EVENT_GAP_SECONDS apart.
+        positions = np.flatnonzero(candidate)
+        breaks = np.diff(seconds[positions]) > EVENT_GAP_SECONDS
+        run_ids = np.concatenate(([0], np.cumsum(breaks)))
+        for run in range(run_ids[-1] + 1):
+            members = positions[run_ids == run]
+            row = int(members[np.argmax(magnitude[members])])
+            details = _describe(event, row, seconds, speed, accel, braking_drop, turn, accel_rise, bump)
+            events.append((row, int(members[0]), int(members[-1]), rows[TIME].iloc[row], event,
+                           float(magnitude[row]), details))
+    events.sort()
+    return pd.DataFrame(events, columns=EVENT_COLUMNS)
+
+
+def _describe(event, row, seconds, speed, accel, braking_drop, turn, accel_rise, bump):
+    if event == "Harsh Braking":
+        start = _window_start(seconds, row, BRAKING_SECONDS)
+        # The last row at the top speed: where the braking began, not a cruise before it.
+        peak = row - int(np.nanargmax(speed[start:row + 1][::-1]))
+        return f"Speed drop of {braking_drop[row]:.1f} km/h in {seconds[row] - seconds[peak]:.1f} sec"
+    if event == "Sharp Turn":
+        return f"Bearing changed by {turn[row]:.1f}° at speed {speed[row]:.1f} km/h"
+    if event == "High Acceleration":
+        start = _window_start(seconds, row, ACCEL_SECONDS)
+        low = row - int(np.nanargmin(accel[start:row + 1][::-1]))
+        duration = max(seconds[row] - seconds[low], 1.0 / SAMPLE_HZ)
+        return (f"Acceleration increased by {accel_rise[row]:.2f}g in {duration:.1f} sec "
+                f"(Rate: {accel_rise[row] / duration:.2f} g/s)")
+    return f"Vertical acceleration spike of {bump[row]:.2f}g at speed {speed[row]:.1f} km/h"
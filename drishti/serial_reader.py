@@ -0,0 +1,140 @@
+# Event-driven line reader for serial sensors (the MQ3 Arduino bridge).
+# A background thread blocks in select() on the serial port, so it uses no CPU while
+# the sensor is quiet, and stamps every complete line with a monotonic and a wall-clock
+# time as soon as it arrives. If the port disappears (USB unplugged, Arduino reset) it
+# is reopened with a growing delay.
+
+import os
+import select
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import serial
+
+# ===============================
+# Default Settings
+# ===============================
+OPEN_DELAY = 3.0           # the Arduino resets when the port opens; wait before reading
+MIN_BACKOFF = 1.0          # first reopen delay in seconds
+MAX_BACKOFF = 30.0         # reopen delay is doubled up to this limit
+MAX_LINE_BYTES = 4096      # a longer run of bytes without a newline is discarded
+
+Reading = namedtuple("Reading", ["monotonic", "wall", "line"])
+
+
+class SerialLineReader:
+    """
+    Read newline-terminated lines from a serial port on a background thread and
+    pass each one to on_reading(Reading(monotonic, wall, line)).
+    """
+
+    def __init__(self, port, baud_rate, on_reading, tz=None, open_delay=OPEN_DELAY,
+                 min_backoff=MIN_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.on_reading = on_reading
+        self.tz = tz
+        self.open_delay = open_delay
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._serial = None
+        self._buffer = bytearray()                # bytes of a line that has not ended yet
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()   # wakes select() on stop()
+        self._thread = None
+
+        # Counters, readable at any time for debugging or metrics.
+        self.lines_read = 0
+        self.bytes_read = 0
+        self.reopens = 0
+        self.read_seconds = 0.0   # time spent reading and splitting, not waiting
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="serial-reader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        os.write(self._wake_w, b"x")
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._close()
+
+    # ---------------------------
+    # Worker
+    # ---------------------------
+    def _run(self):
+        backoff = self.min_backoff
+        while not self._stop.is_set():
+            if self._serial is None:
+                if not self._open():
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+                    continue
+                backoff = self.min_backoff
+            try:
+                self._read_available()
+            except (serial.SerialException, OSError) as e:
+                print(f"Serial error on {self.port} (reopening): {e}")
+                self._close()
+
+    def _open(self):
+        try:
+            self._serial = serial.Serial(self.port, self.baud_rate, timeout=0)
+        except (serial.SerialException, OSError) as e:
+            print(f"Error opening {self.port}: {e}")
+            return False
+        if self._stop.wait(self.open_delay):
+            return False
+        self._serial.reset_input_buffer()
+        self._buffer = bytearray()
+        self.reopens += 1
+        print(f"Serial connection established on {self.port}.")
+        return True
+
+    def _close(self):
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except Exception:
+                pass
+            self._serial = None
+
+    def _read_available(self):
+        """
+        Block until the port (or the stop pipe) is readable, then hand over every
+        complete line that has arrived.
+        """
+        ready, _, _ = select.select([self._serial.fileno(), self._wake_r], [], [])
+        if self._wake_r in ready:
+            return
+        started = time.perf_counter()
+        monotonic = time.monotonic()
+        wall = datetime.now(tz=self.tz)
+        # pyserial raises SerialException if a readable port returns no data (unplugged).
+        data = self._serial.read(max(self._serial.in_waiting, 1))
+        self.bytes_read += len(data)
+        self._buffer += data
+        lines = []
+        while True:
+            end = self._buffer.find(b"\n")
+            if end < 0:
+                break
+            lines.append(bytes(self._buffer[:end]))
+            del self._buffer[:end + 1]
+        if len(self._buffer) > MAX_LINE_BYTES:
+            print(f"Discarding {len(self._buffer)} bytes without a newline from {self.port}")
+            self._buffer.clear()
+        self.read_seconds += time.perf_counter() - started
+
+        for raw in lines:
+            line = raw.decode("utf-8", errors="replace").strip()
+            if line:
+                self.lines_read += 1
+                self.on_reading(Reading(monotonic, wall, line))
@@ -0,0 +1,162 @@
+# Incremental reading of a growing CSV log (e.g. the OBD track log on the server).
+# CsvTail remembers the byte offset it has read up to and parses only the complete
+# rows appended since, so each call costs the same however long the log has grown.
+# SlidingWindow cuts those rows into fixed-size windows that start every `step` rows
+# (consecutive windows share size - step rows, so an event on a boundary is seen
+# whole) and keeps only the rows a window still needs.
+
+import io
+import os
+from collections import namedtuple
+
+from .lazy import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# ===============================
+# Default Settings
+# ===============================
+MAX_READ_BYTES = 1024 * 1024    # most bytes parsed per read (bounds a catch-up on a long log)
+
+
+class CsvTail:
+    """
+    Reads the rows appended to a CSV file since the previous read, keeping only the
+    given columns (missing ones are filled with NaN). The header is read from the
+    first line. If the file is replaced or truncated, reading starts over and
+    `restarted` is set until the next read.
+    """
+
+    def __init__(self, path, columns, offset=0, inode=None, max_read_bytes=MAX_READ_BYTES):
+        self.path = path
+        self.columns = list(columns)
+        self.offset = offset            # bytes consumed: everything before is parsed
+        self.inode = inode
+        self.max_read_bytes = max_read_bytes
+        self.names = None
+        self.restarted = False
+        self.rows_read = 0
+
+    def read(self):
+        """
+        Returns (DataFrame of the new complete rows, numpy array of the byte offset
+        each row starts at). Both are empty if nothing new was appended.
+        """
+        self.restarted = False
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return self._empty()
+        if self.inode is not None and (st.st_ino != self.inode or st.st_size < self.offset):
+            print(f"{self.path} was replaced or truncated; reading it from the start")
+            self.offset = 0
+            self.names = None
+            self.restarted = True
+        self.inode = st.st_ino
+
+        with open(self.path, "rb") as f:
+            if self.names is None:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    return self._empty()       # header not complete yet
+                # utf-8-sig: logs saved by spreadsheet tools start with a byte order mark
+                self.names = [name.strip() for name in header.decode("utf-8-sig", errors="replace").split(",")]
+                self.offset = max(self.offset, len(header))
+            if st.st_size <= self.offset:
+                return self._empty()
+            f.seek(self.offset)
+            chunk = f.read(min(self.max_read_bytes, st.st_size - self.offset))
+
+        end = chunk.rfind(b"\n") + 1           # only complete rows
+        if end == 0:
+            return self._empty()
+        chunk = chunk[:end]
+        line_ends = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10) + 1
+        starts = self.offset + np.concatenate(([0], line_ends[:-1]))
+
+        present = [column for column in self.columns if column in self.names]
+        # skip_blank_lines=False keeps one parsed row per line, so rows line up with
+        # starts (the log has no quoted newlines); blank lines are dropped below.
+        rows = pd.read_csv(io.BytesIO(chunk), header=None, names=self.names, usecols=present,
+                           index_col=False, skip_blank_lines=False)
+        for column in self.columns:
+            if column not in rows.columns:
+                rows[column] = np.nan
+        rows = rows[self.columns]
+        keep = rows.notna().any(axis=1).to_numpy()
+        self.offset += end
+        rows = rows[keep].reset_index(drop=True)
+        self.rows_read += len(rows)
+        return rows, starts[keep]
+
+    def _empty(self):
+        return pd.DataFrame(columns=self.columns), np.empty(0, dtype=np.int64)
+
+
+Window = namedtuple("Window", "start_row end_row new_from_row rows")
+# Rows [start_row, end_row) of the log, counted from the first data row; rows before
+# new_from_row were already part of the previous window.
+
+
+class SlidingWindow:
+    """
+    Buffers rows from a CsvTail and hands out windows of `size` rows ending every
+    `step` rows. Windows up to analysed_row are done; next_window() returns the
+    first one that is not, and mark_analysed() drops the rows no later window needs.
+    """
+
+    def __init__(self, size, step, first_row=0, analysed_row=0):
+        if not 0 < step <= size:
+            raise ValueError("step must be between 1 and the window size")
+        self.size = size
+        self.step = step
+        self.first_row = first_row          # row number of the first buffered row
+        self.analysed_row = analysed_row
+        self.rows = None
+        self.starts = np.empty(0, dtype=np.int64)
+
+    @property
+    def end_row(self):
+        return self.first_row + (0 if self.rows is None else len(self.rows))
+
+    def reset(self):
+        self.first_row = 0
+        self.analysed_row = 0
+        self.rows = None
+        self.starts = np.empty(0, dtype=np.int64)
+
+    def extend(self, rows, starts):
+        if not len(rows):
+            return
+        self.rows = rows if self.rows is None else pd.concat([self.rows, rows], ignore_index=True)
+        self.starts = np.concatenate((self.starts, starts))
+
+    def next_window(self, flush=False):
+        """
+        The next window not analysed yet, or None. With flush, a window that is not
+        full yet is returned too (e.g. once the log has stopped growing).
+        """
+        end = self.analysed_row + self.step
+        if end > self.end_row:
+            if not flush or self.end_row <= self.analysed_row:
+                return None
+            end = self.end_row
+        start = max(self.first_row, end - self.size)
+        rows = self.rows.iloc[start - self.first_row:end - self.first_row]
+        return Window(start, end, max(start, self.analysed_row), rows)
+
+    def mark_analysed(self, window):
+        self.analysed_row = window.end_row
+        keep_from = max(self.first_row, window.end_row + self.step - self.size)
+        drop = keep_from - self.first_row
+        if drop:
+            self.rows = self.rows.iloc[drop:].reset_index(drop=True)
+            self.starts = self.starts[drop:]
+            self.first_row = keep_from
+
+    def resume_offset(self, tail):
+        """
+        Byte offset of the first row still needed: where a restarted reader goes on.
+        """
+        return int(self.starts[0]) if len(self.starts) else tail.offset
@@ -0,0 +1,298 @@
+# Background uploader that appends CSV rows to files on the virtual machine engine.
+# One long-lived SSH/SFTP session is shared by every remote file, rows are queued in
+# memory and flushed in batches, and anything that cannot be sent is spooled to disk
+# until the link comes back. A write that breaks off part way is cut back on the
+# remote side before its rows are sent again, so no row appears twice.
+
+import os
+import queue
+import threading
+import time
+from urllib.parse import quote, unquote
+
+from .lazy import LazyModule
+
+paramiko = LazyModule("paramiko")   # imported on the first connection attempt
+
+# ===============================
+# Default Settings
+# ===============================
+MAX_QUEUE_SIZE = 10000     # rows held in memory before spilling straight to disk
+BATCH_SIZE = 200           # flush once this many rows are waiting
+FLUSH_INTERVAL = 1.0       # ... or once the oldest waiting row is this many seconds old
+MIN_BACKOFF = 1.0          # first reconnect delay in seconds
+MAX_BACKOFF = 60.0         # reconnect delay is doubled up to this limit
+KEEPALIVE_INTERVAL = 30    # SSH keepalive so idle NAT entries are not dropped
+
+
+class BatchedUploader:
+    """
+    Append rows to remote files without ever blocking the caller on the network.
+
+    Call append(remote_path, line) from the frame loop; a worker thread groups the
+    queued rows per remote file and writes each group with a single SFTP append.
+    """
+
+    def __init__(self, hostname, username, key_filename, spool_dir,
+                 max_queue_size=MAX_QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, min_backoff=MIN_BACKOFF,
+                 max_backoff=MAX_BACKOFF):
+        self.hostname = hostname
+        self.username = username
+        self.key_filename = key_filename
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._spool_lock = threading.Lock()
+        self._client = None
+        self._sftp = None
+        self._backoff = min_backoff
+        self._next_connect_time = 0.0
+        self._thread = None
+
+        # Counters, readable at any time for debugging or metrics.
+        self.rows_sent = 0
+        self.bytes_sent = 0
+        self.rows_spooled = 0
+        self.batches_sent = 0
+        self.reconnects = 0
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def start(self):
+        """
+        Start the background worker thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="batched-uploader", daemon=True)
+            self._thread.start()
+        return self
+
+    def append(self, remote_path, line):
+        """
+        Queue one row for the remote file. Never blocks: if the in-memory queue is
+        full the row goes straight to the disk spool.
+        """
+        try:
+            self._queue.put_nowait((remote_path, line))
+        except queue.Full:
+            self._spool({remote_path: [line]})
+
+    def pending(self):
+        """
+        Number of rows waiting in memory.
+        """
+        return self._queue.qsize()
+
+    def close(self, timeout=10.0):
+        """
+        Flush what is left in memory (or spool it) and stop the worker.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._disconnect()
+
+    # ---------------------------
+    # Worker
+    # ---------------------------
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._deliver(batch)
+            elif self._ensure_connected():
+                # Idle and online: a good moment to drain anything left on disk.
+                self._replay_spool()
+
+        # Final drain on shutdown: one attempt over the network, the rest goes to disk.
+        batch = self._drain_queue()
+        if batch:
+            self._deliver(batch)
+
+    def _collect_batch(self):
+        """
+        Wait for rows and group them by remote path until the batch is big enough
+        or the flush interval has elapsed.
+        """
+        batch = {}
+        count = 0
+        deadline = None
+        while count < self.batch_size and not self._stop.is_set():
+            timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                remote_path, line = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            batch.setdefault(remote_path, []).append(line)
+            count += 1
+        return batch
+
+    def _drain_queue(self):
+        batch = {}
+        while True:
+            try:
+                remote_path, line = self._queue.get_nowait()
+            except queue.Empty:
+                return batch
+            batch.setdefault(remote_path, []).append(line)
+
+    def _deliver(self, batch):
+        if not self._ensure_connected():
+            self._spool(batch)
+            return
+        # Older spooled rows go out first so each remote file stays in order.
+        if not self._replay_spool():
+            self._spool(batch)
+            return
+        for remote_path, lines in list(batch.items()):
+            try:
+                self._write_remote(remote_path, "".join(line + "\n" for line in lines))
+                self.rows_sent += len(lines)
+                self.batches_sent += 1
+                del batch[remote_path]
+            except Exception as e:
+                print(f"Error updating remote CSV ({remote_path}): {e}")
+                self._disconnect()
+                self._spool(batch)
+                return
+
+    # ---------------------------
+    # Connection Handling
+    # ---------------------------
+    def _ensure_connected(self):
+        if self._sftp is not None:
+            transport = self._client.get_transport()
+            if transport is not None and transport.is_active():
+                return True
+            self._disconnect()
+
+        now = time.monotonic()
+        if now < self._next_connect_time:
+            return False
+        try:
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(self.hostname, username=self.username, key_filename=self.key_filename, timeout=10)
+            client.get_transport().set_keepalive(KEEPALIVE_INTERVAL)
+            self._sftp = client.open_sftp()
+            self._client = client
+            self._backoff = self.min_backoff
+            self.reconnects += 1
+            return True
+        except Exception as e:
+            print(f"Error connecting to {self.hostname} (retrying in {self._backoff:.0f}s): {e}")
+            self._next_connect_time = now + self._backoff
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+            return False
+
+    def _disconnect(self):
+        for handle in (self._sftp, self._client):
+            if handle is not None:
+                try:
+                    handle.close()
+                except Exception:
+                    pass
+        self._sftp = None
+        self._client = None
+
+    def _write_remote(self, remote_path, data):
+        """
+        Append data to the remote file. If an earlier write to it failed part way,
+        the file is first cut back to its size before that write (the rows are all
+        in data again); if this write fails, that size is recorded for next time.
+        """
+        mark_path = self._mark_file(remote_path)
+        rewind = self._read_mark(mark_path)
+        start = None
+        try:
+            if rewind is not None and self._sftp.stat(remote_path).st_size > rewind:
+                self._sftp.truncate(remote_path, rewind)
+            with self._sftp.open(remote_path, "a") as remote_file:
+                start = remote_file.tell()      # opened for append: the current size
+                remote_file.write(data)
+        except Exception:
+            if rewind is None and start is not None:
+                with open(mark_path, "w") as f:
+                    f.write(f"{start}\n")
+            raise
+        if rewind is not None:
+            os.remove(mark_path)
+        self.bytes_sent += len(data)
+
+    # ---------------------------
+    # Disk Spool
+    # ---------------------------
+    def _spool_file(self, remote_path):
+        return os.path.join(self.spool_dir, quote(remote_path, safe="") + ".spool")
+
+    def _spool(self, batch):
+        """
+        Append rows that could not be sent to one spool file per remote path.
+        """
+        with self._spool_lock:
+            for remote_path, lines in batch.items():
+                try:
+                    with open(self._spool_file(remote_path), "a") as f:
+                        f.write("".join(line + "\n" for line in lines))
+                    self.rows_spooled += len(lines)
+                except Exception as e:
+                    print(f"Error spooling rows for {remote_path}: {e}")
+
+    def _mark_file(self, remote_path):
+        return os.path.join(self.spool_dir, quote(remote_path, safe="") + ".mark")
+
+    @staticmethod
+    def _read_mark(mark_path):
+        try:
+            with open(mark_path) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _replay_spool(self):
+        """
+        Send every spool file to its remote path. Returns False if the link failed.
+        The spool files are renamed to .replay under the lock and sent without it,
+        so append() never waits on the network; a .replay file left by a failed
+        send goes out before anything spooled since.
+        """
+        while True:
+            with self._spool_lock:
+                names = [name for name in os.listdir(self.spool_dir) if name.endswith(".replay")]
+                if not names:
+                    for name in os.listdir(self.spool_dir):
+                        if name.endswith(".spool"):
+                            replay_name = name[:-len(".spool")] + ".replay"
+                            os.replace(os.path.join(self.spool_dir, name), os.path.join(self.spool_dir, replay_name))
+                            names.append(replay_name)
+            if not names:
+                return True
+            for name in sorted(names):
+                replay_path = os.path.join(self.spool_dir, name)
+                remote_path = unquote(name[:-len(".replay")])
+                try:
+                    with open(replay_path) as f:
+                        data = f.read()
+                    if data:
+                        self._write_remote(remote_path, data)
+                        self.rows_sent += data.count("\n")
+                        self.batches_sent += 1
+                    os.remove(replay_path)
+                except Exception as e:
+                    print(f"Error replaying spooled rows for {remote_path}: {e}")
+                    self._disconnect()
+                    return False
@@ -0,0 +1,218 @@
+# Dark-channel visibility score of a front camera image, used by the server's
+# "Front Facing Camera Files/Activation on server.py" and the Pi's edge mode.
+# score_file and score_jpeg decode the JPEG at 1/2, 1/4 or 1/8 scale (libjpeg scales
+# while decoding, so this costs a fraction of a full decode), optionally shrink it to
+# a fixed working width, and scale the patch to match. visibility_accuracy.py reports
+# how far each scale is from the full-resolution result: on the sample images 1/2
+# stays within half a point, 1/4 reads about a point lower. visibility_row gives the
+# visibility_log.csv row the server and visibility_backfill.py write; log_times reads
+# its timestamps back.
+
+import math
+import os
+import re
+from datetime import datetime
+
+from .lazy import LazyModule
+
+cv2 = LazyModule("cv2")
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+PATCH_SIZE = 15     # dark-channel patch at full resolution
+BAND_ROWS = 256     # rows per band when taking the minimum over the colour channels
+CSV_HEADER = ["Date", "Time", "Filename", "Visibility (%)", "Avg Dark Value"]   # visibility_log.csv
+
+
+def compute_min_channel(img):
+    """
+    Per-pixel minimum over the colour channels. Equal to np.min(img, axis=2), but
+    an order of magnitude faster on uint8 images; split in bands of rows so the
+    per-channel copies stay small.
+    """
+    min_channel = np.empty(img.shape[:2], dtype=img.dtype)
+    for top in range(0, img.shape[0], BAND_ROWS):
+        channels = cv2.split(img[top:top + BAND_ROWS])
+        band = channels[0]
+        for channel in channels[1:]:
+            band = cv2.min(band, channel)
+        min_channel[top:top + BAND_ROWS] = band
+    return min_channel
+
+
+def compute_dark_channel(img, patch_size=PATCH_SIZE):
+    """
+    Compute the dark channel of an image.
+    For each pixel, the dark channel is the minimum intensity value
+    within a patch (of size patch_size) across all color channels.
+    """
+    min_channel = compute_min_channel(img)
+    kernel = cv2.getStructuringElement(
+        cv2.MORPH_RECT, (patch_size, patch_size))
+    dark_channel = cv2.erode(min_channel, kernel)
+    return dark_channel
+
+
+def compute_visibility_percentage(dark_channel_img):
+    """
+    Calculate a visibility percentage from the dark channel image.
+    We assume that lower average dark channel values indicate better visibility.
+
+    Formula:
+      visibility (%) = 100 * (1 - (avg_dark / 255))
+    """
+    avg_dark = np.mean(dark_channel_img)
+    visibility_percent = 100 * (1 - (avg_dark / 255))
+    visibility_percent = np.clip(visibility_percent, 0, 100)
+    return visibility_percent, avg_dark
+
+
+def reduced_read_flag(reduction):
+    """
+    The cv2.imread/imdecode flag that decodes a colour image at 1/reduction scale.
+    """
+    flags = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }
+    if reduction not in flags:
+        raise ValueError(f"reduction must be 1, 2, 4 or 8, not {reduction}")
+    return flags[reduction]
+
+
+def scaled_patch_size(scale, patch_size=PATCH_SIZE):
+    # Rounding up keeps the reduced score closest to the full-resolution one.
+    return max(1, math.ceil(patch_size / scale))
+
+
+def score_image(img, scale=1, patch_size=PATCH_SIZE):
+    """
+    (visibility %, avg dark value) of an image shrunk by scale from full resolution.
+    """
+    dark = compute_dark_channel(img, scaled_patch_size(scale, patch_size))
+    visibility_percent, avg_dark = compute_visibility_percentage(dark)
+    return float(visibility_percent), float(avg_dark)
+
+
+def _score_decoded(img, reduction, working_width, patch_size):
+    scale = reduction
+    if working_width and img.shape[1] > working_width:
+        height = max(1, round(img.shape[0] * working_width / img.shape[1]))
+        scale = reduction * img.shape[1] / working_width
+        img = cv2.resize(img, (working_width, height), interpolation=cv2.INTER_AREA)
+    visibility_percent, avg_dark = score_image(img, scale, patch_size)
+    return visibility_percent, avg_dark, img
+
+
+def score_jpeg(data, reduction=2, working_width=None, patch_size=PATCH_SIZE):
+    """
+    Decode JPEG bytes at 1/reduction scale (then shrink to working_width, if wider)
+    and score them. Returns (visibility %, avg dark value, the image that was
+    scored), or None if the bytes do not decode.
+    """
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), reduced_read_flag(reduction))
+    if img is None:
+        return None
+    return _score_decoded(img, reduction, working_width, patch_size)
+
+
+def score_file(path, reduction=2, working_width=None, patch_size=PATCH_SIZE):
+    """
+    Like score_jpeg, for an image file.
+    """
+    img = cv2.imread(path, reduced_read_flag(reduction))
+    if img is None:
+        return None
+    return _score_decoded(img, reduction, working_width, patch_size)
+
+
+def extract_timestamp_from_filename(filename):
+    """
+    Extract date and time from filename.
+    Expected filename format: image_YYYYMMDD_HHMMSS.ext
+    Returns a tuple (date, time) in string format (YYYY-MM-DD, HH:MM:SS).
+    If the pattern is not found, returns None.
+    """
+    match = re.search(r'(\d{8})_(\d{6})', filename)
+    if match:
+        date_str = match.group(1)
+        time_str = match.group(2)
+        date_formatted = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
+        time_formatted = f"{time_str[:2]}:{time_str[2:4]}:{time_str[4:]}"
+        return date_formatted, time_formatted
+    else:
+        return None
+
+
+def log_times(dates, times, timezone):
+    """
+    UTC datetimes of visibility_log.csv Date and Time columns (local time in
+    timezone; dates either YYYY-MM-DD or DD-MM-YYYY), NaT where they do not parse.
+    """
+    stamps = dates.astype(str).str.strip() + " " + times.astype(str).str.strip()
+    # Explicit formats: a day-first guess would also read 2025-03-05 as 3 May.
+    local = pd.to_datetime(stamps, format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    archived = local.isna()
+    if archived.any():
+        local[archived] = pd.to_datetime(stamps[archived], format="%d-%m-%Y %H:%M:%S", errors="coerce")
+    return local.dt.tz_localize(timezone, ambiguous="NaT", nonexistent="NaT").dt.tz_convert("UTC")
+
+
+def visibility_row(file_path, reduction=2, working_width=None, data=None):
+    """
+    The visibility_log.csv row (date, time, filename, visibility, avg dark) of an
+    image file, or None if it cannot be read. data, if given, holds the file's
+    bytes already read. The timestamp comes from the filename, or else from the
+    file's modification time.
+    """
+    if data is not None:
+        scored = score_jpeg(data, reduction, working_width)
+    else:
+        scored = score_file(file_path, reduction, working_width)
+    if scored is None:
+        return None
+    visibility_percent, avg_dark, _ = scored
+
+    filename = os.path.basename(file_path)
+    timestamp = extract_timestamp_from_filename(filename)
+    if timestamp:
+        date_formatted, time_formatted = timestamp
+    else:
+        dt = datetime.fromtimestamp(os.path.getmtime(file_path))
+        date_formatted = dt.strftime("%Y-%m-%d")
+        time_formatted = dt.strftime("%H:%M:%S")
+
+    return [date_formatted, time_formatted, filename,
+            f"{visibility_percent:.2f}", f"{avg_dark:.2f}"]
+
+
+class SnapshotTrigger:
+    """
+    Decides when an edge-scored capture is worth sending as an image: when the
+    visibility is below threshold (at most once every min_interval seconds while it
+    stays low) or when it moved by at least change points since the previous capture.
+    """
+
+    def __init__(self, threshold, change, min_interval):
+        self.threshold = threshold
+        self.change = change
+        self.min_interval = min_interval
+        self.previous = None
+        self.last_sent = None
+
+    def check(self, visibility_percent, now):
+        """
+        Returns "low", "change" or None.
+        """
+        reason = None
+        if self.previous is not None and abs(visibility_percent - self.previous) >= self.change:
+            reason = "change"
+        elif visibility_percent < self.threshold and (
+                self.last_sent is None or now - self.last_sent >= self.min_interval):
+            reason = "low"
+        self.previous = visibility_percent
+        if reason is not None:
+            self.last_sent = now
+        return reason
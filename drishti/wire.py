@@ -0,0 +1,304 @@
+# Compact framed binary wire protocol between the Pi and the ingest daemon on the
+# virtual machine engine (drishti/ingest_server.py).
+#
+# Every frame is an 8-byte header (magic "DW", protocol version, frame type, payload
+# length) followed by the payload. A connection starts with HELLO (vehicle id), the
+# server answers STATE (last committed sequence number of each of the vehicle's
+# streams), then the client sends BATCH frames and the server answers each with an
+# ACK carrying the stream's committed sequence number.
+#
+# A BATCH holds records of one sensor stream. Records are typed and fixed by a
+# versioned schema (below), packed with struct and each prefixed with its length, so
+# a server can store records of a schema version it does not know yet. Sequence
+# numbers are per vehicle and stream and start at 1; the server drops records it has
+# already committed, which together with the client's outbox gives exactly-once
+# delivery.
+
+import math
+import re
+import struct
+from datetime import datetime, timedelta, timezone
+
+MAGIC = b"DW"
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("<2sBBI")        # magic, protocol version, frame type, payload length
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+# Frame types
+HELLO = 1    # client -> server: vehicle id
+STATE = 2    # server -> client: (sensor, committed seq) for each stream of the vehicle
+BATCH = 3    # client -> server: records of one stream
+ACK = 4      # server -> client: (sensor, committed seq) after a batch
+ERROR = 5    # server -> client: reason, then the server closes the connection
+
+BATCH_HEAD = struct.Struct("<BBQH")     # sensor, schema version, first sequence number, record count
+STREAM_SEQ = struct.Struct("<BQ")       # sensor, sequence number
+RECORD_LENGTH = struct.Struct("<H")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# ===============================
+# Record Schemas
+# ===============================
+# Field kinds: "time" is an aware datetime (int64 microseconds since the epoch plus the
+# UTC offset in minutes), "f32"/"u8"/"u16" are numbers, "str" is length-prefixed UTF-8.
+FIELD_FORMATS = {"time": "qh", "f32": "f", "u8": "B", "u16": "H"}
+STR = struct.Struct("<H")
+
+
+class Schema:
+    """
+    The typed record layout of one sensor stream at one version.
+    """
+
+    def __init__(self, sensor, name, version, fields, csv_header):
+        self.sensor = sensor
+        self.name = name
+        self.version = version
+        self.fields = fields                  # [(name, kind)]
+        self.csv_header = csv_header
+        self._fixed = struct.Struct("<" + "".join(FIELD_FORMATS[kind] for _, kind in fields if kind != "str"))
+        self._kinds = [kind for _, kind in fields]
+
+    def encode(self, values):
+        """
+        Pack one record (a tuple in field order).
+        """
+        fixed = []
+        strings = []
+        for kind, value in zip(self._kinds, values):
+            if kind == "time":
+                delta = value - EPOCH
+                fixed.append((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+                fixed.append(int(value.utcoffset().total_seconds() // 60))
+            elif kind == "str":
+                strings.append(value.encode("utf-8"))
+            else:
+                fixed.append(value)
+        data = self._fixed.pack(*fixed)
+        for text in strings:
+            data += STR.pack(len(text)) + text
+        return data
+
+    def decode(self, data):
+        """
+        Unpack one record into a tuple in field order.
+        """
+        fixed = iter(self._fixed.unpack_from(data))
+        offset = self._fixed.size
+        values = []
+        for kind in self._kinds:
+            if kind == "time":
+                micros, tz_minutes = next(fixed), next(fixed)
+                tz = timezone(timedelta(minutes=tz_minutes))
+                values.append((EPOCH + timedelta(microseconds=micros)).astimezone(tz))
+            elif kind == "str":
+                (length,) = STR.unpack_from(data, offset)
+                offset += STR.size
+                values.append(data[offset:offset + length].decode("utf-8", errors="replace"))
+                offset += length
+            else:
+                values.append(next(fixed))
+        return tuple(values)
+
+
+# Driver status codes (the same order as driver_monitor/local_log.py)
+DRIVER_STATUSES = ["N/A", "Driver Awake", "ALERT: High Drowsiness!", "ALERT: Driver Sleeping!"]
+DRIVER_STATUS_CODES = {status: code for code, status in enumerate(DRIVER_STATUSES)}
+
+# OBD track log columns the server-side analysis uses (OBD Data Files/pi to gemini.py)
+OBD_COLUMNS = [
+    'GPS Time',
+    'Bearing',
+    'Acceleration Sensor(Total)(g)',
+    'Acceleration Sensor(X axis)(g)',
+    'Acceleration Sensor(Y axis)(g)',
+    'Acceleration Sensor(Z axis)(g)',
+    'Engine Load(%)',
+    'Speed (OBD)(km/h)',
+    'Throttle Position(Manifold)(%)',
+]
+
+MQ3 = Schema(1, "mq3", 1, [("time", "time"), ("value", "f32")], "Time Stamp,Sensor Value")
+DRIVER = Schema(2, "driver", 1, [
+    ("time", "time"), ("left_ear", "f32"), ("right_ear", "f32"), ("lar", "f32"),
+    ("drowsiness_percent", "f32"), ("status", "u8"), ("yawn", "u8"),
+], "timestamp,left_ear,right_ear,lar,drowsiness_percent,driver_status,yawn_or_not")
+OBD = Schema(3, "obd", 1, [("time", "time"), ("gps_time", "str")] + [
+    (column, "f32") for column in OBD_COLUMNS[1:]
+], ",".join(OBD_COLUMNS))
+
+SCHEMAS = {(schema.sensor, schema.version): schema for schema in (MQ3, DRIVER, OBD)}
+SENSOR_NAMES = {schema.sensor: schema.name for schema in SCHEMAS.values()}
+
+
+# ===============================
+# Text Rows <-> Records
+# ===============================
+def mq3_record(wall, line):
+    """
+    Record for an Arduino line such as "Sensor Value: 142" read at wall (NaN if the
+    line holds no number).
+    """
+    match = re.search(r"(-?\d+\.?\d*)", line)
+    return wall, float(match.group(1)) if match else math.nan
+
+
+def driver_record(row):
+    """
+    Record for a combined-log row (timestamp, left_ear, right_ear, lar,
+    drowsiness_percent, driver_status, yawn_or_not).
+    """
+    timestamp, left_ear, right_ear, lar, drowsiness_percent, status, yawn = row.split(",")
+    return (datetime.fromisoformat(timestamp), float(left_ear), float(right_ear), float(lar),
+            float(drowsiness_percent), DRIVER_STATUS_CODES.get(status, 0), 1 if yawn == "Yes" else 0)
+
+
+class ObdRowParser:
+    """
+    Turns rows of the OBD track log into records, given the log's header line.
+    Missing or non-numeric values become NaN.
+    """
+
+    def __init__(self, header):
+        names = [name.strip() for name in header.split(",")]
+        self.indexes = [names.index(column) if column in names else None for column in OBD_COLUMNS]
+
+    def record(self, wall, row):
+        fields = row.split(",")
+        values = [wall]
+        for position, index in enumerate(self.indexes):
+            value = fields[index].strip() if index is not None and index < len(fields) else ""
+            if position == 0:
+                values.append(value)
+            else:
+                try:
+                    values.append(float(value))
+                except ValueError:
+                    values.append(math.nan)
+        return tuple(values)
+
+
+def _number(value, fmt):
+    return "" if math.isnan(value) else format(value, fmt)
+
+
+def csv_row(schema, values):
+    """
+    The record as a row of the text CSV the server-side scripts already read.
+    """
+    if schema.name == "mq3":
+        wall, value = values
+        return f"{wall.isoformat()},Sensor Value: {_number(value, 'g')}"
+    if schema.name == "driver":
+        wall, left_ear, right_ear, lar, drowsiness_percent, status, yawn = values
+        status_text = DRIVER_STATUSES[status] if status < len(DRIVER_STATUSES) else "Unknown"
+        return (f"{wall.isoformat()},{left_ear:.3f},{right_ear:.3f},{lar:.3f},{drowsiness_percent:.1f},"
+                f"{status_text},{'Yes' if yawn else 'No'}")
+    if schema.name == "obd":
+        return ",".join([values[1]] + [_number(value, ".6g") for value in values[2:]])
+    return ",".join(str(value) for value in values)
+
+
+# ===============================
+# Frames
+# ===============================
+def encode_frame(frame_type, payload=b""):
+    return HEADER.pack(MAGIC, PROTOCOL_VERSION, frame_type, len(payload)) + payload
+
+
+def decode_header(header):
+    """
+    Returns (frame type, payload length); raises ProtocolError on a bad header.
+    """
+    magic, version, frame_type, length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ProtocolError(f"bad magic {magic!r}")
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"unsupported protocol version {version}")
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"frame of {length} bytes is too large")
+    return frame_type, length
+
+
+def read_frame(recv_exact):
+    """
+    Read one frame with recv_exact(n) (which returns exactly n bytes or raises).
+    Returns (frame type, payload).
+    """
+    frame_type, length = decode_header(recv_exact(HEADER.size))
+    return frame_type, recv_exact(length) if length else b""
+
+
+def encode_hello(vehicle_id):
+    return encode_frame(HELLO, vehicle_id.encode("utf-8"))
+
+
+def decode_hello(payload):
+    try:
+        vehicle_id = payload.decode("utf-8")
+    except UnicodeDecodeError:
+        raise ProtocolError("vehicle id is not UTF-8")
+    if not vehicle_id or "/" in vehicle_id or vehicle_id.startswith("."):
+        raise ProtocolError(f"invalid vehicle id {vehicle_id!r}")
+    return vehicle_id
+
+
+def encode_state(committed):
+    """
+    committed: {sensor: last committed seq}
+    """
+    return encode_frame(STATE, b"".join(STREAM_SEQ.pack(sensor, seq) for sensor, seq in sorted(committed.items())))
+
+
+def decode_state(payload):
+    return {sensor: seq for sensor, seq in STREAM_SEQ.iter_unpack(payload)}
+
+
+def encode_batch(sensor, version, first_seq, records):
+    """
+    records: list of packed records with consecutive sequence numbers from first_seq.
+    """
+    parts = [BATCH_HEAD.pack(sensor, version, first_seq, len(records))]
+    for record in records:
+        parts.append(RECORD_LENGTH.pack(len(record)))
+        parts.append(record)
+    return encode_frame(BATCH, b"".join(parts))
+
+
+def decode_batch(payload):
+    """
+    Returns (sensor, schema version, first seq, [packed records]).
+    """
+    if len(payload) < BATCH_HEAD.size:
+        raise ProtocolError("truncated batch")
+    sensor, version, first_seq, count = BATCH_HEAD.unpack_from(payload)
+    offset = BATCH_HEAD.size
+    records = []
+    for _ in range(count):
+        if offset + RECORD_LENGTH.size > len(payload):
+            raise ProtocolError("truncated batch")
+        (length,) = RECORD_LENGTH.unpack_from(payload, offset)
+        offset += RECORD_LENGTH.size
+        if offset + length > len(payload):
+            raise ProtocolError("truncated batch")
+        records.append(payload[offset:offset + length])
+        offset += length
+    return sensor, version, first_seq, records
+
+
+def encode_ack(sensor, seq):
+    return encode_frame(ACK, STREAM_SEQ.pack(sensor, seq))
+
+
+def decode_ack(payload):
+    return STREAM_SEQ.unpack(payload)
+
+
+def encode_error(message):
+    return encode_frame(ERROR, message.encode("utf-8"))
@@ -0,0 +1,21 @@
+# Shared test helpers. The tests run from the repo root with `python3 -m pytest`;
+# the drishti and driver_monitor packages are imported from the checkout, the way
+# the scripts do it.
+
+import importlib.util
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "Driver Facing Files"))
+
+
+def load_script(relative_path, name):
+    """
+    Import one of the repo's scripts (their file names have spaces) as a module.
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,53 @@
+from driver_monitor.adaptive_rate import InferenceScheduler
+
+CALM = (0.32, 0.32, 0.3, False)
+
+
+def make_scheduler():
+    return InferenceScheduler(eye_ar_thresh=0.22, yawn_threshold=0.7, max_interval=0.25,
+                              stable_frames=3, interval_step=0.05)
+
+
+def test_every_frame_until_calm_for_long_enough():
+    scheduler = make_scheduler()
+    for frame in range(3):
+        assert scheduler.should_infer(frame / 30)
+        scheduler.record(*CALM)
+    assert scheduler.interval == 0.05
+
+
+def test_interval_doubles_up_to_the_ceiling():
+    scheduler = make_scheduler()
+    intervals = []
+    for _ in range(8):
+        scheduler.record(*CALM)
+        intervals.append(scheduler.interval)
+    assert intervals == [0.0, 0.0, 0.05, 0.1, 0.2, 0.25, 0.25, 0.25]
+
+
+def test_skipped_frames_respect_the_interval():
+    scheduler = make_scheduler()
+    scheduler.interval = 0.09            # a little under three frames at 30 fps
+    decisions = [scheduler.should_infer(frame / 30) for frame in range(10)]
+    assert decisions == [True, False, False, True, False, False, True, False, False, True]
+    assert scheduler.duty_cycle() == 0.4
+
+
+def test_anything_near_a_threshold_snaps_back_to_every_frame():
+    for near in ((0.25, 0.32, 0.3, False), (0.32, 0.32, 0.6, False), (0.32, 0.32, 0.3, True)):
+        scheduler = make_scheduler()
+        for _ in range(6):
+            scheduler.record(*CALM)
+        assert scheduler.interval > 0
+        scheduler.record(*near)
+        assert scheduler.interval == 0.0
+        scheduler.record(*CALM)
+        assert scheduler.interval == 0.0        # calm streak starts over
+
+
+def test_full_rate_when_no_face():
+    scheduler = make_scheduler()
+    for _ in range(6):
+        scheduler.record(*CALM)
+    scheduler.full_rate()
+    assert scheduler.should_infer(0.0) and scheduler.should_infer(0.001)
@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from drishti.asof_join import AsofJoin, epoch_seconds
+
+
+def drive(seed):
+    """
+    OBD row times (about 6 a second, with two outages) and image times (about one
+    every 3 s), the images arriving up to 5 s out of order.
+    """
+    rng = np.random.default_rng(seed)
+    right = np.cumsum(rng.uniform(0.05, 0.3, 3000))
+    right = right[(right < 100) | (right > 107)]       # OBD log stalls for 7 s
+    right = right[(right < 300) | (right > 301.5)]
+    left = np.arange(0, right[-1] + 5, 3.0) + rng.uniform(-1, 1, int((right[-1] + 5) // 3) + 1)
+    arrival = left + rng.uniform(0, 5, len(left))
+    return left, right, arrival
+
+
+def reference(left, right, direction, tolerance):
+    merged = pd.merge_asof(pd.DataFrame({"t": left, "i": np.arange(len(left))}).sort_values("t"),
+                           pd.DataFrame({"t": right, "v": np.arange(len(right))}),
+                           on="t", direction=direction, tolerance=tolerance)
+    return {int(i): None if math.isnan(v) else int(v) for i, v in zip(merged["i"], merged["v"])}
+
+
+@pytest.mark.parametrize("direction", ["backward", "forward", "nearest"])
+@pytest.mark.parametrize("seed", [1, 2])
+def test_streaming_matches_merge_asof(direction, seed):
+    left, right, arrival = drive(seed)
+    join = AsofJoin(tolerance=2.0, direction=direction)
+    results = {}
+    most_right_rows = 0
+    next_left = next_right = 0
+    order = np.argsort(arrival)
+    for now in np.arange(0, arrival.max() + 1, 0.5):
+        # the OBD log is read in chunks of whatever has been written
+        end = next_right
+        while end < len(right) and right[end] <= now:
+            end += 1
+        join.add_right_many(right[next_right:end].tolist(), list(range(next_right, end)))
+        next_right = end
+        while next_left < len(order) and arrival[order[next_left]] <= now:
+            index = int(order[next_left])
+            join.add_left(float(left[index]), index)
+            next_left += 1
+        for _, index, _, value, _ in join.pop_ready():
+            results[index] = value
+        most_right_rows = max(most_right_rows, join.right_rows())
+    join.add_right(math.inf, None)     # the drive has ended
+    for _, index, _, value, _ in join.pop_ready():
+        results[index] = value
+
+    assert results == reference(left, right, direction, 2.0)
+    assert join.waiting() == 0 and join.emitted == len(left)
+    assert most_right_rows < 150 < len(right) / 10    # only the rows a waiting image can use
+
+
+def test_ties_go_backward_like_merge_asof():
+    join = AsofJoin(tolerance=2.0, direction="nearest")
+    join.add_left(10.0, "image")
+    join.add_right_many([9.0, 11.0, 12.0], ["before", "after", "later"])
+    assert join.pop_ready() == [(10.0, "image", 9.0, "before", None)]
+    assert reference(np.array([10.0]), np.array([9.0, 11.0]), "nearest", 2.0) == {0: 0}
+
+
+def test_wants_right_until_the_log_passes_the_oldest_image():
+    join = AsofJoin(tolerance=2.0, direction="backward")
+    assert not join.wants_right()
+    join.add_left(10.0, "a")
+    join.add_right(9.5, 40)
+    assert join.wants_right() and join.pop_ready() == []
+    join.add_right(10.0, 41)
+    assert join.wants_right()                         # a row at 10.0 could still follow
+    join.add_right(10.1, 42)
+    assert not join.wants_right()
+    assert join.pop_ready() == [(10.0, "a", 10.0, 41, None)]
+
+
+def test_out_of_order_and_missing_times_are_skipped():
+    join = AsofJoin()
+    join.add_right_many([1.0, 3.0, 2.0, float("nan"), 4.0], [1, 3, 2, 0, 4])
+    join.add_left(float("nan"), "no time")
+    assert join.out_of_order == 2 and join.right_rows() == 3 and join.waiting() == 0
+
+
+def test_stalled_right_stream_releases_rows_after_max_wait():
+    now = [0.0]
+    join = AsofJoin(tolerance=2.0, max_wait=30, clock=lambda: now[0])
+    join.add_right(99.0, 50)
+    join.add_left(100.0, "a")
+    join.add_left(200.0, "b")
+    assert join.pop_ready() == []
+    now[0] = 30.0
+    assert join.pop_ready() == [(100.0, "a", 99.0, 50, None), (200.0, "b", None, None, None)]
+    assert (join.emitted, join.matched) == (2, 1)
+
+
+def test_right_rows_are_capped():
+    join = AsofJoin(max_right_rows=10, left_disorder=1e9)
+    join.add_right_many([float(n) for n in range(25)], list(range(25)))
+    assert join.right_rows() == 10 and join.right_dropped == 15
+    assert join.oldest_right_item() is None          # no items were given
+
+
+def test_direction_is_checked():
+    with pytest.raises(ValueError):
+        AsofJoin(direction="closest")
+
+
+def test_epoch_seconds():
+    times = pd.Series(pd.to_datetime(["1970-01-01 00:00:10", None], utc=True))
+    seconds = epoch_seconds(times)
+    assert seconds[0] == 10.0 and math.isnan(seconds[1])
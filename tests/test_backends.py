@@ -0,0 +1,92 @@
+import sys
+from collections import namedtuple
+
+import cv2
+import numpy as np
+import pytest
+
+from driver_monitor.backends import Dlib68Landmarks, LbfLandmarks, eye_openness, make_face_detector, \
+    make_landmarker
+from driver_monitor.synthetic_driver import face_landmarks
+
+Point = namedtuple("Point", "x y")
+
+
+class FakeShape:
+    def __init__(self, points):
+        self._points = [Point(x, y) for x, y in points]
+
+    def parts(self):
+        return self._points
+
+
+def eye_image(open_eye):
+    gray = np.full((60, 80), 200, dtype=np.uint8)
+    if open_eye:
+        cv2.circle(gray, (40, 30), 6, 20, -1)              # iris and pupil
+    else:
+        cv2.line(gray, (22, 30), (58, 30), 20, 1)          # lash line
+    return gray
+
+
+def test_eye_openness_tells_open_from_closed():
+    corners = np.array([20.0, 30.0]), np.array([60.0, 30.0])
+    opened = eye_openness(eye_image(True), *corners)
+    closed = eye_openness(eye_image(False), *corners)
+    assert opened > 0.2
+    assert closed < 0.1
+
+
+def test_eye_openness_of_a_tiny_eye_is_zero():
+    assert eye_openness(eye_image(True), np.array([40.0, 30.0]), np.array([42.0, 30.0])) == 0.0
+
+
+def test_dlib68_landmarks_give_points_and_features():
+    points = face_landmarks(320, 240, 200, 260, ear=0.28, lar=0.5)
+    landmarker = Dlib68Landmarks(lambda gray, face: FakeShape(points), roi_padding=None)
+    got, features = landmarker(np.zeros((480, 640), dtype=np.uint8), face=None)
+    np.testing.assert_allclose(got, points)
+    assert features["left_ear"] == pytest.approx(0.28)
+    assert features["lar"] == pytest.approx(0.5)
+
+
+def test_unknown_backend_names_are_rejected():
+    with pytest.raises(ValueError, match="Unknown face backend"):
+        make_face_detector("hog2")
+    with pytest.raises(ValueError, match="Unknown landmark backend"):
+        make_landmarker("dlib99")
+
+
+class Box:
+    def left(self):
+        return 10
+
+    def top(self):
+        return 20
+
+    def width(self):
+        return 100
+
+    def height(self):
+        return 120
+
+
+def test_lbf_fit_failure_is_no_landmarks():
+    class FailingFacemark:
+        def fit(self, gray, boxes):
+            assert boxes.tolist() == [[10, 20, 100, 120]]
+            return False, None
+
+    landmarker = LbfLandmarks.__new__(LbfLandmarks)
+    landmarker.facemark = FailingFacemark()
+    assert landmarker(np.zeros((480, 640), dtype=np.uint8), Box()) is None
+
+
+def test_compare_backends_needs_its_reference(tmp_path, monkeypatch, capsys):
+    import compare_backends
+
+    monkeypatch.setattr(sys, "argv", ["compare_backends.py", "--frames", str(tmp_path),
+                                      "--backends", "haar/dlib99", "haar/dlib68"])
+    with pytest.raises(SystemExit, match="reference backend haar/dlib99"):
+        compare_backends.main()
+    assert "Running" not in capsys.readouterr().out
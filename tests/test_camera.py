@@ -0,0 +1,94 @@
+import time
+
+import cv2
+import numpy as np
+
+from drishti import camera
+
+
+def test_fake_camera_jpeg_has_the_configured_size(tmp_path):
+    source = camera.open_camera("fake", (320, 180), 80)
+    img = cv2.imdecode(np.frombuffer(source.capture(), np.uint8), cv2.IMREAD_COLOR)
+    assert img.shape == (180, 320, 3)
+    path = str(tmp_path / "image.jpg")
+    source.capture_file(path)
+    assert cv2.imread(path).shape == (180, 320, 3)
+
+
+def test_fake_camera_replays_a_directory(tmp_path):
+    for n, value in enumerate((20, 230)):
+        cv2.imwrite(str(tmp_path / f"{n}.png"), np.full((90, 160, 3), value, np.uint8))
+    source = camera.FakeCamera((160, 90), image_dir=str(tmp_path))
+    means = [cv2.imdecode(np.frombuffer(source.capture(), np.uint8), cv2.IMREAD_COLOR).mean() for _ in range(3)]
+    assert means[0] < 50 < means[1] and abs(means[2] - means[0]) < 5
+
+
+class FakeRemoteFile:
+    def __init__(self, files, path):
+        self.files = files
+        self.path = path
+        self.pipelined = False
+
+    def set_pipelined(self, pipelined):
+        self.pipelined = pipelined
+
+    def write(self, data):
+        self.files[self.path] = self.files.get(self.path, b"") + data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSftp:
+    def __init__(self):
+        self.files = {}
+        self.opened = []
+
+    def open(self, path, mode):
+        assert mode == "wb"
+        remote_file = FakeRemoteFile(self.files, path)
+        self.opened.append(remote_file)
+        return remote_file
+
+
+def test_upload_jpeg_writes_under_the_final_name():
+    sftp = FakeSftp()
+    assert camera.upload_jpeg(sftp, b"jpeg bytes", "/remote/image_1.jpg") == 10
+    assert sftp.files == {"/remote/image_1.jpg": b"jpeg bytes"}
+    assert sftp.opened[0].pipelined
+
+
+class CountingCamera:
+    def __init__(self):
+        self.count = 0
+
+    def capture(self):
+        self.count += 1
+        return b"%d" % self.count
+
+
+def test_pipeline_drops_the_oldest_image_when_upload_falls_behind():
+    source = CountingCamera()
+    pipeline = camera.CapturePipeline(source, 0.01, time.monotonic, depth=2).start()
+    deadline = time.monotonic() + 5
+    while pipeline.dropped < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pipeline.close()
+    first = pipeline.get(timeout=0)
+    second = pipeline.get(timeout=0)
+    assert pipeline.dropped >= 3
+    assert int(second[1]) == int(first[1]) + 1 == pipeline.captured
+    assert pipeline.get(timeout=0) is None
+
+
+def test_pipeline_reports_a_failed_capture():
+    class BrokenCamera:
+        def capture(self):
+            raise OSError("camera unplugged")
+
+    pipeline = camera.CapturePipeline(BrokenCamera(), 0.01, time.monotonic).start()
+    assert pipeline.get() is None
+    assert isinstance(pipeline.error, OSError)
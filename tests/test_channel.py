@@ -0,0 +1,75 @@
+import time
+
+from drishti.channel import BatchedChannelWriter, LocalFileChannel
+
+
+class FlakyFactory:
+    """
+    Channel factory whose channels break after `fail_after` sends.
+    """
+
+    def __init__(self, fail_after):
+        self.fail_after = fail_after
+        self.received = []
+        self.opens = 0
+
+    def open(self):
+        self.opens += 1
+        return FlakyChannel(self)
+
+    def close(self):
+        pass
+
+
+class FlakyChannel:
+    def __init__(self, factory):
+        self.factory = factory
+        self.closed = False
+
+    def exit_status_ready(self):
+        return False
+
+    def sendall(self, data):
+        if self.factory.fail_after == 0:
+            self.factory.fail_after = None
+            raise OSError("channel dropped")
+        if self.factory.fail_after is not None:
+            self.factory.fail_after -= 1
+        self.factory.received.append(data)
+
+    def close(self):
+        self.closed = True
+
+
+def test_rows_reach_the_file_in_batches(tmp_path):
+    path = tmp_path / "mq3_data.csv"
+    writer = BatchedChannelWriter(LocalFileChannel(str(path)), batch_size=10, flush_interval=0.05).start()
+    for i in range(25):
+        writer.put(f"row {i}\n")
+    writer.close()
+    assert path.read_text().splitlines() == [f"row {i}" for i in range(25)]
+    assert writer.rows_sent == 25 and writer.batches_sent >= 3
+
+
+def test_rows_are_kept_and_replayed_after_a_broken_channel():
+    factory = FlakyFactory(fail_after=1)
+    writer = BatchedChannelWriter(factory, batch_size=2, flush_interval=0.01, min_backoff=0.01, max_backoff=0.01)
+    writer.start()
+    for i in range(6):
+        writer.put(f"{i}\n")
+    deadline = time.monotonic() + 5
+    while writer.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    assert "".join(factory.received) == "".join(f"{i}\n" for i in range(6))
+    assert factory.opens == 2
+
+
+def test_full_ring_drops_the_oldest_rows():
+    factory = FlakyFactory(fail_after=None)
+    writer = BatchedChannelWriter(factory, ring_size=3, batch_size=100)
+    for i in range(5):
+        writer.put(f"{i}\n")
+    assert writer.rows_dropped == 2
+    writer._drain()
+    assert factory.received == ["2\n3\n4\n"]
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from drishti import compaction
+from drishti.rash_driving import detect_events, elapsed_seconds
+
+START = datetime(2025, 3, 15, 15, 42, 55)
+
+
+def gps_time(second):
+    return (START + timedelta(seconds=second)).strftime("%a %b %d %H:%M:%S GMT+05:30 %Y")
+
+
+def drive(speed, bearing=90.0, hz=10):
+    speed = np.asarray(speed, dtype=float)
+    count = len(speed)
+    return pd.DataFrame({
+        "GPS Time": [gps_time(n // hz) for n in range(count)],
+        "Bearing": np.broadcast_to(bearing, count),
+        "Acceleration Sensor(Total)(g)": np.linspace(0.1, 0.2, count),
+        "Acceleration Sensor(X axis)(g)": np.full(count, -0.05),
+        "Acceleration Sensor(Y axis)(g)": np.zeros(count),
+        "Acceleration Sensor(Z axis)(g)": np.full(count, 0.02),
+        "Engine Load(%)": np.full(count, 30.0),
+        "Speed (OBD)(km/h)": speed,
+        "Throttle Position(Manifold)(%)": np.full(count, 12.0),
+    })
+
+
+def braking_drive():
+    # 20 s at 60 km/h, a stop to 40 km/h over 2 s at 20 s, then 38 s at 40 km/h.
+    return drive(np.concatenate((np.full(200, 60.0), np.linspace(60, 40, 20), np.full(380, 40.0))))
+
+
+def test_obd_features_per_segment():
+    bearing = np.concatenate((np.full(50, 350.0), np.linspace(350, 370, 50) % 360, np.full(20, 10.0)))
+    rows = drive(np.linspace(30, 54, 120), bearing=bearing)
+    features = compaction.obd_features(rows)
+    assert len(features) == 3                          # 12 s in 5 s segments
+    first, second = features.iloc[0], features.iloc[1]
+    assert (first["From"], first["To"]) == (gps_time(0), gps_time(4))
+    assert first["Speed min"] == 30.0 and first["Speed change"] == pytest.approx(49 * 24 / 119, abs=0.01)
+    assert second["Bearing change"] == pytest.approx(20.0, abs=0.5)     # across north, not -340
+    assert second["Speed max at"] == gps_time(9)
+    assert first["Peak |X| (g)"] == 0.05
+    assert features["Throttle max"].tolist() == [12.0] * 3
+
+
+def test_peak_rows_keep_the_look_back_and_a_second_after():
+    rows = braking_drive()
+    seconds = elapsed_seconds(rows["GPS Time"])
+    events = detect_events(rows)
+    kept = compaction.peak_rows(seconds, events)
+    event = events.iloc[0]
+    assert seconds[kept[0]] == pytest.approx(seconds[event["first"]] - 5.5, abs=0.1)
+    assert seconds[kept[-1]] == pytest.approx(seconds[event["last"]] + 1.0, abs=0.1)
+    assert np.all(np.diff(kept) == 1)
+
+
+def test_compacted_prompt_shows_the_same_events():
+    rows = braking_drive()
+    events = detect_events(rows)
+    assert events["event"].tolist() == ["Harsh Braking"]
+    text, kept = compaction.compact_obd(rows, events)
+    assert "Raw rows around the flagged peaks" in text
+    assert compaction.compression_ratio(rows.to_csv(index=False), text) > 2
+    missing, extra = compaction.check_obd_compaction(rows, kept, events)
+    assert missing.empty and extra.empty
+
+
+def test_check_reports_an_event_the_kept_rows_lose():
+    rows = braking_drive()
+    events = detect_events(rows)
+    kept = np.arange(0, 150)                           # the braking is cut off
+    missing, extra = compaction.check_obd_compaction(rows, kept, events)
+    assert missing["event"].tolist() == ["Harsh Braking"] and extra.empty
+    # events before from_row were checked with the previous window
+    missing, _ = compaction.check_obd_compaction(rows, kept, events, from_row=int(events.iloc[0]["row"]) + 1)
+    assert missing.empty
+
+
+def test_quiet_window_is_only_a_summary():
+    rows = drive(np.full(600, 50.0))
+    text, kept = compaction.compact_obd(rows, detect_events(rows))
+    assert len(kept) == 0 and "Raw rows" not in text
+    assert compaction.compression_ratio(rows.to_csv(index=False), text) > 10
+
+
+def merged_table():
+    stamps = [f"2025-03-15 15:{42 + n // 20:02d}:{(n * 3) % 60:02d}" for n in range(40)]
+    visibility = np.full(40, 70.0)
+    visibility[[5, 25, 30]] = [40.0, 30.0, 44.0]
+    speed = np.full(40, 50.0)
+    speed[25] = 30.0
+    return pd.DataFrame({"Time Stamp": stamps, "Visibility (%)": visibility, "Speed (OBD)(km/h)": speed})
+
+
+def test_visibility_features_per_minute():
+    features = compaction.visibility_features(merged_table())
+    assert features["Rows"].tolist() == [20, 20]
+    assert features["Visibility min"].tolist() == [40.0, 30.0]
+    assert features.iloc[1]["Visibility min at"] == "2025-03-15 15:43:15"
+    assert features.iloc[0]["Visibility p50"] == 70.0
+
+
+def test_visibility_keeps_only_low_visibility_at_speed():
+    merged = merged_table()
+    text, kept = compaction.compact_visibility(merged)
+    assert kept.tolist() == [5, 30]                    # row 25 is below 40 km/h
+    assert "(2 of 40)" in text
+    empty_text, empty_kept = compaction.compact_visibility(merged.iloc[:0])
+    assert len(empty_kept) == 0 and empty_text.startswith("Time Stamp,")
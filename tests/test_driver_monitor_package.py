@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from conftest import REPO_ROOT
+from drishti.lazy import LazyModule
+from driver_monitor.models import ModelLoadError, ModelLoader
+from driver_monitor.supervisor import supervise
+
+
+def test_lazy_module_imports_on_first_use():
+    module = LazyModule("json")
+    assert not module.loaded()
+    assert module.dumps([1]) == "[1]"
+    assert module.loaded()
+
+
+def test_importing_the_package_does_not_import_the_models():
+    code = ("import sys; import driver_monitor.monitor, driver_monitor.supervisor; "
+            "print(sorted(m for m in ('cv2', 'dlib', 'paramiko') if m in sys.modules))")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([REPO_ROOT, os.path.join(REPO_ROOT, "Driver Facing Files")]))
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_model_load_error_names_the_backends():
+    loader = ModelLoader("no_such_backend", "dlib68", "/missing.dat")
+    with pytest.raises(ModelLoadError, match="no_such_backend/dlib68"):
+        loader.get()
+    assert not loader.loaded()
+
+
+class FlakyMonitor:
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+        self.stopping = threading.Event()
+
+    def run_once(self):
+        self.calls += 1
+        result = self.results.pop(0) if self.results else 0
+        if not self.results:
+            self.stopping.set()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_supervisor_restarts_after_errors_and_camera_loss():
+    monitor = FlakyMonitor([RuntimeError("camera gone"), 0, 25, 0])
+    supervise(monitor, restart_delay=0.001, max_restart_delay=0.002)
+    assert monitor.calls == 4
+
+
+def test_supervisor_gives_up_after_max_restarts():
+    monitor = FlakyMonitor([0] * 10)
+    supervise(monitor, restart_delay=0.001, max_restart_delay=0.001, max_restarts=2)
+    assert monitor.calls == 3
+
+
+def test_supervisor_does_not_retry_model_errors():
+    monitor = FlakyMonitor([ModelLoadError("bad path"), 0])
+    with pytest.raises(ModelLoadError):
+        supervise(monitor, restart_delay=0.001)
+    assert monitor.calls == 1
@@ -0,0 +1,77 @@
+import pytest
+
+from driver_monitor.drowsiness import DriverState, process_faces
+from driver_monitor.synthetic_driver import AWAKE_EAR, BLINK_EAR, SyntheticDriverVideo
+
+OPEN = 0.30
+CLOSED = 0.10
+
+
+def run(state, ear, lar, start, end, step=0.1):
+    decision = None
+    t = start
+    while t <= end + 1e-9:
+        decision = state.update(ear, ear, lar, t)
+        t += step
+    return decision
+
+
+def test_open_eyes_are_awake():
+    decision = run(DriverState(), OPEN, 0.3, 0.0, 10.0)
+    assert decision["driver_status"] == "Driver Awake"
+    assert decision["drowsiness_percent"] == 0.0
+    assert decision["perclos"] == 0.0
+
+
+def test_closure_goes_from_drowsy_to_sleeping():
+    state = DriverState()
+    assert run(state, CLOSED, 0.3, 0.0, 2.9)["driver_status"] == "Driver Awake"
+    decision = state.update(CLOSED, CLOSED, 0.3, 5.5)
+    assert decision["driver_status"] == "ALERT: High Drowsiness!"
+    assert decision["drowsiness_percent"] == pytest.approx(50.0)
+    assert state.update(CLOSED, CLOSED, 0.3, 8.0)["driver_status"] == "ALERT: Driver Sleeping!"
+    assert state.update(OPEN, OPEN, 0.3, 8.1)["driver_status"] == "Driver Awake"
+
+
+def test_one_eye_closed_is_not_a_closure():
+    state = DriverState()
+    for t in range(10):
+        decision = state.update(CLOSED, OPEN, 0.3, float(t))
+    assert decision["driver_status"] == "Driver Awake"
+
+
+def test_long_yawn_is_counted_once():
+    state = DriverState()
+    decisions = [state.update(0.05, 0.05, 0.9, t / 10) for t in range(0, 35)]
+    yawns = [d for d in decisions if d["yawn_or_not"] == "Yes"]
+    assert len(yawns) == 1 and state.yawn_count == 1
+    assert yawns[0]["yawn_percent"] == pytest.approx(100.0)
+
+
+def test_no_face_resets_the_timers():
+    state = DriverState()
+    run(state, CLOSED, 0.3, 0.0, 2.5)
+    assert state.timer_running()
+    assert state.no_face()["driver_status"] == "N/A"
+    assert not state.timer_running()
+    assert state.update(CLOSED, CLOSED, 0.3, 4.0)["driver_status"] == "Driver Awake"
+
+
+def test_synthetic_scenario():
+    video = SyntheticDriverVideo(duration=1.0, fps=10)
+    assert len(video) == 10
+    assert video.eye_and_mouth_at(0.05)[0] == BLINK_EAR
+    assert video.eye_and_mouth_at(1.0)[0] == AWAKE_EAR
+    assert video.eye_and_mouth_at(12.0) == (0.12, video.eye_and_mouth_at(1.0)[1])
+    frame, t = next(iter(video))
+    assert frame.shape == (480, 640, 3) and t == 0.0
+    left, top, right, bottom = video.face_box
+    assert left < video.current_points[:, 0].min() and video.current_points[:, 0].max() < right
+
+
+def test_faces_that_cannot_be_fitted_are_left_out():
+    def landmarker(gray, face):
+        return None if face == "blurred" else ("points", {"face": face})
+
+    assert process_faces(None, ["blurred", "clear"], landmarker) == [("points", {"face": "clear"})]
+    assert process_faces(None, ["blurred"], landmarker) == []
@@ -0,0 +1,85 @@
+import asyncio
+import configparser
+import os
+
+import pytest
+
+from drishti import camera
+from drishti.edge.config import load_config, producer_sections
+from drishti.edge.producers import FrontCameraProducer, ObdProducer
+from conftest import REPO_ROOT
+
+HEADER = b"GPS Time,Speed (OBD)(km/h)\n"
+
+
+class FakeTransport:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, stream, kind, remote_path, data, on_sent=None):
+        self.sent.append((data, on_sent))
+        return True
+
+
+class FakeAgent:
+    """
+    The parts of EdgeAgent an ObdProducer uses. sleep() runs the given actions,
+    one per producer loop.
+    """
+
+    def __init__(self, state_dir):
+        self.state_dir = str(state_dir)
+        self.ingest = None
+        self.tz = None
+        self.transport = FakeTransport()
+        self.stopping = asyncio.Event()
+        self.actions = []
+
+    async def run_blocking(self, func, *args):
+        return func(*args)
+
+    async def sleep(self, seconds):
+        self.actions.pop(0)()
+
+
+def obd_producer(agent, log_path):
+    config = configparser.ConfigParser()
+    config.read_dict({"obd": {"local_path": str(log_path), "interval": "0"}})
+    return ObdProducer(agent, "obd", config["obd"])
+
+
+def crash():
+    raise RuntimeError("sensor failed")
+
+
+def test_restart_does_not_queue_undelivered_rows_again(tmp_path):
+    log_path = tmp_path / "track.csv"
+    log_path.write_bytes(HEADER + b"t0,10\n")
+    agent = FakeAgent(tmp_path)
+    producer = obd_producer(agent, log_path)
+
+    agent.actions = [crash]                     # queued, not delivered yet, then a failure
+    with pytest.raises(RuntimeError):
+        asyncio.run(producer.run())
+    with open(log_path, "ab") as f:
+        f.write(b"t1,11\n")
+    agent.actions = [agent.stopping.set]        # the supervisor's restart
+    asyncio.run(producer.run())
+    assert [data for data, _ in agent.transport.sent] == [HEADER + b"t0,10\n", b"t1,11\n"]
+
+    agent.transport.sent[0][1]()                # only the first chunk was delivered
+    agent.transport.sent = []
+    agent.stopping.clear()
+    agent.actions = [agent.stopping.set]
+    asyncio.run(obd_producer(agent, log_path).run())    # a new agent process
+    assert [data for data, _ in agent.transport.sent] == [b"t1,11\n"]
+
+
+def test_front_camera_defaults_to_the_full_sensor_resolution(tmp_path):
+    agent = FakeAgent(tmp_path)
+    config = load_config(os.path.join(REPO_ROOT, "Edge Agent Files", "edge_agent.ini"))
+    unset = configparser.ConfigParser()
+    unset.add_section("front_camera")
+    for section in (dict(producer_sections(config))["front_camera"], unset["front_camera"]):
+        producer = FrontCameraProducer(agent, "front_camera", section)
+        assert producer.size is None and producer.quality == camera.DEFAULT_QUALITY == 90
@@ -0,0 +1,102 @@
+import asyncio
+
+from drishti.edge.transport import APPEND, FILE, LocalDirConnection, Transport
+
+
+class RecordingConnection(LocalDirConnection):
+    """
+    LocalDirConnection that logs each write.
+    """
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.calls = []
+
+    def append(self, path, data):
+        self.calls.append(("append", path, data))
+        super().append(path, data)
+
+    def write_part(self, path, offset, data):
+        self.calls.append(("part", path, offset))
+        super().write_part(path, offset, data)
+
+
+def run(connection, sends, **options):
+    async def main():
+        transport = Transport(connection, priorities={"alert": 0, "image": 9}, min_backoff=0.01,
+                              max_backoff=0.01, **options)
+        transport.start()
+        for send in sends:
+            transport.send(*send)
+        for _ in range(500):                # closing while offline would drop the rest
+            if not transport.pending():
+                break
+            await asyncio.sleep(0.01)
+        await transport.close(timeout=5)
+        return transport
+
+    return asyncio.run(main())
+
+
+def test_alert_overtakes_an_image_between_chunks(tmp_path):
+    connection = RecordingConnection(str(tmp_path))
+    image = bytes(range(256)) * 40
+    transport = run(connection, [("image", FILE, "/img/a.jpg", image),
+                                 ("alert", APPEND, "/log/alerts.csv", b"drowsy\n")], chunk_bytes=4096)
+    assert connection.calls[0] == ("append", "/log/alerts.csv", b"drowsy\n")
+    assert [call[2] for call in connection.calls[1:]] == [0, 4096, 8192]
+    assert (tmp_path / "img" / "a.jpg").read_bytes() == image
+    assert transport.streams["image"]["sent"] == 1 and transport.queued_bytes == 0
+
+
+def test_appends_to_one_file_are_merged_in_order(tmp_path):
+    connection = RecordingConnection(str(tmp_path))
+    run(connection, [("mq3", APPEND, "/mq3.csv", f"{i}\n".encode()) for i in range(5)])
+    assert connection.calls == [("append", "/mq3.csv", b"0\n1\n2\n3\n4\n")]
+
+
+def test_budget_drops_the_least_important_data_first(tmp_path):
+    connection = RecordingConnection(str(tmp_path))
+    transport = run(connection, [("image", FILE, "/a.jpg", b"x" * 60),
+                                 ("alert", APPEND, "/alerts.csv", b"y" * 60),
+                                 ("image", FILE, "/b.jpg", b"z" * 60)], max_queued_bytes=100)
+    assert transport.streams["image"]["dropped"] == 2
+    assert transport.streams["alert"]["sent"] == 1
+    assert not (tmp_path / "a.jpg").exists()
+
+
+def test_file_is_rewritten_after_a_failed_chunk(tmp_path):
+    connection = RecordingConnection(str(tmp_path))
+    data = b"0123456789" * 100
+    original_write = connection.write_part
+
+    def fail_second_chunk(path, offset, chunk):
+        if offset == 256 and not getattr(connection, "failed", False):
+            connection.failed = True
+            raise OSError("link dropped")
+        original_write(path, offset, chunk)
+
+    connection.write_part = fail_second_chunk
+    transport = run(connection, [("image", FILE, "/a.jpg", data)], chunk_bytes=256)
+    assert (tmp_path / "a.jpg").read_bytes() == data
+    assert transport.reconnects == 2
+    assert [call[2] for call in connection.calls] == [0, 0, 256, 512, 768]
+
+
+def test_append_that_fails_part_way_is_not_written_twice(tmp_path):
+    connection = RecordingConnection(str(tmp_path))
+    original_append = connection.append
+
+    def fail_half_way(path, data):
+        if not getattr(connection, "failed", False):
+            connection.failed = True
+            original_append(path, data[:len(data) // 2 + 1])
+            raise OSError("link dropped")
+        original_append(path, data)
+
+    connection.append = fail_half_way
+    rows = [f"{i},obd\n".encode() for i in range(10)]
+    (tmp_path / "obd.csv").write_bytes(b"Time,Speed\n")
+    transport = run(connection, [("obd", APPEND, "/obd.csv", row) for row in rows])
+    assert (tmp_path / "obd.csv").read_bytes() == b"Time,Speed\n" + b"".join(rows)
+    assert transport.reconnects == 2 and transport.streams["obd"]["sent"] == 10
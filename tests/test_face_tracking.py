@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from driver_monitor.face_tracking import MODE_DETECT, MODE_LANDMARKS, FaceTracker, ScaledFaceDetector, \
+    landmarks_bounding_box, predict_landmarks_in_roi
+
+FRAME = np.zeros((480, 640), dtype=np.uint8)
+
+
+class CountingDetector:
+    def __init__(self, faces):
+        self.faces = faces
+        self.calls = 0
+
+    def __call__(self, gray_frame):
+        self.calls += 1
+        return list(self.faces)
+
+
+class Box:
+    def __init__(self, left, top, right, bottom):
+        self.box = (left, top, right, bottom)
+
+    def left(self):
+        return self.box[0]
+
+    def top(self):
+        return self.box[1]
+
+    def right(self):
+        return self.box[2]
+
+    def bottom(self):
+        return self.box[3]
+
+
+def square_landmarks(left, top, size):
+    corners = np.array([[0, 0], [1, 0], [0, 1], [1, 1]], dtype=float)
+    return np.array([left, top]) + corners * size
+
+
+def test_landmarks_bounding_box():
+    points = np.array([[3, 9], [7, 2], [5, 5]])
+    assert landmarks_bounding_box(points) == (3, 2, 7, 9)
+
+
+def test_detect_mode_runs_the_detector_on_every_frame():
+    face = Box(90, 90, 190, 190)
+    detector = CountingDetector([face])
+    tracker = FaceTracker(detector, mode=MODE_DETECT)
+    for _ in range(5):
+        assert tracker.locate(FRAME) == [face]
+        tracker.observe(square_landmarks(100, 100, 80))
+    assert detector.calls == tracker.detections == 5
+
+
+def test_no_face_keeps_detecting():
+    detector = CountingDetector([])
+    tracker = FaceTracker(detector, mode=MODE_LANDMARKS)
+    for _ in range(3):
+        assert tracker.locate(FRAME) == []
+    assert detector.calls == 3
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        FaceTracker(CountingDetector([]), mode="guess")
+
+
+def test_landmark_mode_redetects_only_every_interval():
+    dlib = pytest.importorskip("dlib")
+    detector = CountingDetector([dlib.rectangle(90, 90, 190, 190)])
+    tracker = FaceTracker(detector, mode=MODE_LANDMARKS, redetect_interval=5)
+    for _ in range(12):
+        faces = tracker.locate(FRAME)
+        assert len(faces) == 1
+        tracker.observe(square_landmarks(100, 100, 80))
+    assert detector.calls == 2          # frames 1 and 7
+    face = tracker.locate(FRAME)[0]     # frame 13 detects again
+    assert detector.calls == 3
+    assert (face.left(), face.top(), face.right(), face.bottom()) == (90, 90, 190, 190)
+
+
+def test_landmark_box_jump_forces_redetection():
+    dlib = pytest.importorskip("dlib")
+    detector = CountingDetector([dlib.rectangle(90, 90, 190, 190)])
+    tracker = FaceTracker(detector, mode=MODE_LANDMARKS, redetect_interval=100)
+    tracker.locate(FRAME)
+    tracker.observe(square_landmarks(100, 100, 80))
+    tracker.locate(FRAME)
+    tracker.observe(square_landmarks(100, 100, 160))    # box doubled: track lost
+    tracker.locate(FRAME)
+    assert detector.calls == 2
+
+
+def test_scaled_detector_rejects_bad_scale():
+    with pytest.raises(ValueError):
+        ScaledFaceDetector(CountingDetector([]), scale=0)
+    with pytest.raises(ValueError):
+        ScaledFaceDetector(CountingDetector([]), scale=1.5)
+
+
+def test_full_scale_detector_passes_faces_through():
+    face = Box(10, 20, 30, 40)
+    detector = ScaledFaceDetector(CountingDetector([face]), scale=1)
+    assert detector(FRAME) == [face]
+    assert detector.calls == 1
+
+
+def test_scaled_detector_maps_boxes_back_to_full_resolution():
+    dlib = pytest.importorskip("dlib")
+    seen = []
+
+    def detector(small):
+        seen.append(small.shape)
+        return [dlib.rectangle(10, 20, 60, 70)]
+
+    face = ScaledFaceDetector(detector, scale=0.5)(FRAME)[0]
+    assert seen == [(240, 320)]
+    assert (face.left(), face.top(), face.right(), face.bottom()) == (20, 40, 120, 140)
+
+
+def test_landmarks_in_roi_are_in_frame_coordinates():
+    dlib = pytest.importorskip("dlib")
+    crops = []
+
+    def predictor(image, face):
+        crops.append((image.shape, face.left(), face.top()))
+        return dlib.full_object_detection(face, [dlib.point(face.left(), face.top())])
+
+    face = dlib.rectangle(100, 120, 199, 219)
+    shape = predict_landmarks_in_roi(predictor, FRAME, face, padding=0.25)
+    assert crops == [((149, 149), 25, 25)]
+    assert (shape.part(0).x, shape.part(0).y) == (100, 120)
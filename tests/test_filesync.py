@@ -0,0 +1,94 @@
+import os
+
+from drishti.filesync import AppendOnlySync
+
+
+class LocalSftp:
+    """
+    SFTP stand-in backed by the local file system.
+    """
+
+    def open(self, path, mode):
+        return open(path, mode)
+
+    def stat(self, path):
+        return os.stat(path)
+
+    def rename(self, old, new):
+        os.rename(old, new)
+
+    def close(self):
+        pass
+
+
+class ActiveClient:
+    def get_transport(self):
+        return self
+
+    def is_active(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def make_sync(tmp_path):
+    local = tmp_path / "track.csv"
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    sync = AppendOnlySync("host", "user", "key", str(local), str(remote_dir / "track.csv"))
+    sync._sftp = LocalSftp()
+    sync._client = ActiveClient()
+    return sync, local, remote_dir / "track.csv"
+
+
+def test_only_complete_rows_are_sent(tmp_path):
+    sync, local, remote = make_sync(tmp_path)
+    local.write_bytes(b"GPS Time,Speed\nt1,10\nt2,1")
+    assert sync.sync_once() == len(b"GPS Time,Speed\nt1,10\n")
+    assert remote.read_bytes() == b"GPS Time,Speed\nt1,10\n"
+    with open(local, "ab") as f:
+        f.write(b"2\nt3,13\n")
+    sync.sync_once()
+    assert remote.read_bytes() == local.read_bytes()
+    assert sync.rows_sent == 4
+
+
+def test_reconnect_continues_from_the_remote_size(tmp_path):
+    sync, local, remote = make_sync(tmp_path)
+    local.write_bytes(b"h\na\nb\nc\n")
+    remote.write_bytes(b"h\na\nb")              # an append cut off half-way
+    sync.sync_once()
+    assert remote.read_bytes() == b"h\na\nb\nc\n"
+    assert sync.bytes_sent == 3
+
+
+def test_replaced_local_file_archives_the_remote_copy(tmp_path):
+    sync, local, remote = make_sync(tmp_path)
+    local.write_bytes(b"trip1\nrow\n")
+    sync.sync_once()
+    local.unlink()
+    local.write_bytes(b"trip2\n")
+    sync.sync_once()
+    assert remote.read_bytes() == b"trip2\n"
+    archived = [name for name in os.listdir(remote.parent) if name != "track.csv"]
+    assert len(archived) == 1 and (remote.parent / archived[0]).read_bytes() == b"trip1\nrow\n"
+    assert sync.rotations == 1
+
+
+def test_remote_copy_of_another_file_is_archived(tmp_path):
+    sync, local, remote = make_sync(tmp_path)
+    local.write_bytes(b"new\nrows\n")
+    remote.write_bytes(b"old\n")
+    sync.sync_once()
+    assert remote.read_bytes() == b"new\nrows\n"
+    assert len(os.listdir(remote.parent)) == 2
+
+
+def test_long_row_is_sent_in_pieces(tmp_path):
+    sync, local, remote = make_sync(tmp_path)
+    sync.max_chunk_bytes = 4
+    local.write_bytes(b"abcdefghij\n")
+    sync.sync_once()
+    assert remote.read_bytes() == b"abcdefghij\n"
+    assert sync.appends == 3
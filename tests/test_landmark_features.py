@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from driver_monitor.landmark_features import PerclosWindow, compute_features
+from driver_monitor.synthetic_driver import face_landmarks
+
+
+def reference_ear(eye):
+    # The per-eye formula the driver script used before the vectorised pass.
+    a = np.linalg.norm(eye[1] - eye[5])
+    b = np.linalg.norm(eye[2] - eye[4])
+    c = np.linalg.norm(eye[0] - eye[3])
+    return (a + b) / (2.0 * c)
+
+
+def test_features_of_a_frontal_face():
+    points = face_landmarks(320, 240, 200, 260, ear=0.3, lar=0.4)
+    features = compute_features(points)
+    assert features["left_ear"] == pytest.approx(0.3)
+    assert features["right_ear"] == pytest.approx(0.3)
+    assert features["lar"] == pytest.approx(0.4)
+    assert features["yaw"] == pytest.approx(0.0, abs=1e-9)
+    assert features["roll"] == pytest.approx(0.0, abs=1e-9)
+    assert 0 < features["pitch"] < 1
+
+
+def test_ear_matches_the_per_eye_formula():
+    rng = np.random.default_rng(3)
+    points = face_landmarks(320, 240, 200, 260, ear=0.25, lar=0.5) + rng.normal(0, 1.5, (68, 2))
+    features = compute_features(points)
+    assert features["left_ear"] == pytest.approx(reference_ear(points[36:42]))
+    assert features["right_ear"] == pytest.approx(reference_ear(points[42:48]))
+
+
+def test_batch_matches_single_frames():
+    frames = np.stack([face_landmarks(300 + i, 240, 200, 260, ear=0.1 + 0.05 * i, lar=0.3 + 0.1 * i)
+                       for i in range(4)])
+    batch = compute_features(frames)
+    for i, points in enumerate(frames):
+        single = compute_features(points)
+        for name, value in single.items():
+            assert batch[name][i] == pytest.approx(value)
+
+
+def test_roll_follows_a_tilted_head():
+    points = face_landmarks(0, 0, 200, 260, ear=0.3, lar=0.4)
+    angle = np.radians(10)
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    assert compute_features(points @ rotation.T)["roll"] == pytest.approx(10.0)
+
+
+def test_perclos_is_the_closed_share_of_the_last_frames():
+    window = PerclosWindow(size=4)
+    assert window.value() == 0.0
+    assert window.update(True) == 100.0
+    assert window.update(False) == 50.0
+    for closed in (False, False, False):
+        window.update(closed)
+    assert window.value() == 0.0                # the closed frame has left the window
+    window.reset()
+    assert window.update(True) == 100.0
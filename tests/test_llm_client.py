@@ -0,0 +1,146 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from drishti import llm_client
+from drishti.llm_client import LlmClient, ResponseCache, TokenBucket
+from drishti.llm_stub import fake_answer, start_stub
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_allows_a_burst_then_the_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_client.time, "sleep", clock.sleep)
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.now == 0.0
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_cache_expires_and_evicts_the_least_recently_used():
+    clock = FakeClock()
+    cache = ResponseCache(max_entries=2, ttl=10, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)                  # evicts b, used less recently than a
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    clock.now = 10
+    assert cache.get("a") is None and len(cache) == 1
+    assert ResponseCache.key("u", {"x": 1, "y": 2}) == ResponseCache.key("u", {"y": 2, "x": 1})
+
+
+@pytest.fixture
+def stub():
+    server = start_stub(port=0, latency=0.0)
+    yield server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+    server.shutdown()
+
+
+def client_for(url, **kwargs):
+    kwargs.setdefault("rate", 1000)
+    kwargs.setdefault("burst", 100)
+    return LlmClient(url + "/analyze", "key", min_backoff=0, max_backoff=0, **kwargs)
+
+
+def test_answers_are_cached(stub):
+    server, url = stub
+    client = client_for(url)
+    assert client.analyze("window 1")["fault"] == fake_answer("window 1")["fault"]
+    assert client.analyze("window 1")["fault"] == fake_answer("window 1")["fault"]
+    assert client.analyze("window 1", model="other") is not None
+    client.close()
+    assert server.requests == 2
+    assert (client.cache_hits, client.cache_misses) == (1, 2)
+
+
+def test_identical_prompts_in_flight_share_a_request(stub):
+    server, url = stub
+    server.latency = 0.2
+    client = client_for(url)
+    futures = [client.submit("window 1") for _ in range(3)]
+    assert len({id(future) for future in futures}) == 1
+    assert futures[0].result() is not None
+    client.close()
+    assert server.requests == 1
+
+
+def test_batches_answer_in_order(stub):
+    server, url = stub
+    client = client_for(url, batch_url=url + "/batch", max_batch=2)
+    client.analyze("c")
+    prompts = ["a", "b", "a", "c", "d", "e"]
+    answers = client.analyze_many(prompts)
+    client.close()
+    assert [answer["parameters"] for answer in answers] == [fake_answer(p)["parameters"] for p in prompts]
+    assert server.requests == 1 + 2    # "c" was cached; a, b, d, e in two batches
+
+
+def test_gives_up_after_the_retries(stub):
+    server, url = stub
+    server.error_rate = 1.0
+    client = client_for(url, max_retries=2)
+    assert client.analyze("window 1") is None
+    client.close()
+    assert (server.requests, client.retries, client.failures) == (3, 2, 1)
+    assert len(client.cache) == 0
+
+
+class BadAnswerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests += 1
+        data = self.server.body
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def bad_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BadAnswerHandler)
+    server.daemon_threads = True
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_an_answer_that_is_not_json_is_not_retried(bad_server):
+    server, url = bad_server
+    server.body = b"<html>quota page</html>"
+    client = client_for(url, max_retries=3)
+    assert client.analyze("window 1") is None
+    client.close()
+    assert (server.requests, client.retries, client.failures) == (1, 0, 1)
+
+
+@pytest.mark.parametrize("body", [[{"fault": "none"}], {"responses": [{"fault": "none"}]}, "ok"])
+def test_a_batch_answer_of_the_wrong_shape_fails_the_batch(bad_server, body):
+    server, url = bad_server
+    server.body = json.dumps(body).encode("utf-8")
+    client = client_for(url, batch_url=url + "/batch")
+    assert client.analyze_many(["a", "b"]) == [None, None]
+    client.close()
+    assert client.failures == 1 and len(client.cache) == 0
@@ -0,0 +1,68 @@
+import io
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from driver_monitor.local_log import LocalLogStore, read_records, segment_paths, write_csv
+
+IST = timezone(timedelta(hours=5, minutes=30))
+START = datetime(2025, 3, 15, 15, 42, 55, 123456, tzinfo=IST)
+
+
+def write_rows(store, count):
+    for i in range(count):
+        status = "ALERT: High Drowsiness!" if i % 2 else "Driver Awake"
+        store.append(START + timedelta(seconds=i / 30), 0.25, 0.5, 0.125, 12.5 * (i % 2), status,
+                     "Yes" if i == 3 else "No")
+
+
+def test_records_round_trip(tmp_path):
+    store = LocalLogStore(str(tmp_path), buffer_records=4)
+    write_rows(store, 10)
+    store.close()
+    paths = segment_paths(str(tmp_path))
+    assert len(paths) == 1 and paths[0].endswith(".bin.gz")
+    records = list(read_records(paths[0]))
+    assert len(records) == 10
+    timestamp, left_ear, right_ear, lar, drowsiness, status, yawn = records[3]
+    assert timestamp == START + timedelta(seconds=3 / 30)
+    assert timestamp.utcoffset() == timedelta(hours=5, minutes=30)
+    assert (left_ear, right_ear, lar, drowsiness, status, yawn) == (0.25, 0.5, 0.125, 12.5, "ALERT: High Drowsiness!", "Yes")
+
+
+def test_csv_matches_the_old_log_format(tmp_path):
+    store = LocalLogStore(str(tmp_path))
+    write_rows(store, 2)
+    store.close()
+    out = io.StringIO()
+    assert write_csv(segment_paths(str(tmp_path)), out) == 2
+    assert out.getvalue().splitlines()[0] == "2025-03-15T15:42:55.123456+05:30,0.250,0.500,0.125,0.0,Driver Awake,No"
+
+
+def test_segments_rotate_and_oldest_are_deleted(tmp_path):
+    store = LocalLogStore(str(tmp_path), buffer_records=10, segment_bytes=200, max_store_bytes=250)
+    write_rows(store, 100)
+    store.close()
+    assert store.segments_closed >= 5
+    assert store.segments_deleted > 0
+    total = sum(os.path.getsize(path) for path in segment_paths(str(tmp_path)))
+    assert total <= 250
+
+
+def test_partial_last_record_is_ignored(tmp_path):
+    store = LocalLogStore(str(tmp_path))
+    write_rows(store, 3)
+    store.flush()
+    path = store._segment_path
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")                # power cut in the middle of a record
+    assert len(list(read_records(path))) == 3
+    store.close()
+
+
+def test_not_a_segment(tmp_path):
+    path = tmp_path / "combined-x.bin"
+    path.write_bytes(b"hello")
+    with pytest.raises(ValueError):
+        list(read_records(str(path)))
@@ -0,0 +1,64 @@
+import os
+import urllib.request
+
+import pytest
+
+from drishti.edge.config import load_config
+from drishti.metrics import MetricsRegistry, serve_http, write_textfile
+from conftest import REPO_ROOT
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry(prefix="t_")
+    histogram = registry.histogram("stage_seconds", "Stage time", labels={"stage": "detect"}, buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.05, 3.0):
+        histogram.observe(value)
+    text = registry.render()
+    assert "# TYPE t_stage_seconds histogram" in text
+    assert 't_stage_seconds_bucket{stage="detect",le="0.01"} 1' in text
+    assert 't_stage_seconds_bucket{stage="detect",le="0.1"} 3' in text
+    assert 't_stage_seconds_bucket{stage="detect",le="+Inf"} 4' in text
+    assert 't_stage_seconds_count{stage="detect"} 4' in text
+
+
+def test_same_name_and_labels_give_the_same_metric():
+    registry = MetricsRegistry()
+    assert registry.counter("frames_total") is registry.counter("frames_total")
+    assert registry.counter("frames_total", labels={"a": 1}) is not registry.counter("frames_total")
+    with pytest.raises(ValueError):
+        registry.gauge("frames_total")
+
+
+def test_counters_and_gauges_can_read_attributes():
+    registry = MetricsRegistry(prefix="")
+    state = {"depth": 3}
+    registry.gauge("queue_depth", func=lambda: state["depth"])
+    counter = registry.counter("drops_total")
+    counter.inc()
+    counter.inc(2)
+    state["depth"] = 7
+    text = registry.render()
+    assert "queue_depth 7" in text and "drops_total 3" in text
+
+
+def test_textfile_and_http_export(tmp_path):
+    registry = MetricsRegistry(prefix="")
+    registry.counter("rows_total").inc(5)
+    path = str(tmp_path / "drishti.prom")
+    write_textfile(path, registry)
+    assert "rows_total 5" in open(path).read()
+
+    server = serve_http(registry, port=0, health=lambda: '{"ok": true}')
+    assert server.server_address[0] == "127.0.0.1"      # not every interface unless asked
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        assert "rows_total 5" in urllib.request.urlopen(base + "/metrics").read().decode()
+        assert urllib.request.urlopen(base + "/health").read() == b'{"ok": true}'
+    finally:
+        server.shutdown()
+
+
+def test_edge_agent_metrics_are_local_unless_configured():
+    assert load_config()["agent"]["metrics_host"] == "127.0.0.1"
+    config = load_config(os.path.join(REPO_ROOT, "Edge Agent Files", "edge_agent.ini"))
+    assert config["agent"]["metrics_host"] == "127.0.0.1"
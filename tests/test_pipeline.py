@@ -0,0 +1,78 @@
+import threading
+
+from driver_monitor.pipeline import AsyncWorker, LatestFrameCapture
+
+
+class ScriptedCamera:
+    """
+    cv2.VideoCapture stand-in: hands out the given frames, each once the test
+    releases it, then reports the end of the stream.
+    """
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.release = threading.Semaphore(0)
+
+    def read(self):
+        self.release.acquire()
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+
+
+def test_capture_returns_each_new_frame_once():
+    camera = ScriptedCamera(["a", "b"])
+    capture = LatestFrameCapture(camera).start()
+    camera.release.release()
+    frame, frame_time = capture.read(timeout=2)
+    assert frame == "a" and frame_time is not None
+    assert capture.read(timeout=0.05) is None          # nothing new yet
+    camera.release.release()
+    assert capture.read(timeout=2)[0] == "b"
+    camera.release.release()                            # end of stream
+    assert capture.read(timeout=2) is None
+    capture.stop()
+
+
+def test_capture_keeps_only_the_newest_frame():
+    camera = ScriptedCamera(["a", "b", "c"])
+    capture = LatestFrameCapture(camera).start()
+    for _ in range(3):
+        camera.release.release()
+    camera.release.release()                            # end of stream
+    capture._thread.join(2)
+    assert capture.frames_captured == 3
+    assert capture.frames_dropped == 2
+    assert capture.read(timeout=0)[0] == "c"          # the newest frame is still handed out
+    assert capture.read(timeout=0) is None
+    capture.stop()
+
+
+def test_worker_runs_calls_in_order_and_finishes_on_stop():
+    done = []
+    worker = AsyncWorker().start()
+    for i in range(100):
+        worker.submit(done.append, i)
+    worker.stop()
+    assert done == list(range(100))
+
+
+def test_worker_drops_calls_when_full():
+    gate = threading.Event()
+    worker = AsyncWorker(max_queue_size=2).start()
+    worker.submit(gate.wait)
+    for _ in range(10):
+        worker.submit(print, "never")
+    assert worker.dropped >= 8
+    gate.set()
+    worker.stop()
+
+
+def test_worker_survives_a_failing_call(capsys):
+    done = []
+    worker = AsyncWorker(name="log-writer").start()
+    worker.submit(lambda: 1 / 0)
+    worker.submit(done.append, "after")
+    worker.stop()
+    assert done == ["after"]
+    assert "Error in log-writer" in capsys.readouterr().out
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from drishti import rash_driving as rd
+
+START = datetime(2025, 3, 15, 15, 42, 55)
+
+
+def drive(speed, bearing=0.0, accel=0.1, vertical=0.0, hz=10):
+    """
+    A track log at hz rows per second, with Torque's whole-second GPS Time.
+    """
+    speed = np.asarray(speed, dtype=float)
+    count = len(speed)
+    times = [(START + timedelta(seconds=n // hz)).strftime("%a %b %d %H:%M:%S GMT+05:30 %Y") for n in range(count)]
+    return pd.DataFrame({
+        rd.TIME: times,
+        rd.BEARING: np.broadcast_to(bearing, count),
+        rd.ACCEL_TOTAL: np.broadcast_to(accel, count),
+        rd.ACCEL_VERTICAL: np.broadcast_to(vertical, count),
+        rd.SPEED: speed,
+    })
+
+
+def only(events, event):
+    return events[events["event"] == event]
+
+
+def test_elapsed_seconds_spread_rows_within_a_second():
+    seconds = rd.elapsed_seconds(drive(np.zeros(25))[rd.TIME])
+    assert seconds[:3] == pytest.approx([0.0, 0.1, 0.2])
+    assert seconds[10] == 1.0 and seconds[20] == 2.0
+    assert seconds[24] == pytest.approx(2.8)     # the last second holds 5 rows
+    assert np.all(np.diff(seconds) > 0)
+
+
+def test_elapsed_seconds_without_parseable_times():
+    assert rd.elapsed_seconds(pd.Series(["", "n/a", "?"])) == pytest.approx([0.0, 0.1, 0.2])
+
+
+def test_steady_driving_has_no_events():
+    assert rd.detect_events(drive(np.full(200, 50.0))).empty
+    assert list(rd.detect_events(drive([])).columns) == rd.EVENT_COLUMNS
+
+
+def test_harsh_braking():
+    speed = np.concatenate((np.full(50, 60.0), np.linspace(60, 40, 20), np.full(50, 40.0)))
+    events = rd.detect_events(drive(speed))
+    braking = only(events, "Harsh Braking")
+    assert len(braking) == 1
+    event = braking.iloc[0]
+    assert event["magnitude"] == pytest.approx(20 / 15, abs=0.01)
+    assert event["first"] <= event["row"] <= event["last"]
+    assert event["details"].startswith("Speed drop of 20.0 km/h in 1.9 sec")
+
+
+def test_weak_braking_is_only_a_near_candidate():
+    speed = np.concatenate((np.full(50, 60.0), np.linspace(60, 47, 20), np.full(50, 47.0)))
+    near = only(rd.detect_events(drive(speed)), "Harsh Braking")
+    assert len(near) == 1 and 0.8 <= near.iloc[0]["magnitude"] < 1.0
+    assert rd.detect_events(drive(speed), near_factor=1.0).empty
+
+
+def test_sharp_turn_across_north_needs_speed():
+    bearing = np.concatenate((np.full(50, 340.0), np.linspace(340, 380, 20) % 360, np.full(50, 20.0)))
+    turn = only(rd.detect_events(drive(np.full(120, 40.0), bearing=bearing)), "Sharp Turn")
+    assert len(turn) == 1 and turn.iloc[0]["magnitude"] == pytest.approx(40 / 30, abs=0.01)
+    assert only(rd.detect_events(drive(np.full(120, 20.0), bearing=bearing)), "Sharp Turn").empty
+
+
+def test_high_acceleration_and_bumps():
+    accel = np.full(120, 0.1)
+    accel[60:65] = np.linspace(0.1, 0.8, 5)
+    accel[65:] = 0.8
+    events = rd.detect_events(drive(np.full(120, 30.0), accel=accel))
+    rise = only(events, "High Acceleration").iloc[0]
+    assert rise["magnitude"] == pytest.approx(0.7 / 0.5, abs=0.01)
+    assert rise["details"] == "Acceleration increased by 0.70g in 0.4 sec (Rate: 1.75 g/s)"
+
+    vertical = np.zeros(120)
+    vertical[80] = 0.45
+    bump = only(rd.detect_events(drive(np.full(120, 30.0), vertical=vertical)), "Speed Breaker / Pothole")
+    assert len(bump) == 1 and bump.iloc[0]["row"] == 80
+    assert bump.iloc[0]["details"] == "Vertical acceleration spike of 0.45g at speed 30.0 km/h"
+    assert rd.detect_events(drive(np.full(120, 10.0), vertical=vertical)).empty
+
+
+def test_separate_events_are_reported_separately():
+    speed = np.concatenate((np.full(50, 60.0), np.linspace(60, 40, 20), np.linspace(40, 60, 100),
+                            np.linspace(60, 40, 20), np.full(50, 40.0)))
+    braking = only(rd.detect_events(drive(speed)), "Harsh Braking")
+    assert len(braking) == 2
+    assert braking["row"].is_monotonic_increasing
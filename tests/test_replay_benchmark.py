@@ -0,0 +1,36 @@
+import csv
+import sys
+
+import replay_benchmark
+from driver_monitor.backends import Dlib68Landmarks
+from driver_monitor.synthetic_driver import FaceBox, SyntheticDriverVideo, SyntheticFaceDetector, \
+    SyntheticShapePredictor
+
+
+def test_synthetic_replay_finds_the_scripted_spells(tmp_path):
+    video = SyntheticDriverVideo(fps=10)
+    landmarker = Dlib68Landmarks(SyntheticShapePredictor(video))
+    stats = replay_benchmark.run_replay(video, SyntheticFaceDetector(), landmarker, str(tmp_path / "rows.csv"))
+    assert stats["frames"] == 450
+    assert [status for _, status in stats["onsets"]] == [
+        "Driver Awake", "ALERT: High Drowsiness!", "Driver Awake",
+        "ALERT: High Drowsiness!", "ALERT: Driver Sleeping!", "Driver Awake",
+        "ALERT: High Drowsiness!", "Driver Awake",
+    ]
+    assert stats["yawns"] == 1
+    with open(tmp_path / "rows.csv", newline="") as f:
+        assert len(list(csv.reader(f))) == 451
+
+
+def test_synthetic_benchmark_runs_from_the_command_line(tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / "rows.csv")
+    monkeypatch.setattr(sys, "argv", ["replay_benchmark.py", "--synthetic", "--duration", "5", "--fps", "10",
+                                      "--output", output])
+    replay_benchmark.main()
+    assert "Frames: 50" in capsys.readouterr().out
+
+
+def test_face_box_matches_dlib_rectangle_sizes():
+    box = FaceBox(10, 20, 59, 99)
+    assert (box.left(), box.top(), box.right(), box.bottom()) == (10, 20, 59, 99)
+    assert (box.width(), box.height()) == (50, 80)
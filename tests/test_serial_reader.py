@@ -0,0 +1,33 @@
+import threading
+import time
+
+from conftest import load_script
+from drishti.serial_reader import SerialLineReader
+
+fake_mq3_serial = load_script("MQ3 Files/fake_mq3_serial.py", "fake_mq3_serial")
+
+
+def test_serial_lines_are_read_as_they_arrive():
+    device = fake_mq3_serial.FakeSerialDevice()
+    readings = []
+    got_two = threading.Event()
+
+    def on_reading(reading):
+        readings.append(reading)
+        if len(readings) == 2:
+            got_two.set()
+
+    reader = SerialLineReader(device.port, 9600, on_reading, open_delay=0).start()
+    try:
+        deadline = time.monotonic() + 5
+        while not reader.reopens and time.monotonic() < deadline:
+            time.sleep(0.01)
+        device.write_line("Sensor Value: 140")
+        device.write_line("")
+        device.write_line("Sensor Value: 151")
+        assert got_two.wait(5)
+    finally:
+        reader.stop()
+        device.close()
+    assert [reading.line for reading in readings] == ["Sensor Value: 140", "Sensor Value: 151"]
+    assert readings[0].wall is not None and readings[0].monotonic <= readings[1].monotonic
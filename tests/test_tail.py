@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from drishti.tail import CsvTail, SlidingWindow
+
+HEADER = "Time,Speed,Load\n"
+
+
+def row(n):
+    return f"t{n},{n},{n * 2}\n"
+
+
+def write(path, text, mode="a"):
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_reads_only_complete_rows_once(tmp_path):
+    path = str(tmp_path / "log.csv")
+    tail = CsvTail(path, ["Time", "Speed"])
+    assert tail.read()[0].empty                     # no file yet
+    write(path, HEADER + row(0) + row(1) + "t2,2")
+    rows, starts = tail.read()
+    assert rows["Speed"].tolist() == [0, 1]
+    assert starts.tolist() == [len(HEADER), len(HEADER) + len(row(0))]
+    assert tail.read()[0].empty
+    write(path, ",4\n" + row(3))
+    rows, starts = tail.read()
+    assert rows["Time"].tolist() == ["t2", "t3"]
+    with open(path, "rb") as f:
+        f.seek(int(starts[1]))
+        assert f.readline().decode() == row(3)
+    assert tail.rows_read == 4
+
+
+def test_missing_columns_blank_lines_and_byte_order_mark(tmp_path):
+    path = str(tmp_path / "log.csv")
+    write(path, "\ufeffTime, Speed\n" + "t0,5\n\nt1,6\n", "w")
+    rows, starts = CsvTail(path, ["Speed", "Load"]).read()
+    assert rows["Speed"].tolist() == [5, 6]
+    assert rows["Load"].isna().all()
+    assert len(starts) == 2
+
+
+def test_waits_for_a_complete_header(tmp_path):
+    path = str(tmp_path / "log.csv")
+    write(path, "Time,Spe")
+    tail = CsvTail(path, ["Speed"])
+    assert tail.read()[0].empty
+    write(path, "ed\n" + "t0,7\n")
+    assert tail.read()[0]["Speed"].tolist() == [7]
+
+
+def test_catches_up_in_bounded_reads(tmp_path):
+    path = str(tmp_path / "log.csv")
+    write(path, HEADER + "".join(row(n) for n in range(100)))
+    tail = CsvTail(path, ["Speed"], max_read_bytes=64)
+    speeds = []
+    for _ in range(100):
+        rows, _ = tail.read()
+        if rows.empty:
+            break
+        assert len(rows) <= 64 // len(row(0))
+        speeds += rows["Speed"].tolist()
+    assert speeds == list(range(100))
+
+
+def test_starts_over_when_the_log_is_replaced_or_truncated(tmp_path):
+    path = str(tmp_path / "log.csv")
+    write(path, HEADER + row(0) + row(1))
+    tail = CsvTail(path, ["Speed"])
+    tail.read()
+    write(path, HEADER + row(5), "w")              # truncated in place
+    rows, _ = tail.read()
+    assert tail.restarted and rows["Speed"].tolist() == [5]
+
+    replacement = str(tmp_path / "new.csv")
+    write(replacement, "Speed,Time\n" + "9,t9\n" + "10,t10\n" + "11,t11\n")
+    os.replace(replacement, path)                  # a new, longer file
+    rows, _ = tail.read()
+    assert tail.restarted and rows["Speed"].tolist() == [9, 10, 11]
+    assert tail.read()[0].empty and not tail.restarted
+
+
+def frame(first, count):
+    return pd.DataFrame({"n": range(first, first + count)}), np.arange(first, first + count) * 10
+
+
+def test_window_step_must_fit_the_size():
+    with pytest.raises(ValueError):
+        SlidingWindow(10, 0)
+    with pytest.raises(ValueError):
+        SlidingWindow(10, 11)
+
+
+def test_overlapping_windows_and_buffer_trimming():
+    window = SlidingWindow(size=6, step=4)
+    window.extend(*frame(0, 10))
+    seen = []
+    while True:
+        current = window.next_window()
+        if current is None:
+            break
+        seen.append((current.start_row, current.end_row, current.new_from_row, current.rows["n"].tolist()))
+        window.mark_analysed(current)
+    assert seen == [(0, 4, 0, [0, 1, 2, 3]), (2, 8, 4, [2, 3, 4, 5, 6, 7])]
+    # the next window (4, 12) needs rows from 6 on
+    assert window.first_row == 6 and window.rows["n"].tolist() == [6, 7, 8, 9]
+    assert window.resume_offset(None) == 60
+    assert window.next_window() is None
+
+    last = window.next_window(flush=True)
+    assert (last.start_row, last.end_row, last.new_from_row) == (6, 10, 8)
+    window.mark_analysed(last)
+    assert window.next_window(flush=True) is None
+
+
+def test_resume_offset_without_buffered_rows(tmp_path):
+    path = str(tmp_path / "log.csv")
+    write(path, HEADER + row(0))
+    tail = CsvTail(path, ["Speed"])
+    tail.read()
+    window = SlidingWindow(4, 2)
+    assert window.resume_offset(tail) == tail.offset == len(HEADER) + len(row(0))
@@ -0,0 +1,106 @@
+import threading
+
+from drishti.uploader import BatchedUploader
+
+
+class FakeRemoteFile:
+    def __init__(self, sftp, path):
+        self.sftp = sftp
+        self.path = path
+
+    def tell(self):
+        return len(self.sftp.files.get(self.path, ""))
+
+    def write(self, data):
+        self.sftp.before_write.wait(5)
+        if self.sftp.fail_after is not None:
+            # The link breaks after part of the data has reached the server.
+            self.sftp.files[self.path] = self.sftp.files.get(self.path, "") + data[:self.sftp.fail_after]
+            self.sftp.fail_after = None
+            raise OSError("connection lost")
+        self.sftp.files[self.path] = self.sftp.files.get(self.path, "") + data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeStat:
+    def __init__(self, size):
+        self.st_size = size
+
+
+class FakeSftp:
+    def __init__(self):
+        self.files = {}
+        self.fail_after = None
+        self.before_write = threading.Event()
+        self.before_write.set()
+
+    def open(self, path, mode):
+        assert mode == "a"
+        return FakeRemoteFile(self, path)
+
+    def stat(self, path):
+        return FakeStat(len(self.files.get(path, "")))
+
+    def truncate(self, path, size):
+        self.files[path] = self.files[path][:size]
+
+
+def make_uploader(tmp_path):
+    uploader = BatchedUploader("host", "user", "key", str(tmp_path / "spool"))
+    sftp = FakeSftp()
+    uploader._sftp = sftp
+    uploader._ensure_connected = lambda: True
+    uploader._disconnect = lambda: None
+    return uploader, sftp
+
+
+def test_spooled_rows_are_replayed_before_new_ones(tmp_path):
+    uploader, sftp = make_uploader(tmp_path)
+    uploader._spool({"/remote/log.csv": ["1", "2"]})
+    uploader._deliver({"/remote/log.csv": ["3"]})
+    assert sftp.files["/remote/log.csv"] == "1\n2\n3\n"
+    assert list((tmp_path / "spool").iterdir()) == []
+    assert uploader.rows_sent == 3
+
+
+def test_partial_write_is_not_duplicated(tmp_path):
+    uploader, sftp = make_uploader(tmp_path)
+    uploader._deliver({"/remote/log.csv": ["old"]})
+    sftp.fail_after = 5                 # "row1\n" arrives, "row2\n" does not
+    uploader._deliver({"/remote/log.csv": ["row1", "row2"]})
+    assert sftp.files["/remote/log.csv"] == "old\nrow1\n"
+    assert uploader._replay_spool()
+    assert sftp.files["/remote/log.csv"] == "old\nrow1\nrow2\n"
+    uploader._deliver({"/remote/log.csv": ["row3"]})
+    assert sftp.files["/remote/log.csv"] == "old\nrow1\nrow2\nrow3\n"
+    assert list((tmp_path / "spool").iterdir()) == []
+
+
+def test_failed_replay_is_sent_again_whole(tmp_path):
+    uploader, sftp = make_uploader(tmp_path)
+    uploader._spool({"/remote/log.csv": ["a", "b"]})
+    sftp.fail_after = 2
+    assert not uploader._replay_spool()
+    uploader._spool({"/remote/log.csv": ["c"]})
+    assert uploader._replay_spool()
+    assert sftp.files["/remote/log.csv"] == "a\nb\nc\n"
+
+
+def test_spooling_does_not_wait_for_a_replay(tmp_path):
+    uploader, sftp = make_uploader(tmp_path)
+    uploader._spool({"/remote/log.csv": ["a"]})
+    sftp.before_write.clear()           # the replay hangs on the network
+    replay = threading.Thread(target=uploader._replay_spool)
+    replay.start()
+    spooled = threading.Thread(target=uploader._spool, args=({"/remote/log.csv": ["b"]},))
+    spooled.start()
+    spooled.join(2)
+    assert not spooled.is_alive()
+    sftp.before_write.set()
+    replay.join(5)
+    assert sftp.files["/remote/log.csv"] == "a\nb\n"
@@ -0,0 +1,95 @@
+import os
+from datetime import datetime
+
+import cv2
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import REPO_ROOT
+from drishti import visibility
+
+SAMPLE_IMAGE = os.path.join(REPO_ROOT, "Front Facing Camera Files", "image_20250315_153410.jpg")
+
+
+def test_min_channel_matches_numpy():
+    img = np.random.default_rng(0).integers(0, 256, (600, 90, 3), dtype=np.uint8)
+    assert np.array_equal(visibility.compute_min_channel(img), np.min(img, axis=2))
+
+
+def test_dark_channel_takes_the_patch_minimum():
+    img = np.full((31, 31, 3), 200, np.uint8)
+    img[15, 15] = (10, 90, 90)
+    dark = visibility.compute_dark_channel(img, patch_size=5)
+    assert dark[15, 15] == dark[13, 17] == 10
+    assert dark[12, 15] == 200
+
+
+def test_visibility_of_plain_images():
+    assert visibility.score_image(np.zeros((40, 40, 3), np.uint8)) == (100.0, 0.0)
+    assert visibility.score_image(np.full((40, 40, 3), 255, np.uint8)) == (0.0, 255.0)
+
+
+def test_scaled_patch_size_rounds_up():
+    assert [visibility.scaled_patch_size(scale) for scale in (1, 2, 4, 8)] == [15, 8, 4, 2]
+    assert visibility.scaled_patch_size(100) == 1
+
+
+def test_reduced_read_flag_rejects_other_scales():
+    with pytest.raises(ValueError):
+        visibility.reduced_read_flag(3)
+
+
+def test_jpeg_and_file_scores_agree():
+    with open(SAMPLE_IMAGE, "rb") as f:
+        data = f.read()
+    from_bytes = visibility.score_jpeg(data, 2)
+    from_file = visibility.score_file(SAMPLE_IMAGE, 2)
+    assert from_bytes[:2] == from_file[:2]
+    assert 0 <= from_bytes[0] <= 100
+    full = visibility.score_file(SAMPLE_IMAGE, 1)
+    assert from_bytes[2].shape[1] * 2 == pytest.approx(full[2].shape[1], abs=1)
+    assert visibility.score_jpeg(b"not a jpeg") is None
+
+
+def test_working_width_shrinks_the_image():
+    _, _, img = visibility.score_file(SAMPLE_IMAGE, 2, working_width=320)
+    assert img.shape[1] == 320
+
+
+def test_visibility_row_takes_the_time_from_the_filename(tmp_path):
+    row = visibility.visibility_row(SAMPLE_IMAGE, 2)
+    assert row[:3] == ["2025-03-15", "15:34:10", "image_20250315_153410.jpg"]
+    assert float(row[3]) == pytest.approx(100 * (1 - float(row[4]) / 255), abs=0.01)
+    unreadable = tmp_path / "image_20250315_153410.jpg"
+    unreadable.write_bytes(b"")
+    assert visibility.visibility_row(str(unreadable)) is None
+
+
+def test_visibility_row_falls_back_to_the_modification_time(tmp_path):
+    path = str(tmp_path / "front.jpg")
+    cv2.imwrite(path, np.full((64, 64, 3), 128, np.uint8))
+    os.utime(path, (1741000000, 1741000000))
+    modified = datetime.fromtimestamp(1741000000)
+    assert visibility.visibility_row(path, 1)[:2] == [modified.strftime("%Y-%m-%d"), modified.strftime("%H:%M:%S")]
+
+
+def test_snapshot_trigger():
+    trigger = visibility.SnapshotTrigger(threshold=45, change=10, min_interval=30)
+    assert trigger.check(80, 0) is None
+    assert trigger.check(60, 3) == "change"
+    assert trigger.check(40, 6) == "change"
+    assert trigger.check(41, 9) is None        # still low, but sent 3 s ago
+    assert trigger.check(40, 36) == "low"
+    assert trigger.check(42, 39) is None
+    assert trigger.check(55, 42) == "change"   # recovering is reported too
+    assert trigger.check(56, 45) is None
+
+
+def test_log_times_read_both_date_formats():
+    dates = pd.Series(["2025-03-05", "05-03-2025", "2025-12-01", "01-12-2025", "2025-03-15", "n/a"])
+    times = pd.Series(["14:30:00", "14:30:00", "06:00:00", "06:00:00", "25:00:00", "14:30:00"])
+    utc = visibility.log_times(dates, times, "Asia/Kolkata")
+    march, december = pd.Timestamp("2025-03-05 09:00", tz="UTC"), pd.Timestamp("2025-12-01 00:30", tz="UTC")
+    assert utc[:4].tolist() == [march, march, december, december]
+    assert utc[4:].isna().all()
@@ -0,0 +1,45 @@
+import csv
+import os
+import sys
+
+import pytest
+
+from conftest import REPO_ROOT, load_script
+
+accuracy = load_script("Front Facing Camera Files/visibility_accuracy.py", "visibility_accuracy")
+server = load_script("Front Facing Camera Files/Activation on server.py", "front_camera_server")
+
+IMAGE_DIR = os.path.join(REPO_ROOT, "Front Facing Camera Files")
+SAMPLE_IMAGE = os.path.join(IMAGE_DIR, "image_20250315_153410.jpg")
+
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["visibility_accuracy.py", IMAGE_DIR, *args])
+    return accuracy.main()
+
+
+def test_full_resolution_matches_the_original_computation():
+    assert accuracy.score_file(SAMPLE_IMAGE, 1)[0] == pytest.approx(accuracy.reference_score(SAMPLE_IMAGE), abs=1e-9)
+
+
+def test_server_setting_is_within_half_a_point(monkeypatch):
+    assert run(monkeypatch, "--reduction", str(server.SCORE_REDUCTION), "--tolerance", "0.5") == 0
+
+
+def test_documented_examples_pass(monkeypatch):
+    assert run(monkeypatch, "--reduction", "2", "--tolerance", "1") == 0
+    assert run(monkeypatch, "--reduction", "2", "--working-width", "1280", "--tolerance", "1") == 0
+
+
+def test_too_coarse_a_setting_fails(monkeypatch):
+    assert run(monkeypatch, "--reduction", "4", "--working-width", "480", "--tolerance", "2") == 1
+
+
+def test_logged_scores_skip_bad_rows(tmp_path):
+    log = tmp_path / "visibility_log.csv"
+    with open(log, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Time", "Filename", "Visibility (%)", "Avg Dark Value"])
+        writer.writerow(["2025-03-15", "15:34:10", "image_20250315_153410.jpg", "66.45", "85.55"])
+        writer.writerow(["2025-03-15", "15:34:13", "image_20250315_153413.jpg", "n/a", ""])
+    assert accuracy.logged_scores(str(log)) == {"image_20250315_153410.jpg": 66.45}
@@ -0,0 +1,119 @@
+import csv
+import os
+import shutil
+import sys
+
+import pytest
+
+from conftest import REPO_ROOT
+
+SCRIPT_DIR = os.path.join(REPO_ROOT, "Front Facing Camera Files")
+SAMPLES = ["image_20250315_153410.jpg", "image_20250315_154146.jpg"]
+SETTINGS = "v1,reduction=2,working_width=0,patch=15"
+
+# Imported by name, so the spawned worker processes can import it too.
+sys.path.insert(0, SCRIPT_DIR)
+import visibility_backfill as backfill  # noqa: E402
+
+
+@pytest.fixture
+def images(tmp_path):
+    root = tmp_path / "archive"
+    (root / "day1").mkdir(parents=True)
+    for filename in SAMPLES:
+        shutil.copy(os.path.join(SCRIPT_DIR, filename), root / "day1")
+    (root / "day1" / "image_20250315_170000.jpg").write_bytes(b"truncated")
+    (root / "notes.txt").write_text("not an image")
+    return root
+
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["visibility_backfill.py", *args])
+    return backfill.main()
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_state_rolls_back_to_the_last_checkpoint(tmp_path):
+    csv_path = str(tmp_path / "out.csv")
+    state = backfill.BackfillState(csv_path, SETTINGS)
+    state.add("a.jpg", 10, 1, "", "ok", ["2025-03-15", "15:34:10", "a.jpg", "66.00", "86.70"])
+    state.checkpoint()
+    state.add("b.jpg", 10, 2, "", "ok", ["2025-03-15", "15:41:46", "b.jpg", "58.00", "107.10"])
+    state.checkpoint()
+    with open(csv_path, "a") as f:     # rows written after the checkpoint, then a crash
+        f.write("2025-03-15,16:00:00,c.jpg,50.00,127.50\n")
+    with open(state.index_path, "a") as f:
+        f.write("c.jpg\t10\t3\t\tok\n")
+
+    reopened = backfill.BackfillState(csv_path, SETTINGS)
+    assert reopened.done == {("a.jpg", 10, 1), ("b.jpg", 10, 2)}
+    reopened.close()
+    assert [row[2] for row in read_rows(csv_path)] == ["Filename", "a.jpg", "b.jpg"]
+
+
+def test_state_refuses_other_settings_or_an_unindexed_csv(tmp_path):
+    csv_path = str(tmp_path / "out.csv")
+    backfill.BackfillState(csv_path, SETTINGS).close()
+    with pytest.raises(SystemExit):
+        backfill.BackfillState(csv_path, SETTINGS.replace("reduction=2", "reduction=4"))
+    os.remove(csv_path + ".ckpt")
+    with pytest.raises(SystemExit):
+        backfill.BackfillState(csv_path, SETTINGS)
+    backfill.BackfillState(csv_path, SETTINGS, restart=True).close()
+    assert read_rows(csv_path) == [backfill.CSV_HEADER]
+
+
+def test_process_image_statuses(images):
+    path = str(images / "day1" / SAMPLES[0])
+    backfill._init_worker(2, None, True, set())
+    relative_path, size, _, digest, status, row = backfill.process_image((path, "day1/a.jpg", 1, 2))
+    assert (relative_path, status, row[2]) == ("day1/a.jpg", "ok", SAMPLES[0]) and digest
+    backfill._init_worker(2, None, True, {digest})
+    assert backfill.process_image((path, "day1/a.jpg", 1, 2))[4] == "duplicate"
+    broken = str(images / "day1" / "image_20250315_170000.jpg")
+    assert backfill.process_image((broken, "day1/b.jpg", 1, 2))[4] == "error"
+
+
+def test_rerun_only_processes_new_images(images, monkeypatch, capsys):
+    csv_path = str(images / "visibility_backfill.csv")
+    assert run(monkeypatch, str(images), "--workers", "2") == 0
+    rows = read_rows(csv_path)
+    assert rows[0] == backfill.CSV_HEADER
+    assert sorted(row[2] for row in rows[1:]) == SAMPLES
+
+    shutil.copy(os.path.join(SCRIPT_DIR, "image_20250315_155458.jpg"), images)
+    capsys.readouterr()
+    assert run(monkeypatch, str(images), "--workers", "1") == 0
+    assert "Done: 1 images" in capsys.readouterr().out
+    assert sorted(row[2] for row in read_rows(csv_path)[1:]) == SAMPLES + ["image_20250315_155458.jpg"]
+
+
+def test_hash_skips_copies(images, monkeypatch):
+    shutil.copy(images / "day1" / SAMPLES[0], images / "copy.jpg")
+    assert run(monkeypatch, str(images), "--workers", "1", "--hash") == 0
+    rows = read_rows(str(images / "visibility_backfill.csv"))
+    assert len(rows) == 1 + len(SAMPLES)
+
+
+def test_an_error_stops_the_workers_and_keeps_the_checkpoint(images, monkeypatch):
+    checkpoint = backfill.BackfillState.checkpoint
+    calls = []
+
+    def failing_checkpoint(self):
+        calls.append(None)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        checkpoint(self)
+
+    monkeypatch.setattr(backfill, "CHECKPOINT_ROWS", 1)
+    monkeypatch.setattr(backfill.BackfillState, "checkpoint", failing_checkpoint)
+    with pytest.raises(OSError, match="disk full"):
+        run(monkeypatch, str(images), "--workers", "1")
+    monkeypatch.setattr(backfill.BackfillState, "checkpoint", checkpoint)
+    assert run(monkeypatch, str(images), "--workers", "1") == 0
+    rows = read_rows(str(images / "visibility_backfill.csv"))
+    assert sorted(row[2] for row in rows[1:]) == SAMPLES
@@ -0,0 +1,100 @@
+import csv
+import queue
+import shutil
+import time
+
+import pytest
+
+from conftest import REPO_ROOT, load_script
+
+server = load_script("Front Facing Camera Files/Activation on server.py", "front_camera_server")
+
+SAMPLE_IMAGE = REPO_ROOT + "/Front Facing Camera Files/image_20250315_153410.jpg"
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "STABLE_POLL", 0.01)
+    monkeypatch.setattr(server, "STABLE_POLLS", 3)
+    return tmp_path
+
+
+def _drain(ready, count, timeout=5.0):
+    items = []
+    deadline = time.monotonic() + timeout
+    while len(items) < count and time.monotonic() < deadline:
+        try:
+            items.append(ready.get(timeout=0.05))
+        except queue.Empty:
+            pass
+    return items
+
+
+def test_closed_never_blocks_the_observer_thread(folder):
+    ready = queue.Queue(maxsize=1)
+    tracker = server.CompletionTracker(ready, {str(folder): "log.csv"})
+    tracker.start()
+    paths = []
+    for n in range(5):
+        path = folder / f"image_{n}.jpg"
+        path.write_bytes(b"jpeg")
+        paths.append(str(path))
+    started = time.monotonic()
+    for path in paths:
+        tracker.closed(path)
+    assert time.monotonic() - started < 0.5
+    items = _drain(ready, 5)
+    tracker.close()
+    assert items == [(path, "log.csv") for path in paths]
+
+
+def test_an_upload_is_queued_once(folder):
+    ready = queue.Queue()
+    tracker = server.CompletionTracker(ready, {str(folder): "log.csv"})
+    tracker.start()
+    path = folder / "image_1.jpg"
+    path.write_bytes(b"jpeg")
+    tracker.changed(str(path))
+    tracker.closed(str(path))
+    tracker.closed(str(path))
+    assert _drain(ready, 1) == [(str(path), "log.csv")]
+    time.sleep(0.1)
+    tracker.close()
+    assert ready.empty()
+
+
+def test_a_file_without_close_event_is_queued_once_its_size_settles(folder):
+    ready = queue.Queue()
+    tracker = server.CompletionTracker(ready, {str(folder): "log.csv"})
+    tracker.start()
+    path = folder / "image_1.jpg"
+    path.write_bytes(b"")
+    tracker.changed(str(path))
+    time.sleep(0.1)
+    assert ready.empty()                  # still empty: not complete
+    path.write_bytes(b"jpeg")
+    assert _drain(ready, 1) == [(str(path), "log.csv")]
+    tracker.close()
+
+
+def test_images_are_scored_and_logged(folder):
+    shutil.copy(SAMPLE_IMAGE, folder)
+    log = str(folder / "visibility_log.csv")
+    ready = queue.Queue(maxsize=2)
+    writer = server.CsvWriter()
+    processor = server.VisibilityProcessor(ready, writer, workers=2, use_processes=False)
+    tracker = server.CompletionTracker(ready, {str(folder): log})
+    writer.start()
+    processor.start()
+    tracker.start()
+    tracker.closed(str(folder / "image_20250315_153410.jpg"))
+    (folder / "image_20250315_999999.jpg").write_bytes(b"not a jpeg")
+    tracker.closed(str(folder / "image_20250315_999999.jpg"))
+    time.sleep(0.5)
+    tracker.close()
+    processor.close()
+    writer.close()
+    with open(log, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == server.CSV_HEADER
+    assert [row[:3] for row in rows[1:]] == [["2025-03-15", "15:34:10", "image_20250315_153410.jpg"]]
@@ -0,0 +1,162 @@
+import asyncio
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from drishti import wire
+from drishti.ingest_client import Outbox
+from drishti.ingest_server import IngestServer
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def test_records_round_trip():
+    wall = datetime(2025, 3, 5, 14, 30, 15, 123456, tzinfo=IST)
+    driver = (wall, 0.25, 0.5, 0.125, 40.0, 2, 1)
+    assert wire.DRIVER.decode(wire.DRIVER.encode(driver)) == driver
+    obd = (wall, "Wed Mar 05 14:30:15 GMT+05:30 2025") + (1.5,) * (len(wire.OBD_COLUMNS) - 1)
+    decoded = wire.OBD.decode(wire.OBD.encode(obd))
+    assert decoded == obd and decoded[0].utcoffset() == timedelta(hours=5, minutes=30)
+    value = wire.MQ3.decode(wire.MQ3.encode(wire.mq3_record(wall, "no reading")))[1]
+    assert math.isnan(value)
+
+
+def test_frames_round_trip():
+    records = [wire.MQ3.encode((datetime(2025, 3, 5, tzinfo=IST), float(n))) for n in range(3)]
+    frame = wire.encode_batch(wire.MQ3.sensor, wire.MQ3.version, 7, records)
+    frame_type, length = wire.decode_header(frame[:wire.HEADER.size])
+    assert (frame_type, length) == (wire.BATCH, len(frame) - wire.HEADER.size)
+    assert wire.decode_batch(frame[wire.HEADER.size:]) == (wire.MQ3.sensor, wire.MQ3.version, 7, records)
+    assert wire.decode_hello(wire.encode_hello("car-1")[wire.HEADER.size:]) == "car-1"
+    assert wire.decode_state(wire.encode_state({1: 5, 3: 9})[wire.HEADER.size:]) == {1: 5, 3: 9}
+    assert wire.decode_ack(wire.encode_ack(2, 11)[wire.HEADER.size:]) == (2, 11)
+
+
+@pytest.mark.parametrize("payload", [b"\x01", b"", wire.encode_batch(1, 1, 1, [b"abc"])[wire.HEADER.size:-1]])
+def test_short_batch_is_a_protocol_error(payload):
+    with pytest.raises(wire.ProtocolError):
+        wire.decode_batch(payload)
+
+
+@pytest.mark.parametrize("payload", [b"\xff\xfe", b"", b"../etc", b".hidden"])
+def test_bad_hello_is_a_protocol_error(payload):
+    with pytest.raises(wire.ProtocolError):
+        wire.decode_hello(payload)
+
+
+def test_bad_header_is_a_protocol_error():
+    with pytest.raises(wire.ProtocolError):
+        wire.decode_header(b"XX" + wire.encode_hello("car-1")[2:wire.HEADER.size])
+
+
+def _exchange(server, frames, replies_expected=None):
+    """
+    Send the frames to server.handle and return the frames it answers with (until it
+    closes the connection, or replies_expected have arrived).
+    """
+
+    async def run():
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"".join(frames))
+        await writer.drain()
+        replies = []
+        try:
+            while replies_expected is None or len(replies) < replies_expected:
+                header = await reader.readexactly(wire.HEADER.size)
+                frame_type, length = wire.decode_header(header)
+                replies.append((frame_type, await reader.readexactly(length) if length else b""))
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return replies
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("frames", [
+    [wire.encode_frame(wire.HELLO, b"\xff\xfe")],
+    [wire.encode_hello("car-1"), wire.encode_frame(wire.BATCH, b"\x01")],
+])
+def test_server_answers_malformed_frames_with_error(tmp_path, frames):
+    server = IngestServer(str(tmp_path), csv_mirrors={}, fsync=False)
+    replies = _exchange(server, frames)
+    server.close()
+    assert replies[-1][0] == wire.ERROR
+    assert server.open_connections == 0
+
+
+def test_server_drops_resent_records(tmp_path):
+    server = IngestServer(str(tmp_path), csv_mirrors={}, fsync=False)
+    records = [wire.MQ3.encode((datetime(2025, 3, 5, tzinfo=IST), float(n))) for n in range(4)]
+    replies = _exchange(server, [
+        wire.encode_hello("car-1"),
+        wire.encode_batch(wire.MQ3.sensor, 1, 1, records[:3]),
+        wire.encode_batch(wire.MQ3.sensor, 1, 2, records[1:]),
+    ], replies_expected=3)
+    server.close()
+    assert replies[0] == (wire.STATE, b"")
+    assert [wire.decode_ack(payload) for _, payload in replies[1:]] == [(1, 3), (1, 4)]
+    assert server.committed("car-1") == {wire.MQ3.sensor: 4}
+
+
+def _fill(outbox, count):
+    for n in range(count):
+        outbox.append(wire.MQ3.encode((datetime(2025, 3, 5, tzinfo=IST), float(n))))
+
+
+def test_outbox_rewind_resends_unacknowledged(tmp_path):
+    outbox = Outbox(str(tmp_path), wire.MQ3)
+    _fill(outbox, 5)
+    first_seq, records, offset = outbox.read_batch(2)
+    outbox.ack(first_seq + len(records) - 1, offset)
+    assert outbox.read_batch(10)[0] == 3
+    assert outbox.unsent() == 0
+    outbox.rewind()
+    assert outbox.unsent() == 3
+    first_seq, records, _ = outbox.read_batch(10)
+    assert first_seq == 3 and len(records) == 3
+    outbox.close()
+
+
+def test_outbox_rewind_skips_what_the_server_committed(tmp_path):
+    outbox = Outbox(str(tmp_path), wire.MQ3)
+    _fill(outbox, 5)
+    outbox.read_batch(10)
+    outbox.rewind(committed=4)   # the ACK for seq 4 was lost
+    assert outbox.acked_seq == 4 and outbox.unacked() == 1
+    first_seq, records, _ = outbox.read_batch(10)
+    assert first_seq == 5 and len(records) == 1
+    outbox.close()
+
+    # The acknowledged position survives a restart.
+    reopened = Outbox(str(tmp_path), wire.MQ3)
+    assert (reopened.acked_seq, reopened.next_seq) == (4, 6)
+    assert reopened.read_batch(10)[0] == 5
+    reopened.close()
+
+
+def test_outbox_rewind_past_its_end_renumbers(tmp_path):
+    outbox = Outbox(str(tmp_path), wire.MQ3)
+    _fill(outbox, 2)
+    outbox.rewind(committed=10)   # the outbox was lost on the Pi
+    assert outbox.unacked() == 0
+    _fill(outbox, 1)
+    assert outbox.read_batch(10)[0] == 11
+    outbox.close()
+
+
+def test_outbox_drops_a_partly_written_entry(tmp_path):
+    outbox = Outbox(str(tmp_path), wire.MQ3)
+    _fill(outbox, 3)
+    outbox.close()
+    with open(outbox.path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 2)
+    reopened = Outbox(str(tmp_path), wire.MQ3)
+    assert reopened.next_seq == 3
+    assert len(reopened.read_batch(10)[1]) == 2
+    reopened.close()